@@ -10,6 +10,7 @@ from loguru import logger
 from app.core.config import settings
 from app.models.user import User
 from app.core.security.pass_hash import verify_password
+from app.core.security.principal import principal_cache
 
 # Схемы аутентификации
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/kyc/token")  # Для эндпоинта /token
@@ -75,7 +76,10 @@ def create_access_token(
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(jwt_bearer)
 ) -> User:
-    """Получение текущего пользователя из JWT токена"""
+    """
+    Текущий пользователь из JWT токена: токен проверяется один раз, пользователь и его роли —
+    из кэша принципалов, без запроса к БД. Возвращает частичный экземпляр User (см. Principal.to_user)
+    """
     token = credentials.credentials
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -85,26 +89,40 @@ async def get_current_user(
     
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id = payload.get("user_id")
-        email = payload.get("sub")
-        
-        if user_id:
-            user = await User.get(id=user_id)
-        elif email:
-            user = await User.get(email=email)
-        else:
-            raise credentials_exception
-        
-        if not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Inactive user"
-            )
-        return user
-    except (JWTError, DoesNotExist) as e:
+    except JWTError as e:
         logger.error(f"Authentication error: {str(e)}")
         raise credentials_exception
 
+    user_id = payload.get("user_id")
+    email = payload.get("sub")
+    if not user_id and email:
+        user_id = await User.get_or_none(email=email).values_list("id", flat=True)
+    if not user_id:
+        raise credentials_exception
+
+    principal = await principal_cache.get(user_id)
+    if principal is None:
+        logger.error(f"Authentication error: user {user_id} not found")
+        raise credentials_exception
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user"
+        )
+    return principal.to_user()
+
+async def get_current_user_record(user: User = Depends(get_current_user)) -> User:
+    """Полная запись текущего пользователя из БД — для эндпоинтов, которые читают профиль или меняют пользователя"""
+    record = await User.get_or_none(id=user.id)
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    record.role_names = user.role_names
+    return record
+
 async def get_current_active_user(user: User = Depends(get_current_user)) -> User:
     """Проверка активного пользователя"""
     if not user.is_active:
@@ -1,196 +1,227 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from app.schemas import (TransLiteral, VehicleTypeModelAddons, MakeModelAddons, ModelModelAddons,
                     SeriesModelAddons, YearCountResponse)
 
 from app.models import VehicleType, Make, Model, Series, Lot, Lot1, Lot2 , Lot3 , Lot4, Lot5 , Lot6 , Lot7
-from typing import List, Optional
+from typing import Any, List, Optional
 from loguru import logger
 from fastapi.exceptions import HTTPException
 from fastapi import status
 from tortoise.functions import Count
 from app.services.translate_service import get_translation
+from app.services import get_vehicle_type_counters
+from app.services.cache.response import response_cache
 
 router = APIRouter()
 
+# Справочники со счетчиками лотов: готовые тела ответов, устаревшие отдаются, пока идет пересчет
+ADDITIONAL_RESPONSE_TTL = 300
+STALE_TTL_FACTOR = 4
+
 @router.get("/vehicle_types")
-async def get_all_vehicle_types(language: TransLiteral = Query("en")):
+async def get_all_vehicle_types(request: Request, language: TransLiteral = Query("en")):
     """
     Получает все типы транспортных средств, исключая 'other' и сортируя по количеству лотов
     """
-    try:
-        vehicle_types = await VehicleType.all()
-        result = []
+    async def build() -> Any:
+        try:
+            vehicle_types = await VehicleType.all()
+            counters = await get_vehicle_type_counters()
+            result = []
         
-        for vt in vehicle_types:
-            if vt.slug == "other":
-                continue  # исключаем 'other'
+            for vt in vehicle_types:
+                if vt.slug == "other":
+                    continue  # исключаем 'other'
             
-            count = (
-                await Lot1.filter(vehicle_type=vt).count() +
-                await Lot2.filter(vehicle_type=vt).count() +
-                await Lot3.filter(vehicle_type=vt).count() +
-                await Lot4.filter(vehicle_type=vt).count() +
-                await Lot5.filter(vehicle_type=vt).count() +
-                await Lot6.filter(vehicle_type=vt).count() +
-                await Lot7.filter(vehicle_type=vt).count()
-            )
+                count = counters.get(vt.id, 0)
 
-            item = {
-                "id": vt.id,
-                "name": vt.name,
-                "slug": vt.slug,
-                "icon_path": vt.icon_path,
-                "icon_active": vt.icon_active,
-                "icon_disable": vt.icon_disable,
-                "counter": count
-            }
+                item = {
+                    "id": vt.id,
+                    "name": vt.name,
+                    "slug": vt.slug,
+                    "icon_path": vt.icon_path,
+                    "icon_active": vt.icon_active,
+                    "icon_disable": vt.icon_disable,
+                    "counter": count
+                }
 
-            translated_value = await get_translation(
-                field_name="vehicle_type", 
-                original_value=vt.slug, 
-                language=language
-            )
-            if translated_value:
-                item["name"] = translated_value
+                translated_value = await get_translation(
+                    field_name="vehicle_type", 
+                    original_value=vt.slug, 
+                    language=language
+                )
+                if translated_value:
+                    item["name"] = translated_value
 
-            result.append(item)
+                result.append(item)
         
-        # Сортируем по убыванию количества
-        result.sort(key=lambda x: x['counter'], reverse=True)
+            # Сортируем по убыванию количества
+            result.sort(key=lambda x: x['counter'], reverse=True)
         
-        return result
-    except Exception as e:
-        logger.error(f"Error getting vehicle types: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Internal server error while fetching vehicle types"
-        )
+            return result
+        except Exception as e:
+            logger.error(f"Error getting vehicle types: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Internal server error while fetching vehicle types"
+            )
+
+    return await response_cache.fetch(
+        request, response_cache.key(f"additional_vehicle_types_{language}"), build,
+        ADDITIONAL_RESPONSE_TTL, ADDITIONAL_RESPONSE_TTL * STALE_TTL_FACTOR
+    )
+
 
 @router.get("/makes", response_model=List[MakeModelAddons])
 async def get_all_makes(
+    request: Request,
     vehicle_type_slug: str = Query("automobile", description="Slug типа транспортного средства"),
     language: str = Query("en", description="Язык для переводов (не используется в текущей реализации)")
 ) -> List[MakeModelAddons]:
     """
     Получает все марки (Make) для указанного типа транспортного средства
     """
-    try:
-        vehicle_type = await VehicleType.filter(slug=vehicle_type_slug).first()
-        if not vehicle_type:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Vehicle type with slug '{vehicle_type_slug}' not found"
-            )
+    async def build() -> List[MakeModelAddons]:
+        try:
+            vehicle_type = await VehicleType.filter(slug=vehicle_type_slug).first()
+            if not vehicle_type:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Vehicle type with slug '{vehicle_type_slug}' not found"
+                )
         
-        makes = await Make.filter(vehicle_type=vehicle_type).all()
+            makes = await Make.filter(vehicle_type=vehicle_type).all()
         
-        result = []
-        for make in makes:
-            count = await Lot1.filter(make=make).count()
-            item = {
-                "id": make.id,
-                "name": make.name,
-                "slug": make.slug,
-                "vehicle_type_id": make.vehicle_type_id,
-                "counter": count
-            }
-            result.append(MakeModelAddons(**item))
+            result = []
+            for make in makes:
+                count = await Lot1.filter(make=make).count()
+                item = {
+                    "id": make.id,
+                    "name": make.name,
+                    "slug": make.slug,
+                    "vehicle_type_id": make.vehicle_type_id,
+                    "counter": count
+                }
+                result.append(MakeModelAddons(**item))
             
-        return result
+            return result
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting makes for vehicle type '{vehicle_type_slug}': {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Internal server error while fetching makes"
-        )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting makes for vehicle type '{vehicle_type_slug}': {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Internal server error while fetching makes"
+            )
+
+    return await response_cache.fetch(
+        request, response_cache.key(f"additional_makes_{vehicle_type_slug}"), build,
+        ADDITIONAL_RESPONSE_TTL, ADDITIONAL_RESPONSE_TTL * STALE_TTL_FACTOR
+    )
+
 
 @router.get("/models", response_model=List[ModelModelAddons])
 async def get_all_models(
+    request: Request,
     make_slug: str = Query("audi", description="Slug марки транспортного средства"),
     language: str = Query("en", description="Язык для переводов (не используется в текущей реализации)")
 ) -> List[ModelModelAddons]:
     """
     Получает все модели (Model) для указанной марки транспортного средства
     """
-    try:
-        make_result = await Make.filter(slug=make_slug).first()
-        if not make_result:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Make with slug '{make_slug}' not found"
-            )
+    async def build() -> List[ModelModelAddons]:
+        try:
+            make_result = await Make.filter(slug=make_slug).first()
+            if not make_result:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Make with slug '{make_slug}' not found"
+                )
         
-        models = await Model.filter(make=make_result).all()
+            models = await Model.filter(make=make_result).all()
         
-        result = []
-        for model in models:
-            count = await Lot1.filter(model=model).count()
-            item = {
-                "id": model.id,
-                "name": model.name,
-                "slug": model.slug,
-                "make_id": model.make_id,
-                "counter": count
-            }
-            result.append(ModelModelAddons(**item))
+            result = []
+            for model in models:
+                count = await Lot1.filter(model=model).count()
+                item = {
+                    "id": model.id,
+                    "name": model.name,
+                    "slug": model.slug,
+                    "make_id": model.make_id,
+                    "counter": count
+                }
+                result.append(ModelModelAddons(**item))
             
-        return result
+            return result
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting models for make '{make_slug}': {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Internal server error while fetching models"
-        )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting models for make '{make_slug}': {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Internal server error while fetching models"
+            )
+
+    return await response_cache.fetch(
+        request, response_cache.key(f"additional_models_{make_slug}"), build,
+        ADDITIONAL_RESPONSE_TTL, ADDITIONAL_RESPONSE_TTL * STALE_TTL_FACTOR
+    )
+
 
 @router.get("/series", response_model=List[SeriesModelAddons])
 async def get_all_series(
+    request: Request,
     model_slug: str = Query("a4", description="Slug модели транспортного средства"),
     language: str = Query("en", description="Язык для переводов (не используется в текущей реализации)")
 ) -> List[SeriesModelAddons]:
     """
     Получает все серии (Series) для указанной модели транспортного средства
     """
-    try:
-        model = await Model.filter(slug=model_slug).first()
-        if not model:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Model with slug '{model_slug}' not found"
-            )
+    async def build() -> List[SeriesModelAddons]:
+        try:
+            model = await Model.filter(slug=model_slug).first()
+            if not model:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Model with slug '{model_slug}' not found"
+                )
         
-        series = await Series.filter(model=model).all()
+            series = await Series.filter(model=model).all()
         
-        result = []
-        for s in series:
-            count = await Lot1.filter(series=s).count()
-            item = {
-                "id": s.id,
-                "name": s.name,
-                "slug": s.slug,
-                "model_id": s.model_id,
-                "counter": count
-            }
-            result.append(SeriesModelAddons(**item))
+            result = []
+            for s in series:
+                count = await Lot1.filter(series=s).count()
+                item = {
+                    "id": s.id,
+                    "name": s.name,
+                    "slug": s.slug,
+                    "model_id": s.model_id,
+                    "counter": count
+                }
+                result.append(SeriesModelAddons(**item))
             
-        return result
+            return result
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting series for model '{model_slug}': {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Internal server error while fetching series"
-        )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting series for model '{model_slug}': {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Internal server error while fetching series"
+            )
+
+    return await response_cache.fetch(
+        request, response_cache.key(f"additional_series_{model_slug}"), build,
+        ADDITIONAL_RESPONSE_TTL, ADDITIONAL_RESPONSE_TTL * STALE_TTL_FACTOR
+    )
+
 
 @router.get("/years", response_model=List[YearCountResponse])
 async def get_available_years(
+    request: Request,
     vehicle_type_slug: Optional[str] = Query(None, description="Slug типа транспортного средства"),
     make_slug: Optional[str] = Query(None, description="Slug марки транспортного средства"),
     model_slug: Optional[str] = Query(None, description="Slug модели транспортного средства"),
@@ -201,59 +232,67 @@ async def get_available_years(
     Получает все доступные года из таблицы Lot с учетом переданных фильтров
     Возвращает список объектов с годом и количеством лотов для каждого года
     """
-    try:
-        query = Lot1.all()
+    async def build() -> List[YearCountResponse]:
+        try:
+            query = Lot1.all()
         
-        if vehicle_type_slug:
-            vehicle_type = await VehicleType.filter(slug=vehicle_type_slug).first()
-            if not vehicle_type:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Vehicle type with slug '{vehicle_type_slug}' not found"
-                )
-            query = query.filter(vehicle_type=vehicle_type)
+            if vehicle_type_slug:
+                vehicle_type = await VehicleType.filter(slug=vehicle_type_slug).first()
+                if not vehicle_type:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Vehicle type with slug '{vehicle_type_slug}' not found"
+                    )
+                query = query.filter(vehicle_type=vehicle_type)
         
-        if make_slug:
-            make = await Make.filter(slug=make_slug).first()
-            if not make:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Make with slug '{make_slug}' not found"
-                )
-            query = query.filter(make=make)
+            if make_slug:
+                make = await Make.filter(slug=make_slug).first()
+                if not make:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Make with slug '{make_slug}' not found"
+                    )
+                query = query.filter(make=make)
         
-        if model_slug:
-            model = await Model.filter(slug=model_slug).first()
-            if not model:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Model with slug '{model_slug}' not found"
-                )
-            query = query.filter(model=model)
+            if model_slug:
+                model = await Model.filter(slug=model_slug).first()
+                if not model:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Model with slug '{model_slug}' not found"
+                    )
+                query = query.filter(model=model)
         
-        if series_slug:
-            series = await Series.filter(slug=series_slug).first()
-            if not series:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Series with slug '{series_slug}' not found"
-                )
-            query = query.filter(series=series)
+            if series_slug:
+                series = await Series.filter(slug=series_slug).first()
+                if not series:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Series with slug '{series_slug}' not found"
+                    )
+                query = query.filter(series=series)
         
-        # Получаем года с количеством лотов для каждого года
-        year_counts = await query.annotate(count=Count('id')).group_by("year").order_by("year").values("year", "count")
+            # Получаем года с количеством лотов для каждого года
+            year_counts = await query.annotate(count=Count('id')).group_by("year").order_by("year").values("year", "count")
         
-        # Преобразуем в список YearCountResponse
-        return [
-            YearCountResponse(year=item["year"], counter=item["count"])
-            for item in year_counts
-        ]
+            # Преобразуем в список YearCountResponse
+            return [
+                YearCountResponse(year=item["year"], counter=item["count"])
+                for item in year_counts
+            ]
         
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting available years: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Internal server error while fetching available years"
-        )
\ No newline at end of file
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting available years: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Internal server error while fetching available years"
+            )
+
+    return await response_cache.fetch(
+        request,
+        response_cache.key(f"additional_years_{vehicle_type_slug}_{make_slug}_{model_slug}_{series_slug}"),
+        build,
+        ADDITIONAL_RESPONSE_TTL, ADDITIONAL_RESPONSE_TTL * STALE_TTL_FACTOR
+    )
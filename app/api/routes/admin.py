@@ -3,6 +3,8 @@ from math import ceil
 from app.models import Lot, HistoricalLot, Translation, LanguageEnum, Status, VehicleType, Make, Color, LotWithoutAuctionDate
 from app.schemas import TransLiteral, TranslationUpdateRequest
 from app.services import serialize_lot, get_count_lot, get_lot_by_id_from_database, json_safe
+from app.services.translate_service import translation_cache
+from app.services.reference_service import reference_resolver
 from loguru import logger
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Union, Any
@@ -33,6 +35,7 @@ async def get_lots_catalog(
 
     - Актуальные лоты: по всем шарам Lot1..Lot7 через
       Lot.count_across_shards / Lot.query_across_shards_with_limit_offset
+      (глобальная сортировка по id, k-way merge шардов)
     - Исторические: через HistoricalLot.historical_count /
       HistoricalLot.historical_query_with_limit_offset
     """
@@ -172,6 +175,9 @@ async def update_translation(request: TranslationUpdateRequest):
                 translation.translated_value = request.translations[translation.language.value]
                 await translation.save()
 
+        # Сбрасываем in-process кэш переводов во всех процессах
+        await translation_cache.invalidate()
+
         # Возвращаем обновленные переводы
         updated_translations = await Translation.filter(
             field_name=request.field_name, original_value=request.original_value
@@ -527,6 +533,7 @@ async def update_status(status_id: int, status_data: StatusCreateUpdate):
     try:
         status_obj = await Status.get(id=status_id)
         await status_obj.update_from_dict(status_data.dict()).save()
+        await reference_resolver.invalidate()
         return StatusOut.from_orm(status_obj)
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Status not found")
@@ -536,6 +543,7 @@ async def delete_status(status_id: int):
     deleted_count = await Status.filter(id=status_id).delete()
     if not deleted_count:
         raise HTTPException(status_code=404, detail="Status not found")
+    await reference_resolver.invalidate()
     return {"message": "Status deleted successfully"}
 
 # Эндпоинты для типов транспорта
@@ -676,6 +684,7 @@ async def update_vehicle_type(
             data["icon_disable"] = await save_icon(vehicle_data.icon_disable, "icon_disable")
 
         await vehicle.update_from_dict(data).save()
+        await reference_resolver.invalidate()
         return VehicleTypeOut.from_orm(vehicle)
 
     except DoesNotExist:
@@ -686,6 +695,7 @@ async def delete_vehicle_type(vehicle_type_id: int):
     deleted_count = await VehicleType.filter(id=vehicle_type_id).delete()
     if not deleted_count:
         raise HTTPException(status_code=404, detail="Vehicle type not found")
+    await reference_resolver.invalidate()
     return {"message": "Vehicle type deleted successfully"}
 
 # Эндпоинты для марок
@@ -720,6 +730,7 @@ async def update_make(make_id: int, make_data: MakeCreateUpdate):
             
         make_obj = await Make.get(id=make_id)
         await make_obj.update_from_dict(make_data.dict()).save()
+        await reference_resolver.invalidate()
         return MakeOut.from_orm(make_obj)
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Make not found")
@@ -729,6 +740,7 @@ async def delete_make(make_id: int):
     deleted_count = await Make.filter(id=make_id).delete()
     if not deleted_count:
         raise HTTPException(status_code=404, detail="Make not found")
+    await reference_resolver.invalidate()
     return {"message": "Make deleted successfully"}
 
 # Эндпоинты для цветов
@@ -757,6 +769,7 @@ async def update_color(color_id: int, color_data: ColorCreateUpdate):
     try:
         color_obj = await Color.get(id=color_id)
         await color_obj.update_from_dict(color_data.dict()).save()
+        await reference_resolver.invalidate()
         return ColorOut.from_orm(color_obj)
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Color not found")
@@ -766,4 +779,5 @@ async def delete_color(color_id: int):
     deleted_count = await Color.filter(id=color_id).delete()
     if not deleted_count:
         raise HTTPException(status_code=404, detail="Color not found")
+    await reference_resolver.invalidate()
     return {"message": "Color deleted successfully"}
\ No newline at end of file
@@ -4,16 +4,22 @@ from app.schemas import (VehicleModel,  VehicleModelOther,
                          TaskResponseModel, TaskResponse, 
                         LotTypeCount, SpecialFilterLiteral,
                          LotHistoryResponse, TransLiteral, BatchTaskResponse,
-                         LotSearchResponse, LotHistoryItem, VehicleModelResponse)
+                         LotSearchResponse, SearchSuggestionResponse, LotHistoryItem, VehicleModelResponse)
 from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from app.services import (get_lot_by_lot_id_from_database, get_lot_by_id_from_database, 
                           get_similar_lots_by_id, serialize_lot, get_lots_count_by_vehicle_type,
                           search_lots, get_popular_brands_function, get_special_filtered_lots,
                           get_filtered_lots, create_cache_for_catalog, filter_copart_hd_images,
-                          lot_to_dict, find_lots_by_price_range, generate_history_dropdown, json_safe)
+                          lot_to_dict, find_lots_by_price_range, generate_history_dropdown, json_safe,
+                          get_cached_lot_by_id)
 from typing import List, Optional, Union, Dict, Any
 from app.models import HistoricalLot, Lot, LotBase
 from app.services.translate_service import get_translation
+from app.services.cache.refine import read_refine_cache, refine_query_key, REFRESH_INTERVAL
+from app.services.cache.response import response_cache
+from app.core.cache import lot_response_key, LOT_CACHE_TTL
+from app.services.autocomplete_service import autocomplete
 from aiocache import caches
 from loguru import logger
 from datetime import datetime
@@ -25,6 +31,13 @@ import asyncio
 router = APIRouter()
 cache = caches.get("default")
 
+# Ответ из предрасчитанных групп /refine живет недолго: группы пересчитываются по событиям
+REFINE_RESPONSE_TTL = REFRESH_INTERVAL * 6
+# Сколько soft_ttl устаревший ответ еще отдается, пока идет фоновый пересчет
+STALE_TTL_FACTOR = 4
+POPULAR_BRANDS_TTL = settings.CACHE_TTL
+SPECIAL_FILTER_TTL = settings.CACHE_TTL
+
 
 @router.get("/refine")
 async def get_refine_filters(
@@ -72,6 +85,7 @@ async def get_refine_filters(
     # Пагинация
     limit: int = Query(18, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from next_cursor of the previous page"),
 
     min_price: Optional[int] = None,
     max_price: Optional[int] = None,
@@ -84,13 +98,11 @@ async def get_refine_filters(
     Запускает фоновую задачу для фильтрации лотов с возможностью получения агрегированной статистики.
     Использует кэш только если все дополнительные фильтры не заданы.
     """
-    full_url = str(request.url)
-    cached_result = await cache.get(f"{full_url}")
-        
-    if cached_result:
-        
-        result_dict = json.loads(cached_result)
-        return result_dict
+    # Ключ ответа — по разобранным параметрам, а не по строке URL
+    response_key = response_cache.key(refine_query_key({
+        name: value for name, value in locals().items() if name != "request"
+    }))
+
     def normalize_filter_value(value):
         """Конвертирует одиночные значения в списки для единообразия"""
         if value is None:
@@ -111,185 +123,136 @@ async def get_refine_filters(
 
     no_additional_filters = all(f is None for f in additional_filters)
 
-    # Условие кэширования
-    if (
-    is_historical in [False, True] and
-    language in ["ru", "en", "md", "ua", "kz", "pl", "ge", "de"] and
-    normalize_filter_value(vehicle_type_slug) == ["automobile"] and
-    limit == 18 and
-    offset in [0,1,2,3,4,5,6,7] and
-    sort_by in ["auction_date", "price", "year", "odometer", "created_at", "bid", "reserve_price"] and
-    sort_order in ["desc","asc"] and
-    no_additional_filters
-):
-        cache_key = f"{base_site[0] if base_site else ''}{settings.CACHE_KEY}{offset}{language}{'history' if is_historical else 'active'}{sort_by}{sort_order}"
-        cached_result = await cache.get(cache_key)
+    # Условие кэширования (предрасчитанные группы /refine)
+    precomputed = (
+        is_historical in [False, True] and
+        language in ["ru", "en", "md", "ua", "kz", "pl", "ge", "de"] and
+        normalize_filter_value(vehicle_type_slug) == ["automobile"] and
+        limit == 18 and
+        offset in [0,1,2,3,4,5,6,7] and
+        sort_by in ["auction_date", "price", "year", "odometer", "created_at", "bid", "reserve_price"] and
+        sort_order in ["desc","asc"] and
+        cursor is None and
+        no_additional_filters
+    )
+
+    async def apply_lot_filters(result: Dict[str, Any]) -> None:
+        """
+        Спецфильтр и диапазон цен заменяют лоты и count; готовый ответ целиком
+        кэширует response_cache (параметры входят в ключ), отдельные кэши не нужны
+        """
+        if special_filter:
+            lots_data = await get_special_filtered_lots(
+                is_historical=is_historical,
+                special_filter=special_filter,
+                limit=limit,
+                offset=offset,
+                language=language
+            )
+            result["lots"] = lots_data.get("results", [])
+            result["count"] = lots_data.get("count", 0)
+        if min_price or max_price:
+            price_data = await find_lots_by_price_range(
+                min_price=min_price,
+                max_price=max_price,
+                is_historical=is_historical,
+                limit=limit,
+                offset=offset,
+                language=language
+            )
+            result["lots"] = price_data.get("results", [])
+            result["count"] = price_data.get("count", 0)
+
+    async def build() -> Dict[str, Any]:
+        if precomputed:
+            site = base_site[0] if base_site else ''
+            result_dict = await read_refine_cache(site, is_historical, sort_by, sort_order, offset, limit, language)
         
-        if cached_result:
-            try:
-                result_dict = json.loads(cached_result)
-                
-                # Обработка специальных фильтров
-                if special_filter:
-                    filter_key = f"{settings.CACHE_KEY}_{special_filter[0]}_{offset}_{language}_{"nonactive" if is_historical else "active"}"
-                    logger.debug(f'Try get cached special filters: {filter_key}')
-                    special_cached = await cache.get(filter_key)
-                    
-                    if special_cached:
-                        special_data = json.loads(special_cached)
-                        logger.success('Got cached special filters!')
-                        # Убедимся, что данные имеют правильную структуру
-                        if isinstance(special_data, dict):
-                            result_dict["lots"] = special_data["results"].get("results", [])
-                            result_dict["count"] = special_data["results"].get("count", 0)
-                        else:
-                            logger.warning("Unexpected special filter cache format")
-                    else:
-                        logger.debug(f'Get regenerated special filters')
-                        lots_data = await get_special_filtered_lots(
-                            is_historical=is_historical,
-                            special_filter=special_filter,
-                            limit=limit,
-                            offset=offset,
-                            language=language
-                        )
-                        result_dict["lots"] = lots_data.get("results", [])
-                        result_dict["count"] = lots_data.get("count", 0)
-
-                # Обработка фильтра по цене
-                if min_price or max_price:
-                    price_key = f"{settings.CACHE_KEY}_price_{min_price}_{max_price}_{offset}_{language}_{'history' if is_historical else 'active'}"
-                    price_cached = await cache.get(price_key)
-                    
-                    if price_cached:
-                        price_data = json.loads(price_cached)
-                        result_dict["lots"] = price_data.get("results", [])
-                        result_dict["count"] = price_data.get("count", 0)
-                    else:
-                        price_data = await find_lots_by_price_range(
-                            min_price=min_price,
-                            max_price=max_price,
-                            is_historical=is_historical,
-                            limit=limit,
-                            offset=offset,
-                            language=language
-                        )
-                        result_dict["lots"] = price_data.get("results", [])
-                        result_dict["count"] = price_data.get("count", 0)
-
-                # Кеширование деталей лотов
-                if result_dict.get('lots'):
-                    list_lot_ids = [lot['id'] for lot in result_dict['lots'] if isinstance(lot, dict)]
-                    list_vin = [lot['vin'] for lot in result_dict['lots'] if isinstance(lot, dict) and lot.get('vin')]
-                    asyncio.create_task(
-                        create_cache_for_catalog(cache, language, list_lot_ids, list_vin, is_historical)
-                    )
+            if result_dict:
+                try:
+                    await apply_lot_filters(result_dict)
+
+                    # Кеширование деталей лотов
+                    if result_dict.get('lots'):
+                        list_lot_ids = [lot['id'] for lot in result_dict['lots'] if isinstance(lot, dict)]
+                        asyncio.create_task(create_cache_for_catalog(cache, list_lot_ids))
                 
-                return result_dict
+                    return result_dict
                 
-            except Exception as e:
-                logger.error(f"Error processing cached result: {str(e)}")
-                logger.error(f"Cache key: {cache_key}, Cached data: {cached_result[:200] if cached_result else 'None'}")
-
-    # Если не кэш — запускаем celery задачу
-    try:
-        auction_date_from_dt = datetime.fromisoformat(auction_date_from) if auction_date_from else None
-        auction_date_to_dt = datetime.fromisoformat(auction_date_to) if auction_date_to else None
+                except Exception as e:
+                    logger.error(f"Error processing cached result: {str(e)}")
+                    logger.error(f"Refine cache group: [{site}][{is_historical}][{sort_by}][{sort_order}]")
+
+        # Если не кэш — запускаем celery задачу
+        try:
+            auction_date_from_dt = datetime.fromisoformat(auction_date_from) if auction_date_from else None
+            auction_date_to_dt = datetime.fromisoformat(auction_date_to) if auction_date_to else None
         
-        result = await get_filtered_lots(
-            cache=cache,
-            full_url=full_url,
-            language=language,
-            is_historical=is_historical,
-            base_site=base_site,
-            min_year=min_year,
-            max_year=max_year,
-            min_odometer=min_odometer,
-            max_odometer=max_odometer,
-
-            # Фильтры по связанным моделям
-            make_slug=make_slug,
-            model_slug=model_slug,
-            vehicle_type_slug=vehicle_type_slug,
-            damage_pr_slug=damage_pr_slug,
-            damage_sec_slug=damage_sec_slug,
-            fuel_slug=fuel_slug,
-            drive_slug=drive_slug,
-            transmission_slug=transmission_slug,
-            color_slug=color_slug,
-            status_slug=status_slug,
-            auction_status_slug=auction_status_slug,
-            body_type_slug=body_type_slug,
-            series_slug = series_slug,
-            title_slug = title_slug,
-            seller_slug = seller_slug,
-            seller_type_slug = seller_type_slug,
-            document_slug = document_slug,
-            document_old_slug = document_old_slug,
-            cylinders = cylinders,
-            engine = engine,
-            engine_size = engine_size,
-            # Дополнительные фильтры
-            state=state,
-            # country=country,
-            is_buynow=is_buynow,
-            min_risk_index=min_risk_index,
-            max_risk_index=max_risk_index,
-            auction_date_from=auction_date_from_dt,
-            auction_date_to=auction_date_to_dt,
-
-            # Пагинация и сортировка
-            limit=limit,
-            offset=offset,
-            sort_by=sort_by,
-            sort_order=sort_order
-        )
+            result = await get_filtered_lots(
+                language=language,
+                is_historical=is_historical,
+                base_site=base_site,
+                min_year=min_year,
+                max_year=max_year,
+                min_odometer=min_odometer,
+                max_odometer=max_odometer,
+
+                # Фильтры по связанным моделям
+                make_slug=make_slug,
+                model_slug=model_slug,
+                vehicle_type_slug=vehicle_type_slug,
+                damage_pr_slug=damage_pr_slug,
+                damage_sec_slug=damage_sec_slug,
+                fuel_slug=fuel_slug,
+                drive_slug=drive_slug,
+                transmission_slug=transmission_slug,
+                color_slug=color_slug,
+                status_slug=status_slug,
+                auction_status_slug=auction_status_slug,
+                body_type_slug=body_type_slug,
+                series_slug = series_slug,
+                title_slug = title_slug,
+                seller_slug = seller_slug,
+                seller_type_slug = seller_type_slug,
+                document_slug = document_slug,
+                document_old_slug = document_old_slug,
+                cylinders = cylinders,
+                engine = engine,
+                engine_size = engine_size,
+                # Дополнительные фильтры
+                state=state,
+                # country=country,
+                is_buynow=is_buynow,
+                min_risk_index=min_risk_index,
+                max_risk_index=max_risk_index,
+                auction_date_from=auction_date_from_dt,
+                auction_date_to=auction_date_to_dt,
+
+                # Пагинация и сортировка
+                limit=limit,
+                offset=offset,
+                sort_by=sort_by,
+                sort_order=sort_order,
+                cursor=cursor
+            )
         
-        if special_filter:
-            key = f"{settings.CACHE_KEY}_{special_filter[0]}_{offset}_{language}_{"nonactive" if is_historical else "active"}"
-            cached_result = await cache.get(key)
-            logger.debug(f'SPEACIAL FILTERS KEY TO GET: {key}')
-            if cached_result:
-                logger.debug('Get cached result by special filters')
-                lots = json.loads(cached_result)
-            else:
-                lots = await get_special_filtered_lots(
-                    is_historical=is_historical,
-                    special_filter=special_filter,
-                    limit=limit,
-                    offset=offset,
-                    language=language
-                )
-            result["lots"] = lots["results"]
-            result["count"] = lots["count"]
-        if min_price or max_price:
-            key = f"{settings.CACHE_KEY}_min_price{min_price}max_price{max_price}{offset}"
-            special_cached_result = await cache.get(key)
-            if special_cached_result:
-                lots = json.loads(special_cached_result)
-                result["lots"] = lots["results"]["results"]
-                result["count"] = lots["count"]["count"]
-            else:
-                lots = await find_lots_by_price_range(
-                    min_price=min_price,
-                    max_price=max_price,
-                    is_historical=is_historical,
-                    limit=limit,
-                    offset=offset,
-                    language=language
-                )
-                result["lots"] = lots["results"]
-                result["count"] = lots["count"]
-        list_lot_ids_to_cache = []
-        list_vin = []
-        for lot in result['lots']:
-            list_lot_ids_to_cache.append(lot['id'])
-            list_vin.append(lot['vin'])
-        # asyncio.create_task(create_cache_for_catalog(cache, language,list_lot_ids_to_cache,list_vin, is_historical))
-        return result
-    except Exception as e:
-        logger.error(f"Failed to start refine task: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to start refinement task")
+            await apply_lot_filters(result)
+            list_lot_ids_to_cache = []
+            list_vin = []
+            for lot in result['lots']:
+                list_lot_ids_to_cache.append(lot['id'])
+                list_vin.append(lot['vin'])
+            # asyncio.create_task(create_cache_for_catalog(cache, list_lot_ids_to_cache))
+            return result
+        except Exception as e:
+            logger.error(f"Failed to start refine task: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to start refinement task")
+
+    # Одновременные промахи по одному URL схлопываются в один расчет, устаревший ответ отдается, пока идет пересчет
+    soft_ttl = REFINE_RESPONSE_TTL if precomputed else settings.CACHE_TTL + 180
+    return await response_cache.fetch(
+        request, response_key, build, soft_ttl, soft_ttl * STALE_TTL_FACTOR
+    )
 
 
 @router.post("/create", response_model=TaskResponseModel)
@@ -545,6 +508,7 @@ async def get_lots_by_price_range(
 
 @router.get("/popular_brands")
 async def get_popular_brands(
+    request: Request,
     limit: int = Query(48, description="Максимальное количество популярных брендов")
 ):
     """
@@ -555,14 +519,21 @@ async def get_popular_brands(
     :param limit: Количество возвращаемых брендов (`int`, по умолчанию 48).
     :return: Список объектов `LotMarkResponse`, представляющих популярные марки авто.
     """
-    popular_brands = await get_popular_brands_function(limit=limit)
-    return popular_brands
+    async def build() -> Any:
+        return jsonable_encoder(await get_popular_brands_function(limit=limit))
+
+    return await response_cache.fetch(
+        request, response_cache.key(f"popular_brands_{limit}"), build,
+        POPULAR_BRANDS_TTL, POPULAR_BRANDS_TTL * STALE_TTL_FACTOR
+    )
 
 
 @router.get("/search_car")
 async def search_car(
     search_info: str = Query(..., description="VIN (17 символов), lot_id или название модели"),
-    language: TransLiteral = Query(None, description="Язык для локализации")
+    language: TransLiteral = Query(None, description="Язык для локализации"),
+    limit: int = Query(15, ge=1, le=100),
+    offset: int = Query(0, ge=0),
 ):
     """
     Поиск автомобилей по VIN, lot_id или названию модели
@@ -570,12 +541,13 @@ async def search_car(
     Args:
         search_info: Строка для поиска
         language: Язык для локализации результатов
+        limit, offset: Страница результатов (ранжированных по совпадению и дате аукциона)
         
     Returns:
         Список найденных лотов в формате LotSearchResponse
     """
     try:
-        found_lots = await search_lots(search_info)
+        found_lots = await search_lots(search_info, limit=limit, offset=offset)
         
         # Преобразуем в Pydantic модель
         result = []
@@ -602,6 +574,22 @@ async def search_car(
         )
 
 
+@router.get("/search_car/autocomplete", response_model=List[SearchSuggestionResponse])
+async def search_car_autocomplete(
+    q: str = Query(..., min_length=1, description="Начало названия марки, модели или серии"),
+    limit: int = Query(10, ge=1, le=10),
+):
+    """
+    Подсказки марок, моделей и серий по префиксу из in-process дерева (без обращения к БД)
+    """
+    return [
+        SearchSuggestionResponse(
+            kind=item.kind, name=item.name, slug=item.slug, label=item.label, make=item.make, model=item.model
+        )
+        for item in await autocomplete.suggest(q, limit)
+    ]
+
+
 @router.get("/more_lots")
 async def get_more_lots(
     list_ids: List[int] = Query(..., description="Список ID лотов"),
@@ -680,38 +668,25 @@ async def move_lot_from_id(
 
 @router.get("/id/{id}")
 async def get_lot_by_id(
+    request: Request,
     id: int,
-    is_historical: bool = Query(False),
     language: TransLiteral = Query("en")
 ):
     """
     Получает информацию о лоте по его внутреннему ID (PK с префиксом).
     """
-    try:
-        cache_key = f"{settings.CACHE_KEY}_lot_{id}_{language}_{'hist' if is_historical else 'cur'}"
-
-        cached_result = await cache.get(cache_key)
-        if cached_result:
-            return json.loads(cached_result)
-
-        # dict с переводами (уже, по идее, без ORM)
-        lot_dict = await get_lot_by_id_from_database(
-            id=id,
-            language=language,
-            is_historical=is_historical,
-        )
-
+    async def build() -> Dict[str, Any]:
+        # В кэше одна каноническая запись на лот, перевод накладывается при чтении
+        lot_dict = await get_cached_lot_by_id(cache, id, language)
         if not lot_dict:
             raise HTTPException(status_code=404, detail="Лот не найден")
+        return lot_dict
 
-        # Делаем JSON-безопасным
-        safe_lot = json_safe(lot_dict)
-
-        # Кладём в кеш уже безопасную структуру
-        await cache.set(cache_key, json.dumps(safe_lot))
-
-        # Возвращаем тоже безопасную
-        return safe_lot
+    try:
+        # Готовое тело ответа на языке запроса; сбрасывается вместе с канонической записью (invalidate_lot_cache)
+        return await response_cache.fetch(
+            request, lot_response_key(id), build, LOT_CACHE_TTL, LOT_CACHE_TTL * STALE_TTL_FACTOR, language
+        )
 
     except HTTPException:
         raise
@@ -779,6 +754,7 @@ async def test_cache(
 
 @router.get("/special_filtered")
 async def get_catalog_by_special_filter(
+    request: Request,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
     is_historical: bool = Query(False),
@@ -789,10 +765,17 @@ async def get_catalog_by_special_filter(
     Получение лотов с применением специальных фильтров
     (Минимальный код в эндпоинте)
     """
-    return await get_special_filtered_lots(
-        is_historical=is_historical,
-        special_filter=special_filter,
-        limit=limit,
-        offset=offset,
-        language=language
+    async def build() -> Dict[str, Any]:
+        return await get_special_filtered_lots(
+            is_historical=is_historical,
+            special_filter=special_filter,
+            limit=limit,
+            offset=offset,
+            language=language
+        )
+
+    key = response_cache.key(
+        f"special_filtered_{'history' if is_historical else 'active'}_{','.join(special_filter or [])}"
+        f"_{limit}_{offset}_{language}"
     )
+    return await response_cache.fetch(request, key, build, SPECIAL_FILTER_TTL, SPECIAL_FILTER_TTL * STALE_TTL_FACTOR)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 
 from app.models.user import User
-from app.api.dependencies import get_current_active_user
+from app.api.dependencies import get_current_active_user, get_current_user_record
 from app.schemas.profile import UserProfileUpdate, UserProfileResponse, AvatarUploadResponse
 from app.services.store.s3contabo import s3_service
 
@@ -14,7 +14,7 @@ router = APIRouter()
 
 @router.get("/me", response_model=UserProfileResponse)
 async def get_my_profile(
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_record)
 ):
     """Get current user's profile"""
     return current_user
@@ -23,7 +23,7 @@ async def get_my_profile(
 @router.put("/me", response_model=UserProfileResponse)
 async def update_my_profile(
     profile_update: UserProfileUpdate,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_record)
 ):
     """Update current user's profile"""
     update_data = profile_update.model_dump(exclude_unset=True)
@@ -38,7 +38,7 @@ async def update_my_profile(
 @router.post("/me/avatar", response_model=AvatarUploadResponse)
 async def upload_avatar(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_record)
 ):
     """Upload user avatar to Contabo S3"""
     # 1) Проверка типа
@@ -82,7 +82,7 @@ async def upload_avatar(
 
 @router.delete("/me/avatar")
 async def delete_avatar(
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_record)
 ):
     """Delete user avatar from S3 and clear field"""
     old_url = current_user.avatar_url
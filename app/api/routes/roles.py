@@ -5,6 +5,7 @@ from uuid import UUID
 from app.models.role import Role, Permission
 from app.schemas.role import RoleSchema, PermissionSchema
 from app.api.dependencies import get_current_admin_user
+from app.core.security.principal import principal_cache
 
 router = APIRouter()
 
@@ -87,6 +88,7 @@ async def update_role(role_id: UUID, role_in: RoleSchema, current_user=Depends(g
     role.name = role_in.name
     role.description = role_in.description
     await role.save()
+    await principal_cache.invalidate_all()
     return role
 
 
@@ -106,6 +108,7 @@ async def delete_role(role_id: UUID, current_user=Depends(get_current_admin_user
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     await role.delete()
+    await principal_cache.invalidate_all()
     return
 
 
@@ -131,6 +134,7 @@ async def add_permission_to_role(role_id: UUID, permission_id: UUID, current_use
     if not role or not permission:
         raise HTTPException(status_code=404, detail="Role or Permission not found")
     await role.permissions.add(permission)
+    await principal_cache.invalidate_all()
     return
 
 
@@ -152,6 +156,7 @@ async def remove_permission_from_role(role_id: UUID, permission_id: UUID, curren
     if not role or not permission:
         raise HTTPException(status_code=404, detail="Role or Permission not found")
     await role.permissions.remove(permission)
+    await principal_cache.invalidate_all()
     return
 
 
@@ -233,6 +238,7 @@ async def update_permission(permission_id: UUID, permission_in: PermissionSchema
     permission.name = permission_in.name
     permission.description = permission_in.description
     await permission.save()
+    await principal_cache.invalidate_all()
     return permission
 
 
@@ -252,4 +258,5 @@ async def delete_permission(permission_id: UUID, current_user=Depends(get_curren
     if not permission:
         raise HTTPException(status_code=404, detail="Permission not found")
     await permission.delete()
+    await principal_cache.invalidate_all()
     return
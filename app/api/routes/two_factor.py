@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 
 from app.models.user import User
-from app.api.dependencies import get_current_active_user
+from app.api.dependencies import get_current_active_user, get_current_user_record
 from app.schemas.two_factor import (
     TwoFactorEnableResponse,
     TwoFactorVerifyRequest,
@@ -15,7 +15,7 @@ router = APIRouter()
 
 @router.post("/enable", response_model=TwoFactorEnableResponse)
 async def enable_two_factor(
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_record)
 ):
     """Enable two-factor authentication"""
     try:
@@ -37,7 +37,7 @@ async def enable_two_factor(
 async def verify_two_factor(
     verify_data: TwoFactorVerifyRequest,
     request: Request,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_record)
 ):
     """Verify and activate two-factor authentication"""
     ip_address = request.client.host if request.client else None
@@ -66,7 +66,7 @@ async def verify_two_factor(
 @router.post("/disable")
 async def disable_two_factor(
     disable_data: TwoFactorDisableRequest,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user_record)
 ):
     """Disable two-factor authentication"""
     try:
@@ -6,6 +6,7 @@ from app.schemas.user import UserResponse, TokenResponse
 from app.api.dependencies import (
     get_current_user,
     get_current_active_user,
+    get_current_user_record,
     admin_required,
     kyc_access_required,
     authenticate_user,
@@ -17,6 +18,7 @@ from loguru import logger
 from datetime import datetime, timedelta
 import secrets
 from app.core.security.security import get_password_hash
+from app.core.security.principal import principal_cache
 
 router = APIRouter()
 
@@ -90,12 +92,12 @@ async def get_verification_status(user_id: int):
 
 
 @router.get("/me", response_model=UserResponse)
-async def read_user_me(user: User = Depends(get_current_active_user)):
+async def read_user_me(user: User = Depends(get_current_user_record)):
     """
     Возвращает информацию о текущем активном пользователе.
 
     Args:
-        user (User): Пользователь, полученный через зависимость get_current_active_user.
+        user (User): Пользователь, полученный через зависимость get_current_user_record.
 
     Returns:
         UserResponse: Данные текущего пользователя.
@@ -220,6 +222,7 @@ async def logout(user: User = Depends(get_current_user), data: RefreshTokenReque
     token_obj = await RefreshToken.get_or_none(token=data.refresh_token, user=user)
     if token_obj:
         await token_obj.delete()
+    await principal_cache.invalidate([user.id])
     return {"message": "Logged out"}
 
 
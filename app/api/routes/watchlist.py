@@ -7,7 +7,8 @@ from app.models.lot import Lot
 from app.schemas.lot import VehicleModel
 from app.api.dependencies import get_current_user
 from tortoise.exceptions import IntegrityError
-from app.services import get_lot_by_id_from_database
+from app.services import get_lot_by_id_from_database, get_neutral_lots_by_ids, localize_lot_detail
+from app.core.cache import invalidate_watchers
 from app.schemas import TransLiteral
 
 router = APIRouter()
@@ -54,16 +55,17 @@ async def add_to_watchlist(lot_id: int,is_historical: bool = Query(False),
     except IntegrityError:
         raise HTTPException(status_code=400, detail="Lot already in watchlist")
 
+    await invalidate_watchers([lot_id])
     return {"message": "Lot added to watchlist"}
 
 
 @router.delete("/lots/{lot_id}/watch", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_from_watchlist(lot_id: UUID, user=Depends(get_current_user)):
+async def remove_from_watchlist(lot_id: int, user=Depends(get_current_user)):
     """
     Удаляет лот из списка отслеживаемых (watchlist) текущего пользователя.
 
     Args:
-        lot_id (UUID): Уникальный идентификатор лота.
+        lot_id (int): Уникальный идентификатор лота.
         user: Текущий авторизованный пользователь, полученный из зависимости get_current_user.
 
     Raises:
@@ -73,6 +75,7 @@ async def remove_from_watchlist(lot_id: UUID, user=Depends(get_current_user)):
     deleted = await UserWatchlist.filter(user_id=user.id, lot_id=lot_id).delete()
     if not deleted:
         raise HTTPException(status_code=404, detail="Lot not in watchlist")
+    await invalidate_watchers([lot_id])
     return
 
 
@@ -91,13 +94,11 @@ async def get_watchlist(language: TransLiteral = Query("en"), user=Depends(get_c
         - Возвращаемые лоты представлены в виде схемы LotSchema.
         - Порядок лотов не гарантируется (можно добавить сортировку при необходимости).
     """
-    entries = await UserWatchlist.filter(user_id=user.id).all()
-    lot_ids = [entry.lot_id for entry in entries]
+    lot_ids = await UserWatchlist.filter(user_id=user.id).values_list("lot_id", flat=True)
+    # Все лоты списка — одним батчем вместо запроса на каждый
+    lots = await get_neutral_lots_by_ids(lot_ids)
     result = []
     for lot_id in lot_ids:
-        lot = await get_lot_by_id_from_database(
-            id=lot_id,
-            language=language,
-        )
-        result.append(lot)
+        lot = lots.get(lot_id)
+        result.append(await localize_lot_detail(language, lot) if lot else None)
     return result
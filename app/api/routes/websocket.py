@@ -1,5 +1,4 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status, Query
-from typing import Dict, Set
 import json
 from uuid import UUID
 import asyncio
@@ -7,135 +6,11 @@ from loguru import logger
 
 from app.models.user import User
 from app.core.security.auth import verify_token
+from app.services.websocket_hub import ConnectionManager
 
 router = APIRouter()
 
 
-class ConnectionManager:
-    """Manages WebSocket connections for real-time bidding updates"""
-
-    def __init__(self):
-        # Map of lot_id to set of websockets watching that lot
-        self.lot_watchers: Dict[str, Set[WebSocket]] = {}
-        # Map of websocket to user
-        self.socket_users: Dict[WebSocket, User] = {}
-        # Map of user_id to set of websockets for that user
-        self.user_connections: Dict[UUID, Set[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, user: User, lot_id: str = None):
-        """Connect a new WebSocket"""
-        await websocket.accept()
-
-        # Store user for this socket
-        self.socket_users[websocket] = user
-
-        # Track user connections
-        if user.id not in self.user_connections:
-            self.user_connections[user.id] = set()
-        self.user_connections[user.id].add(websocket)
-
-        # If watching a specific lot, add to watchers
-        if lot_id:
-            if lot_id not in self.lot_watchers:
-                self.lot_watchers[lot_id] = set()
-            self.lot_watchers[lot_id].add(websocket)
-
-        logger.info(f"WebSocket connected: user={user.id}, lot={lot_id}")
-
-    def disconnect(self, websocket: WebSocket):
-        """Disconnect a WebSocket"""
-        # Remove from lot watchers
-        for lot_id, watchers in list(self.lot_watchers.items()):
-            if websocket in watchers:
-                watchers.remove(websocket)
-                if not watchers:
-                    del self.lot_watchers[lot_id]
-
-        # Remove from user tracking
-        user = self.socket_users.get(websocket)
-        if user and user.id in self.user_connections:
-            self.user_connections[user.id].discard(websocket)
-            if not self.user_connections[user.id]:
-                del self.user_connections[user.id]
-
-        # Remove from socket users map
-        if websocket in self.socket_users:
-            del self.socket_users[websocket]
-
-        logger.info(f"WebSocket disconnected: user={user.id if user else 'unknown'}")
-
-    async def subscribe_to_lot(self, websocket: WebSocket, lot_id: str):
-        """Subscribe a WebSocket to a specific lot"""
-        if lot_id not in self.lot_watchers:
-            self.lot_watchers[lot_id] = set()
-        self.lot_watchers[lot_id].add(websocket)
-
-        # Confirm subscription
-        await websocket.send_json({
-            "type": "subscribed",
-            "lot_id": lot_id,
-            "message": f"Subscribed to lot {lot_id}"
-        })
-
-    async def unsubscribe_from_lot(self, websocket: WebSocket, lot_id: str):
-        """Unsubscribe a WebSocket from a specific lot"""
-        if lot_id in self.lot_watchers and websocket in self.lot_watchers[lot_id]:
-            self.lot_watchers[lot_id].remove(websocket)
-            if not self.lot_watchers[lot_id]:
-                del self.lot_watchers[lot_id]
-
-        # Confirm unsubscription
-        await websocket.send_json({
-            "type": "unsubscribed",
-            "lot_id": lot_id,
-            "message": f"Unsubscribed from lot {lot_id}"
-        })
-
-    async def broadcast_to_lot(self, lot_id: str, message: dict):
-        """Broadcast a message to all watchers of a specific lot"""
-        if lot_id in self.lot_watchers:
-            disconnected = set()
-            for websocket in self.lot_watchers[lot_id]:
-                try:
-                    await websocket.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending to websocket: {e}")
-                    disconnected.add(websocket)
-
-            # Clean up disconnected sockets
-            for websocket in disconnected:
-                self.disconnect(websocket)
-
-    async def send_to_user(self, user_id: UUID, message: dict):
-        """Send a message to all connections of a specific user"""
-        if user_id in self.user_connections:
-            disconnected = set()
-            for websocket in self.user_connections[user_id]:
-                try:
-                    await websocket.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending to websocket: {e}")
-                    disconnected.add(websocket)
-
-            # Clean up disconnected sockets
-            for websocket in disconnected:
-                self.disconnect(websocket)
-
-    async def broadcast_to_all(self, message: dict):
-        """Broadcast a message to all connected clients"""
-        disconnected = set()
-        for websocket in list(self.socket_users.keys()):
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting: {e}")
-                disconnected.add(websocket)
-
-        # Clean up disconnected sockets
-        for websocket in disconnected:
-            self.disconnect(websocket)
-
-
 # Global connection manager instance
 manager = ConnectionManager()
 
@@ -171,7 +46,7 @@ async def websocket_endpoint(
     - ping: {"type": "ping"}
 
     Message types from server:
-    - bid_placed: New bid on a lot
+    - bid_placed: New bids on a lot, batched per frame: {"bid": latest, "bids": [...]}
     - bid_update: Bid status changed
     - lot_update: Lot information changed
     - notification: User notification
@@ -185,11 +60,11 @@ async def websocket_endpoint(
         return
 
     # Connect WebSocket
-    await manager.connect(websocket, user, lot_id)
+    connection = await manager.connect(websocket, user, lot_id)
 
     try:
         # Send welcome message
-        await websocket.send_json({
+        connection.send_json({
             "type": "connected",
             "message": "Connected to bidding updates",
             "user_id": str(user.id)
@@ -214,37 +89,32 @@ async def websocket_endpoint(
                         await manager.unsubscribe_from_lot(websocket, lot_id)
 
                 elif message_type == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    connection.send_json({"type": "pong"})
 
                 else:
-                    await websocket.send_json({
+                    connection.send_json({
                         "type": "error",
                         "message": f"Unknown message type: {message_type}"
                     })
 
             except json.JSONDecodeError:
-                await websocket.send_json({
+                connection.send_json({
                     "type": "error",
                     "message": "Invalid JSON message"
                 })
 
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
-        logger.info(f"WebSocket disconnected: user={user.id}")
+        await manager.disconnect(websocket)
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
-        manager.disconnect(websocket)
+        await manager.disconnect(websocket)
 
 
 # Helper functions for sending updates (to be used from bid services)
 
 async def notify_bid_placed(lot_id: str, bid_data: dict):
     """Notify all watchers that a new bid was placed"""
-    await manager.broadcast_to_lot(lot_id, {
-        "type": "bid_placed",
-        "lot_id": lot_id,
-        "bid": bid_data
-    })
+    await manager.stream_bid(lot_id, bid_data)
 
 
 async def notify_bid_update(lot_id: str, bid_id: str, status: str):
@@ -254,16 +124,12 @@ async def notify_bid_update(lot_id: str, bid_id: str, status: str):
         "lot_id": lot_id,
         "bid_id": bid_id,
         "status": status
-    })
+    }, key=f"bid_update:{bid_id}")
 
 
 async def notify_lot_update(lot_id: str, update_data: dict):
     """Notify about lot information update"""
-    await manager.broadcast_to_lot(lot_id, {
-        "type": "lot_update",
-        "lot_id": lot_id,
-        "data": update_data
-    })
+    await manager.stream_lot_update(lot_id, update_data)
 
 
 async def notify_user(user_id: UUID, notification_data: dict):
@@ -1,5 +1,9 @@
 from aiocache import caches
+from loguru import logger
+from typing import Iterable, Optional
 from app.core.config import settings
+from app.core.config.redis import get_redis_client
+import time
 
 def init_cache():
     caches.set_config({
@@ -13,4 +17,231 @@ def init_cache():
             },
             "plugins": []
         }
-    })
\ No newline at end of file
+    })
+
+class LocalCacheVersion:
+    """
+    Версия in-process кэша, согласуемая между процессами через Redis.
+
+    Процесс, изменивший данные, делает bump() (INCR ключа), остальные
+    сверяют версию через changed() не чаще раза в check_interval секунд.
+    """
+
+    def __init__(self, key: str, check_interval: float = 5.0):
+        self.key = key
+        self.check_interval = check_interval
+        self.current: Optional[str] = None
+        self._checked_at = 0.0
+
+    async def remote(self) -> Optional[str]:
+        try:
+            redis = await get_redis_client()
+            return await redis.get(self.key)
+        except Exception as e:
+            logger.warning(f"Cache version check failed for {self.key}: {e}")
+            return self.current
+
+    async def sync(self) -> None:
+        """Запоминает текущую версию из Redis (вызывается при загрузке кэша)"""
+        self.current = await self.remote()
+        self._checked_at = time.monotonic()
+
+    async def changed(self) -> bool:
+        """True, если версия в Redis изменилась с момента последнего sync()"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        return await self.remote() != self.current
+
+    async def bump(self) -> None:
+        try:
+            redis = await get_redis_client()
+            await redis.incr(self.key)
+        except Exception as e:
+            logger.warning(f"Cache version bump failed for {self.key}: {e}")
+
+
+# Поколение ключа поднимается при инвалидации: значение, прочитанное из БД до нее, в кэш уже не попадет.
+# Живет дольше любого чтения из БД и блокировки пересчета ответа (LOCK_TTL в app.services.cache.response)
+GENERATION_TTL = 120
+
+# Запись, только если поколение ключа не изменилось с момента чтения.
+# KEYS: ключ, поколение; ARGV: поколение при чтении ("" — не было), значение, TTL
+GUARDED_SET = """
+if (redis.call('get', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+def generation_key(key: str) -> str:
+    return f"{key}_gen"
+
+
+async def invalidate_guarded(keys: Iterable[str]) -> None:
+    """Удаляет ключи и отклоняет запись значений, прочитанных до удаления (GUARDED_SET, fenced-запись ответов)"""
+    keys = list(keys)
+    if not keys:
+        return
+    redis = await get_redis_client()
+    async with redis.pipeline(transaction=False) as pipe:
+        # Сначала поколение: запись, успевшая до него, удаляется следом
+        for key in keys:
+            pipe.incr(generation_key(key))
+            pipe.expire(generation_key(key), GENERATION_TTL)
+        pipe.delete(*keys)
+        await pipe.execute()
+
+
+# Площадки, для которых предрассчитывается /refine ("" — все площадки)
+REFINE_SITES = ("iaai", "copart", "")
+REFINE_DIRTY_KEY = f"{settings.CACHE_KEY}_refine_dirty"
+
+
+def refine_group_member(is_historical: bool, site: str) -> str:
+    return f"{int(bool(is_historical))}:{site}"
+
+
+async def mark_refine_dirty(changes: Iterable[tuple[bool, Optional[str]]]) -> None:
+    """
+    Помечает группы предрасчитанного /refine для пересчета.
+
+    :param changes: пары (is_historical, slug площадки); площадка None — лот
+        мог затронуть любую площадку. Группа "все площадки" помечается всегда.
+    """
+    members = set()
+    for is_historical, site in changes:
+        sites = REFINE_SITES if site is None else ("", site) if site in REFINE_SITES else ("",)
+        members.update(refine_group_member(is_historical, s) for s in sites)
+    if not members:
+        return
+    try:
+        redis = await get_redis_client()
+        await redis.sadd(REFINE_DIRTY_KEY, *members)
+    except Exception as e:
+        logger.warning(f"Failed to mark refine cache dirty: {e}")
+
+
+async def pop_refine_dirty(count: int = 100) -> list[tuple[bool, str]]:
+    """Забирает помеченные группы (каждую получает только один процесс)"""
+    try:
+        redis = await get_redis_client()
+        members = await redis.spop(REFINE_DIRTY_KEY, count) or []
+    except Exception as e:
+        logger.warning(f"Failed to read refine dirty groups: {e}")
+        return []
+    groups = []
+    for member in members:
+        state, _, site = member.partition(":")
+        groups.append((state == "1", site))
+    return groups
+
+
+# Канонические (без перевода) записи лотов: одна на лот для всех языков
+LOT_CACHE_TTL = settings.CACHE_TTL + 180
+
+
+def lot_cache_key(lot_pk: int) -> str:
+    return f"{settings.CACHE_KEY}_lot_{lot_pk}"
+
+
+def vin_history_cache_key(vin: str) -> str:
+    return f"{settings.CACHE_KEY}_vin_{vin}"
+
+
+def lot_response_key(lot_pk: int) -> str:
+    """Готовые тела ответа /lot/id/{id}: hash язык -> bytes (см. app.services.cache.response)"""
+    return f"{settings.CACHE_KEY}_response_lot_{lot_pk}"
+
+
+async def invalidate_lot_cache(lot_pks: Iterable[Optional[int]] = (), vins: Iterable[Optional[str]] = ()) -> None:
+    """Удаляет канонические записи лотов, готовые ответы и истории VIN после изменения лота"""
+    lot_pks = [pk for pk in lot_pks if pk]
+    keys = [lot_cache_key(pk) for pk in lot_pks] + [vin_history_cache_key(vin) for vin in vins if vin]
+    if not keys:
+        return
+    try:
+        cache = caches.get("default")
+        for key in keys:
+            await cache.delete(key)
+        await invalidate_guarded(lot_response_key(pk) for pk in lot_pks)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate lot cache: {e}")
+
+
+# Зеркало каталога лотов (lot_directory): lot_pk / lot_id / vin -> [[таблица, id], ...]
+LOT_DIRECTORY_TTL = settings.CACHE_TTL * 12
+# Отсутствие лота в каталоге и в таблицах запоминается ненадолго (register сбрасывает его сразу)
+LOT_DIRECTORY_MISS_TTL = 60
+
+
+def lot_directory_key(field: str, value) -> str:
+    return f"{settings.CACHE_KEY}_lotdir_{field}_{value}"
+
+
+async def invalidate_lot_directory(entries: Iterable[tuple[Optional[int], Optional[int], Optional[str]]]) -> None:
+    """Удаляет зеркальные записи каталога лотов по (lot_pk, lot_id, vin)"""
+    keys = set()
+    for lot_pk, lot_id, vin in entries:
+        keys.update(
+            lot_directory_key(field, value)
+            for field, value in (("lot_pk", lot_pk), ("lot_id", lot_id), ("vin", vin)) if value
+        )
+    if not keys:
+        return
+    try:
+        await invalidate_guarded(keys)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate lot directory: {e}")
+
+
+# Журнал измененных лотов для in-process индексов (lot_pk -> время изменения, sorted set)
+LOT_CHANGES_KEY = f"{settings.CACHE_KEY}_lot_changes"
+# Сколько секунд хранится журнал; индекс, отставший сильнее, пересобирается целиком
+LOT_CHANGES_TTL = 3600
+
+
+async def mark_lots_changed(lot_pks: Iterable[Optional[int]]) -> None:
+    """Записывает в журнал лоты, которые добавлены, изменены, перенесены или удалены"""
+    now = time.time()
+    members = {str(pk): now for pk in lot_pks if pk}
+    if not members:
+        return
+    try:
+        redis = await get_redis_client()
+        await redis.zadd(LOT_CHANGES_KEY, members)
+        await redis.zremrangebyscore(LOT_CHANGES_KEY, "-inf", now - LOT_CHANGES_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to record lot changes: {e}")
+
+
+async def lots_changed_since(since: float) -> Optional[list[int]]:
+    """id лотов, измененных начиная с since (unix time); None — журнал недоступен"""
+    try:
+        redis = await get_redis_client()
+        return [int(pk) for pk in await redis.zrangebyscore(LOT_CHANGES_KEY, since, "+inf")]
+    except Exception as e:
+        logger.warning(f"Failed to read lot changes: {e}")
+        return None
+
+
+# Инвертированный индекс watchlist: lot_pk -> id пользователей, отслеживающих лот
+WATCHERS_TTL = settings.CACHE_TTL
+
+
+def watchers_key(lot_pk: int) -> str:
+    return f"{settings.CACHE_KEY}_watchers_{lot_pk}"
+
+
+async def invalidate_watchers(lot_pks: Iterable[Optional[int]]) -> None:
+    """Сбрасывает списки наблюдателей лотов после изменения watchlist"""
+    keys = [watchers_key(pk) for pk in lot_pks if pk]
+    if not keys:
+        return
+    try:
+        await invalidate_guarded(keys)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate watchers index: {e}")
@@ -93,6 +93,12 @@ class Settings(BaseSettings):
     CACHE_KEY: str = "lot_refine_automobile"
     CACHE_TTL: int = 1800
 
+    # Шарды таблицы Lot (классы моделей) для консистентного хеширования lot_id.
+    # На время ребалансировки в LOT_SHARDS_PREVIOUS остается прежний набор: чтение идет по обоим
+    LOT_SHARDS: List[str] = ["Lot1", "Lot2", "Lot3", "Lot4", "Lot5", "Lot6", "Lot7"]
+    LOT_SHARDS_PREVIOUS: List[str] = []
+    LOT_SHARD_VNODES: int = 128
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
     @property
@@ -105,7 +111,7 @@ class Settings(BaseSettings):
         """
         Генерирует уникальный секретный ключ для пользователя
         """
-        base_str = f"{Settings.secret_key}-{user_id}-{user_salt}"
+        base_str = f"{settings.secret_key}-{user_id}-{user_salt}"
         return sha256(base_str.encode()).hexdigest()
 
 settings = Settings()
\ No newline at end of file
@@ -6,7 +6,11 @@ class KafkaConfig:
         return {
             'bootstrap.servers': settings.KAFKA_BOOTSTRAP_SERVERS,
             'message.max.bytes': 10000000,
-            'queue.buffering.max.messages': 100000
+            'queue.buffering.max.messages': 100000,
+            # Сообщения копятся до linger.ms и уходят пачками со сжатием
+            'linger.ms': 20,
+            'batch.num.messages': 10000,
+            'compression.type': 'lz4',
         }
 
     @staticmethod
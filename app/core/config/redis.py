@@ -8,3 +8,13 @@ async def get_redis_client() -> Redis:
     if _redis is None:
         _redis = Redis.from_url(settings.redis_url, decode_responses=True)
     return _redis
+
+
+_redis_bytes = None
+
+async def get_redis_bytes_client() -> Redis:
+    """Клиент без декодирования ответов — для готовых тел HTTP-ответов (bytes)"""
+    global _redis_bytes
+    if _redis_bytes is None:
+        _redis_bytes = Redis.from_url(settings.redis_url, decode_responses=False)
+    return _redis_bytes
@@ -21,6 +21,17 @@ class DatabaseManager:
         """)
         logger.info("✅ GIN index lot_search_idx created or already exists")
 
+        # Триграммный индекс для /lot/search_car (см. migrations/add_lot_directory_search.sql)
+        try:
+            await conn.execute_query("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+            await conn.execute_query("""
+                CREATE INDEX IF NOT EXISTS lot_directory_search_text_trgm_idx
+                ON lot_directory USING GIN (search_text gin_trgm_ops);
+            """)
+            logger.info("✅ GIN index lot_directory_search_text_trgm_idx created or already exists")
+        except Exception as e:
+            logger.warning(f"pg_trgm index for lot_directory was not created: {e}")
+
     @staticmethod
     async def close():
         """Close database connections"""
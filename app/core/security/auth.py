@@ -5,6 +5,7 @@ from jose import jwt, JWTError
 from app.core.config import settings
 from app.models.user import User
 from tortoise.exceptions import DoesNotExist
+from app.core.security.principal import principal_cache
 
 async def create_access_token(user_id: int, scopes: list[str] = ["user"]) -> dict:
     """
@@ -16,7 +17,7 @@ async def create_access_token(user_id: int, scopes: list[str] = ["user"]) -> dic
     expire = datetime.now() + timedelta(minutes=settings.access_token_expire_minutes)
     
     payload = {
-        "user_id": user.id,
+        "user_id": str(user.id),
         "sub": user.email,
         "scopes": scopes,
         "exp": expire
@@ -36,7 +37,7 @@ async def create_access_token(user_id: int, scopes: list[str] = ["user"]) -> dic
 
 async def verify_token(token: str) -> User:
     """
-    Проверяет JWT токен и возвращает пользователя
+    Проверяет JWT токен и возвращает пользователя (частичный экземпляр из кэша принципалов, без запроса к БД)
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,30 +46,29 @@ async def verify_token(token: str) -> User:
     )
     
     try:
-        # Сначала получаем user_id без проверки подписи
-        unverified = jwt.get_unverified_claims(token)
-        user_id = unverified.get("user_id")
+        # Ключ подписи у каждого пользователя свой — user_id читаем до проверки подписи
+        user_id = jwt.get_unverified_claims(token).get("user_id")
         if not user_id:
             raise credentials_exception
-            
-        # Получаем пользователя и генерируем его ключ
-        user = await User.get(id=user_id)
-        user_secret_key = settings.get_user_secret_key(user.id, user.salt)
-        
+
+        principal = await principal_cache.get(user_id)
+        if principal is None:
+            raise credentials_exception
+
         # Проверяем токен
-        payload = jwt.decode(
+        jwt.decode(
             token,
-            user_secret_key,
+            principal.secret_key,
             algorithms=[settings.algorithm]
         )
         
-        if not user.is_active:
+        if not principal.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Inactive user"
             )
             
-        return user
+        return principal.to_user()
         
-    except (JWTError, DoesNotExist) as e:
-        raise credentials_exception
\ No newline at end of file
+    except JWTError as e:
+        raise credentials_exception
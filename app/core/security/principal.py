@@ -0,0 +1,192 @@
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from uuid import UUID
+from loguru import logger
+from tortoise.signals import post_delete, post_save
+
+from app.core.cache import GUARDED_SET, LocalCacheVersion
+from app.core.config import settings
+from app.core.config.redis import get_redis_client
+from app.models.role import Role
+from app.models.user import User
+
+# Запись в Redis и в памяти процесса (секунды); изменения пользователя в других процессах
+# видны не позже PRINCIPAL_LOCAL_TTL
+PRINCIPAL_TTL = 300
+PRINCIPAL_LOCAL_TTL = 5.0
+PRINCIPAL_LOCAL_SIZE = 10_000
+
+# Версия всех принципалов: поднимается при изменении ролей и прав
+PRINCIPAL_VERSION_KEY = f"{settings.CACHE_KEY}_principal_version"
+
+PRINCIPAL_USER_FIELDS = ("id", "email", "salt", "is_active", "kyc_access", "two_fa_enabled")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Личность пользователя для авторизации: без профиля, баланса и секретов 2FA"""
+    id: str
+    email: str
+    salt: str
+    is_active: bool
+    kyc_access: bool
+    two_fa_enabled: bool
+    roles: frozenset
+    permissions: frozenset
+
+    @classmethod
+    async def load(cls, user_id: str) -> Optional['Principal']:
+        """Пользователь и его роли/права из БД: два запроса"""
+        rows = await User.filter(id=user_id).values(*PRINCIPAL_USER_FIELDS)
+        if not rows:
+            return None
+        grants = await Role.filter(users__id=user_id).values_list("name", "permissions__name")
+        return cls(
+            **{**rows[0], "id": str(rows[0]["id"])},
+            roles=frozenset(role for role, _ in grants),
+            permissions=frozenset(permission for _, permission in grants if permission),
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> 'Principal':
+        fields = json.loads(data)
+        return cls(**{**fields, "roles": frozenset(fields["roles"]), "permissions": frozenset(fields["permissions"])})
+
+    def to_json(self) -> str:
+        return json.dumps({
+            **{field: getattr(self, field) for field in PRINCIPAL_USER_FIELDS},
+            "roles": sorted(self.roles),
+            "permissions": sorted(self.permissions),
+        })
+
+    @property
+    def secret_key(self) -> str:
+        """Ключ подписи токенов пользователя (см. app.core.security.auth)"""
+        return settings.get_user_secret_key(self.id, self.salt)
+
+    def to_user(self) -> User:
+        """
+        Частичный экземпляр User без запроса к БД (как после .only()): годится для id,
+        связей (user=...) и has_role(); профиль и баланс — через get_current_user_record
+        """
+        user = User._init_from_db(**{
+            **{field: getattr(self, field) for field in PRINCIPAL_USER_FIELDS},
+            "id": UUID(self.id),
+        })
+        user.role_names = self.roles
+        return user
+
+
+class PrincipalCache:
+    """
+    Принципалы по id пользователя: LRU в памяти процесса (PRINCIPAL_LOCAL_TTL) поверх Redis (PRINCIPAL_TTL).
+    Изменение пользователя (сохранение, выход, 2FA) сбрасывает его запись, изменение ролей и прав —
+    все записи через версию в ключе.
+    """
+
+    def __init__(self):
+        self._local: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+        self.version = LocalCacheVersion(PRINCIPAL_VERSION_KEY, check_interval=PRINCIPAL_LOCAL_TTL)
+
+    def key(self, user_id: str) -> str:
+        return f"{settings.CACHE_KEY}_principal_{self.version.current or 0}_{user_id}"
+
+    def generation_key(self, user_id: str) -> str:
+        """Поколение пользователя: поднимается при каждой инвалидации, см. GUARDED_SET"""
+        return f"{settings.CACHE_KEY}_principal_gen_{user_id}"
+
+    async def get(self, user_id) -> Optional[Principal]:
+        user_id = str(user_id)
+        if await self.version.changed():
+            self._local.clear()
+            await self.version.sync()
+
+        now = time.monotonic()
+        entry = self._local.get(user_id)
+        if entry is not None and entry[0] > now:
+            self._local.move_to_end(user_id)
+            return entry[1]
+
+        # Ключ фиксируется до чтения из БД: после смены версии ролей запись уйдет под прежний ключ
+        key = self.key(user_id)
+        principal, generation = await self._read(key, user_id)
+        if principal is None:
+            principal = await Principal.load(user_id)
+            if principal is None:
+                self._local.pop(user_id, None)
+                return None
+            if not await self._write(key, principal, generation):
+                # Пользователя изменили, пока он читался: прочитанное могло устареть, в кэш не кладем
+                return await Principal.load(user_id)
+
+        self._local[user_id] = (now + PRINCIPAL_LOCAL_TTL, principal)
+        self._local.move_to_end(user_id)
+        while len(self._local) > PRINCIPAL_LOCAL_SIZE:
+            self._local.popitem(last=False)
+        return principal
+
+    async def _read(self, key: str, user_id: str) -> tuple[Optional[Principal], Optional[str]]:
+        """Принципал из Redis и текущее поколение пользователя (None — Redis недоступен)"""
+        try:
+            redis = await get_redis_client()
+            data, generation = await redis.mget(key, self.generation_key(user_id))
+            return (Principal.from_json(data) if data else None), generation or ""
+        except Exception as e:
+            logger.warning(f"Principal cache read failed: {e}")
+            return None, None
+
+    async def _write(self, key: str, principal: Principal, generation: Optional[str]) -> bool:
+        """False — пользователя инвалидировали после чтения поколения"""
+        if generation is None:
+            return True
+        try:
+            redis = await get_redis_client()
+            return bool(await redis.eval(
+                GUARDED_SET, 2, key, self.generation_key(principal.id),
+                generation, principal.to_json(), PRINCIPAL_TTL,
+            ))
+        except Exception as e:
+            logger.warning(f"Principal cache write failed: {e}")
+            return True
+
+    async def invalidate(self, user_ids: Iterable) -> None:
+        """Сбрасывает принципалов пользователей (выход, 2FA, деактивация, смена ролей пользователя)"""
+        user_ids = [str(user_id) for user_id in user_ids if user_id]
+        if not user_ids:
+            return
+        for user_id in user_ids:
+            self._local.pop(user_id, None)
+        try:
+            redis = await get_redis_client()
+            async with redis.pipeline(transaction=False) as pipe:
+                # Сначала поколение: чтение из БД, начатое до изменения, свою запись уже не сделает
+                for user_id in user_ids:
+                    pipe.incr(self.generation_key(user_id))
+                    pipe.expire(self.generation_key(user_id), PRINCIPAL_TTL)
+                pipe.delete(*(self.key(user_id) for user_id in user_ids))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Principal cache invalidation failed: {e}")
+
+    async def invalidate_all(self) -> None:
+        """Сбрасывает всех принципалов (изменение ролей и прав)"""
+        self._local.clear()
+        await self.version.bump()
+        await self.version.sync()
+
+
+principal_cache = PrincipalCache()
+
+
+@post_save(User)
+async def _user_saved(sender, instance: User, created, using_db, update_fields) -> None:
+    if not created:
+        await principal_cache.invalidate([instance.id])
+
+
+@post_delete(User)
+async def _user_deleted(sender, instance: User, using_db) -> None:
+    await principal_cache.invalidate([instance.id])
@@ -20,12 +20,14 @@ from app.api.routes import (
 from app.core.database import DatabaseManager
 from app.services.init_service import InitService
 from app.api.dependencies import get_current_user
-from app.services.kafka.producer import KafkaProducer
+from app.services.kafka.producer import kafka_producer
 import clamd
 from app.services.kafka.admin import KafkaAdmin
 from app.database import (create_admin_user, create_default_roles, 
                             create_additional_information)
 from app.services.cache import init_main_cache
+from app.services.translate_service import translation_cache
+from app.services.similar_service import similar_lots
 from fastapi.security import APIKeyHeader
 from app.core.cache import init_cache
 from fastapi.staticfiles import StaticFiles
@@ -75,7 +77,7 @@ async def lifespan(app: FastAPI):
     await InitService.init_roles_permissions()
     await InitService.create_default_user()
 
-    app.state.kafka_producer = KafkaProducer()
+    app.state.kafka_producer = kafka_producer
     admin = KafkaAdmin()
     loop = asyncio.get_running_loop()
     await loop.run_in_executor(None, admin.create_topics)
@@ -97,8 +99,14 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.exception(f"create_additional_information autostart failed: {e}")
     init_cache()
-    # ⏱️ Запуск фоновой задачи на обновление кэша
-    # asyncio.create_task(init_main_cache())
+    try:
+        await translation_cache.load()
+    except Exception as e:
+        logger.exception(f"Translation cache preload failed: {e}")
+    # ⏱️ Запуск фоновой задачи на обновление кэша (пересчет по событиям)
+    asyncio.create_task(init_main_cache())
+    # Индекс похожих лотов грузится в фоне; до готовности /similar_lots ищет через БД
+    similar_lots.ensure_fresh()
     await create_default_roles()
     await create_admin_user()
     try:
@@ -111,7 +119,7 @@ async def lifespan(app: FastAPI):
         #         await app.state.copart_controller.stop()
         # except Exception:
         #     logger.exception("Error stopping Copart controller")
-        app.state.kafka_producer.flush()
+        await asyncio.get_running_loop().run_in_executor(None, app.state.kafka_producer.close)
         await db.close()
 
 BASE_DIR = Path(__file__).parent
@@ -0,0 +1,123 @@
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+from pypika_tortoise import Parameterizer, Table, functions
+from pypika_tortoise.terms import Case, Function, LiteralValue, NullValue, Star, Tuple, ValueWrapper
+from tortoise.queryset import ValuesQuery
+
+# Диапазон значений поля для условного счетчика: (поле, нижняя граница включительно, верхняя исключительно)
+RangeBucket = tuple[str, Optional[float], Optional[float]]
+
+
+class GroupingSets(Function):
+    def __init__(self, *sets: Sequence[Any]) -> None:
+        super().__init__("GROUPING SETS", *(Tuple(*terms) for terms in sets))
+
+
+class Grouping(Function):
+    def __init__(self, *terms: Any, alias: Optional[str] = None) -> None:
+        super().__init__("GROUPING", *terms, alias=alias)
+
+
+def grouping_mask(columns: Sequence[str], column: Optional[str] = None) -> int:
+    """
+    Значение GROUPING(columns...) для набора (column) или для итогового набора () при column=None:
+    бит колонки (старший — первая) равен 1, если колонка в наборе не группируется
+    """
+    mask = (1 << len(columns)) - 1
+    if column is not None:
+        mask ^= 1 << (len(columns) - 1 - columns.index(column))
+    return mask
+
+
+def _aggregates(rows, min_max: Sequence[str], ranges: Mapping[str, RangeBucket]) -> list:
+    terms = [functions.Count(Star()).as_("count")]
+    for field in min_max:
+        terms.append(functions.Min(rows.field(field)).as_(f"{field}_min"))
+        terms.append(functions.Max(rows.field(field)).as_(f"{field}_max"))
+    for name, (field, low, high) in ranges.items():
+        condition = None
+        for bound in (rows.field(field) >= low if low is not None else None,
+                      rows.field(field) < high if high is not None else None):
+            if bound is not None:
+                condition = bound if condition is None else condition & bound
+        terms.append(functions.Count(Case().when(condition, LiteralValue(1))).as_(name))
+    return terms
+
+
+async def execute_facets(
+    queryset: ValuesQuery,
+    columns: Sequence[str],
+    min_max: Sequence[str] = (),
+    ranges: Optional[Mapping[str, RangeBucket]] = None,
+) -> list[dict]:
+    """
+    Считает все фасеты одного контекста фильтров за один запрос:
+    SELECT <columns>, GROUPING(...) AS grouping_id, COUNT(*), MIN/MAX, счетчики ranges
+    FROM (<отфильтрованная выборка>) GROUP BY GROUPING SETS ((c1), (c2), ..., ()).
+    Итоговый набор () дает count, min/max и ranges по всей выборке.
+    Без GROUPING SETS (sqlite) те же строки собираются через WITH ... UNION ALL.
+    Строки разбираются reduce_facets.
+    """
+    ranges = ranges or {}
+    queryset._choose_db_if_not_chosen()
+    queryset._make_query()
+    db = queryset._db
+    query_class = db.query_class
+    rows = queryset.query
+    ctx = query_class.SQL_CONTEXT.copy(parameterizer=Parameterizer())
+
+    if db.capabilities.dialect == "postgres":
+        query = query_class.from_(rows).select(
+            *[rows.field(column).as_(column) for column in columns],
+            Grouping(*[rows.field(column) for column in columns], alias="grouping_id")
+            if columns else ValueWrapper(0, alias="grouping_id"),
+            *_aggregates(rows, min_max, ranges),
+        ).groupby(GroupingSets(*[[rows.field(column)] for column in columns], []))
+        sql = query.get_sql(ctx)
+    else:
+        # Выборку считаем один раз в CTE, наборы группировки — отдельными SELECT
+        sql = f'WITH "facet_rows" AS ({rows.get_sql(ctx)}) '
+        table = Table("facet_rows")
+        parts = []
+        for grouped in [*columns, None]:
+            part = query_class.from_(table).select(
+                *[table.field(column).as_(column) if column == grouped else NullValue(alias=column)
+                  for column in columns],
+                ValueWrapper(grouping_mask(columns, grouped), alias="grouping_id"),
+                *_aggregates(table, min_max, ranges),
+            )
+            if grouped is not None:
+                part = part.groupby(table.field(grouped))
+            parts.append(part.get_sql(ctx))
+        sql += " UNION ALL ".join(parts)
+
+    return await db.execute_query_dict(sql, ctx.parameterizer.values)
+
+
+def reduce_facets(
+    rows: Iterable[dict],
+    columns: Sequence[str],
+    min_max: Sequence[str] = (),
+    ranges: Optional[Mapping[str, RangeBucket]] = None,
+) -> dict:
+    """
+    Разбирает строки execute_facets по grouping_id:
+    {"totals": {count, *_min/*_max, ranges}, column: {значение: count}}.
+    NULL-значения колонок в фасеты не попадают.
+    """
+    ranges = ranges or {}
+    totals_mask = grouping_mask(columns)
+    masks = {grouping_mask(columns, column): column for column in columns}
+    result: dict[str, Any] = {column: {} for column in columns}
+    result["totals"] = {
+        "count": 0,
+        **{f"{field}_{edge}": None for field in min_max for edge in ("min", "max")},
+        **{name: 0 for name in ranges},
+    }
+    for row in rows:
+        mask = row["grouping_id"]
+        if mask == totals_mask:
+            result["totals"] = {key: row[key] for key in result["totals"]}
+        elif (column := masks.get(mask)) is not None and row[column] is not None:
+            result[column][row[column]] = row["count"]
+    return result
@@ -1,8 +1,22 @@
 from tortoise import fields, models
-from typing import Optional
+from tortoise.expressions import Function, Q
+from tortoise.functions import Coalesce
+from pypika_tortoise import functions as sql_functions
+from typing import Optional, Union
+from datetime import datetime, timezone
 from loguru import logger
 from tortoise.transactions import in_transaction
 from tortoise.exceptions import IntegrityError
+from app.core.cache import (mark_refine_dirty, invalidate_lot_cache, invalidate_lot_directory,
+                            lot_directory_key, generation_key, GUARDED_SET, LOT_DIRECTORY_TTL,
+                            LOT_DIRECTORY_MISS_TTL, mark_lots_changed)
+from app.core.config.redis import get_redis_client
+from app.models.shard_query import (shard_ordering, keyset_filter, merge_shard_rows,
+                                    execute_shard_aggregate, reduce_shard_aggregates)
+from app.models.shard_map import ShardMap
+from app.core.config import settings
+import asyncio
+import json
 import re
 
 
@@ -18,6 +32,13 @@ def slugify(name: str) -> str:
 
         return name
 
+LOT_PREFETCH_RELATED = (
+    "make", "model", "vehicle_type", "damage_pr", "damage_sec",
+    "fuel", "drive", "transmission", "color", "status", "body_type",
+    "series", "base_site", "seller", "seller_type", "document", "document_old", "title"
+)
+
+
 class BaseReferenceModel(models.Model):
     """
     Базовая модель для справочных таблиц со `slug` и `name`.
@@ -205,6 +226,13 @@ class PrefixIDModel(models.Model):
         abstract = True
 
 
+# Емкость диапазона одного префикса: ID таблицы лежат в (PREFIX * 10_000_000, (PREFIX + 1) * 10_000_000)
+PREFIX_CAPACITY = 10_000_000
+
+# Сколько ID процесс резервирует у id_counters за одно обращение
+ID_BLOCK_SIZE = 1000
+
+
 class IDCounter(models.Model):
     """
     Таблица для хранения последних использованных ID для каждой таблицы
@@ -214,81 +242,88 @@ class IDCounter(models.Model):
     
     class Meta:
         table = "id_counters"
-    @classmethod
-    async def get_last_shard_num(cls) -> int:
-        """Возвращает номер последнего использованного шарда"""
-        counter, _ = await cls.get_or_create(
-            table_name="shard_counter",
-            defaults={"last_id": 0}
-        )
-        return counter.last_id
-    
-    @classmethod
-    async def set_last_shard_num(cls, shard_num: int) -> None:
-        """Устанавливает номер последнего использованного шарда"""
-        counter, _ = await cls.get_or_create(
-            table_name="shard_counter",
-            defaults={"last_id": 0}
-        )
-        counter.last_id = shard_num
-        await counter.save()
 
     @classmethod
     async def initialize_counters(cls):
         """Инициализирует счетчики для всех таблиц при первом запуске"""
-        tables = [
-            ("Lot", 1),
-            ("HistoricalLot", 2),
-            ("LotWithoutAuctionDate", 3),
-            ("LotWithouImage", 4),
-            ("LotHistoryAddons", 5),
-            ("LotOtherVehicle", 6)
-        ]
-        
-        for table_name, prefix in tables:
+        for model in LOT_DIRECTORY_MODELS.values():
             await cls.get_or_create(
-                table_name=table_name,
-                defaults={"last_id": prefix * 10_000_000}
+                table_name=model.__name__,
+                defaults={"last_id": model.PREFIX * PREFIX_CAPACITY}
             )
-    
+
     @classmethod
-    async def get_next_id(cls, table_name: str, shard_name: str = None) -> int:
+    async def reserve_block(cls, table_name: str, prefix: int, count: int) -> tuple[int, int]:
         """
-        Генерирует следующий ID для указанной таблицы и шарда
-        :param table_name: Имя таблицы
-        :param shard_name: Имя шарда (если None, используется основная таблица)
-        :return: Следующий ID
+        Резервирует диапазон из count ID таблицы одной транзакцией (блокировка строки счетчика).
+        Счетчик ниже начала диапазона префикса (старые счетчики шардов) поднимается до него.
+        :return: (первый, последний) ID диапазона включительно
         """
-        counter_name = f"{table_name}_{shard_name}" if shard_name else table_name
-        
+        floor = prefix * PREFIX_CAPACITY
         async with in_transaction():
-            counter, created = await cls.get_or_create(
-                table_name=counter_name,
-                defaults={"last_id": cls.get_initial_id(table_name, shard_name)}
-            )
-            counter.last_id += 1
-            await counter.save()
-            return counter.last_id
-    
-    @staticmethod
-    def get_initial_id(table_name: str, shard_name: str = None) -> int:
-        """
-        Возвращает начальный ID для таблицы/шарда
-        """
-        prefixes = {
-            "Lot": 1,
-            "HistoricalLot": 2,
-            "LotWithoutAuctionDate": 3,
-            "LotWithouImage": 4,
-            "LotHistoryAddons": 5,
-            "LotOtherVehicle": 6,
-            "LotOtherVehicleHistorical": 7
-        }
-        
-        prefix = prefixes.get(table_name, 0)
-        shard_num = int(shard_name.replace("Lot", "")) if shard_name and shard_name != "Lot" else 0
-        
-        return prefix * 10_000_000 + shard_num * 1_000_000
+            await cls.get_or_create(table_name=table_name, defaults={"last_id": floor})
+            counter = await cls.select_for_update().get(table_name=table_name)
+            first = max(counter.last_id, floor) + 1
+            last = first + count - 1
+            if last >= floor + PREFIX_CAPACITY:
+                raise ValueError(f"ID range of {table_name} (prefix {prefix}) is exhausted")
+            counter.last_id = last
+            await counter.save(update_fields=["last_id"])
+            return first, last
+
+
+class IDBlockAllocator:
+    """
+    Hi-lo генератор ID: процесс берет у IDCounter блок из block_size ID
+    (одна блокировка строки счетчика на блок, а не на каждую вставку)
+    и раздает их из памяти. Блоки разных процессов не пересекаются;
+    остаток блока при перезапуске процесса теряется — дырки в ID допустимы.
+    """
+
+    def __init__(self, block_size: int = ID_BLOCK_SIZE):
+        self.block_size = block_size
+        self._blocks: dict[str, tuple[int, int]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def allocate(self, model: type['PrefixIDModel'], count: int = 1) -> list[int]:
+        """Возвращает count новых ID таблицы model"""
+        if count <= 0:
+            return []
+        name = model.__name__
+        async with self._locks.setdefault(name, asyncio.Lock()):
+            next_id, last_id = self._blocks.get(name, (1, 0))
+            ids: list[int] = []
+            while len(ids) < count:
+                if next_id > last_id:
+                    next_id, last_id = await IDCounter.reserve_block(
+                        name, model.PREFIX, max(self.block_size, count - len(ids))
+                    )
+                taken = min(count - len(ids), last_id - next_id + 1)
+                ids.extend(range(next_id, next_id + taken))
+                next_id += taken
+            self._blocks[name] = (next_id, last_id)
+            return ids
+
+    def reset(self) -> None:
+        """Забывает зарезервированные блоки (например, после смены базы в тестах)"""
+        self._blocks.clear()
+        self._locks.clear()
+
+
+id_allocator = IDBlockAllocator()
+
+_lot_shard_map: Optional[ShardMap] = None
+
+
+def lot_shard_map() -> ShardMap:
+    """Карта шардов Lot из настроек (LOT_SHARDS, LOT_SHARDS_PREVIOUS), строится один раз на процесс"""
+    global _lot_shard_map
+    if _lot_shard_map is None:
+        unknown = {*settings.LOT_SHARDS, *settings.LOT_SHARDS_PREVIOUS} - set(LOT_SHARD_MODELS)
+        if unknown:
+            raise ValueError(f"Unknown lot shards: {sorted(unknown)}")
+        _lot_shard_map = ShardMap(settings.LOT_SHARDS, settings.LOT_SHARDS_PREVIOUS, settings.LOT_SHARD_VNODES)
+    return _lot_shard_map
 
 
 class LotBase(PrefixIDModel):
@@ -298,39 +333,47 @@ class LotBase(PrefixIDModel):
     PREFIX = 0  # Базовый префикс, должен быть переопределен в дочерних классах
 
     @classmethod
-    async def get_shard_for_new_record(cls) -> type['LotBase']:
+    async def get_shard_for_new_record(cls, lot_id: Optional[int] = None) -> type['LotBase']:
         """
         Возвращает класс шарда для создания новой записи.
-        Для нешардированных таблиц возвращает сам класс.
-        Для шардированных таблиц выбирает шард по алгоритму.
+        Для нешардированных таблиц возвращает сам класс,
+        для Lot — шард по консистентному хешу lot_id (без обращения к БД).
         """
-        # Если это не основной Lot, возвращаем текущий класс
-        if cls != Lot:
-            return cls
-        
-        # Алгоритм выбора шарда для основной таблицы Lot
-        # Можно использовать round-robin, хеширование или другой метод
-        # В этом примере используем простой round-robin
-        
-        # Получаем последний использованный шард из IDCounter
-        last_shard_num = await IDCounter.get_last_shard_num()
-        next_shard_num = (last_shard_num % 7) + 1  # У нас 7 шардов
-        
-        shard_classes = {
-            1: Lot1,
-            2: Lot2,
-            3: Lot3,
-            4: Lot4,
-            5: Lot5,
-            6: Lot6,
-            7: Lot7
-        }
-        
-        # Сохраняем номер последнего использованного шарда
-        await IDCounter.set_last_shard_num(next_shard_num)
-        
-        return shard_classes[next_shard_num]
+        return (await cls.get_shards_for_new_records([lot_id]))[0]
     
+    @classmethod
+    async def get_shards_for_new_records(cls, lot_ids: list[Optional[int]]) -> list[type['LotBase']]:
+        """Пакетный вариант get_shard_for_new_record"""
+        if cls != Lot:
+            return [cls] * len(lot_ids)
+        if None in lot_ids:
+            raise ValueError("lot_id is required to place a lot into a Lot shard")
+
+        shard_map = lot_shard_map()
+        return [LOT_SHARD_MODELS[shard_map.shard_for(lot_id)] for lot_id in lot_ids]
+
+    @classmethod
+    def get_read_shards(cls, lot_id: int) -> list[type['LotBase']]:
+        """
+        Таблицы, в которых может лежать лот с данным lot_id: для Lot — один шард,
+        во время ребалансировки — текущий и прежний
+        """
+        if cls != Lot:
+            return [cls]
+        return [LOT_SHARD_MODELS[name] for name in lot_shard_map().read_shards(lot_id)]
+
+    @classmethod
+    def refine_state(cls) -> Optional[bool]:
+        """
+        is_historical группы предрасчитанного /refine, в которую попадают лоты таблицы;
+        None — таблица в предрасчет не входит
+        """
+        if cls is Lot or cls in LOT_SHARD_MODELS.values():
+            return False
+        if cls is HistoricalLot:
+            return True
+        return None
+
     @classmethod
     def get_shard_class(cls) -> type['LotBase']:
         """
@@ -345,7 +388,7 @@ class LotBase(PrefixIDModel):
         Возвращает все классы шардов для текущего типа лота
         """
         if cls == Lot:
-            return [Lot1, Lot2, Lot3, Lot4, Lot5, Lot6, Lot7]
+            return [LOT_SHARD_MODELS[name] for name in lot_shard_map().shards]
         return [cls]
     
     @classmethod
@@ -359,93 +402,136 @@ class LotBase(PrefixIDModel):
         return results
     
     @classmethod
-    async def query_across_shards_with_limit_offset(cls, limit: int = 18, offset: int = 0, *args, **kwargs) -> list['LotBase']:
-        """
-        Выполняет запрос по всем шардам текущего типа и возвращает объединенный результат с учетом общего лимита и оффсета.
+    async def query_across_shards_with_limit_offset(
+        cls,
+        limit: int = 18,
+        offset: int = 0,
+        *args,
+        sort_by: str = "id",
+        sort_order: str = "asc",
+        cursor: Optional[tuple] = None,
+        prefetch: Optional[tuple] = None,
+        **kwargs
+    ) -> list['LotBase']:
         """
-        results = []
-        total_collected = 0
-        remaining_offset = offset
-        remaining_limit = limit
-
-        for shard_class in await cls.get_all_shards():
-            if remaining_limit <= 0:
-                break
-
-            # Считаем сколько записей всего в этом шарде (можно оптимизировать при необходимости)
-            total_in_shard = await shard_class.filter(*args, **kwargs).count()
-
-            if remaining_offset >= total_in_shard:
-                remaining_offset -= total_in_shard
-                continue
-
-            shard_results = await shard_class.filter(*args, **kwargs)\
-                .offset(remaining_offset)\
-                .limit(remaining_limit)\
-                .prefetch_related(
-                    "make", "model", "vehicle_type", "damage_pr", "damage_sec",
-                    "fuel", "drive", "transmission", "color", "status", "body_type",
-                    "series", "base_site", "seller", "seller_type", "document", "document_old", "title"
-                )
-
-            results.extend(shard_results)
-            total_collected += len(shard_results)
-            remaining_limit = limit - total_collected
-            remaining_offset = 0  # Offset применяется только к первому подходящему шарду
+        Выполняет запрос по всем шардам текущего типа и возвращает глобально отсортированную страницу.
 
-        return results
+        Во все шарды параллельно уходит ORDER BY sort_by, id LIMIT offset+limit (только id и ключ),
+        результаты сливаются k-way merge, после чего полные записи с prefetch догружаются
+        только для итоговой страницы.
+        При переданном cursor (значение сортировки, id) offset игнорируется и
+        каждый шард читает не больше limit записей после курсора.
+        """
+        descending = sort_order == "desc"
+        ordering = shard_ordering(sort_by, descending)
+        prefetch = LOT_PREFETCH_RELATED if prefetch is None else prefetch
+
+        if cursor is not None:
+            args = (*args, keyset_filter(sort_by, descending, cursor))
+            offset = 0
+
+        shards = await cls.get_all_shards()
+        key_fields = ("id",) if sort_by == "id" else ("id", sort_by)
+        shard_rows = await asyncio.gather(*(
+            shard_class.filter(*args, **kwargs)
+                .order_by(*ordering)
+                .limit(offset + limit)
+                .values_list(*key_fields)
+            for shard_class in shards
+        ))
+        if sort_by == "id":
+            shard_rows = [[(row[0], row[0]) for row in rows] for rows in shard_rows]
+
+        page = merge_shard_rows(shard_rows, descending, offset, limit)
+        if not page:
+            return []
+
+        ids_by_shard: dict[int, list[int]] = {}
+        for index, row_id, _ in page:
+            ids_by_shard.setdefault(index, []).append(row_id)
+
+        fetched = await asyncio.gather(*(
+            shards[index].filter(id__in=ids).prefetch_related(*prefetch)
+            for index, ids in ids_by_shard.items()
+        ))
+        lots_by_key = {
+            (index, lot.id): lot
+            for index, lots in zip(ids_by_shard.keys(), fetched)
+            for lot in lots
+        }
+        return [lots_by_key[(index, row_id)] for index, row_id, _ in page if (index, row_id) in lots_by_key]
     
     
+    @classmethod
+    async def aggregate_across_shards(
+        cls,
+        *args,
+        min_max: tuple[str, ...] = (),
+        group_by: Optional[str] = None,
+        **kwargs
+    ) -> Union[dict, list[dict]]:
+        """
+        Агрегатный планировщик: компилирует фильтры в один UNION ALL по всем шардам
+        и возвращает count, <field>_min / <field>_max за один round trip.
+        С group_by возвращает список корзин {group_by: значение, "count": ...}.
+        """
+        fields = ("id", *min_max, *((group_by,) if group_by else ()))
+        querysets = [
+            shard_class.filter(*args, **kwargs).values(*fields)
+            for shard_class in await cls.get_all_shards()
+        ]
+        rows = await execute_shard_aggregate(querysets, min_max, group_by)
+        return reduce_shard_aggregates(rows, min_max, group_by)
+
     @classmethod
     async def get_min_max_odometer_across_shards(cls, *args, **kwargs) -> tuple[Optional[int], Optional[int]]:
         """
         Возвращает минимальный и максимальный одометр по всем шардам, учитывая переданные фильтры
         """
-        min_odo = None
-        max_odo = None
-
-        for shard_class in await cls.get_all_shards():
-            try:
-                qs = shard_class.filter(*args, **kwargs)
-                shard_min = await qs.order_by('odometer').limit(1).values_list('odometer', flat=True)
-                shard_max = await qs.order_by('-odometer').limit(1).values_list('odometer', flat=True)
-
-                if shard_min:
-                    min_val = shard_min[0]
-                    min_odo = min_val if min_odo is None else min(min_odo, min_val)
-
-                if shard_max:
-                    max_val = shard_max[0]
-                    max_odo = max_val if max_odo is None else max(max_odo, max_val)
-            except Exception as e:
-                pass
-
-        return min_odo, max_odo
+        try:
+            totals = await cls.aggregate_across_shards(*args, min_max=("odometer",), **kwargs)
+            return totals["odometer_min"], totals["odometer_max"]
+        except Exception as e:
+            logger.warning(f"Odometer aggregate failed for {cls.__name__}: {e}")
+            return None, None
     
     @classmethod
     async def count_across_shards(cls, *args, **kwargs) -> int:
         """
         Выполняет подсчет количества записей по всем шардам текущего типа
         """
-        total = 0
-        for shard_class in await cls.get_all_shards():
-            try:
-                count = await shard_class.filter(*args, **kwargs).count()
-                if count:
-                    total += count
-            except Exception as e:
-                pass
-        return total
+        try:
+            totals = await cls.aggregate_across_shards(*args, **kwargs)
+            return totals["count"]
+        except Exception as e:
+            logger.warning(f"Count aggregate failed for {cls.__name__}: {e}")
+            return 0
     
     @classmethod
     async def get_next_id(cls) -> int:
         """Генерирует следующий ID для текущей таблицы"""
-        return await IDCounter.get_next_id(cls.__name__)
+        return (await id_allocator.allocate(cls))[0]
     
+    @classmethod
+    async def get_next_ids(cls, count: int) -> list[int]:
+        """Резервирует count ID для пакетной вставки в текущую таблицу"""
+        return await id_allocator.allocate(cls, count)
+
     async def save(self, *args, **kwargs):
         if not self.id:
             self.id = await self.__class__.get_next_id()
+            # Иначе Tortoise не передаст id в INSERT и возьмет автоинкремент таблицы
+            self._custom_generated_pk = True
         await super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or LotDirectory.TRACKED_FIELDS & set(update_fields):
+            await LotDirectory.register([self])
+        else:
+            await mark_lots_changed([self.id])
+
+    async def delete(self, *args, **kwargs):
+        await super().delete(*args, **kwargs)
+        await LotDirectory.unregister(type(self), [self.id])
     
     @classmethod
     async def move_to(cls, source_id: int, target_class: type['LotBase']) -> 'LotBase':
@@ -497,13 +583,68 @@ class LotBase(PrefixIDModel):
                 
                 # Удаляем исходный лот
                 await source_lot.delete(using_db=connection)
-                
-                return new_lot
+
+                await LotSearch.unindex(cls, [source_id])
+                await LotSearch.index([new_lot])
                 
             except Exception as e:
                 await connection.rollback()
                 raise ValueError(f"Failed to move lot {source_id}: {str(e)}") from e
-    
+
+        base_site = lot_data.get('base_site')
+        await mark_refine_dirty(
+            (model.refine_state(), base_site.slug if base_site else None)
+            for model in (cls, target_class) if model.refine_state() is not None
+        )
+        await invalidate_lot_cache([source_id], [lot_data.get('vin')])
+        return new_lot
+
+    @classmethod
+    async def move_many(cls, source_ids: list[int], target_class: type['LotBase']) -> int:
+        """
+        Пакетный move_to: переносит лоты с сохранением ID одним запросом
+        WITH moved AS (DELETE ... RETURNING ...) INSERT INTO ... SELECT (в sqlite — INSERT ... SELECT и DELETE).
+        lot_search и lot_directory обновляются по набору id, а не по лоту.
+        Возвращает число перенесенных лотов
+        """
+        source_ids = list(source_ids)
+        if not source_ids:
+            return 0
+        # Колонки у всех таблиц лотов одинаковые
+        columns = ", ".join(f'"{column}"' for column in cls._meta.fields_db_projection.values())
+        source_table, target_table = cls._meta.db_table, target_class._meta.db_table
+
+        async with in_transaction() as connection:
+            moved = await cls.filter(id__in=source_ids).values_list("id", "vin", "base_site__slug")
+            if not moved:
+                return 0
+            ids = [row[0] for row in moved]
+            if connection.capabilities.dialect == "postgres":
+                await connection.execute_query(
+                    f'WITH "moved" AS (DELETE FROM "{source_table}" WHERE "id" = ANY($1::bigint[]) '
+                    f'RETURNING {columns}) INSERT INTO "{target_table}" ({columns}) SELECT {columns} FROM "moved"',
+                    [ids],
+                )
+            else:
+                placeholders = ", ".join("?" for _ in ids)
+                await connection.execute_query(
+                    f'INSERT INTO "{target_table}" ({columns}) '
+                    f'SELECT {columns} FROM "{source_table}" WHERE "id" IN ({placeholders})',
+                    ids,
+                )
+                await connection.execute_query(f'DELETE FROM "{source_table}" WHERE "id" IN ({placeholders})', ids)
+
+            await LotSearch.relocate(cls, target_class, ids)
+            await LotDirectory.relocate(cls, target_class, ids)
+
+        await mark_refine_dirty(
+            (model.refine_state(), site)
+            for model in (cls, target_class) if model.refine_state() is not None
+            for site in {row[2] for row in moved}
+        )
+        await invalidate_lot_cache(ids, [row[1] for row in moved])
+        return len(ids)
+
     # Убираем auto_increment=True, так как мы управляем ID вручную
     id = fields.BigIntField(pk=True)
     lot_id = fields.BigIntField(unique=True)
@@ -817,6 +958,13 @@ class Lot7(LotBase):
         ]
 
 
+# Все объявленные шарды Lot. Новый шард — класс LotN(LotBase) здесь и его имя в LOT_SHARDS
+# (прежний набор на время ребалансировки — в LOT_SHARDS_PREVIOUS, см. parsers/rebalance_shards.py)
+LOT_SHARD_MODELS: dict[str, type[LotBase]] = {
+    model.__name__: model for model in (Lot1, Lot2, Lot3, Lot4, Lot5, Lot6, Lot7)
+}
+
+
 class HistoricalLot(LotBase):
     PREFIX = 2
 
@@ -825,29 +973,14 @@ class HistoricalLot(LotBase):
         """
         Возвращает минимальный и максимальный одометр по таблице HistoricalLot, учитывая переданные фильтры.
         """
-        try:
-            qs = cls.filter(*args, **kwargs)
-
-            min_odo_list = await qs.order_by('odometer').limit(1).values_list('odometer', flat=True)
-            max_odo_list = await qs.order_by('-odometer').limit(1).values_list('odometer', flat=True)
-
-            min_odo = min_odo_list[0] if min_odo_list else None
-            max_odo = max_odo_list[0] if max_odo_list else None
-
-            return min_odo, max_odo
-
-        except Exception:
-            return None, None
+        return await cls.get_min_max_odometer_across_shards(*args, **kwargs)
 
     @classmethod
     async def historical_count(cls, *args, **kwargs) -> int:
         """
         Выполняет подсчет количества записей в таблице HistoricalLot с учетом фильтров.
         """
-        try:
-            return await cls.filter(*args, **kwargs).count()
-        except Exception:
-            return 0
+        return await cls.count_across_shards(*args, **kwargs)
         
     @classmethod
     async def historical_query_with_limit_offset(
@@ -860,14 +993,7 @@ class HistoricalLot(LotBase):
         """
         Выполняет запрос к таблице HistoricalLot с лимитом и оффсетом.
         """
-        return await cls.filter(*args, **kwargs)\
-            .offset(offset)\
-            .limit(limit)\
-            .prefetch_related(
-                "make", "model", "vehicle_type", "damage_pr", "damage_sec",
-                "fuel", "drive", "transmission", "color", "status", "body_type",
-                "series", "base_site", "seller", "seller_type", "document", "document_old", "title"
-            )
+        return await cls.query_across_shards_with_limit_offset(limit, offset, *args, **kwargs)
     class Meta:
         table = "historical_lot"
         indexes = [
@@ -932,29 +1058,14 @@ class LotOtherVehicle(LotBase):
         """
         Возвращает минимальный и максимальный одометр по таблице LotOtherVehicle, учитывая переданные фильтры.
         """
-        try:
-            qs = cls.filter(*args, **kwargs)
-
-            min_odo_list = await qs.order_by('odometer').limit(1).values_list('odometer', flat=True)
-            max_odo_list = await qs.order_by('-odometer').limit(1).values_list('odometer', flat=True)
-
-            min_odo = min_odo_list[0] if min_odo_list else None
-            max_odo = max_odo_list[0] if max_odo_list else None
-
-            return min_odo, max_odo
-
-        except Exception:
-            return None, None
+        return await cls.get_min_max_odometer_across_shards(*args, **kwargs)
 
     @classmethod
     async def other_vehicle_count(cls, *args, **kwargs) -> int:
         """
         Выполняет подсчет количества записей в таблице LotOtherVehicle с учетом фильтров.
         """
-        try:
-            return await cls.filter(*args, **kwargs).count()
-        except Exception:
-            return 0
+        return await cls.count_across_shards(*args, **kwargs)
         
     @classmethod
     async def other_vehicle_query_with_limit_offset(
@@ -967,14 +1078,7 @@ class LotOtherVehicle(LotBase):
         """
         Выполняет запрос к таблице LotOtherVehicle с лимитом и оффсетом.
         """
-        return await cls.filter(*args, **kwargs)\
-            .offset(offset)\
-            .limit(limit)\
-            .prefetch_related(
-                "make", "model", "vehicle_type", "damage_pr", "damage_sec",
-                "fuel", "drive", "transmission", "color", "status", "body_type",
-                "series", "base_site", "seller", "seller_type", "document", "document_old", "title"
-            )
+        return await cls.query_across_shards_with_limit_offset(limit, offset, *args, **kwargs)
     class Meta:
         table = "lot_vehicle_other"
         indexes = [
@@ -995,29 +1099,14 @@ class LotOtherVehicleHistorical(LotBase):
         """
         Возвращает минимальный и максимальный одометр по таблице LotOtherVehicle, учитывая переданные фильтры.
         """
-        try:
-            qs = cls.filter(*args, **kwargs)
-
-            min_odo_list = await qs.order_by('odometer').limit(1).values_list('odometer', flat=True)
-            max_odo_list = await qs.order_by('-odometer').limit(1).values_list('odometer', flat=True)
-
-            min_odo = min_odo_list[0] if min_odo_list else None
-            max_odo = max_odo_list[0] if max_odo_list else None
-
-            return min_odo, max_odo
-
-        except Exception:
-            return None, None
+        return await cls.get_min_max_odometer_across_shards(*args, **kwargs)
 
     @classmethod
     async def historical_other_vehicle_count(cls, *args, **kwargs) -> int:
         """
         Выполняет подсчет количества записей в таблице LotOtherVehicle с учетом фильтров.
         """
-        try:
-            return await cls.filter(*args, **kwargs).count()
-        except Exception:
-            return 0
+        return await cls.count_across_shards(*args, **kwargs)
         
     @classmethod
     async def historical_other_vehicle_query_with_limit_offset(
@@ -1030,14 +1119,7 @@ class LotOtherVehicleHistorical(LotBase):
         """
         Выполняет запрос к таблице LotOtherVehicle с лимитом и оффсетом.
         """
-        return await cls.filter(*args, **kwargs)\
-            .offset(offset)\
-            .limit(limit)\
-            .prefetch_related(
-                "make", "model", "vehicle_type", "damage_pr", "damage_sec",
-                "fuel", "drive", "transmission", "color", "status", "body_type",
-                "series", "base_site", "seller", "seller_type", "document", "document_old", "title"
-            )
+        return await cls.query_across_shards_with_limit_offset(limit, offset, *args, **kwargs)
     class Meta:
         table = "lot_vehicle_other_historical"
         indexes = [
@@ -1058,51 +1140,26 @@ class LotRouter:
     @staticmethod
     def get_shard_class(lot_id: int) -> type[LotBase]:
         """
-        Возвращает класс шарда на основе ID лота
+        Возвращает класс таблицы, в которой был создан лот, по префиксу его ID
         """
-        prefix = lot_id // 10_000_000
-        
-        # Определяем базовый класс на основе префикса
-        if prefix == 1:
-            base_class = Lot
-        elif prefix == 2:
-            return HistoricalLot
-        elif prefix == 3:
-            return LotWithoutAuctionDate
-        elif prefix == 4:
-            return LotWithouImage
-        elif prefix == 5:
-            return LotHistoryAddons
-        elif prefix == 6:
-            return LotOtherVehicle
-        elif prefix == 7:
-            return LotOtherVehicleHistorical
-        else:
-            raise ValueError(f"Unknown prefix: {prefix}")
-        
-        # Если это основной лот (префикс 1), распределяем по шардам
-        if prefix == 1:
-            shard_num = (lot_id % 10_000_000) % 7 + 1  # Распределение от 1 до 7
-            shard_classes = {
-                1: Lot1,
-                2: Lot2,
-                3: Lot3,
-                4: Lot4,
-                5: Lot5,
-                6: Lot6,
-                7: Lot7
-            }
-            return shard_classes[shard_num]
-        
-        return base_class
+        prefix = lot_id // PREFIX_CAPACITY
+        for model in LOT_DIRECTORY_MODELS.values():
+            if model.PREFIX == prefix:
+                return model
+        raise ValueError(f"Unknown prefix: {prefix}")
 
     @classmethod
     async def get_lot(cls, lot_id: int) -> Optional[LotBase]:
         """
         Получает лот из соответствующего шарда по ID
+        (лот мог быть перенесен из таблицы, где создан, — тогда ищем через lot_directory)
         """
         shard_class = cls.get_shard_class(lot_id)
-        return await shard_class.get_or_none(id=lot_id)
+        lot = await shard_class.get_or_none(id=lot_id)
+        if lot is None:
+            lots = await LotDirectory.fetch("lot_pk", lot_id, prefetch=())
+            lot = lots[0] if lots else None
+        return lot
 
     @classmethod
     async def create_lot(cls, lot_data: dict, lot_type: str = None) -> LotBase:
@@ -1129,19 +1186,8 @@ class LotRouter:
             # Автоматическое определение типа лота
             shard_class = Lot
         
-        # Если это основной лот, выбираем случайный шард (или по другой логике)
-        if shard_class == Lot:
-            shard_num = (await IDCounter.get_next_id('Lot')) % 7 + 1
-            shard_classes = {
-                1: Lot1,
-                2: Lot2,
-                3: Lot3,
-                4: Lot4,
-                5: Lot5,
-                6: Lot6,
-                7: Lot7
-            }
-            shard_class = shard_classes[shard_num]
+        # Если это основной лот, выбираем шард
+        shard_class = await shard_class.get_shard_for_new_record(lot_data.get('lot_id'))
         
         lot = shard_class(**lot_data)
         await lot.save()
@@ -1170,4 +1216,505 @@ class LotRouter:
         if not target_class:
             raise ValueError(f"Unknown target type: {target_type}")
         
-        return await source_lot.move_to(target_class)
\ No newline at end of file
+        return await source_lot.move_to(target_class)
+
+# Справочники, которые денормализуются в lot_search (id + slug)
+LOT_SEARCH_RELATIONS = (
+    "vehicle_type", "make", "model", "series", "base_site", "damage_pr", "damage_sec",
+    "fuel", "drive", "transmission", "color", "status", "auction_status", "body_type",
+    "title", "seller", "seller_type", "document", "document_old",
+)
+
+LOT_SEARCH_SCALARS = (
+    "lot_id", "vin", "odometer", "price", "reserve_price", "bid", "current_bid", "auction_date",
+    "year", "cylinders", "state", "engine", "engine_size", "is_buynow", "risk_index",
+    "created_at", "is_historical",
+)
+
+
+class LotSearch(models.Model):
+    """
+    Read model для /lot/refine: одна узкая строка на лот из активных шардов Lot1..Lot7,
+    HistoricalLot и таблиц прочей техники с денормализованными id и slug справочников.
+
+    Фильтры, сортировка, count и фасеты считаются по одной таблице без JOIN;
+    полные записи лотов догружаются по (source, lot_pk) только для страницы.
+    Поддерживается инкрементально (создание, обновление, удаление и перенос лотов),
+    полная пересборка — rebuild().
+    """
+    id = fields.BigIntField(pk=True)
+    # Каталог /refine: Lot, HistoricalLot, LotOtherVehicle, LotOtherVehicleHistorical
+    catalog = fields.CharField(max_length=32)
+    # Класс таблицы лота (Lot1..Lot7, HistoricalLot, ...) и id в ней
+    source = fields.CharField(max_length=32)
+    lot_pk = fields.BigIntField()
+
+    lot_id = fields.BigIntField()
+    vin = fields.CharField(max_length=50)
+    odometer = fields.IntField(null=True)
+    price = fields.FloatField(null=True)
+    reserve_price = fields.FloatField(null=True)
+    bid = fields.FloatField(null=True)
+    current_bid = fields.FloatField(null=True)
+    auction_date = fields.DatetimeField(null=True)
+    year = fields.IntField(null=True)
+    cylinders = fields.IntField(null=True)
+    state = fields.CharField(max_length=10, null=True)
+    engine = fields.CharField(max_length=50, null=True)
+    engine_size = fields.FloatField(null=True)
+    is_buynow = fields.BooleanField(default=False)
+    risk_index = fields.FloatField(null=True)
+    created_at = fields.DatetimeField(null=True)
+    is_historical = fields.BooleanField(default=False)
+
+    vehicle_type_id = fields.BigIntField(null=True)
+    vehicle_type_slug = fields.CharField(max_length=100, null=True)
+    make_id = fields.BigIntField(null=True)
+    make_slug = fields.CharField(max_length=100, null=True)
+    model_id = fields.BigIntField(null=True)
+    model_slug = fields.CharField(max_length=100, null=True)
+    series_id = fields.BigIntField(null=True)
+    series_slug = fields.CharField(max_length=100, null=True)
+    base_site_id = fields.BigIntField(null=True)
+    base_site_slug = fields.CharField(max_length=100, null=True)
+    damage_pr_id = fields.BigIntField(null=True)
+    damage_pr_slug = fields.CharField(max_length=100, null=True)
+    damage_sec_id = fields.BigIntField(null=True)
+    damage_sec_slug = fields.CharField(max_length=100, null=True)
+    fuel_id = fields.BigIntField(null=True)
+    fuel_slug = fields.CharField(max_length=100, null=True)
+    drive_id = fields.BigIntField(null=True)
+    drive_slug = fields.CharField(max_length=100, null=True)
+    transmission_id = fields.BigIntField(null=True)
+    transmission_slug = fields.CharField(max_length=100, null=True)
+    color_id = fields.BigIntField(null=True)
+    color_slug = fields.CharField(max_length=100, null=True)
+    status_id = fields.BigIntField(null=True)
+    status_slug = fields.CharField(max_length=100, null=True)
+    auction_status_id = fields.BigIntField(null=True)
+    auction_status_slug = fields.CharField(max_length=100, null=True)
+    body_type_id = fields.BigIntField(null=True)
+    body_type_slug = fields.CharField(max_length=100, null=True)
+    title_id = fields.BigIntField(null=True)
+    title_slug = fields.CharField(max_length=100, null=True)
+    seller_id = fields.BigIntField(null=True)
+    seller_slug = fields.CharField(max_length=100, null=True)
+    seller_type_id = fields.BigIntField(null=True)
+    seller_type_slug = fields.CharField(max_length=100, null=True)
+    document_id = fields.BigIntField(null=True)
+    document_slug = fields.CharField(max_length=100, null=True)
+    document_old_id = fields.BigIntField(null=True)
+    document_old_slug = fields.CharField(max_length=100, null=True)
+
+    class Meta:
+        table = "lot_search"
+        unique_together = (("source", "lot_pk"),)
+        indexes = [
+            ("catalog", "is_historical", "auction_date"),
+            ("catalog", "base_site_slug", "auction_date"),
+            ("catalog", "vehicle_type_slug", "make_slug", "model_slug", "series_slug"),
+            ("catalog", "price"),
+            ("catalog", "year"),
+            ("catalog", "odometer"),
+            ("catalog", "created_at"),
+            ("catalog", "bid"),
+            ("catalog", "current_bid"),
+            ("catalog", "reserve_price"),
+            ("lot_id",),
+        ]
+
+    @staticmethod
+    def catalog_for(model: type[LotBase]) -> Optional[str]:
+        """Каталог /refine для таблицы лота; None — таблица в lot_search не попадает"""
+        if model in LOT_SHARD_MODELS.values():
+            return Lot.__name__
+        if model in (HistoricalLot, LotOtherVehicle, LotOtherVehicleHistorical):
+            return model.__name__
+        return None
+
+    @staticmethod
+    def catalog_models(catalog: str) -> list[type[LotBase]]:
+        if catalog == Lot.__name__:
+            return [LOT_SHARD_MODELS[name] for name in lot_shard_map().shards]
+        return [{
+            HistoricalLot.__name__: HistoricalLot,
+            LotOtherVehicle.__name__: LotOtherVehicle,
+            LotOtherVehicleHistorical.__name__: LotOtherVehicleHistorical,
+        }[catalog]]
+
+    @staticmethod
+    def search_filters(filters: dict) -> dict:
+        """Переводит фильтры лота (make__slug__in, ...) в колонки lot_search (make_slug__in, ...)"""
+        return {key.replace("__slug", "_slug", 1): value for key, value in filters.items()}
+
+    @classmethod
+    def from_lot(cls, lot: LotBase) -> 'LotSearch':
+        """Строка lot_search для лота; справочники должны быть загружены (см. index)"""
+        row = cls(
+            catalog=cls.catalog_for(type(lot)),
+            source=type(lot).__name__,
+            lot_pk=lot.id,
+            **{field: getattr(lot, field) for field in LOT_SEARCH_SCALARS},
+        )
+        for relation in LOT_SEARCH_RELATIONS:
+            related = getattr(lot, relation)
+            loaded = isinstance(related, models.Model)
+            setattr(row, f"{relation}_id", related.id if loaded else None)
+            setattr(row, f"{relation}_slug", related.slug if loaded else None)
+        return row
+
+    @classmethod
+    async def index(cls, lots) -> None:
+        """Добавляет или обновляет строки lot_search для лотов (таблицы вне каталогов пропускаются)"""
+        lots = [lot for lot in lots if lot is not None and cls.catalog_for(type(lot))]
+        if not lots:
+            return
+        for lot in lots:
+            # Не загруженная FK-связь — это QuerySet, а не экземпляр справочника
+            missing = [
+                relation for relation in LOT_SEARCH_RELATIONS
+                if getattr(lot, f"{relation}_id") is not None
+                and not isinstance(getattr(lot, relation), models.Model)
+            ]
+            if missing:
+                await lot.fetch_related(*missing)
+
+        rows = [cls.from_lot(lot) for lot in lots]
+        update_fields = [
+            "catalog", *LOT_SEARCH_SCALARS,
+            *(f"{relation}_{suffix}" for relation in LOT_SEARCH_RELATIONS for suffix in ("id", "slug")),
+        ]
+        await cls.bulk_create(rows, on_conflict=["source", "lot_pk"], update_fields=update_fields)
+
+    @classmethod
+    async def unindex(cls, model: type[LotBase], lot_pks) -> None:
+        """Удаляет строки lot_search лотов таблицы model"""
+        lot_pks = [pk for pk in lot_pks if pk is not None]
+        if lot_pks and cls.catalog_for(model):
+            await cls.filter(source=model.__name__, lot_pk__in=lot_pks).delete()
+
+    @classmethod
+    async def relocate(cls, source: type[LotBase], target: type[LotBase], lot_pks: list[int]) -> None:
+        """Переводит строки лотов, перенесенных из source в target (id сохраняются)"""
+        source_catalog, target_catalog = cls.catalog_for(source), cls.catalog_for(target)
+        if source_catalog and target_catalog:
+            await cls.filter(source=source.__name__, lot_pk__in=lot_pks).update(
+                source=target.__name__, catalog=target_catalog
+            )
+        elif source_catalog:
+            await cls.unindex(source, lot_pks)
+        elif target_catalog:
+            await cls.index(await target.filter(id__in=lot_pks).prefetch_related(*LOT_SEARCH_RELATIONS))
+
+    @classmethod
+    async def hydrate(cls, rows) -> list[LotBase]:
+        """Полные записи лотов (с prefetch) для строк lot_search в том же порядке"""
+        pks_by_source: dict[str, list[int]] = {}
+        for row in rows:
+            pks_by_source.setdefault(row.source, []).append(row.lot_pk)
+
+        models_by_name = {
+            model.__name__: model
+            for catalog in (Lot.__name__, HistoricalLot.__name__, LotOtherVehicle.__name__,
+                            LotOtherVehicleHistorical.__name__)
+            for model in cls.catalog_models(catalog)
+        }
+        sources = list(pks_by_source)
+        fetched = await asyncio.gather(*(
+            models_by_name[source].filter(id__in=pks_by_source[source]).prefetch_related(*LOT_PREFETCH_RELATED)
+            for source in sources
+        ))
+        lots_by_key = {
+            (source, lot.id): lot
+            for source, lots in zip(sources, fetched)
+            for lot in lots
+        }
+        return [lots_by_key[(row.source, row.lot_pk)] for row in rows if (row.source, row.lot_pk) in lots_by_key]
+
+    @classmethod
+    async def rebuild(cls, batch_size: int = 1000) -> int:
+        """Полная пересборка lot_search по всем таблицам каталогов (keyset по id)"""
+        total = 0
+        for catalog in (Lot.__name__, HistoricalLot.__name__, LotOtherVehicle.__name__,
+                        LotOtherVehicleHistorical.__name__):
+            for model in cls.catalog_models(catalog):
+                # Читатели видят старые строки таблицы, пока она не пересобрана целиком
+                async with in_transaction():
+                    await cls.filter(source=model.__name__).delete()
+                    last_id = None
+                    while True:
+                        query = model.all() if last_id is None else model.filter(id__gt=last_id)
+                        lots = await query.order_by("id").limit(batch_size).prefetch_related(*LOT_SEARCH_RELATIONS)
+                        if not lots:
+                            break
+                        await cls.index(lots)
+                        total += len(lots)
+                        last_id = lots[-1].id
+                logger.info(f"lot_search: {model.__name__} indexed")
+        logger.success(f"lot_search rebuilt: {total} rows")
+        return total
+
+
+# Все таблицы лотов, которые учитывает lot_directory
+LOT_DIRECTORY_MODELS: dict[str, type[LotBase]] = {
+    model.__name__: model
+    for model in (Lot, *LOT_SHARD_MODELS.values(), HistoricalLot, LotWithoutAuctionDate,
+                  LotWithouImage, LotHistoryAddons, LotOtherVehicle, LotOtherVehicleHistorical)
+}
+
+
+class _Similarity(sql_functions.Function):
+    def __init__(self, term, text, alias=None) -> None:
+        super().__init__("SIMILARITY", term, text, alias=alias)
+
+
+class TrigramSimilarity(Function):
+    """
+    Схожесть строк similarity() из pg_trgm (только Postgres).
+
+    :samp:`TrigramSimilarity("{FIELD_NAME}", {TEXT})`
+    """
+    database_func = _Similarity
+
+
+class LotDirectory(models.Model):
+    """
+    Каталог лотов: какая таблица (source) хранит лот с данным id, lot_id или VIN.
+
+    Поиск одного лота — один индексный запрос к каталогу (или чтение зеркала
+    в Redis) и одна выборка из нужной таблицы вместо перебора 14 таблиц.
+    Текстовый поиск /lot/search_car — один ранжированный запрос по search_text
+    (GIN-индекс pg_trgm, см. migrations/add_lot_directory_search.sql).
+    Поддерживается в LotBase.save()/delete() и при пакетной вставке
+    (изменения пишутся и в журнал лотов — mark_lots_changed); полная пересборка — rebuild().
+    """
+    id = fields.BigIntField(pk=True)
+    source = fields.CharField(max_length=32)
+    lot_pk = fields.BigIntField()
+    lot_id = fields.BigIntField()
+    # VIN в верхнем регистре
+    vin = fields.CharField(max_length=50)
+    auction_date = fields.DatetimeField(null=True)
+    # Марка, модель, серия, VIN и lot_id в нижнем регистре
+    search_text = fields.CharField(max_length=255, default="")
+
+    class Meta:
+        table = "lot_directory"
+        unique_together = (("source", "lot_pk"),)
+        indexes = [("lot_pk",), ("lot_id",), ("vin",)]
+
+    KEYS = ("lot_pk", "lot_id", "vin")
+    # Поля лота, при изменении которых запись каталога пересчитывается в save()
+    TRACKED_FIELDS = frozenset({
+        "lot_id", "vin", "auction_date", "make", "model", "series", "make_id", "model_id", "series_id",
+    })
+    SEARCH_RELATIONS = {"make": Make, "model": Model, "series": Series}
+    # Служебные записи с короткими id в поиск не попадают
+    SEARCH_MIN_LOT_PK = 100_000
+
+    @staticmethod
+    def search_text_for(make: Optional[str], model: Optional[str], series: Optional[str], vin: Optional[str],
+                        lot_id: Optional[int]) -> str:
+        return " ".join(str(part) for part in (make, model, series, vin, lot_id) if part).lower()[:255]
+
+    @classmethod
+    def entry(cls, lot: LotBase, names: Optional[dict] = None) -> 'LotDirectory':
+        """Запись каталога; names — {(связь, id): имя} для незагруженных make/model/series"""
+        names = names or {}
+        relation_names = {}
+        for relation in cls.SEARCH_RELATIONS:
+            related = getattr(lot, relation, None)
+            relation_names[relation] = (
+                related.name if isinstance(related, models.Model)
+                else names.get((relation, getattr(lot, f"{relation}_id", None)))
+            )
+        return cls(
+            source=type(lot).__name__, lot_pk=lot.id, lot_id=lot.lot_id, vin=(lot.vin or "").upper(),
+            auction_date=lot.auction_date,
+            search_text=cls.search_text_for(
+                relation_names["make"], relation_names["model"], relation_names["series"], lot.vin, lot.lot_id
+            ),
+        )
+
+    @classmethod
+    async def relation_names(cls, lots) -> dict:
+        """Имена make/model/series, не загруженных в лотах: по запросу на справочник"""
+        missing: dict[str, set] = {}
+        for lot in lots:
+            for relation in cls.SEARCH_RELATIONS:
+                related_id = getattr(lot, f"{relation}_id", None)
+                if related_id is not None and not isinstance(getattr(lot, relation, None), models.Model):
+                    missing.setdefault(relation, set()).add(related_id)
+        names = {}
+        for relation, ids in missing.items():
+            for related_id, name in await cls.SEARCH_RELATIONS[relation].filter(id__in=list(ids)).values_list("id", "name"):
+                names[(relation, related_id)] = name
+        return names
+
+    @classmethod
+    async def register(cls, lots) -> None:
+        """Добавляет или обновляет записи каталога для лотов"""
+        lots = [lot for lot in lots if lot is not None and lot.id]
+        if not lots:
+            return
+        names = await cls.relation_names(lots)
+        rows = [cls.entry(lot, names) for lot in lots]
+        # Прежние lot_id/vin тоже сбрасываем из зеркала — они могли измениться
+        previous = await cls.filter(lot_pk__in=[row.lot_pk for row in rows]).values_list("lot_pk", "lot_id", "vin")
+        await cls.bulk_create(
+            rows, on_conflict=["source", "lot_pk"], update_fields=["lot_id", "vin", "auction_date", "search_text"]
+        )
+        await invalidate_lot_directory([*previous, *((row.lot_pk, row.lot_id, row.vin) for row in rows)])
+        await mark_lots_changed(row.lot_pk for row in rows)
+
+    @classmethod
+    async def unregister(cls, model: type[LotBase], lot_pks) -> None:
+        """Удаляет записи каталога лотов таблицы model"""
+        lot_pks = [pk for pk in lot_pks if pk is not None]
+        if not lot_pks:
+            return
+        query = cls.filter(source=model.__name__, lot_pk__in=lot_pks)
+        entries = await query.values_list("lot_pk", "lot_id", "vin")
+        if entries:
+            await query.delete()
+            await invalidate_lot_directory(entries)
+        await mark_lots_changed(lot_pks)
+
+    @classmethod
+    async def relocate(cls, source: type[LotBase], target: type[LotBase], lot_pks: list[int]) -> None:
+        """Переводит записи каталога лотов, перенесенных из source в target (id сохраняются)"""
+        query = cls.filter(source=source.__name__, lot_pk__in=lot_pks)
+        entries = await query.values_list("lot_pk", "lot_id", "vin")
+        if entries:
+            await query.update(source=target.__name__)
+            await invalidate_lot_directory(entries)
+        await mark_lots_changed(lot_pks)
+
+    @classmethod
+    async def locate(cls, key: str, value) -> list[tuple[str, int]]:
+        """
+        (таблица, id) лотов по ключу lot_pk, lot_id или vin: зеркало в Redis, затем lot_directory,
+        для лотов без записи каталога — сами таблицы лотов (probe)
+        """
+        if key not in cls.KEYS:
+            raise ValueError(f"Unknown lot directory key: {key}")
+        if key == "vin":
+            value = value.strip().upper()
+        cache_key = lot_directory_key(key, value)
+        generation = None
+        try:
+            redis = await get_redis_client()
+            cached, generation = await redis.mget(cache_key, generation_key(cache_key))
+            if cached is not None:
+                return [tuple(entry) for entry in json.loads(cached)]
+        except Exception as e:
+            logger.warning(f"Lot directory mirror read failed: {e}")
+
+        entries = [tuple(entry) for entry in await cls.filter(**{key: value}).order_by("id").values_list("source", "lot_pk")]
+        if not entries:
+            entries = await cls.probe(key, value)
+        try:
+            # Не записывается, если каталог по ключу изменился после чтения поколения (invalidate_lot_directory)
+            redis = await get_redis_client()
+            await redis.eval(
+                GUARDED_SET, 2, cache_key, generation_key(cache_key), generation or "", json.dumps(entries),
+                LOT_DIRECTORY_TTL if entries else LOT_DIRECTORY_MISS_TTL,
+            )
+        except Exception as e:
+            logger.warning(f"Lot directory mirror write failed: {e}")
+        return entries
+
+    @classmethod
+    async def probe(cls, key: str, value) -> list[tuple[str, int]]:
+        """
+        Поиск лотов прямо в таблицах лотов, когда записи каталога нет (каталог не пересобран,
+        сбой register); найденные лоты регистрируются
+        """
+        field = "id" if key == "lot_pk" else key
+        found = await asyncio.gather(*(model.filter(**{field: value}) for model in LOT_DIRECTORY_MODELS.values()))
+        lots = [lot for lots in found for lot in lots]
+        if lots:
+            logger.warning(f"Lot directory has no entry for {key}={value}, registering {len(lots)} lot(s)")
+            try:
+                await cls.register(lots)
+            except Exception as e:
+                logger.error(f"Failed to register lots found by probe: {e}")
+        return [(type(lot).__name__, lot.id) for lot in lots]
+
+    @classmethod
+    async def fetch(
+        cls,
+        key: str,
+        value,
+        models: Optional[list[type[LotBase]]] = None,
+        prefetch: tuple = LOT_PREFETCH_RELATED,
+    ) -> list[LotBase]:
+        """Лоты по ключу каталога (по одному запросу на таблицу, где они лежат); models ограничивает таблицы"""
+        entries = await cls.locate(key, value)
+        if models is not None:
+            names = {model.__name__ for model in models}
+            entries = [entry for entry in entries if entry[0] in names]
+        return await cls.hydrate(entries, prefetch)
+
+    @classmethod
+    async def search(cls, text: str, limit: int = 15, offset: int = 0) -> list[tuple[str, int]]:
+        """
+        (таблица, id) лотов, у которых каждое слово запроса — начало слова search_text,
+        одним запросом: лучшие по similarity() (в Postgres), затем по дате аукциона
+        """
+        words = text.lower().split()
+        if not words:
+            return []
+        query = cls.filter(lot_pk__gte=cls.SEARCH_MIN_LOT_PK)
+        for word in words:
+            query = query.filter(Q(search_text__startswith=word) | Q(search_text__contains=f" {word}"))
+        query = query.annotate(sort_date=Coalesce("auction_date", datetime(1970, 1, 1, tzinfo=timezone.utc)))
+        ordering = ["-sort_date", "id"]
+        if cls._meta.db.capabilities.dialect == "postgres":
+            query = query.annotate(rank=TrigramSimilarity("search_text", " ".join(words)))
+            ordering.insert(0, "-rank")
+        rows = await query.order_by(*ordering).offset(offset).limit(limit).values_list("source", "lot_pk")
+        return [tuple(row) for row in rows]
+
+    @classmethod
+    async def hydrate(cls, entries, prefetch: tuple = LOT_PREFETCH_RELATED) -> list[LotBase]:
+        """Лоты для (таблица, id) в том же порядке: по запросу на таблицу"""
+        pks_by_source: dict[str, list[int]] = {}
+        for source, lot_pk in entries:
+            if source in LOT_DIRECTORY_MODELS:
+                pks_by_source.setdefault(source, []).append(lot_pk)
+        fetched = await asyncio.gather(*(
+            LOT_DIRECTORY_MODELS[source].filter(id__in=lot_pks).prefetch_related(*prefetch)
+            for source, lot_pks in pks_by_source.items()
+        ))
+        lots = {(type(lot).__name__, lot.id): lot for lots in fetched for lot in lots}
+        return [lots[entry] for entry in map(tuple, entries) if entry in lots]
+
+    @classmethod
+    async def rebuild(cls, batch_size: int = 5000) -> int:
+        """Полная пересборка lot_directory по всем таблицам лотов (keyset по id)"""
+        total = 0
+        for source, model in LOT_DIRECTORY_MODELS.items():
+            async with in_transaction():
+                await cls.filter(source=source).delete()
+                last_id = None
+                while True:
+                    query = model.all() if last_id is None else model.filter(id__gt=last_id)
+                    rows = await query.order_by("id").limit(batch_size).values_list(
+                        "id", "lot_id", "vin", "auction_date", "make__name", "model__name", "series__name"
+                    )
+                    if not rows:
+                        break
+                    await cls.bulk_create(
+                        [
+                            cls(source=source, lot_pk=pk, lot_id=lot_id, vin=(vin or "").upper(), auction_date=auction_date,
+                                search_text=cls.search_text_for(make, model, series, vin, lot_id))
+                            for pk, lot_id, vin, auction_date, make, model, series in rows
+                        ],
+                        on_conflict=["source", "lot_pk"], update_fields=["lot_id", "vin", "auction_date", "search_text"],
+                    )
+                    total += len(rows)
+                    last_id = rows[-1][0]
+            logger.info(f"lot_directory: {source} indexed")
+        logger.success(f"lot_directory rebuilt: {total} rows")
+        return total
@@ -0,0 +1,61 @@
+import bisect
+import hashlib
+from typing import Sequence
+
+
+def stable_hash(value) -> int:
+    """64-битный хеш, одинаковый во всех процессах (в отличие от hash())"""
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+class ShardRing:
+    """
+    Консистентное хеширование по кольцу: у каждого шарда vnodes виртуальных точек.
+    При добавлении шарда к нему переходит ~1/N ключей, остальные остаются на месте.
+    """
+
+    def __init__(self, shards: Sequence[str], vnodes: int = 128) -> None:
+        if not shards:
+            raise ValueError("Shard ring needs at least one shard")
+        self.shards = tuple(shards)
+        points = sorted((stable_hash(f"{shard}#{vnode}"), shard) for shard in self.shards for vnode in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, key) -> str:
+        index = bisect.bisect_right(self._hashes, stable_hash(key))
+        return self._owners[index % len(self._owners)]
+
+
+class ShardMap:
+    """
+    Размещение лотов по шардам: текущее кольцо и, на время ребалансировки, предыдущее.
+    Пока previous задано, чтение идет по обоим (dual read), запись — только по текущему.
+    """
+
+    def __init__(self, shards: Sequence[str], previous: Sequence[str] = (), vnodes: int = 128) -> None:
+        self.ring = ShardRing(shards, vnodes)
+        self.previous = ShardRing(previous, vnodes) if previous else None
+
+    @property
+    def migrating(self) -> bool:
+        return self.previous is not None
+
+    @property
+    def shards(self) -> list[str]:
+        """Все шарды, в которых сейчас могут лежать лоты: текущие, затем выводимые"""
+        names = list(self.ring.shards)
+        if self.previous is not None:
+            names.extend(name for name in self.previous.shards if name not in names)
+        return names
+
+    def shard_for(self, key) -> str:
+        """Шард для записи лота"""
+        return self.ring.shard_for(key)
+
+    def read_shards(self, key) -> list[str]:
+        """Шарды для чтения лота: один, во время ребалансировки — текущий и прежний"""
+        names = [self.ring.shard_for(key)]
+        if self.previous is not None and (previous := self.previous.shard_for(key)) not in names:
+            names.append(previous)
+        return names
@@ -0,0 +1,184 @@
+import base64
+import heapq
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Iterable, Optional, Sequence, Union
+
+from pypika_tortoise import Parameterizer, functions
+from pypika_tortoise.terms import Star
+from tortoise.expressions import Q
+from tortoise.queryset import ValuesQuery
+
+
+def shard_ordering(sort_by: str, descending: bool) -> tuple[str, str]:
+    """
+    Порядок сортировки для запроса к шарду: поле сортировки + id как tie-breaker,
+    чтобы порядок был строгим и одинаковым во всех шардах
+    """
+    if descending:
+        return f"-{sort_by}", "-id"
+    return sort_by, "id"
+
+
+def sort_key(value: Any, row_id: int) -> tuple:
+    """
+    Ключ слияния, совпадающий с порядком Postgres:
+    ASC — NULL в конце, DESC — NULL в начале (heapq.merge с reverse=True)
+    """
+    return value is None, value, row_id
+
+
+def _keyed_stream(index: int, rows: Iterable[tuple[int, Any]]):
+    for row_id, value in rows:
+        yield sort_key(value, row_id), index, row_id, value
+
+
+def merge_shard_rows(
+    shard_rows: Sequence[Iterable[tuple[int, Any]]],
+    descending: bool,
+    offset: int,
+    limit: int,
+) -> list[tuple[int, int, Any]]:
+    """
+    K-way слияние уже отсортированных выборок шардов.
+
+    :param shard_rows: для каждого шарда список (id, значение сортировки) в порядке shard_ordering
+    :return: глобальная страница в виде (индекс шарда, id, значение сортировки)
+    """
+    streams = [_keyed_stream(index, rows) for index, rows in enumerate(shard_rows)]
+    merged = heapq.merge(*streams, key=lambda item: item[0], reverse=descending)
+    return [(index, row_id, value) for _, index, row_id, value in islice(merged, offset, offset + limit)]
+
+
+def keyset_filter(sort_by: str, descending: bool, cursor: tuple[Any, int]) -> Q:
+    """
+    Условие "строго после курсора" для порядка shard_ordering с учетом NULL
+    """
+    value, last_id = cursor
+    if sort_by == "id":
+        return Q(id__lt=last_id) if descending else Q(id__gt=last_id)
+
+    is_null = Q(**{f"{sort_by}__isnull": True})
+    if descending:
+        if value is None:
+            return (is_null & Q(id__lt=last_id)) | Q(**{f"{sort_by}__isnull": False})
+        return Q(**{f"{sort_by}__lt": value}) | (Q(**{sort_by: value}) & Q(id__lt=last_id))
+
+    if value is None:
+        return is_null & Q(id__gt=last_id)
+    return (
+        Q(**{f"{sort_by}__gt": value})
+        | (Q(**{sort_by: value}) & Q(id__gt=last_id))
+        | is_null
+    )
+
+
+# Типы значений сортировки, которых нет в JSON: тег в курсоре -> разбор строки
+CURSOR_TYPES = {"dt": datetime.fromisoformat, "d": date.fromisoformat, "dec": Decimal}
+
+
+def _cursor_tag(value: Any) -> Optional[str]:
+    if isinstance(value, datetime):
+        return "dt"
+    if isinstance(value, date):
+        return "d"
+    if isinstance(value, Decimal):
+        return "dec"
+    return None
+
+
+def encode_cursor(value: Any, row_id: int) -> str:
+    """
+    Кодирует позицию (значение сортировки, id) в непрозрачную строку;
+    datetime/date/Decimal сохраняются с тегом типа, чтобы в keyset_filter вернулось то же значение
+    """
+    tag = _cursor_tag(value)
+    position = [value, row_id] if tag is None else [str(value) if tag == "dec" else value.isoformat(), row_id, tag]
+    raw = json.dumps(position, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple[Any, int]]:
+    """Декодирует курсор; для пустого или битого курсора возвращает None"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id, *tag = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if tag and value is not None:
+            value = CURSOR_TYPES[tag[0]](value)
+        return value, int(row_id)
+    except (ValueError, TypeError, KeyError, ArithmeticError):
+        return None
+
+
+async def execute_shard_aggregate(
+    querysets: Sequence[ValuesQuery],
+    min_max: Sequence[str] = (),
+    group_by: Optional[str] = None,
+) -> list[dict]:
+    """
+    Оборачивает отфильтрованную выборку каждого шарда в
+    SELECT COUNT(*), MIN/MAX(...) [GROUP BY ...] FROM (<выборка шарда>),
+    склеивает шарды через UNION ALL и выполняет за один round trip.
+    Частичные агрегаты сводятся reduce_shard_aggregates.
+    """
+    parts = []
+    for queryset in querysets:
+        queryset._choose_db_if_not_chosen()
+        queryset._make_query()
+        query_class = queryset._db.query_class
+        rows = queryset.query
+        part = query_class.from_(rows).select(functions.Count(Star()).as_("count"))
+        for field in min_max:
+            part = part.select(
+                functions.Min(rows.field(field)).as_(f"{field}_min"),
+                functions.Max(rows.field(field)).as_(f"{field}_max"),
+            )
+        if group_by:
+            part = part.select(rows.field(group_by).as_(group_by)).groupby(rows.field(group_by))
+        parts.append(part)
+
+    # Один Parameterizer на все части, чтобы нумерация $N была сквозной
+    ctx = query_class.SQL_CONTEXT.copy(parameterizer=Parameterizer())
+    sql = " UNION ALL ".join(part.get_sql(ctx) for part in parts)
+    return await querysets[0]._db.execute_query_dict(sql, ctx.parameterizer.values)
+
+
+def reduce_shard_aggregates(
+    rows: Iterable[dict],
+    min_max: Sequence[str] = (),
+    group_by: Optional[str] = None,
+) -> Union[dict, list[dict]]:
+    """
+    Сводит частичные агрегаты шардов: count суммируется, *_min/*_max берутся по всем шардам.
+    Без group_by возвращает один словарь, с group_by — список корзин.
+    """
+    buckets: dict[Any, dict] = {}
+    for row in rows:
+        key = row.get(group_by) if group_by else None
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = {"count": 0}
+            if group_by:
+                bucket[group_by] = key
+            for field in min_max:
+                bucket[f"{field}_min"] = None
+                bucket[f"{field}_max"] = None
+            buckets[key] = bucket
+
+        bucket["count"] += row.get("count") or 0
+        for field in min_max:
+            low, high = row.get(f"{field}_min"), row.get(f"{field}_max")
+            if low is not None and (bucket[f"{field}_min"] is None or low < bucket[f"{field}_min"]):
+                bucket[f"{field}_min"] = low
+            if high is not None and (bucket[f"{field}_max"] is None or high > bucket[f"{field}_max"]):
+                bucket[f"{field}_max"] = high
+
+    if group_by:
+        return list(buckets.values())
+
+    empty = {"count": 0, **{f"{field}_{edge}": None for field in min_max for edge in ("min", "max")}}
+    return buckets.get(None, empty)
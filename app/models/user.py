@@ -42,6 +42,9 @@ class User(models.Model):
     updated_at = fields.DatetimeField(auto_now=True)
     roles = fields.ManyToManyField("models.Role", related_name="users")
 
+    # Роли из кэша принципалов (экземпляры от get_current_user); None — читаются из БД
+    role_names: Optional[frozenset] = None
+
     class Meta:
         table = "users"
 
@@ -61,5 +64,7 @@ class User(models.Model):
             return None
 
     async def has_role(self, role_name: str) -> bool:
+        if self.role_names is not None:
+            return role_name in self.role_names
         roles = await self.roles.all()
         return any(role.name == role_name for role in roles)
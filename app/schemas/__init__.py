@@ -2,7 +2,7 @@ from .lot import (LotMarkResponse, TaskResultResponse, VehicleModel,
                     VehicleModelResponse, TaskResponseModel, LotResponseModel,
                     TaskResponse, LotTypeCount, VehicleTypeModel, MakeModel, ModelModel, Series,
                     YearResponse, SpecialFilterLiteral, LotResult, BatchTaskResponse, BatchTaskStatus,
-                    LotSearchResponse, LotHistoryItem, LotHistoryResponse, FilterCounts, 
+                    LotSearchResponse, SearchSuggestionResponse, LotHistoryItem, LotHistoryResponse, FilterCounts, 
                     TaskRefineResponse,VehicleTypeModelAddons, MakeModelAddons, ModelModelAddons,
                     SeriesModelAddons, YearResponseAddons, YearCountResponse, VehicleModelOther)
 from .lead import CreateLeadSchema, LeadSchema
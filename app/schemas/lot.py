@@ -452,6 +452,14 @@ class LotSearchResponse(BaseModel):
     vin: str
     auction: str
 
+class SearchSuggestionResponse(BaseModel):
+    kind: str
+    name: str
+    slug: str
+    label: str
+    make: Optional[str] = None
+    model: Optional[str] = None
+
 class LotMarkResponse(BaseModel):
     slug: str
     name: str
@@ -2,11 +2,13 @@ from .lot_service import (get_filtered_lots, add_lot,
                            get_lot_by_lot_id_from_database, get_lot_by_id_from_database,
                            get_similar_lots_by_id, get_lots_by_ids, get_lots_count_by_vehicle_type,
                            search_lots, serialize_lot, get_popular_brands_function,
-                           get_special_filtered_lots, fetch_vin_data, get_relation_stats, lot_to_dict, 
+                           get_special_filtered_lots, fetch_vin_data, lot_to_dict, 
                            find_lots_by_price_range, delete_lot, filter_copart_hd_images,
                            fetch_history_data, update_lot_with_relations, update_lot,
                            generate_history_dropdown, create_cache_for_catalog, add_sharding_lot,
-                           count_all_active, count_all_auctions_active, json_safe
+                           count_all_active, count_all_auctions_active, json_safe,
+                           get_vehicle_type_counters, add_lots_bulk, get_neutral_lot_by_id,
+                           localize_lot_detail, get_cached_lot_by_id, get_neutral_lots_by_ids
                            )
 from .lead_service import (lead_generation, create_new_lead, get_leads, get_lead, 
                            update_lead, delete_lead)
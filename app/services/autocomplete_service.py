@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from loguru import logger
+from app.models import Make, Model, Series
+from app.core.config import settings
+from app.core.cache import LocalCacheVersion
+
+# Сколько подсказок хранится в каждом узле (и максимум, который отдает suggest)
+MAX_SUGGESTIONS = 10
+
+# Версия дерева: поднимается при изменении марок, моделей и серий (см. ReferenceResolver)
+AUTOCOMPLETE_VERSION_KEY = f"{settings.CACHE_KEY}_autocomplete_version"
+
+# Марки выше моделей, модели выше серий
+KIND_PRIORITY = {"make": 0, "model": 1, "series": 2}
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    kind: str
+    name: str
+    slug: str
+    make: Optional[str] = None
+    model: Optional[str] = None
+    popularity: int = 0
+
+    @property
+    def label(self) -> str:
+        return " ".join(part for part in (self.make, self.model, self.name) if part)
+
+    def rank(self) -> tuple:
+        return KIND_PRIORITY[self.kind], -self.popularity, len(self.label), self.label
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.top: List[Suggestion] = []
+
+
+class AutocompleteTrie:
+    """
+    Префиксное дерево подсказок: каждый узел хранит лучшие MAX_SUGGESTIONS подсказок поддерева,
+    поэтому поиск — проход по символам префикса без обхода поддерева.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+
+    def insert(self, key: str, suggestion: Suggestion) -> None:
+        node = self.root
+        self._offer(node, suggestion)
+        for char in key.lower():
+            node = node.children.setdefault(char, _Node())
+            self._offer(node, suggestion)
+
+    @staticmethod
+    def _offer(node: _Node, suggestion: Suggestion) -> None:
+        if suggestion in node.top:
+            return
+        node.top.append(suggestion)
+        node.top.sort(key=Suggestion.rank)
+        del node.top[MAX_SUGGESTIONS:]
+
+    def complete(self, prefix: str, limit: int = MAX_SUGGESTIONS) -> List[Suggestion]:
+        node = self.root
+        for char in " ".join(prefix.lower().split()):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.top[:limit]
+
+
+def build_trie(makes, models, series) -> AutocompleteTrie:
+    """
+    Дерево по марке, модели и серии; модели и серии доступны и по полному имени
+    («bmw x5», «bmw x5 xdrive40i»), и по собственному
+    """
+    trie = AutocompleteTrie()
+    make_names = {}
+    for make in makes:
+        make_names[make.id] = make.name
+        trie.insert(make.name, Suggestion("make", make.name, make.slug, popularity=make.popular_counter or 0))
+
+    model_parents = {}
+    for model in models:
+        make_name = make_names.get(model.make_id)
+        model_parents[model.id] = (make_name, model.name)
+        suggestion = Suggestion("model", model.name, model.slug, make=make_name)
+        trie.insert(model.name, suggestion)
+        trie.insert(suggestion.label, suggestion)
+
+    for item in series:
+        make_name, model_name = model_parents.get(item.model_id, (None, None))
+        suggestion = Suggestion("series", item.name, item.slug, make=make_name, model=model_name)
+        trie.insert(item.name, suggestion)
+        trie.insert(suggestion.label, suggestion)
+    return trie
+
+
+class Autocomplete:
+    """
+    In-process автодополнение марок/моделей/серий для /lot/search_car.
+    Справочники читаются один раз; дерево пересобирается, когда ReferenceResolver
+    добавляет марки/модели/серии или справочники меняются из админки (версия в Redis).
+    """
+
+    def __init__(self):
+        self._trie: Optional[AutocompleteTrie] = None
+        self.version = LocalCacheVersion(AUTOCOMPLETE_VERSION_KEY)
+
+    async def load(self) -> None:
+        await self.version.sync()
+        self._trie = build_trie(
+            await Make.all().only("id", "name", "slug", "popular_counter"),
+            await Model.all().only("id", "name", "slug", "make_id"),
+            await Series.all().only("id", "name", "slug", "model_id"),
+        )
+        logger.info("Autocomplete trie loaded")
+
+    async def suggest(self, prefix: str, limit: int = MAX_SUGGESTIONS) -> List[Suggestion]:
+        if not prefix.strip():
+            return []
+        if self._trie is None or await self.version.changed():
+            await self.load()
+        return self._trie.complete(prefix, limit)
+
+
+autocomplete = Autocomplete()
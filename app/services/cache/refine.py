@@ -1,38 +1,41 @@
 import asyncio
+import hashlib
 import json
 from aiocache import caches
 from app.core.config import settings
-from app.tasks import get_refine_task, get_special_filtered_lots_task, get_range_price_lots_task, count_lots_task, count_auctions_task
+from app.core.cache import REFINE_SITES, mark_refine_dirty, pop_refine_dirty
+from app.core.config.redis import get_redis_client
+from app.models import LotSearch
+from app.models.shard_query import encode_cursor
+from app.services.lot_service import (get_filtered_lots, lot_to_neutral_dict, localize_lot, localize_stats,
+                                      count_all_active, count_all_auctions_active, search_lot_rows,
+                                      lot_search_catalog)
 from loguru import logger
-from celery.result import AsyncResult
 from typing import Optional, Dict, Any
 from datetime import datetime
 
 # Initialize cache
 cache = caches.get("default")
 
-# Limit concurrent tasks
-semaphore = asyncio.BoundedSemaphore(8)
-
-# Filter configurations
-SPECIAL_FILTERS = [
-    "buy_now", "keys", "minimum_odometer", "maximum_odometer",
-    "document_clean", "auction_date_today", "auction_date_tomorrow",
-    "auction_next_week", "run-and-drive"
-]
-
-RANGE_PRICE = [
-    [1, 7000],
-    [7000, 10000],
-    [10000, 15000],
-    [15000, 20000],
-    [20000, 30000],
-    [30000, 500000]
-]
-
 SORT_BY = [
     "auction_date", "price", "year", "odometer", "created_at", "bid", "current_bid", "reserve_price"
 ]
+SORT_ORDERS = ["asc", "desc"]
+
+# Предрасчитываются первые PAGE_LIMIT + MAX_OFFSET строк: этого хватает на offset 0..7 при limit 18
+PAGE_LIMIT = 18
+MAX_OFFSET = 7
+PRECOMPUTED_ROWS = PAGE_LIMIT + MAX_OFFSET
+
+# Страховочный TTL: обычно ключи пересчитываются по событиям, а не по таймеру
+REFINE_CACHE_TTL = settings.CACHE_TTL * 12
+REFRESH_INTERVAL = 5
+WARMUP_LOCK_KEY = f"{settings.CACHE_KEY}_refine_warmup"
+
+# Версия схемы ключа запроса /refine: поднимается при изменении параметров роута или их смысла
+REFINE_QUERY_VERSION = 1
+# Мультифильтры, где важен порядок (роут берет первое значение): остальные сортируются
+ORDERED_QUERY_PARAMS = {"base_site", "special_filter"}
 
 def safe_serialize(data: Any) -> str:
     """Safely serialize data for caching with comprehensive type handling"""
@@ -55,170 +58,137 @@ def safe_serialize(data: Any) -> str:
         logger.warning(f"Serialization error: {e}")
         return json.dumps({})
 
-async def refresh_single_cache(
-        i: int, 
-        lang: str, 
-        history: bool, 
-        site: Optional[str] = None,
-        sort_by: Optional[str] = "auction_date",
-        format_sort: Optional[str] = "desc"
-        ) -> None:
-    async with semaphore:
-        try:
-            task_kwargs: Dict[str, Any] = {
-                "is_historical": history,
-                "language": lang,
-                "vehicle_type_slug": ["automobile"],
-                "limit": 18,
-                "offset": i,
-                "sort_by": sort_by,
-                "sort_order": format_sort,
-            }
-            if site:
-                task_kwargs["base_site"] = site
-
-            task = get_refine_task.apply_async(kwargs=task_kwargs)
-            
-            for _ in range(30):  # max_retries
-                task_result = AsyncResult(task.id)
-                if task_result.ready():
-                    if task_result.successful():
-                        result = task_result.result
-                        if not isinstance(result, dict):
-                            logger.warning(f"Unexpected result type: {type(result)}")
-                            result = {}
-                        
-                        cache_data = result.get('result', {})
-                        key = f"{site or ''}{settings.CACHE_KEY}{i}{lang}{'history' if history else 'active'}{sort_by}{format_sort}"
-                        await cache.set(key, safe_serialize(cache_data), ttl=settings.CACHE_TTL + 180)
-                        return
-                    else:
-                        logger.error(f"Task failed: {task_result.result}")
-                        return
-                await asyncio.sleep(1)  # retry_delay
-            
-            logger.error(f"Task timeout for [{i}][{lang}][{history}]")
-                
-        except Exception as e:
-            logger.error(f"Cache refresh error [{i}][{lang}][{history}]: {e}")
 
-async def refresh_special_filters_cache(i: int, lang: str, history: bool, filter_name: str) -> None:
-    async with semaphore:
-        try:
-            task = get_special_filtered_lots_task.apply_async(kwargs={
-                "is_historical": history,
-                "language": lang,
-                "special_filter": [filter_name],
-                "limit": 18,
-                "offset": i
-            })
-            
-            for _ in range(30):
-                task_result = AsyncResult(task.id)
-                if task_result.ready():
-                    if task_result.successful():
-                        result = task_result.result
-                        key = f"{settings.CACHE_KEY}_{filter_name}_{i}_{lang}_{'nonactive' if history else 'active'}"
-                        await cache.set(key, safe_serialize(result), ttl=settings.CACHE_TTL + 180)
-                        return
-                    else:
-                        logger.error(f"Filter task failed {filter_name}: {task_result.result}")
-                        return
-                await asyncio.sleep(1)
-            
-            logger.error(f"Filter task timeout [{i}][{lang}][{filter_name}]")
-                
-        except Exception as e:
-            logger.error(f"Filter cache error {filter_name}: {e}")
+def base_key(site: str, history: bool, sort_by: str, sort_order: str) -> str:
+    return f"{settings.CACHE_KEY}_base_{site}_{'history' if history else 'active'}_{sort_by}_{sort_order}"
+
+
+def summary_key(site: str, history: bool) -> str:
+    return f"{settings.CACHE_KEY}_summary_{site}_{'history' if history else 'active'}"
+
+
+def _canonical_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def refine_query_key(params: Dict[str, Any]) -> str:
+    """
+    Канонический ключ запроса /refine по уже разобранным параметрам роута: порядок параметров,
+    порядок и повторы значений мультифильтров, явно переданные значения по умолчанию и посторонние
+    параметры (utm и т.п.) на ключ не влияют
+    """
+    canonical = {}
+    for name, value in params.items():
+        if isinstance(value, (list, tuple)):
+            values = list(dict.fromkeys(_canonical_value(item) for item in value if item is not None))
+            value = values if name in ORDERED_QUERY_PARAMS else sorted(values)
+        if value is None or value == []:
+            continue
+        canonical[name] = _canonical_value(value)
+    normalized = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return f"refine_v{REFINE_QUERY_VERSION}_{hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()}"
+
+
+def refine_base_filters(site: str, history: bool) -> Dict[str, Any]:
+    """Те же фильтры, что get_filtered_lots строит для автомобилей без доп. фильтров (имена полей лота)"""
+    filters = {"vehicle_type__slug__in": ["automobile"], "is_historical": history}
+    if site:
+        filters["base_site__slug__in"] = [site]
+    return filters
+
+
+async def refresh_base(site: str, history: bool, sort_by: str, sort_order: str) -> None:
+    """Пересчитывает одну базовую выборку: id, курсоры и нейтральные (без перевода) лоты"""
+    rows = await search_lot_rows(
+        lot_search_catalog(["automobile"], history), LotSearch.search_filters(refine_base_filters(site, history)),
+        PRECOMPUTED_ROWS, 0, sort_by, sort_order,
+    )
+    lots = {(type(lot).__name__, lot.id): lot for lot in await LotSearch.hydrate(rows)}
+    pairs = [(row, lots[(row.source, row.lot_pk)]) for row in rows if (row.source, row.lot_pk) in lots]
+    payload = {
+        "ids": [lot.id for _, lot in pairs],
+        "cursors": [encode_cursor(getattr(row, sort_by), row.id) for row, _ in pairs],
+        "lots": [lot_to_neutral_dict(lot) for _, lot in pairs],
+    }
+    await cache.set(base_key(site, history, sort_by, sort_order), safe_serialize(payload), ttl=REFINE_CACHE_TTL)
+
+
+async def refresh_summary(site: str, history: bool) -> None:
+    """Пересчитывает count и статистику фильтров группы (считаются один раз, переводятся при чтении)"""
+    result = await get_filtered_lots(
+        language="en",
+        is_historical=history,
+        base_site=[site] if site else None,
+        vehicle_type_slug=["automobile"],
+        limit=1,
+        offset=0,
+    )
+    payload = {"count": result.get("count", 0), "stats": result.get("stats", {})}
+    await cache.set(summary_key(site, history), safe_serialize(payload), ttl=REFINE_CACHE_TTL)
+
+
+async def refresh_group(site: str, history: bool) -> None:
+    """Пересчитывает все сортировки и сводку одной группы (площадка, история)"""
+    start_time = datetime.now()
+    try:
+        await refresh_summary(site, history)
+        for sort_by in SORT_BY:
+            for sort_order in SORT_ORDERS:
+                await refresh_base(site, history, sort_by, sort_order)
+        duration = (datetime.now() - start_time).total_seconds()
+        logger.info(f"Refine cache group [{site or 'all'}][{'history' if history else 'active'}] refreshed in {duration:.2f}s")
+    except Exception as e:
+        logger.error(f"Refine cache refresh error [{site}][{history}]: {e}")
+        # Повторим на следующем проходе
+        await mark_refine_dirty([(history, site)])
+
+
+async def read_refine_cache(
+    site: str,
+    history: bool,
+    sort_by: str,
+    sort_order: str,
+    offset: int,
+    limit: int,
+    language: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Собирает ответ /refine из предрасчитанной выборки, переводя лоты и статистику на язык запроса.
+    Возвращает None, если группа еще не рассчитана (и помечает ее для пересчета).
+    """
+    if site not in REFINE_SITES or offset + limit > PRECOMPUTED_ROWS:
+        return None
+
+    base_raw, summary_raw = await cache.multi_get([
+        base_key(site, history, sort_by, sort_order), summary_key(site, history)
+    ])
+    if not base_raw or not summary_raw:
+        await mark_refine_dirty([(history, site)])
+        return None
+
+    base, summary = json.loads(base_raw), json.loads(summary_raw)
+    page = base["lots"][offset:offset + limit]
+    return {
+        "lots": [await localize_lot(language, lot) for lot in page],
+        "count": summary["count"],
+        "next_cursor": base["cursors"][offset + limit - 1] if len(page) == limit else None,
+        "stats": await localize_stats(language, summary["stats"]),
+    }
 
-async def refresh_price_range_cache(min_price: int, max_price: int, i: int, lang: str, history: bool) -> None:
-    async with semaphore:
-        try:
-            task = get_range_price_lots_task.apply_async(kwargs={
-                "is_historical": history,
-                "language": lang,
-                "min_price": min_price,
-                "max_price": max_price,
-                "limit": 18,
-                "offset": i
-            })
-            
-            for _ in range(30):
-                task_result = AsyncResult(task.id)
-                if task_result.ready():
-                    if task_result.successful():
-                        key = f"{settings.CACHE_KEY}_min_price{min_price}max_price{max_price}{i}"
-                        await cache.set(key, safe_serialize(task_result.result), ttl=settings.CACHE_TTL + 180)
-                        return
-                    else:
-                        logger.error(f"Price task failed {min_price}-{max_price}: {task_result.result}")
-                        return
-                await asyncio.sleep(1)
-            
-            logger.error(f"Price task timeout [{i}][{min_price}-{max_price}]")
-                
-        except Exception as e:
-            logger.error(f"Price cache error {min_price}-{max_price}: {e}")
 
 async def refresh_active_count_cache() -> None:
-    async with semaphore:
-        task_key = "all_active_count_task"
-        try:
-            if await cache.get(task_key):
-                logger.debug("Count refresh already in progress")
-                return
-            
-            await cache.set(task_key, "1", ttl=300)
-            task = count_lots_task.apply_async()
-
-            for _ in range(30):
-                task_result = AsyncResult(task.id)
-                if task_result.ready():
-                    if task_result.successful():
-                        await cache.set("all_active_count", safe_serialize(task_result.result), ttl=300)
-                        logger.info("Active count updated")
-                        break
-                    else:
-                        logger.error(f"Count task failed: {task_result.result}")
-                        break
-                await asyncio.sleep(1)
-            else:
-                logger.error("Count task timeout")
-            
-        except Exception as e:
-            logger.error(f"Count cache error: {e}")
-        finally:
-            await cache.delete(task_key)
+    try:
+        await cache.set("all_active_count", safe_serialize(await count_all_active()), ttl=300)
+        logger.info("Active count updated")
+    except Exception as e:
+        logger.error(f"Count cache error: {e}")
 
 async def refresh_auction_active_count_cache() -> None:
-    async with semaphore:
-        task_key = "all_auction_active_count_task"
-        try:
-            if await cache.get(task_key):
-                logger.debug("Count refresh already in progress")
-                return
-            
-            await cache.set(task_key, "1", ttl=300)
-            task = count_auctions_task.apply_async()
-
-            for _ in range(30):
-                task_result = AsyncResult(task.id)
-                if task_result.ready():
-                    if task_result.successful():
-                        await cache.set("all_auction_active_count", safe_serialize(task_result.result), ttl=300)
-                        logger.info("Active count updated")
-                        break
-                    else:
-                        logger.error(f"Count task failed: {task_result.result}")
-                        break
-                await asyncio.sleep(1)
-            else:
-                logger.error("Count task timeout")
-            
-        except Exception as e:
-            logger.error(f"Count cache error: {e}")
-        finally:
-            await cache.delete(task_key)
+    try:
+        await cache.set("all_auction_active_count", safe_serialize(await count_all_auctions_active()), ttl=300)
+        logger.info("Auction active count updated")
+    except Exception as e:
+        logger.error(f"Count cache error: {e}")
 
 async def schedule_count_refresh() -> None:
     """Regular count refresh every 5 minutes"""
@@ -230,59 +200,39 @@ async def schedule_count_refresh() -> None:
             logger.error(f"Count scheduler error: {e}")
         await asyncio.sleep(300)
 
-async def execute_tasks_in_batches(tasks: list, batch_size: int = 20) -> None:
-    """Execute tasks in controlled batches"""
-    for i in range(0, len(tasks), batch_size):
-        try:
-            await asyncio.gather(*tasks[i:i + batch_size])
-            await asyncio.sleep(0.5)  # Brief pause between batches
-        except Exception as e:
-            logger.error(f"Task batch error: {e}")
+
+async def warmup_refine_cache() -> None:
+    """Помечает для пересчета группы, которых нет в кэше (один процесс за интервал)"""
+    try:
+        redis = await get_redis_client()
+        if not await redis.set(WARMUP_LOCK_KEY, "1", nx=True, ex=REFINE_CACHE_TTL // 4):
+            return
+    except Exception as e:
+        logger.warning(f"Refine warmup lock failed: {e}")
+        return
+
+    missing = []
+    for site in REFINE_SITES:
+        for history in (False, True):
+            if not await cache.exists(summary_key(site, history)):
+                missing.append((history, site))
+    await mark_refine_dirty(missing)
+
 
 async def refresh_lot_cache() -> None:
-    """Main cache refresh loop"""
+    """
+    Пересчитывает только группы, помеченные mark_refine_dirty при добавлении,
+    переносе и удалении лотов (и отсутствующие в кэше при старте).
+    """
     while True:
         try:
-            start_time = datetime.now()
-            tasks = []
-            
-            # Generate all task combinations
-            for i in range(7):
-                for lang in ['ru', 'en', 'md', 'ua', 'kz', 'pl']:
-                    for history in [False, True]:
-                        # Standard queries
-                        for site in ['iaai', 'copart', '']:
-                            for sort in SORT_BY:
-                                for order in ['asc', 'desc']:
-                                    tasks.append(refresh_single_cache(
-                                        i, lang, history, site, sort, order
-                                    ))
-                        
-                        # Special filters
-                        for filter_name in SPECIAL_FILTERS:
-                            tasks.append(refresh_special_filters_cache(
-                                i, lang, history, filter_name
-                            ))
-                        
-                        # Price ranges
-                        for min_p, max_p in RANGE_PRICE:
-                            tasks.append(refresh_price_range_cache(
-                                min_p, max_p, i, lang, history
-                            ))
-            
-            # Execute in managed batches
-            await execute_tasks_in_batches(tasks)
-            
-            duration = (datetime.now() - start_time).total_seconds()
-            logger.info(f"Cache refresh cycle completed in {duration:.2f} seconds")
-            
-            # Calculate sleep time based on remaining TTL
-            sleep_time = max(10, settings.CACHE_TTL - duration - 10)
-            await asyncio.sleep(sleep_time)
-            
+            await warmup_refine_cache()
+            for site_history in await pop_refine_dirty():
+                history, site = site_history
+                await refresh_group(site, history)
         except Exception as e:
             logger.error(f"Cache refresh error: {e}")
-            await asyncio.sleep(60)
+        await asyncio.sleep(REFRESH_INTERVAL)
 
 async def init_main_cache() -> None:
     """Initialize all cache refresh processes"""
@@ -293,4 +243,4 @@ async def init_main_cache() -> None:
         )
     except Exception as e:
         logger.error(f"Fatal cache initialization error: {e}")
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,343 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import struct
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import Request, Response
+from loguru import logger
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.config.redis import get_redis_bytes_client
+from app.core.cache import generation_key
+
+try:
+    import orjson
+except ImportError:  # orjson — необязательное ускорение, без него тот же JSON через stdlib
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # без brotli хранится и отдается только gzip
+    brotli = None
+
+# Тела больше GZIP_MIN_SIZE байт хранятся сжатыми (gzip и, если доступен, brotli) и так же отдаются клиентам
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+GZIP_MAGIC = b"\x1f\x8b"
+BROTLI_QUALITY = 5
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    return str(obj)
+
+
+def encode_json(data: Any) -> bytes:
+    """Тело JSON-ответа: orjson (если установлен) или stdlib json с тем же результатом"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def accepted_encodings(request: Request) -> set:
+    """Кодировки из Accept-Encoding, кроме явно запрещенных (q=0)"""
+    encodings = set()
+    for item in request.headers.get("accept-encoding", "").lower().split(","):
+        name, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            encodings.add(name.strip())
+    return encodings
+
+
+def not_modified(request: Request, digest: str) -> bool:
+    """If-None-Match совпадает с телом (слабое сравнение, суффикс кодировки не учитывается)"""
+    for tag in request.headers.get("if-none-match", "").split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/").strip('"').split("-")[0] == digest:
+            return True
+    return False
+
+
+# Запись: версия формата, fresh_until, хэш несжатого тела (ETag), длина основного тела;
+# за заголовком — основное тело (gzip для крупных) и br-вариант (может быть пустым).
+# Ответ считается свежим soft_ttl секунд, после этого до hard_ttl отдается устаревшим,
+# пока один процесс пересчитывает его в фоне
+ENTRY_VERSION = 2
+ENTRY_HEADER = struct.Struct(">Bd8sI")
+
+
+class CachedBody:
+    """Готовое тело ответа со всеми вариантами сжатия: сжимается один раз при заполнении кэша"""
+    __slots__ = ("fresh_until", "digest", "body", "br")
+
+    def __init__(self, fresh_until: float, digest: bytes, body: bytes, br: bytes = b""):
+        self.fresh_until = fresh_until
+        self.digest = digest
+        self.body = body
+        self.br = br
+
+    @classmethod
+    def build(cls, data: bytes, soft_ttl: float) -> 'CachedBody':
+        digest = hashlib.blake2b(data, digest_size=8).digest()
+        body, br = data, b""
+        if len(data) > GZIP_MIN_SIZE:
+            body = gzip.compress(data, compresslevel=GZIP_LEVEL)
+            if brotli is not None:
+                br = brotli.compress(data, quality=BROTLI_QUALITY)
+        return cls(time.time() + soft_ttl, digest, body, br)
+
+    @classmethod
+    def unpack(cls, entry: Optional[bytes]) -> Optional['CachedBody']:
+        # Записи старого формата считаются промахом
+        if not entry or len(entry) <= ENTRY_HEADER.size or entry[0] != ENTRY_VERSION:
+            return None
+        _, fresh_until, digest, size = ENTRY_HEADER.unpack_from(entry)
+        start = ENTRY_HEADER.size
+        return cls(fresh_until, digest, entry[start:start + size], entry[start + size:])
+
+    def pack(self) -> bytes:
+        return ENTRY_HEADER.pack(ENTRY_VERSION, self.fresh_until, self.digest, len(self.body)) + self.body + self.br
+
+
+def body_response(request: Request, cached: CachedBody) -> Response:
+    """
+    Response из сохраненного тела без разбора JSON: 304 при совпадении If-None-Match, иначе br/gzip-вариант
+    из кэша; сжатое тело распаковывается только для клиентов без gzip
+    """
+    digest = cached.digest.hex()
+    encodings = accepted_encodings(request)
+    body, encoding = cached.body, None
+    if cached.br and "br" in encodings:
+        body, encoding = cached.br, "br"
+    elif body[:2] == GZIP_MAGIC and "gzip" in encodings:
+        encoding = "gzip"
+
+    # Сильный ETag — свой для каждой кодировки представления
+    headers = {"Vary": "Accept-Encoding", "ETag": f'"{digest}-{encoding}"' if encoding else f'"{digest}"'}
+    if not_modified(request, digest):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    elif body[:2] == GZIP_MAGIC:
+        body = gzip.decompress(body)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+# Блокировка пересчета ключа между процессами и ожидание чужого пересчета (секунды)
+LOCK_TTL = 30
+LOCK_WAIT = 10.0
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+FENCE_KEY = f"{settings.CACHE_KEY}_response_fence"
+
+# Запись только если блокировка все еще наша (токен совпадает) и ключ не инвалидирован с момента
+# ее захвата (поколение то же); блокировка снимается в любом случае. 1 — записано, 0 — блокировка
+# истекла, -1 — ключ инвалидирован.
+# KEYS: блокировка, ключ ответа, поколение; ARGV: токен, запись, hard_ttl, вариант ("" — обычный ключ), поколение
+FENCED_WRITE = """
+if redis.call('get', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('del', KEYS[1])
+if (redis.call('get', KEYS[3]) or '') ~= ARGV[5] then
+    return -1
+end
+if ARGV[4] == '' then
+    redis.call('set', KEYS[2], ARGV[2], 'EX', ARGV[3])
+else
+    redis.call('hset', KEYS[2], ARGV[4], ARGV[2])
+    redis.call('expire', KEYS[2], ARGV[3])
+end
+return 1
+"""
+RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+Compute = Callable[[], Awaitable[Any]]
+
+
+class ResponseCache:
+    """
+    Готовые тела JSON-ответов в Redis (bytes, крупные — в gzip).
+
+    Попадание — один GET (HGET для ответов с вариантами, например по языку) и запись тела в сокет:
+    ни json.loads, ни повторной сериализации FastAPI, ни сжатия; клиент с актуальным ETag получает 304.
+
+    Промахи по одному ключу схлопываются: в процессе — на одну задачу, между процессами — через
+    блокировку в Redis с fencing-токеном (запись проходит, только если блокировка еще у владельца).
+    Устаревший ответ отдается сразу, пересчет идет в фоне.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._refreshing: Dict[tuple, asyncio.Task] = {}
+
+    def key(self, name: str) -> str:
+        return f"{settings.CACHE_KEY}_response_{name}"
+
+    async def fetch(
+        self,
+        request: Request,
+        key: str,
+        compute: Compute,
+        soft_ttl: int,
+        hard_ttl: int,
+        variant: Optional[str] = None,
+    ) -> Response:
+        """
+        Ответ из кэша или результат compute() (dict/list для JSON). Исключение compute()
+        (например, HTTPException 404) получают все ожидающие, в кэш ничего не пишется
+        """
+        cached = await self._read(key, variant)
+        if cached is not None:
+            if cached.fresh_until <= time.time():
+                self._revalidate(key, variant, compute, soft_ttl, hard_ttl)
+            return body_response(request, cached)
+
+        flight = (key, variant)
+        task = self._inflight.get(flight)
+        if task is None:
+            task = asyncio.create_task(self._load(key, variant, compute, soft_ttl, hard_ttl))
+            self._inflight[flight] = task
+            task.add_done_callback(lambda _: self._inflight.pop(flight, None))
+        return body_response(request, await asyncio.shield(task))
+
+    async def _read(self, key: str, variant: Optional[str]) -> Optional[CachedBody]:
+        try:
+            redis = await get_redis_bytes_client()
+            entry = await (redis.get(key) if variant is None else redis.hget(key, variant))
+        except Exception as e:
+            logger.warning(f"Response cache read failed for {key}: {e}")
+            return None
+        return CachedBody.unpack(entry)
+
+    async def _lock(self, key: str, variant: Optional[str]) -> Optional[str]:
+        """
+        Токен "<fencing-номер>:<поколение ключа>", если пересчет ключа достался этому процессу;
+        None — пересчитывает другой
+        """
+        try:
+            redis = await get_redis_bytes_client()
+            generation = await redis.get(generation_key(key))
+            token = f"{await redis.incr(FENCE_KEY)}:{(generation or b'').decode()}"
+            if await redis.set(self._lock_key(key, variant), token, nx=True, ex=LOCK_TTL):
+                return token
+            return None
+        except Exception as e:
+            # Без Redis схлопывание остается только внутри процесса
+            logger.warning(f"Response cache lock failed for {key}: {e}")
+            return ""
+
+    def _lock_key(self, key: str, variant: Optional[str]) -> str:
+        return f"{key}_lock_{variant or ''}"
+
+    async def _locked(self, key: str, variant: Optional[str]) -> bool:
+        try:
+            redis = await get_redis_bytes_client()
+            return bool(await redis.exists(self._lock_key(key, variant)))
+        except Exception as e:
+            logger.warning(f"Response cache lock check failed for {key}: {e}")
+            return False
+
+    async def _load(
+        self, key: str, variant: Optional[str], compute: Compute, soft_ttl: int, hard_ttl: int
+    ) -> CachedBody:
+        token = await self._lock(key, variant)
+        if token is None:
+            # Другой процесс уже считает этот ключ: ждем его запись, по таймауту считаем сами
+            delay, deadline = POLL_INTERVAL, time.monotonic() + LOCK_WAIT
+            while token is None and time.monotonic() < deadline:
+                await asyncio.sleep(delay)
+                cached = await self._read(key, variant)
+                if cached is not None:
+                    return cached
+                # Блокировка снята без записи (ошибка compute, инвалидация): пересчет берем на себя
+                if not await self._locked(key, variant):
+                    token = await self._lock(key, variant)
+                delay = min(delay * 2, MAX_POLL_INTERVAL)
+            if token is None:
+                logger.warning(f"Response cache: no result for {key} after {LOCK_WAIT}s, computing locally")
+        return await self._compute(key, variant, compute, soft_ttl, hard_ttl, token)
+
+    async def _compute(
+        self, key: str, variant: Optional[str], compute: Compute, soft_ttl: int, hard_ttl: int, token: Optional[str]
+    ) -> CachedBody:
+        try:
+            cached = CachedBody.build(encode_json(await compute()), soft_ttl)
+        except BaseException:
+            await self._release(key, variant, token)
+            raise
+        await self._write(key, variant, cached.pack(), hard_ttl, token)
+        return cached
+
+    async def _write(self, key: str, variant: Optional[str], entry: bytes, hard_ttl: int, token: Optional[str]) -> None:
+        try:
+            redis = await get_redis_bytes_client()
+            if token:
+                written = await redis.eval(
+                    FENCED_WRITE, 3, self._lock_key(key, variant), key, generation_key(key),
+                    token, entry, int(hard_ttl), variant or "", token.partition(":")[2],
+                )
+                if written == 0:
+                    logger.warning(f"Response cache: lock for {key} expired before write, result dropped")
+                elif written == -1:
+                    logger.info(f"Response cache: {key} was invalidated while computing, result dropped")
+            elif variant is None:
+                await redis.set(key, entry, ex=int(hard_ttl))
+            else:
+                await redis.hset(key, variant, entry)
+                await redis.expire(key, int(hard_ttl))
+        except Exception as e:
+            logger.warning(f"Response cache write failed for {key}: {e}")
+
+    async def _release(self, key: str, variant: Optional[str], token: Optional[str]) -> None:
+        if not token:
+            return
+        try:
+            redis = await get_redis_bytes_client()
+            await redis.eval(RELEASE_LOCK, 1, self._lock_key(key, variant), token)
+        except Exception as e:
+            logger.warning(f"Response cache unlock failed for {key}: {e}")
+
+    def _revalidate(self, key: str, variant: Optional[str], compute: Compute, soft_ttl: int, hard_ttl: int) -> None:
+        """Фоновый пересчет устаревшего ответа: один на процесс и, через блокировку, один на все процессы"""
+        flight = (key, variant)
+        if flight in self._inflight or flight in self._refreshing:
+            return
+
+        async def refresh() -> None:
+            token = await self._lock(key, variant)
+            if token is None:
+                return
+            try:
+                await self._compute(key, variant, compute, soft_ttl, hard_ttl, token)
+            except Exception as e:
+                logger.warning(f"Response cache refresh failed for {key}: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._refreshing[flight] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(flight, None))
+
+
+response_cache = ResponseCache()
@@ -1,11 +1,58 @@
-from confluent_kafka import Producer
+import asyncio
+import threading
+import time
+from typing import Optional
+from confluent_kafka import Producer, KafkaException
 from app.core.config.kafka import KafkaConfig
 from loguru import logger
 
+# Пауза фонового потока между poll() и ожидание при переполненной локальной очереди (секунды)
+POLL_TIMEOUT = 0.1
+QUEUE_FULL_BACKOFF = 0.05
+CLOSE_TIMEOUT = 10.0
+
+
 class KafkaProducer:
-    def __init__(self):
-        # Инициализация клиента с конфигом из KafkaConfig
-        self.producer = Producer(KafkaConfig.get_producer_config())
+    """
+    Один confluent_kafka.Producer на процесс.
+
+    Сообщения только кладутся в буфер librdkafka (пачки по linger.ms, сжатие — см. KafkaConfig),
+    delivery-колбэки обслуживает фоновый поток poll(), flush() на каждое сообщение не нужен.
+    send() — для async-кода, produce() — для синхронного (Celery и т.п.).
+    """
+
+    def __init__(self, producer=None):
+        # producer — клиент с интерфейсом confluent_kafka.Producer (в тестах — in-memory брокер)
+        self._producer = producer
+        self._poller: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def producer(self):
+        if self._producer is None:
+            with self._lock:
+                if self._producer is None:
+                    self._producer = Producer(KafkaConfig.get_producer_config())
+        return self._producer
+
+    def start(self):
+        """Запускает фоновый поток обработки delivery-колбэков (вызывается при первой отправке)"""
+        with self._lock:
+            if self._poller is not None and self._poller.is_alive():
+                return
+            self._stopped.clear()
+            self._poller = threading.Thread(target=self._poll_loop, name="kafka-producer-poll", daemon=True)
+            self._poller.start()
+
+    def _poll_loop(self):
+        producer = self.producer
+        while not self._stopped.is_set():
+            try:
+                producer.poll(POLL_TIMEOUT)
+            except Exception as e:
+                logger.error(f"Kafka producer poll failed: {e}")
+                time.sleep(POLL_TIMEOUT)
 
     def delivery_report(self, err, msg):
         if err is not None:
@@ -13,20 +60,67 @@ class KafkaProducer:
         else:
             logger.debug(f"Message delivered to {msg.topic()} [{msg.partition()}]")
 
-    def produce(self, topic: str, value: str, key: str = None):
-        # Отправка сообщения с колбеком на delivery_report
-        self.producer.produce(
-            topic=topic,
-            key=key,
-            value=value,
-            callback=self.delivery_report
-        )
-        # Принудительный вызов poll для обработки callback-ов
-        self.producer.poll(0)
-
-    def flush(self):
-        # Ожидает отправки всех сообщений
-        self.producer.flush()
+    def produce(self, topic: str, value: str, key: str = None, callback=None):
+        """
+        Ставит сообщение в очередь без ожидания брокера.
+        Если локальная очередь переполнена, ждет, пока фоновый поток ее разгрузит
+        """
+        self.start()
+        while True:
+            try:
+                self.producer.produce(topic=topic, key=key, value=value, callback=callback or self.delivery_report)
+                return
+            except BufferError:
+                logger.warning("Kafka producer queue is full, waiting for deliveries")
+                time.sleep(QUEUE_FULL_BACKOFF)
+
+    async def send(self, topic: str, value: str, key: str = None, wait: bool = True):
+        """
+        Ставит сообщение в очередь, не блокируя event loop (и при переполненной очереди).
+        wait=True — дожидается подтверждения брокера, ошибка доставки — KafkaException;
+        wait=False — возвращается сразу после постановки в очередь
+        """
+        loop = asyncio.get_running_loop()
+        delivered = loop.create_future()
+
+        def on_delivery(err, msg):
+            self.delivery_report(err, msg)
+            if wait:
+                loop.call_soon_threadsafe(_resolve, delivered, err, msg)
+
+        self.start()
+        while True:
+            try:
+                self.producer.produce(topic=topic, key=key, value=value, callback=on_delivery)
+                break
+            except BufferError:
+                await asyncio.sleep(QUEUE_FULL_BACKOFF)
+        if wait:
+            return await delivered
+
+    def flush(self, timeout: float = CLOSE_TIMEOUT) -> int:
+        """Ожидает отправки всех сообщений; возвращает число неотправленных"""
+        return self.producer.flush(timeout)
+
+    def close(self):
+        """Досылает очередь и останавливает фоновый поток"""
+        remaining = self.flush()
+        if remaining:
+            logger.warning(f"Kafka producer closed with {remaining} undelivered messages")
+        self._stopped.set()
+        if self._poller is not None:
+            self._poller.join(POLL_TIMEOUT * 10)
+            self._poller = None
+
+
+def _resolve(future: asyncio.Future, err, msg):
+    if future.done():
+        return
+    if err is not None:
+        future.set_exception(KafkaException(err))
+    else:
+        future.set_result(msg)
+
 
 # Глобальный объект для переиспользования продюсера во всем проекте
 kafka_producer = KafkaProducer()
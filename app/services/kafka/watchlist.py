@@ -1,26 +1,41 @@
 import json
-from app.models.user_watchlist import UserWatchlist
+from typing import Dict
+from loguru import logger
 from app.services.kafka.producer import kafka_producer
+from app.services.watchlist_service import watchers_for
 
 TOPIC = "auction.lot.watch_updates"
 
-async def notify_watchlist_users(lot_id, changes: dict):
-    # Получаем всех пользователей, отслеживающих лот
-    entries = await UserWatchlist.filter(lot_id=lot_id).all()
-    user_ids = [str(entry.user_id) for entry in entries]
 
-    if not user_ids:
-        return
+async def notify_lots_changes(changes: Dict[int, dict]) -> int:
+    """
+    Уведомления об изменениях набора лотов: наблюдатели всех лотов — одним чтением индекса,
+    по одному сообщению на лот со всеми его пользователями. Возвращает число сообщений
+    """
+    changes = {lot_id: lot_changes for lot_id, lot_changes in changes.items() if lot_changes}
+    if not changes:
+        return 0
+    try:
+        watchers = await watchers_for(changes)
+    except Exception as e:
+        logger.error(f"Failed to load watchers for {len(changes)} lots: {e}")
+        return 0
+
+    for lot_id, user_ids in watchers.items():
+        message = {
+            "lot_id": str(lot_id),
+            "changes": changes[lot_id],
+            "user_ids": user_ids
+        }
+        # Только ставим в очередь: доставку пачками обслуживает фоновый поток продюсера
+        await kafka_producer.send(
+            topic=TOPIC,
+            value=json.dumps(message, default=str),
+            key=str(lot_id),
+            wait=False
+        )
+    return len(watchers)
 
-    message = {
-        "lot_id": str(lot_id),
-        "changes": changes,
-        "user_ids": user_ids
-    }
 
-    kafka_producer.produce(
-        topic=TOPIC,
-        value=json.dumps(message),
-        key=str(lot_id)
-    )
-    kafka_producer.flush()
+async def notify_watchlist_users(lot_id, changes: dict):
+    await notify_lots_changes({int(lot_id): changes})
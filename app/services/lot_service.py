@@ -12,12 +12,21 @@ from app.models import (Lot, BodyType, VehicleType, Make, Model, DamagePrimary,
                         HistoricalLot, LotWithouImage, LotHistoryAddons,
                         LotWithoutAuctionDate, Series, Seller, SellerType, Title, Document,
                         DocumentOld, BaseSite, LotOtherVehicle, LotBase, LotOtherVehicleHistorical,
-                        Lot1, Lot2, Lot3, Lot4, Lot5, Lot6, Lot7)
+                        LotSearch, LotDirectory, LOT_SHARD_MODELS)
+from app.models.shard_query import encode_cursor, decode_cursor, keyset_filter, shard_ordering
+from app.models.facet_query import execute_facets, reduce_facets
 from app.schemas import (VehicleModel, SpecialFilterLiteral, LotHistoryItem, VehicleModelOther,
                          VehicleModelResponse, TransLiteral)
 from datetime import datetime, timedelta, timezone, date, time
 import asyncio
-from app.services.translate_service import create_model_translations, get_translation
+from app.services.translate_service import (ensure_model_translations,
+                                            get_translation)
+from app.services.reference_service import reference_resolver
+from app.services.similar_service import similar_lots
+from app.services.watchlist_service import lot_state, diff_lot_state
+from app.services.kafka.watchlist import notify_lots_changes
+from app.core.cache import (mark_refine_dirty, invalidate_lot_cache, lot_cache_key, vin_history_cache_key,
+                            LOT_CACHE_TTL)
 from app.core.config import settings
 import json
 import random
@@ -192,7 +201,253 @@ async def add_lot(vehicle_data: VehicleModel|VehicleModelOther) -> Optional[Dict
     except Exception as e:
         logger.error(f"Unexpected error adding lot {vin}: {str(e)}", exc_info=True)
         return None
-    
+
+
+BULK_REQUIRED_FIELDS = ('lot_id', 'vin', 'year', 'state', 'location', 'country', 'link',
+                        'vehicle_type', 'make', 'model')
+BULK_INSERT_BATCH_SIZE = 500
+
+
+def _lot_result(lot_data: dict, status: str, lot_id: Optional[int] = None,
+                db_id: Optional[int] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    """Результат обработки лота в формате LotResult"""
+    result = {'vin': lot_data.get('vin'), 'status': status, 'lot_id': lot_id, 'id': db_id}
+    if error is not None:
+        result['error'] = error
+    return result
+
+
+async def find_existing_lots(keys: List[tuple[int, str]]) -> Dict[tuple[int, str], int]:
+    """
+    Ищет уже сохраненные лоты по парам (lot_id, vin) во всех таблицах и шардах:
+    по одному запросу lot_id IN (...) AND vin IN (...) на таблицу, таблицы опрашиваются параллельно.
+
+    :return: {(lot_id, vin): id}
+    """
+    if not keys:
+        return {}
+
+    tables = []
+    for model in LOT_TABLES:
+        for table in [model, *await model.get_all_shards()]:
+            if table not in tables:
+                tables.append(table)
+
+    lot_ids = list({lot_id for lot_id, _ in keys})
+    vins = list({vin for _, vin in keys})
+    found = await asyncio.gather(*(
+        table.filter(lot_id__in=lot_ids, vin__in=vins).values_list('id', 'lot_id', 'vin')
+        for table in tables
+    ))
+
+    wanted = set(keys)
+    existing = {}
+    for rows in found:
+        for db_id, lot_id, vin in rows:
+            if (lot_id, vin) in wanted:
+                existing.setdefault((lot_id, vin), db_id)
+    return existing
+
+
+async def _bulk_insert(model: type[LotBase], rows: List[Dict[str, Any]]) -> List[Union[LotBase, Exception]]:
+    """
+    Вставляет строки одним bulk_create (executemany) с заранее зарезервированными ID.
+    Если пачка падает (например, дубль vin), повторяет вставку построчно,
+    чтобы ошибка досталась только своему лоту.
+    """
+    ids = await model.get_next_ids(len(rows))
+    objects = [model(id=row_id, **row) for row_id, row in zip(ids, rows)]
+    try:
+        async with in_transaction():
+            await model.bulk_create(objects, batch_size=BULK_INSERT_BATCH_SIZE)
+            await LotSearch.index(objects)
+            await LotDirectory.register(objects)
+        return objects
+    except Exception as e:
+        logger.warning(f"Bulk insert into {model.__name__} failed, retrying row by row: {str(e)}")
+
+    results = []
+    for obj in objects:
+        try:
+            async with in_transaction():
+                await obj.save(force_create=True)
+                await LotSearch.index([obj])
+            results.append(obj)
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+async def _upsert_history_addons(rows: Dict[tuple[int, str], Dict[str, Any]]) -> None:
+    """
+    Записи LotHistoryAddons по (lot_id, vin): существующие обновляются (как в add_lot),
+    остальные вставляются одним _bulk_insert
+    """
+    if not rows:
+        return
+    existing = await LotHistoryAddons.filter(vin__in=list({vin for _, vin in rows}))
+    for addon in existing:
+        data = rows.pop((addon.lot_id, addon.vin), None)
+        if data is None:
+            continue
+        try:
+            addon.update_from_dict(data)
+            await addon.save()
+        except Exception as e:
+            logger.error(f"Error updating LotHistoryAddons {addon.vin}:{addon.lot_id}: {str(e)}")
+    if rows:
+        for error in filter(lambda r: isinstance(r, Exception), await _bulk_insert(LotHistoryAddons, list(rows.values()))):
+            logger.error(f"Error copying finished lot into LotHistoryAddons: {str(error)}")
+
+
+async def add_lots_bulk(lots_data: List[dict]) -> List[Dict[str, Any]]:
+    """
+    Пакетный вариант add_lot для импорта Copart/IAAI.
+
+    Валидирует пачку целиком, проверяет дубли одним запросом на таблицу,
+    разрешает справочники и переводы пачкой, раскладывает лоты по целевым
+    таблицам/шардам и пишет каждую таблицу одним bulk_create.
+
+    :param lots_data: Список словарей VehicleModel/VehicleModelOther
+    :return: Результаты в порядке входа в формате LotResult (vin, status, lot_id, id, error)
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(lots_data)
+    today = datetime.now().date()
+
+    # 1. Валидация и разбор полей
+    first_seen: Dict[tuple[int, str], int] = {}
+    repeated: List[tuple[int, tuple[int, str]]] = []
+    for index, lot_data in enumerate(lots_data):
+        missing = [field for field in BULK_REQUIRED_FIELDS if lot_data.get(field) in (None, '')]
+        if missing:
+            results[index] = _lot_result(lot_data, 'failed', error=f"Missing required fields: {', '.join(missing)}")
+            continue
+        key = (lot_data['lot_id'], lot_data['vin'])
+        if key in first_seen:
+            repeated.append((index, key))
+        else:
+            first_seen[key] = index
+
+    pending = dict(first_seen)
+    # 2. Лоты, которые уже есть в базе, считаются успешно добавленными (как в add_lot)
+    for key, db_id in (await find_existing_lots(list(pending))).items():
+        index = pending.pop(key)
+        results[index] = _lot_result(lots_data[index], 'success', key[0], db_id)
+
+    prepared = []
+    for index in pending.values():
+        lot_data = lots_data[index]
+        try:
+            auction_date = parse_auction_date(lot_data)
+            prepared.append({
+                'index': index,
+                'data': lot_data,
+                'auction_date': auction_date,
+                'passed': bool(auction_date) and auction_date.date() < today,
+                'thumbnail': get_lot_thumbnail(lot_data),
+                'vehicle_type': normalize_vehicle_type_name(lot_data['vehicle_type']),
+                'names': lot_reference_names(lot_data),
+                'relations': {},
+            })
+        except Exception as e:
+            results[index] = _lot_result(lot_data, 'failed', error=str(e))
+
+    # 3. Справочники: по одному resolve_many на уровень иерархии и на каждый плоский справочник
+    async def resolve_level(field, model, name_of, parent_field=None):
+        keys = []
+        for item in prepared:
+            parent = item['relations'].get(parent_field) if parent_field else None
+            keys.append((name_of(item), parent.id if parent else None))
+        resolved = await reference_resolver.resolve_many(model, keys)
+        for item, key in zip(prepared, keys):
+            item['relations'][field] = resolved.get(key)
+
+    await resolve_level('vehicle_type', VehicleType, lambda item: item['vehicle_type'])
+    await resolve_level('make', Make, lambda item: item['data']['make'], 'vehicle_type')
+    await resolve_level('model', Model, lambda item: item['data']['model'], 'make')
+    await resolve_level('series', Series, lambda item: item['data'].get('series'), 'model')
+    for field, model in LOT_REFERENCE_FIELDS.items():
+        await resolve_level(field, model, lambda item, field=field: item['names'][field])
+
+    await ensure_model_translations([
+        (field, item['relations'][field]) for item in prepared for field in TRANSLATED_REFERENCE_FIELDS
+    ])
+
+    # 4. Маршрутизация по таблицам и подготовка строк
+    routed: Dict[type[LotBase], List[dict]] = {}
+    for item in prepared:
+        lot_data, relations = item['data'], item['relations']
+        if relations['vehicle_type'] is None:
+            results[item['index']] = _lot_result(lot_data, 'failed', error="Vehicle type could not be resolved")
+            continue
+        risk_index = await calculate_risk_index(
+            year=lot_data.get('year'),
+            odometer=lot_data.get('odometer'),
+            auction_status=relations['auction_status'].name if relations['auction_status'] else None,
+            status=relations['status'].name if relations['status'] else None,
+            have_history=False
+        )
+        item['attrs'] = build_lot_attrs(
+            lot_data, item['auction_date'], item['passed'], item['thumbnail'], risk_index, relations
+        )
+        LotModel = select_lot_model(
+            relations['vehicle_type'].slug, lot_data.get('vin', ''),
+            item['auction_date'], item['passed'], item['thumbnail']
+        )
+        routed.setdefault(LotModel, []).append(item)
+
+    by_shard: Dict[type[LotBase], List[dict]] = {}
+    for LotModel, items in routed.items():
+        lot_ids = [item['data']['lot_id'] for item in items]
+        for shard_class, item in zip(await LotModel.get_shards_for_new_records(lot_ids), items):
+            by_shard.setdefault(shard_class, []).append(item)
+
+    # 5. Запись: один bulk_create на шард
+    created = []
+    for shard_class, items in by_shard.items():
+        inserted = await _bulk_insert(shard_class, [item['attrs'] for item in items])
+        for item, lot in zip(items, inserted):
+            lot_data = item['data']
+            if isinstance(lot, Exception):
+                logger.error(f"Error adding lot {lot_data.get('vin')}: {str(lot)}")
+                results[item['index']] = _lot_result(lot_data, 'failed', error=str(lot))
+                continue
+            results[item['index']] = _lot_result(lot_data, 'success', lot.lot_id, lot.id)
+            item['model'] = shard_class
+            created.append(item)
+
+    # 6. Завершенные аукционы: копия в HistoricalLot и запись в LotHistoryAddons
+    finished = [item for item in created if item['passed']]
+    if finished:
+        vins = [item['data']['vin'] for item in finished]
+        history_vins = set(await HistoricalLot.filter(vin__in=vins).values_list('vin', flat=True))
+        history_rows, addon_rows = {}, {}
+        for item in finished:
+            vin = item['data']['vin']
+            if vin not in history_vins:
+                history_rows.setdefault(vin, item['attrs'])
+            addon_rows.setdefault((int(item['attrs']['lot_id']), vin), {**item['attrs'], 'updated_at': datetime.now()})
+        if history_rows:
+            for error in filter(lambda r: isinstance(r, Exception),
+                                await _bulk_insert(HistoricalLot, list(history_rows.values()))):
+                logger.error(f"Error copying finished lot into HistoricalLot: {str(error)}")
+        await _upsert_history_addons(addon_rows)
+
+    await mark_refine_dirty(
+        change for item in created
+        for change in lot_refine_changes(item['model'], item['relations']['base_site'], item['passed'])
+    )
+
+    # Повторы внутри пачки получают результат первого вхождения
+    for index, key in repeated:
+        results[index] = dict(results[first_seen[key]])
+
+    logger.success(
+        f"Bulk ingest: {sum(1 for r in results if r['status'] == 'success')}/{len(results)} lots, "
+        f"{len(created)} created"
+    )
+    return results
+
 
 async def update_lot(vehicle_data: VehicleModel|VehicleModelOther) -> Optional[Dict[str, int]]:
     """
@@ -203,16 +458,14 @@ async def update_lot(vehicle_data: VehicleModel|VehicleModelOther) -> Optional[D
     """
     vin = vehicle_data.get('vin', 'UNKNOWN')
     try:
-        async with in_transaction():
+        # Без внешней транзакции: кэш и уведомления update_lot_with_relations отправляет после коммита
+        lot = await update_lot_with_relations(vehicle_data)
+        if lot:
             
-            # Создаем основной лот
-            lot = await update_lot_with_relations(vehicle_data)
-            if lot:
-                
-                return {
-                    'id': lot.id,
-                    'lot_id': lot.lot_id
-                }
+            return {
+                'id': lot.id,
+                'lot_id': lot.lot_id
+            }
             
     except IntegrityError as e:
         logger.error(f"Integrity error adding lot {vin}: {str(e)}")
@@ -238,7 +491,11 @@ async def delete_lot(lot_id: int) -> Optional[Dict[str, int]]:
             # Создаем основной лот
             lot = await get_lot_by_lot_id_from_database(lot_id)
             await lot.delete()
-            return True
+            await LotSearch.unindex(type(lot), [lot.id])
+
+        await mark_refine_dirty(lot_refine_changes(type(lot), None))
+        await invalidate_lot_cache([lot.id], [lot.vin])
+        return True
             
     except IntegrityError as e:
         logger.error(f"Integrity error deleted lot {lot_id}: {str(e)}")
@@ -325,7 +582,8 @@ def serialize_lot_for_history(lot) -> Dict[str, Any]:
 
 
 async def generate_history_dropdown(cache, vin: str, is_historical: bool, language: str):
-    cache_key = f"{settings.CACHE_KEY}_vin_{vin}{language}"
+    # serialize_lot_for_history не переводит имена — одна запись на VIN для всех языков
+    cache_key = vin_history_cache_key(vin)
     try:
         # 1) пробуем взять из кеша
         cached_result = await cache.get(cache_key)
@@ -372,111 +630,68 @@ async def generate_history_dropdown(cache, vin: str, is_historical: bool, langua
         }
 
 
-async def create_cache_for_catalog(cache,language,list_ids, list_vin, is_historical):
-    for lot_id in list_ids:
-        result = await get_lot_by_id_from_database(lot_id)
-        if result:
-            # Преобразуем объект Lot в словарь перед сериализацией
-            # lot_dict = await lot_to_dict(language,result)
-            lot = await serialize_lot(language,result)
-            key = f"{settings.CACHE_KEY}_lot_{lot_id}{language}"
-            await cache.set(key, json.dumps(lot), ttl=settings.CACHE_TTL + 180)
+# Справочники, которые отдаются в детальной карточке лота (/lot/id/{id})
+LOT_DETAIL_RELATED_FIELDS = (
+    "vehicle_type", "make", "model", "series", "base_site",
+    "damage_pr", "damage_sec", "keys", "odobrand", "fuel",
+    "drive", "transmission", "color", "status", "auction_status",
+    "body_type", "title", "seller_type", "seller", "document", "document_old",
+)
 
 
-async def get_lot_by_id_from_database(
-    id: int,
-    language: TransLiteral = "en",
-    is_historical: bool = False
-) -> Optional[Dict[str, Any]]:
+async def create_cache_for_catalog(cache, list_ids) -> None:
+    """Прогревает канонические записи лотов каталога, которых еще нет в кэше"""
+    list_ids = list(dict.fromkeys(list_ids))
+    if not list_ids:
+        return
+    cached = await cache.multi_get([lot_cache_key(lot_pk) for lot_pk in list_ids])
+    for lot_pk, cached_lot in zip(list_ids, cached):
+        if cached_lot:
+            continue
+        lot_dict = await get_neutral_lot_by_id(lot_pk)
+        if lot_dict:
+            await cache.set(lot_cache_key(lot_pk), json.dumps(lot_dict), ttl=LOT_CACHE_TTL)
+
+
+async def get_neutral_lot_by_id(id: int) -> Optional[Dict[str, Any]]:
     """
-    Get lot from database with translations.
-    Determines the correct table based on ID prefix.
+    Get lot from database without translations (language-neutral, JSON-safe).
+    Determines the correct table via lot_directory.
 
     Args:
         id: internal lot ID (our PK, not copart lot_id)
-        language: translation language (e.g. 'en', 'ru', 'uk')
-        is_historical: optional hint, если нужно форсить historical
 
     Returns:
-        dict: lot data with translated reference names OR None if not found
+        dict: lot data with original reference names OR None if not found
     """
-    # ---- 1. Определяем модель по префиксу ID ----
-    prefix = id // 10_000_000
-
-    prefix_to_model = {
-        1: Lot,        # main logical lot, но физически Lot1..Lot7
-        2: HistoricalLot,
-        3: LotWithoutAuctionDate,
-        4: LotWithouImage,
-        5: LotHistoryAddons,
-        6: LotOtherVehicle,
-        7: LotOtherVehicleHistorical,
-        11: Lot1,
-        12: Lot2,
-        13: Lot3,
-        14: Lot4,
-        15: Lot5,
-        16: Lot6,
-        17: Lot7,
-    }
+    # ---- 1. Таблица лота — по каталогу lot_directory ----
+    lots = await LotDirectory.fetch("lot_pk", id, prefetch=LOT_DETAIL_RELATED_FIELDS)
+    if not lots:
+        return None
+    return neutral_lot_dict(lots[0])
 
-    model_class = prefix_to_model.get(prefix)
 
-    if model_class is None:
-        # Если префикс неизвестен — перебираем все таблицы
-        model_classes = [
-            Lot, HistoricalLot, LotWithoutAuctionDate,
-            LotWithouImage, LotHistoryAddons,
-            LotOtherVehicle, LotOtherVehicleHistorical,
-            Lot1, Lot2, Lot3, Lot4, Lot5, Lot6, Lot7,
-        ]
-    else:
-        model_classes = [model_class]
+async def get_neutral_lots_by_ids(ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Канонические записи набора лотов: один запрос к lot_directory и по запросу на таблицу"""
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    entries = await LotDirectory.filter(lot_pk__in=ids).values_list("source", "lot_pk")
+    lots = await LotDirectory.hydrate(entries, prefetch=LOT_DETAIL_RELATED_FIELDS)
+    return {lot.id: neutral_lot_dict(lot) for lot in lots}
 
-    # ---- 2. Ищем лот в подходящих таблицах ----
-    lot_orm = None
-    for model in model_classes:
-        lot_orm = await model.filter(id=id).prefetch_related(
-            "vehicle_type", "make", "model", "series", "base_site",
-            "damage_pr", "damage_sec", "keys", "odobrand", "fuel",
-            "drive", "transmission", "color", "status", "auction_status",
-            "body_type", "title", "seller_type", "seller", "document", "document_old",
-        ).first()
-
-        if lot_orm is not None:
-            break
 
-    if lot_orm is None:
-        return None
+def neutral_lot_dict(lot_orm: LotBase) -> Dict[str, Any]:
+    """Лот (с prefetch LOT_DETAIL_RELATED_FIELDS) -> JSON-safe dict без переводов"""
 
-    # ---- 3. Хелпер для справочных моделей + переводов ----
-    async def serialize_ref(obj, field_name: str) -> Optional[Dict[str, Any]]:
-        """
-        Превращает reference-модель (VehicleType, Make, ...) в dict
-        и подставляет перевод имени по slug.
-        field_name = имя поля, по которому храним переводы (damage_pr, fuel, ...)
-        """
+    # ---- 3. Хелпер для справочных моделей ----
+    def serialize_ref(obj) -> Optional[Dict[str, Any]]:
+        """Превращает reference-модель (VehicleType, Make, ...) в dict"""
         if obj is None:
             return None
 
-        data: Dict[str, Any] = {}
-
         # Берём только реальные db-поля, без обратных связей
-        for f_name in getattr(obj._meta, "db_fields", []):
-            data[f_name] = getattr(obj, f_name, None)
-
-        # Перевод по slug → name
-        slug_val = data.get("slug")
-        if slug_val:
-            translated = await get_translation(
-                field_name=field_name,
-                original_value=slug_val,
-                language=language,
-            )
-            if translated:
-                data["name"] = translated
-
-        return data
+        return {f_name: getattr(obj, f_name, None) for f_name in getattr(obj._meta, "db_fields", [])}
 
     # ---- 4. Основные поля лота (scalar-часть) ----
     lot_dict: Dict[str, Any] = {
@@ -509,35 +724,66 @@ async def get_lot_by_id_from_database(
         "is_historical": lot_orm.is_historical,
     }
 
-    # ---- 5. Связанные справочники + переводы ----
-    related_map = {
-        "vehicle_type": lot_orm.vehicle_type,
-        "make": lot_orm.make,
-        "model": lot_orm.model,
-        "series": lot_orm.series,
-        "base_site": lot_orm.base_site,
-        "damage_pr": lot_orm.damage_pr,
-        "damage_sec": lot_orm.damage_sec,
-        "keys": lot_orm.keys,
-        "odobrand": lot_orm.odobrand,
-        "fuel": lot_orm.fuel,
-        "drive": lot_orm.drive,
-        "transmission": lot_orm.transmission,
-        "color": lot_orm.color,
-        "status": lot_orm.status,
-        "auction_status": lot_orm.auction_status,
-        "body_type": lot_orm.body_type,
-        "title": lot_orm.title,
-        "seller_type": lot_orm.seller_type,
-        "seller": lot_orm.seller,
-        "document": lot_orm.document,
-        "document_old": lot_orm.document_old,
-    }
+    # ---- 5. Связанные справочники (имена без перевода) ----
+    for field_name in LOT_DETAIL_RELATED_FIELDS:
+        lot_dict[field_name] = serialize_ref(getattr(lot_orm, field_name))
 
-    for field_name, obj in related_map.items():
-        lot_dict[field_name] = await serialize_ref(obj, field_name)
+    return json_safe(lot_dict)
 
-    return lot_dict
+
+async def localize_lot_detail(language, lot_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Подставляет переводы имен справочников (по slug) в каноническую запись лота (возвращает копию)"""
+    result = dict(lot_dict)
+    for field_name in LOT_DETAIL_RELATED_FIELDS:
+        ref = result.get(field_name)
+        if not isinstance(ref, dict) or not ref.get("slug"):
+            continue
+        translated = await get_translation(
+            field_name=field_name,
+            original_value=ref["slug"],
+            language=language,
+        )
+        if translated:
+            result[field_name] = {**ref, "name": translated}
+    return result
+
+
+async def get_lot_by_id_from_database(
+    id: int,
+    language: TransLiteral = "en",
+    is_historical: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Get lot from database with translations.
+
+    Args:
+        id: internal lot ID (our PK, not copart lot_id)
+        language: translation language (e.g. 'en', 'ru', 'uk')
+        is_historical: optional hint, если нужно форсить historical
+
+    Returns:
+        dict: lot data with translated reference names OR None if not found
+    """
+    lot_dict = await get_neutral_lot_by_id(id)
+    if lot_dict is None:
+        return None
+    return await localize_lot_detail(language, lot_dict)
+
+
+async def get_cached_lot_by_id(cache, id: int, language: TransLiteral = "en") -> Optional[Dict[str, Any]]:
+    """
+    Карточка лота через кэш: в Redis лежит одна каноническая запись на лот,
+    перевод на язык запроса накладывается при чтении.
+    """
+    cached_lot = await cache.get(lot_cache_key(id))
+    if cached_lot:
+        lot_dict = json.loads(cached_lot)
+    else:
+        lot_dict = await get_neutral_lot_by_id(id)
+        if lot_dict is None:
+            return None
+        await cache.set(lot_cache_key(id), json.dumps(lot_dict), ttl=LOT_CACHE_TTL)
+    return await localize_lot_detail(language, lot_dict)
 
 
 async def serialize_lot(language, lot: Lot) -> Dict[str, Any]:
@@ -775,11 +1021,22 @@ async def get_lot_by_lot_id_from_database(
     is_historical: bool = False
 ) -> Optional[LotBase]:
     """
-    Получает лот по lot_id из соответствующего шарда
+    Получает лот по lot_id из соответствующего шарда: шард вычисляется по хешу lot_id
+    (во время ребалансировки — текущий и прежний). Лоты, размещенные до перехода на хеш
+    и еще не перенесенные rebalance_shards, находятся через lot_directory (без записи каталога —
+    перебором таблиц, см. LotDirectory.probe)
     """
     try:
-        lots = await Lot.query_across_shards(lot_id=lot_id)
-        lot = lots[0] if lots else None  # Возьми первый элемент, если он есть
+        lot = None
+        for shard_class in Lot.get_read_shards(lot_id):
+            lot = await shard_class.filter(lot_id=lot_id).first()
+            if lot is not None:
+                break
+        if lot is None:
+            lots = await LotDirectory.fetch("lot_id", lot_id, models=await Lot.get_all_shards(), prefetch=())
+            lot = lots[0] if lots else None
+            if lot is not None:
+                logger.debug(f"Lot {lot_id} found outside its hash shard: {type(lot).__name__}")
         # logger.debug(lot)
 
         if not lot:
@@ -1151,6 +1408,172 @@ def classify_title(title):
     else:
         return "Other"
 
+# Таблицы, в которых лот с тем же (lot_id, vin) считается уже существующим
+LOT_TABLES = [
+    Lot, LotWithoutAuctionDate, LotWithouImage,
+    HistoricalLot, LotHistoryAddons, LotOtherVehicle, LotOtherVehicleHistorical
+]
+
+# Плоские справочники лота: поле -> модель
+LOT_REFERENCE_FIELDS = {
+    'damage_pr': DamagePrimary,
+    'damage_sec': DamageSecondary,
+    'keys': Keys,
+    'odobrand': OdoBrand,
+    'fuel': Fuel,
+    'drive': Drive,
+    'transmission': Transmission,
+    'color': Color,
+    'status': Status,
+    'auction_status': AuctionStatus,
+    'body_type': BodyType,
+    'title': Title,
+    'seller_type': SellerType,
+    'seller': Seller,
+    'document': Document,
+    'document_old': DocumentOld,
+    'base_site': BaseSite,
+}
+
+# Справочники, для которых заводятся переводы
+TRANSLATED_REFERENCE_FIELDS = (
+    'vehicle_type', 'damage_pr', 'document', 'damage_sec', 'keys', 'odobrand', 'fuel',
+    'drive', 'transmission', 'color', 'status', 'auction_status', 'body_type', 'seller_type'
+)
+
+
+def lot_refine_changes(model: type[LotBase], base_site: Optional[BaseSite], auction_date_passed: bool = False,
+                       source: Optional[type[LotBase]] = None) -> List[tuple[bool, Optional[str]]]:
+    """
+    Группы предрасчитанного /refine, которые затрагивает запись лота в таблицу model;
+    source — таблица, где лот лежал до обновления
+    """
+    site = base_site.slug if base_site else None
+    changes = []
+    for table in (source, model):
+        if table is not None and table.refine_state() is not None:
+            changes.append((table.refine_state(), site))
+    if auction_date_passed:
+        # Копия завершенного аукциона попадает в HistoricalLot
+        changes.append((True, site))
+    return list(dict.fromkeys(changes))
+
+
+def parse_auction_date(lot_data: dict) -> Optional[datetime]:
+    """Достает дату аукциона из auction_date/sale_date (datetime или ISO-строка)"""
+    auction_date_str = lot_data.get('auction_date') or lot_data.get('sale_date')
+    if isinstance(auction_date_str, datetime):
+        return auction_date_str
+    if isinstance(auction_date_str, str):
+        try:
+            return datetime.strptime(auction_date_str, "%Y-%m-%dT%H:%M:%S.%f%z")
+        except ValueError:
+            try:
+                return datetime.strptime(auction_date_str, "%Y-%m-%dT%H:%M:%S.%fZ")
+            except ValueError as e:
+                logger.error(f"Error parsing date {auction_date_str}: {e}")
+    return None
+
+
+def get_lot_thumbnail(lot_data: dict) -> Optional[str]:
+    """Первое маленькое изображение, иначе первое HD"""
+    if lot_data.get('link_img_small'):
+        return lot_data['link_img_small'][0]
+    if lot_data.get('link_img_hd'):
+        return lot_data['link_img_hd'][0]
+    return None
+
+
+def normalize_vehicle_type_name(vehicle_type: str) -> str:
+    vehicle_type_name = VEHICLE_TYPE_NORMALIZER.get(vehicle_type, vehicle_type)
+    if vehicle_type_name.startswith("Snow"):
+        return "Snowmobile"
+    if vehicle_type_name.startswith("Dirt") or vehicle_type_name.startswith("Bike"):
+        return "Dirt Bikes"
+    return vehicle_type_name
+
+
+def select_lot_model(
+    vehicle_type_slug: str,
+    vin: str,
+    auction_date: Optional[datetime],
+    auction_date_passed: bool,
+    image_thumbnail: Optional[str],
+) -> type[LotBase]:
+    """Выбирает таблицу для нового лота"""
+    if vehicle_type_slug != 'automobile':
+        return LotOtherVehicleHistorical if auction_date_passed else LotOtherVehicle
+
+    if len(vin) != 17:
+        LotModel = LotOtherVehicle
+    elif auction_date is None:
+        LotModel = LotWithoutAuctionDate
+    elif auction_date_passed:
+        LotModel = HistoricalLot
+    else:
+        LotModel = Lot
+
+    if image_thumbnail is None and LotModel not in {LotOtherVehicle, HistoricalLot}:
+        LotModel = LotWithouImage
+    return LotModel
+
+
+def lot_reference_names(lot_data: dict) -> Dict[str, Optional[str]]:
+    """Нормализованные имена плоских справочников лота (ключи — LOT_REFERENCE_FIELDS)"""
+    names = {field: lot_data.get(field) or None for field in LOT_REFERENCE_FIELDS}
+    names['color'] = lot_data.get('color', 'Other') if lot_data.get('color') in COLOR_CHOICES else "Two Colors"
+    names['status'] = STATUS_MAPPING.get(lot_data.get('status'), lot_data.get('status'))
+    names['auction_status'] = lot_data.get('auction_status', 'Not sold')
+    names['seller_type'] = (
+        (lot_data.get('seller_type') or '').capitalize() if lot_data.get('seller_type') in SELLER_TYPES else "Third parties"
+    )
+    names['document'] = classify_title(lot_data.get('document_old')) if lot_data.get('document_old') else "Unknown"
+
+    names['base_site'] = None
+    if base_site_name := (lot_data.get('base_site') or '').lower():
+        if base_site_name in ['iaai', 'copart']:
+            names['base_site'] = base_site_name.upper() if base_site_name == "iaai" else base_site_name.capitalize()
+    return names
+
+
+def build_lot_attrs(
+    lot_data: dict,
+    auction_date: Optional[datetime],
+    auction_date_passed: bool,
+    image_thumbnail: Optional[str],
+    risk_index: Optional[float],
+    relations: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Поля новой записи лота; relations — экземпляры справочников по имени поля"""
+    return {
+        'lot_id': lot_data['lot_id'],
+        'odometer': lot_data.get('odometer'),
+        'price': lot_data.get('price'),
+        'reserve_price': lot_data.get('reserve_price'),
+        'bid': lot_data.get('bid', 0),
+        'current_bid': lot_data.get('current_bid', 0)/100,
+        'auction_date': auction_date,
+        'cost_repair': lot_data.get('cost_repair'),
+        'year': lot_data['year'],
+        'cylinders': lot_data.get('cylinders'),
+        'state': lot_data['state'],
+        'vin': lot_data['vin'],
+        'engine': lot_data.get('engine'),
+        'engine_size': lot_data.get('engine_size'),
+        'location': lot_data['location'],
+        'location_old': lot_data.get('location_old'),
+        'country': lot_data['country'],
+        'image_thubnail': image_thumbnail,
+        'is_buynow': lot_data.get('is_buynow', False),
+        'link_img_hd': lot_data.get('link_img_hd', []),
+        'link_img_small': lot_data.get('link_img_small', []),
+        'link': lot_data['link'],
+        'risk_index': risk_index,
+        'is_historical': auction_date_passed,
+        **relations,
+    }
+
+
 async def create_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
     """
     Создает лот в базе данных со всеми связанными моделями,
@@ -1158,43 +1581,14 @@ async def create_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
     Если vehicle_type.slug != 'automobile', добавляет только в LotOtherVehicle.
     """
     try:
-        current_date = datetime.now().date()
-        auction_date_str = lot_data.get('auction_date') or lot_data.get('sale_date')
-        auction_date_passed = False
-        auction_date = None
-        
-        # Обработка даты аукциона
-        if auction_date_str:
-            if isinstance(auction_date_str, datetime):
-                auction_date = auction_date_str
-            elif isinstance(auction_date_str, str):
-                try:
-                    auction_date = datetime.strptime(auction_date_str, "%Y-%m-%dT%H:%M:%S.%f%z")
-                except ValueError:
-                    try:
-                        auction_date = datetime.strptime(auction_date_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-                    except ValueError as e:
-                        logger.error(f"Error parsing date {auction_date_str}: {e}")
-            
-            if auction_date:
-                auction_date_passed = auction_date.date() < current_date
-
-        # Обработка изображений
-        image_thumbnail = None
-        if lot_data.get('link_img_small'):
-            image_thumbnail = lot_data['link_img_small'][0]
-        elif lot_data.get('link_img_hd'):
-            image_thumbnail = lot_data['link_img_hd'][0]
+        auction_date = parse_auction_date(lot_data)
+        auction_date_passed = bool(auction_date) and auction_date.date() < datetime.now().date()
+        image_thumbnail = get_lot_thumbnail(lot_data)
 
         async with in_transaction():
             # 1. Проверяем наличие лота во всех таблицах
-            tables_to_check = [
-                Lot, LotWithoutAuctionDate, LotWithouImage,
-                HistoricalLot, LotHistoryAddons, LotOtherVehicle, LotOtherVehicleHistorical
-            ]
-            
             existing_lot = None
-            for model in tables_to_check:
+            for model in LOT_TABLES:
                 existing = await model.filter(
                     lot_id=lot_data['lot_id'],
                     vin=lot_data['vin']
@@ -1208,201 +1602,109 @@ async def create_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
                 return existing_lot
 
             # 2. Определяем целевую модель для сохранения
-            vin = lot_data.get('vin', '')
-            vehicle_type_name = VEHICLE_TYPE_NORMALIZER.get(
-                lot_data['vehicle_type'], 
-                lot_data['vehicle_type']
+            vehicle_type_name = normalize_vehicle_type_name(lot_data['vehicle_type'])
+            vehicle_type = await reference_resolver.resolve(VehicleType, vehicle_type_name)
+            LotModel = select_lot_model(
+                vehicle_type.slug, lot_data.get('vin', ''), auction_date, auction_date_passed, image_thumbnail
             )
-            
-            if vehicle_type_name.startswith("Snow"):
-                vehicle_type_name = "Snowmobile"
-            elif vehicle_type_name.startswith("Dirt") or vehicle_type_name.startswith("Bike"):
-                vehicle_type_name = "Dirt Bikes"
-            
-            vehicle_type = await VehicleType.get_or_create_by_name(vehicle_type_name)
-            
-            # Выбор модели на основе типа транспортного средства
-            if vehicle_type.slug != 'automobile':
-                LotModel = LotOtherVehicle
-                if auction_date_passed:
-                    LotModel = LotOtherVehicleHistorical
-            else:
-                if len(vin) != 17:
-                    LotModel = LotOtherVehicle
-                else:
-                    if auction_date is None:
-                        LotModel = LotWithoutAuctionDate
-                    elif auction_date_passed:
-                        LotModel = HistoricalLot
-                    else:
-                        LotModel = Lot
-
-                if image_thumbnail is None and LotModel not in {LotOtherVehicle, HistoricalLot}:
-                    LotModel = LotWithouImage
 
             # 3. Получаем правильный шард для сохранения
-            shard_class = await LotModel.get_shard_for_new_record()
+            shard_class = await LotModel.get_shard_for_new_record(lot_data['lot_id'])
 
             # 4. Подготовка связанных моделей
             try:
-                make = await Make.get_or_create_by_name(lot_data['make'], vehicle_type=vehicle_type)
-                model = await Model.get_or_create_by_name(lot_data['model'], make=make)
-                
+                make = await reference_resolver.resolve(Make, lot_data['make'], vehicle_type)
+                model = await reference_resolver.resolve(Model, lot_data['model'], make)
+
                 series_name = lot_data.get('series', None)
-                series = await Series.get_or_create_by_name(series_name, model=model) if series_name else None
-                
-                await create_model_translations("vehicle_type", vehicle_type)
+                series = await reference_resolver.resolve(Series, series_name, model) if series_name else None
             except Exception as e:
                 logger.error(f"Error creating vehicle hierarchy: {str(e)}")
                 return None
 
-            # Подготовка опциональных связанных моделей
-            damage_pr = await DamagePrimary.get_or_create_by_name(lot_data.get('damage_pr')) if lot_data.get('damage_pr') else None
-            damage_sec = await DamageSecondary.get_or_create_by_name(lot_data.get('damage_sec')) if lot_data.get('damage_sec') else None
-            keys = await Keys.get_or_create_by_name(lot_data.get('keys')) if lot_data.get('keys') else None
-            odobrand = await OdoBrand.get_or_create_by_name(lot_data.get('odobrand')) if lot_data.get('odobrand') else None
-            fuel = await Fuel.get_or_create_by_name(lot_data.get('fuel')) if lot_data.get('fuel') else None
-            drive = await Drive.get_or_create_by_name(lot_data.get('drive')) if lot_data.get('drive') else None
-            transmission = await Transmission.get_or_create_by_name(lot_data.get('transmission')) if lot_data.get('transmission') else None
-            
-            color = await Color.get_or_create_by_name(
-                lot_data.get('color', 'Other') if lot_data.get('color') in COLOR_CHOICES else "Two Colors"
-            )
-            
-            status_name = STATUS_MAPPING.get(lot_data.get('status'), lot_data.get('status'))
-            status = await Status.get_or_create_by_name(status_name) if status_name else None
-                
-            auction_status = await AuctionStatus.get_or_create_by_name(lot_data.get('auction_status','Not sold'))
-            body_type = await BodyType.get_or_create_by_name(lot_data.get('body_type')) if lot_data.get('body_type') else None
-            title = await Title.get_or_create_by_name(lot_data.get('title')) if lot_data.get('title') else None
-            
-            seller_type = await SellerType.get_or_create_by_name(
-                (lot_data.get('seller_type') or '').capitalize() if lot_data.get('seller_type') in SELLER_TYPES else "Third parties"
-            )
-            
-            seller = await Seller.get_or_create_by_name(lot_data.get('seller')) if lot_data.get('seller') else None
-            
-            document_short_type = classify_title(lot_data.get('document_old')) if lot_data.get('document_old') else "Unknown"
-            document = await Document.get_or_create_by_name(document_short_type)
-            document_old = await DocumentOld.get_or_create_by_name(lot_data.get('document_old')) if lot_data.get('document_old') else None
-            
-            base_site = None
-            if base_site_name := lot_data.get('base_site', '').lower():
-                if base_site_name in ['iaai', 'copart']:
-                    base_site_name = base_site_name.upper() if base_site_name == "iaai" else base_site_name.capitalize()
-                    base_site = await BaseSite.get_or_create_by_name(base_site_name)
+            relations = {'vehicle_type': vehicle_type, 'make': make, 'model': model, 'series': series}
+            for field, name in lot_reference_names(lot_data).items():
+                relations[field] = await reference_resolver.resolve(LOT_REFERENCE_FIELDS[field], name)
 
             # Создаем переводы для связанных моделей
-            for rel_model, rel_instance in [
-                ("damage_pr", damage_pr),
-                ("document", document),
-                ("damage_sec", damage_sec),
-                ("keys", keys),
-                ("odobrand", odobrand),
-                ("fuel", fuel),
-                ("drive", drive),
-                ("transmission", transmission),
-                ("color", color),
-                ("status", status),
-                ("auction_status", auction_status),
-                ("body_type", body_type),
-                ("seller_type", seller_type)
-            ]:
-                if rel_instance:
-                    await create_model_translations(rel_model, rel_instance)
+            await ensure_model_translations(
+                [(field, relations[field]) for field in TRANSLATED_REFERENCE_FIELDS]
+            )
 
             # Расчет risk_index
             risk_index = await calculate_risk_index(
                 year=lot_data.get('year'),
                 odometer=lot_data.get('odometer'),
-                auction_status=auction_status.name if auction_status else None,
-                status=status.name if status else None,
+                auction_status=relations['auction_status'].name if relations['auction_status'] else None,
+                status=relations['status'].name if relations['status'] else None,
                 have_history=False
             )
 
             # 5. Подготовка данных для сохранения
-            lot_attrs = {
-                'lot_id': lot_data['lot_id'],
-                'odometer': lot_data.get('odometer'),
-                'price': lot_data.get('price'),
-                'reserve_price': lot_data.get('reserve_price'),
-                'bid': lot_data.get('bid', 0),
-                'current_bid': lot_data.get('current_bid', 0)/100,
-                'auction_date': auction_date,
-                'cost_repair': lot_data.get('cost_repair'),
-                'year': lot_data['year'],
-                'cylinders': lot_data.get('cylinders'),
-                'state': lot_data['state'],
-                'vin': lot_data['vin'],
-                'engine': lot_data.get('engine'),
-                'engine_size': lot_data.get('engine_size'),
-                'location': lot_data['location'],
-                'location_old': lot_data.get('location_old'),
-                'country': lot_data['country'],
-                'image_thubnail': image_thumbnail,
-                'is_buynow': lot_data.get('is_buynow', False),
-                'link_img_hd': lot_data.get('link_img_hd', []),
-                'link_img_small': lot_data.get('link_img_small', []),
-                'link': lot_data['link'],
-                'risk_index': risk_index,
-                'is_historical': auction_date_passed,
-                'vehicle_type': vehicle_type,
-                'make': make,
-                'model': model,
-                'series': series,
-                'damage_pr': damage_pr,
-                'damage_sec': damage_sec,
-                'keys': keys,
-                'odobrand': odobrand,
-                'fuel': fuel,
-                'drive': drive,
-                'transmission': transmission,
-                'color': color,
-                'status': status,
-                'auction_status': auction_status,
-                'body_type': body_type,
-                'title': title,
-                'seller_type': seller_type,
-                'seller': seller,
-                'document': document,
-                'document_old': document_old,
-                'base_site': base_site
-            }
+            lot_attrs = build_lot_attrs(
+                lot_data, auction_date, auction_date_passed, image_thumbnail, risk_index, relations
+            )
 
             # 6. Создаем новую запись в правильном шарде
             lot = await shard_class.create(**lot_attrs)
+            indexed_lots = [lot]
 
             # 7. Обработка завершенных аукционов
             if auction_date_passed:
                 historical_shard = await HistoricalLot.get_shard_for_new_record()
                 if not await HistoricalLot.filter(vin=lot_data['vin']).exists():
-                    await historical_shard.create(**lot_attrs)
-                
+                    indexed_lots.append(await historical_shard.create(**lot_attrs))
+
                 addon_shard = await LotHistoryAddons.get_shard_for_new_record()
                 addon_data = {**lot_attrs, 'updated_at': datetime.now()}
                 existing_addon = await LotHistoryAddons.filter(
-                    vin=lot_data['vin'], 
+                    vin=lot_data['vin'],
                     lot_id=lot_data['lot_id']
                 ).first()
-                
+
                 if existing_addon:
                     await existing_addon.update_from_dict(addon_data)
                     await existing_addon.save()
                 else:
                     await addon_shard.create(**addon_data)
 
+            await LotSearch.index(indexed_lots)
             logger.success(f"Created lot in {shard_class.__name__} -> {lot_data['vin']}:{lot_attrs['lot_id']}")
-            return lot
+
+        await mark_refine_dirty(lot_refine_changes(shard_class, relations['base_site'], auction_date_passed))
+        return lot
 
     except Exception as e:
         logger.error(f"Unexpected error creating lot: {str(e)}", exc_info=True)
         return None
 
+async def find_stored_lot(lot_id: int, vin: str) -> Optional[LotBase]:
+    """
+    Сохраненная запись лота по (lot_id, vin): шард Lot по хешу lot_id, лоты вне своего шарда —
+    через lot_directory, затем прежние таблицы в порядке LOT_TABLES
+    """
+    lot_id = int(lot_id)
+    for shard_class in Lot.get_read_shards(lot_id):
+        lot = await shard_class.filter(lot_id=lot_id, vin=vin).first()
+        if lot is not None:
+            return lot
+    for lot in await LotDirectory.fetch("lot_id", lot_id, models=await Lot.get_all_shards(), prefetch=()):
+        if lot.vin == vin:
+            return lot
+    for model in LOT_TABLES:
+        lot = await model.filter(lot_id=lot_id, vin=vin).first()
+        if lot is not None:
+            return lot
+    return None
+
+
 async def update_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
     """
     Создает или обновляет лот в базе данных со всеми связанными моделями.
     Если лот уже существует, обновляет его данные.
     Если vehicle_type.slug != 'automobile', добавляет/обновляет только в LotOtherVehicle.
+    Пересчет /refine, сброс кэша и уведомления watchlist идут после коммита своей транзакции,
+    поэтому функцию не вызывают внутри внешней транзакции.
     """
     try:
         current_date = datetime.now().date()
@@ -1438,24 +1740,11 @@ async def update_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
             image_thumbnail = lot_data['link_img_hd'][0]
 
         async with in_transaction():
-            # 1. Проверяем наличие лота во всех таблицах
-            tables_to_check = [
-                Lot, LotWithoutAuctionDate, LotWithouImage,
-                HistoricalLot, LotHistoryAddons, LotOtherVehicle, LotOtherVehicleHistorical
-            ]
-            
-            existing_lot = None
-            source_table = None
-            
-            for model in tables_to_check:
-                existing = await model.filter(
-                    lot_id=lot_data['lot_id'],
-                    vin=lot_data['vin']
-                ).first()
-                if existing:
-                    existing_lot = existing
-                    source_table = model
-                    break
+            # 1. Проверяем наличие лота: шарды Lot, затем остальные таблицы
+            existing_lot = await find_stored_lot(lot_data['lot_id'], lot_data['vin'])
+            source_table = type(existing_lot) if existing_lot else None
+            # Состояние до обновления — для уведомлений пользователей из watchlist
+            previous_state = lot_state(existing_lot) if existing_lot else None
 
             # 2. Определяем целевую таблицу для сохранения
             vin = lot_data.get('vin', '')
@@ -1471,7 +1760,7 @@ async def update_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
             elif vehicle_type_name.startswith("Dirt") or vehicle_type_name.startswith("Bike"):
                 vehicle_type_name = "Dirt Bikes"
             
-            vehicle_type = await VehicleType.get_or_create_by_name(vehicle_type_name)
+            vehicle_type = await reference_resolver.resolve(VehicleType, vehicle_type_name)
             
             # Определяем целевую таблицу
             if vehicle_type.slug != 'automobile':
@@ -1491,36 +1780,36 @@ async def update_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
 
                 if image_thumbnail is None and LotModel not in {LotOtherVehicle, HistoricalLot}:
                     LotModel = LotWithouImage
+            # Активные лоты лежат в шарде Lot по хешу lot_id
+            LotModel = await LotModel.get_shard_for_new_record(lot_data['lot_id'])
 
             # Если лот уже существует, но в другой таблице, перемещаем его
             if existing_lot and not isinstance(existing_lot, LotModel):
                 logger.info(f"Moving lot {existing_lot.id} from {source_table.__name__} to {LotModel.__name__}")
-                existing_lot = await existing_lot.move_to(LotModel)
+                existing_lot = await source_table.move_to(existing_lot.id, LotModel)
             
             # 3. Подготовка связанных моделей
             try:
-                make = await Make.get_or_create_by_name(lot_data['make'], vehicle_type=vehicle_type)
-                model = await Model.get_or_create_by_name(lot_data['model'], make=make)
+                make = await reference_resolver.resolve(Make, lot_data['make'], vehicle_type)
+                model = await reference_resolver.resolve(Model, lot_data['model'], make)
                 
                 series_name = lot_data.get('series') or (lot_data.get('title') or '').split(' ')[-1]
-                series = await Series.get_or_create_by_name(series_name, model=model) if series_name else None
-                
-                await create_model_translations("vehicle_type", vehicle_type)
+                series = await reference_resolver.resolve(Series, series_name, model) if series_name else None
             except Exception as e:
                 logger.error(f"Error creating vehicle hierarchy: {str(e)}")
                 return None
 
             # Подготовка опциональных связанных моделей
-            damage_pr = await DamagePrimary.get_or_create_by_name(lot_data.get('damage_pr')) if lot_data.get('damage_pr') else None
-            damage_sec = await DamageSecondary.get_or_create_by_name(lot_data.get('damage_sec')) if lot_data.get('damage_sec') else None
-            keys = await Keys.get_or_create_by_name(lot_data.get('keys')) if lot_data.get('keys') else None
-            odobrand = await OdoBrand.get_or_create_by_name(lot_data.get('odobrand')) if lot_data.get('odobrand') else None
-            fuel = await Fuel.get_or_create_by_name(lot_data.get('fuel')) if lot_data.get('fuel') else None
-            drive = await Drive.get_or_create_by_name(lot_data.get('drive')) if lot_data.get('drive') else None
-            transmission = await Transmission.get_or_create_by_name(lot_data.get('transmission')) if lot_data.get('transmission') else None
+            damage_pr = await reference_resolver.resolve(DamagePrimary, lot_data.get('damage_pr')) if lot_data.get('damage_pr') else None
+            damage_sec = await reference_resolver.resolve(DamageSecondary, lot_data.get('damage_sec')) if lot_data.get('damage_sec') else None
+            keys = await reference_resolver.resolve(Keys, lot_data.get('keys')) if lot_data.get('keys') else None
+            odobrand = await reference_resolver.resolve(OdoBrand, lot_data.get('odobrand')) if lot_data.get('odobrand') else None
+            fuel = await reference_resolver.resolve(Fuel, lot_data.get('fuel')) if lot_data.get('fuel') else None
+            drive = await reference_resolver.resolve(Drive, lot_data.get('drive')) if lot_data.get('drive') else None
+            transmission = await reference_resolver.resolve(Transmission, lot_data.get('transmission')) if lot_data.get('transmission') else None
             
             color_name = lot_data.get('color', 'Other')
-            color = await Color.get_or_create_by_name(
+            color = await reference_resolver.resolve(Color, 
                 color_name if color_name in [
                     "Blue", "Grey", "Black", "Orange", "Turquoise", "Yellow", 
                     "Charcoal", "Silver", "White", "Other", "Green", "Red", 
@@ -1536,29 +1825,29 @@ async def update_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
                     "Engine Start Program": "Starts",
                     "Does not Start": "Stationary"
                 }.get(status_name, status_name)
-                status = await Status.get_or_create_by_name(status_name)
+                status = await reference_resolver.resolve(Status, status_name)
             else:
                 status = None
                 
-            auction_status = await AuctionStatus.get_or_create_by_name(lot_data.get('auction_status','Not sold'))
-            body_type = await BodyType.get_or_create_by_name(lot_data.get('body_type')) if lot_data.get('body_type') else None
-            title = await Title.get_or_create_by_name(lot_data.get('title')) if lot_data.get('title') else None
+            auction_status = await reference_resolver.resolve(AuctionStatus, lot_data.get('auction_status','Not sold'))
+            body_type = await reference_resolver.resolve(BodyType, lot_data.get('body_type')) if lot_data.get('body_type') else None
+            title = await reference_resolver.resolve(Title, lot_data.get('title')) if lot_data.get('title') else None
             
             seller_type_name = (lot_data.get('seller_type') or '').capitalize()
-            seller_type = await SellerType.get_or_create_by_name(
+            seller_type = await reference_resolver.resolve(SellerType, 
                 seller_type_name if seller_type_name in [
                     "Dealer", "Insurance companies", "Rental companies", 
                     "Financing", "Third parties"
                 ] else "Third parties"
             )
             
-            seller = await Seller.get_or_create_by_name(lot_data.get('seller')) if lot_data.get('seller') else None
+            seller = await reference_resolver.resolve(Seller, lot_data.get('seller')) if lot_data.get('seller') else None
             if lot_data.get('document_old'):
                 document_short_type = classify_title(lot_data.get('document_old'))
             else:
                 document_short_type = "Unknown"
-            document = await Document.get_or_create_by_name(document_short_type)
-            document_old = await DocumentOld.get_or_create_by_name(lot_data.get('document_old')) if lot_data.get('document_old') else None
+            document = await reference_resolver.resolve(Document, document_short_type)
+            document_old = await reference_resolver.resolve(DocumentOld, lot_data.get('document_old')) if lot_data.get('document_old') else None
             
             base_site_name = lot_data.get('base_site', '').lower()
             if base_site_name in ['iaai', 'copart']:
@@ -1566,12 +1855,13 @@ async def update_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
                     base_site_name = base_site_name.upper()
                 else:
                     base_site_name = base_site_name.capitalize()
-                base_site = await BaseSite.get_or_create_by_name(base_site_name)
+                base_site = await reference_resolver.resolve(BaseSite, base_site_name)
             else:
                 base_site = None
 
             # Create translations for relational models
-            for rel_model, rel_instance in [
+            await ensure_model_translations([
+                ("vehicle_type", vehicle_type),
                 ("damage_pr", damage_pr),
                 ("document", document),
                 ("damage_sec", damage_sec),
@@ -1585,9 +1875,7 @@ async def update_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
                 ("auction_status", auction_status),
                 ("body_type", body_type),
                 ("seller_type", seller_type)
-            ]:
-                if rel_instance:
-                    await create_model_translations(rel_model, rel_instance)
+            ])
 
             # Расчет risk_index
             risk_index = await calculate_risk_index(
@@ -1658,6 +1946,7 @@ async def update_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
                 lot_attrs['vin'] = lot_data['vin']
                 lot = await LotModel.create(**lot_attrs)
                 logger.info(f"Created new lot -> {lot_data['vin']}:{lot_data['lot_id']}")
+            await LotSearch.index([lot])
 
             # 6. Обработка завершенных аукционов
             if auction_date_passed or lot_attrs['is_historical']:
@@ -1677,7 +1966,8 @@ async def update_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
                     await historical_lot.update_from_dict(historical_attrs)
                     await historical_lot.save()
                 else:
-                    await HistoricalLot.create(**historical_attrs)
+                    historical_lot = await HistoricalLot.create(**historical_attrs)
+                await LotSearch.index([historical_lot])
                 
                 # Обновляем или создаем запись в Addons
                 addon_data = {
@@ -1697,7 +1987,12 @@ async def update_lot_with_relations(lot_data: dict) -> Optional[LotBase]:
                     await LotHistoryAddons.create(**addon_data)
 
             logger.success(f"Processed lot -> {lot_data['vin']}:{lot_data['lot_id']}")
-            return lot
+
+        # Только группы таблиц, между которыми лот переместился (или той, где он обновлен)
+        await mark_refine_dirty(lot_refine_changes(LotModel, base_site, auction_date_passed, source_table))
+        await invalidate_lot_cache([lot.id], [lot_data['vin']])
+        await notify_lots_changes({lot.id: diff_lot_state(previous_state, lot_state(lot))})
+        return lot
 
     except Exception as e:
         logger.error(f"Unexpected error processing lot: {str(e)}", exc_info=True)
@@ -1749,13 +2044,7 @@ async def _get_lot_orm_by_internal_id(lot_id: int) -> LotBase | None:
         5: LotHistoryAddons,
         6: LotOtherVehicle,
         7: LotOtherVehicleHistorical,
-        11: Lot1,
-        12: Lot2,
-        13: Lot3,
-        14: Lot4,
-        15: Lot5,
-        16: Lot6,
-        17: Lot7,
+        **{model.PREFIX: model for model in LOT_SHARD_MODELS.values()},
     }
 
     model_class = prefix_to_model.get(prefix)
@@ -1765,7 +2054,7 @@ async def _get_lot_orm_by_internal_id(lot_id: int) -> LotBase | None:
         model_classes = [
             HistoricalLot, LotWithoutAuctionDate, LotWithouImage,
             LotHistoryAddons, LotOtherVehicle, LotOtherVehicleHistorical,
-            Lot1, Lot2, Lot3, Lot4, Lot5, Lot6, Lot7,
+            *LOT_SHARD_MODELS.values(),
         ]
     else:
         model_classes = [model_class]
@@ -1778,6 +2067,19 @@ async def _get_lot_orm_by_internal_id(lot_id: int) -> LotBase | None:
     return None
 
 
+async def _fetch_similar_lots(nearest: list, limit: int) -> List[LotBase]:
+    """
+    Лоты по результату индекса похожих в порядке близости.
+    Лоты, успевшие уйти из таблицы (перенос, удаление), пропускаются — поэтому кандидатов берут с запасом
+    """
+    ids_by_shard: Dict[type[LotBase], List[int]] = {}
+    for features in nearest:
+        ids_by_shard.setdefault(features.shard, []).append(features.pk)
+    fetched = await asyncio.gather(*(shard.filter(id__in=ids) for shard, ids in ids_by_shard.items()))
+    by_id = {lot.id: lot for lots in fetched for lot in lots}
+    return [by_id[features.pk] for features in nearest if features.pk in by_id][:limit]
+
+
 async def get_similar_lots_by_id(
     lot_id: int,
     limit: int = 5,
@@ -1801,7 +2103,11 @@ async def get_similar_lots_by_id(
         # Можно искать только среди "без даты / без фото"
         shard_classes = [type(original_lot)]
     else:
-        # Обычные автомобили — ищем по всем Lot1..Lot7
+        # Обычные автомобили — ближайшие соседи из in-memory индекса (app/services/similar_service.py)
+        nearest = await similar_lots.similar(original_lot, limit * 2)
+        if nearest is not None:
+            return await _fetch_similar_lots(nearest, limit)
+        # Индекс еще загружается — ищем по всем Lot1..Lot7
         shard_classes = await Lot.get_all_shards()  # [Lot1..Lot7]
 
     similar_candidates: List[LotBase] = []
@@ -1881,10 +2187,14 @@ async def get_lots_by_ids(lot_ids: List[int]) -> List[Lot]:
     if not lot_ids:
         return []
     
-    return await Lot1.filter(id__in=lot_ids).prefetch_related(
-        "vehicle_type", "make", "model", "damage_pr", "damage_sec",
-        "fuel", "transmission", "color", "status", "auction_status"
-    ).all()
+    fetched = await asyncio.gather(*(
+        shard_class.filter(id__in=lot_ids).prefetch_related(
+            "vehicle_type", "make", "model", "damage_pr", "damage_sec",
+            "fuel", "transmission", "color", "status", "auction_status"
+        )
+        for shard_class in await Lot.get_all_shards()
+    ))
+    return [lot for lots in fetched for lot in lots]
 
 
 async def get_lots_count_by_vehicle_type(
@@ -1965,7 +2275,9 @@ async def fetch_vin_data(vin):
             return {"error": str(e)}  # Handle other types of errors
 
 
-async def search_lots(search_info: str) -> List[Union[Lot, HistoricalLot, LotWithoutAuctionDate]]:
+async def search_lots(
+    search_info: str, limit: int = 15, offset: int = 0
+) -> List[Union[Lot, HistoricalLot, LotWithoutAuctionDate]]:
     search_info = search_info.strip()
     
     prefetch_make = Prefetch("make", queryset=Make.all().only("id", "name", "slug"))
@@ -1984,75 +2296,21 @@ async def search_lots(search_info: str) -> List[Union[Lot, HistoricalLot, LotWit
         "status"
     ]
     
-    if len(search_info) == 17 and search_info.isalnum():
-        query = Q(vin__iexact=search_info) & Q(vin__isnull=False) & ~Q(vin='')
-    elif search_info.isdigit():
-        query = Q(lot_id=int(search_info))
-    else:
-        search_parts = search_info.split()
-        if len(search_parts) >= 2:
-            make_query = Q(make__name__istartswith=search_parts[0])
-            model_query = Q(model__name__istartswith=" ".join(search_parts[1:]))
-            query = make_query & model_query
-        else:
-            query = (
-                Q(make__name__iexact=search_info) |
-                Q(model__name__iexact=search_info) |
-                Q(make__name__istartswith=search_info) |
-                Q(model__name__istartswith=search_info) |
-                Q(series__name__istartswith=search_info)
-            )
-
-    # Ограничиваем количество результатов на уровне запросов
-    queries = [
-        Lot.filter(query).prefetch_related(*base_prefetches).limit(3),
-        Lot1.filter(query).prefetch_related(*base_prefetches).limit(3),
-        Lot2.filter(query).prefetch_related(*base_prefetches).limit(3),
-        Lot3.filter(query).prefetch_related(*base_prefetches).limit(3),
-        Lot4.filter(query).prefetch_related(*base_prefetches).limit(3),
-        Lot5.filter(query).prefetch_related(*base_prefetches).limit(3),
-        Lot6.filter(query).prefetch_related(*base_prefetches).limit(3),
-        Lot7.filter(query).prefetch_related(*base_prefetches).limit(3),
-        HistoricalLot.filter(query).prefetch_related(*base_prefetches).limit(3),
-        LotWithoutAuctionDate.filter(query).prefetch_related(*base_prefetches).limit(3),
-        LotWithouImage.filter(query).prefetch_related(*base_prefetches).limit(3),
-        LotOtherVehicle.filter(query).prefetch_related(*base_prefetches).limit(3),
-        LotOtherVehicleHistorical.filter(query).prefetch_related(*base_prefetches).limit(3),
-        LotHistoryAddons.filter(query).prefetch_related(*base_prefetches).limit(3)
-    ]
-    
-    results = await asyncio.gather(*[q for q in queries])
-
-    seen_ids = set()
-    unique_lots: List[Lot] = []
-
-    for lots in results:
-        for lot in lots:
-            if lot.id not in seen_ids:
-                if len(search_info) == 17 and search_info.isalnum():
-                    # Если искали по VIN, проверяем точное совпадение
-                    if lot.vin.lower() == search_info.lower():
-                        seen_ids.add(lot.id)
-                        unique_lots.append(lot)
-                else:
-                    if len(str(lot.id)) >= 6:
-                        seen_ids.add(lot.id)
-                        unique_lots.append(lot)
-            if len(unique_lots) >= 15:
-                break
-        if len(unique_lots) >= 15:
-            break
+    def by_auction_date(lot):
+        return lot.auction_date if lot.auction_date else datetime.min.replace(tzinfo=timezone.utc)
 
-    # Предзагрузка ключевых связей
-    for lot in unique_lots:
-        await lot.fetch_related('make', 'model', 'series', 'base_site')
-    
-    unique_lots.sort(
-        key=lambda x: x.auction_date if x.auction_date else datetime.min.replace(tzinfo=timezone.utc),
-        reverse=True
-    )
+    # VIN и lot_id — точечный поиск по каталогу lot_directory
+    if len(search_info) == 17 and search_info.isalnum():
+        lots = await LotDirectory.fetch("vin", search_info, prefetch=tuple(base_prefetches))
+        return sorted(lots, key=by_auction_date, reverse=True)[offset:offset + limit]
+    if search_info.isdigit():
+        lots = await LotDirectory.fetch("lot_id", int(search_info), prefetch=tuple(base_prefetches))
+        lots = [lot for lot in lots if len(str(lot.id)) >= 6]
+        return sorted(lots, key=by_auction_date, reverse=True)[offset:offset + limit]
 
-    return unique_lots[:15]
+    # Марка/модель/серия — один ранжированный запрос по search_text каталога (pg_trgm)
+    entries = await LotDirectory.search(search_info, limit=limit, offset=offset)
+    return await LotDirectory.hydrate(entries, prefetch=tuple(base_prefetches))
 
 
 async def get_base_queryset(is_historical: bool) -> Any:
@@ -2092,32 +2350,17 @@ async def get_special_filtered_lots(
 
 
 async def count_all_active():
-    all_count = {
-        'Lot1': await Lot1.all().count(),
-        'Lot2': await Lot2.all().count(),
-        'Lot3': await Lot3.all().count(),
-        'Lot4': await Lot4.all().count(),
-        'Lot5': await Lot5.all().count(),
-        'Lot6': await Lot6.all().count(),
-        'Lot7': await Lot7.all().count(),
-        'LotWithouImage': await LotWithouImage.all().count(),
-        'LotWithoutAuctionDate': await LotWithoutAuctionDate.all().count(),
-    }
+    all_count = {}
+    for model in [*await Lot.get_all_shards(), LotWithouImage, LotWithoutAuctionDate]:
+        all_count[model.__name__] = await model.all().count()
 
     return all_count
 
 
 async def count_all_auctions_active():
     models = {
-        'Lot1': Lot1,
-        'Lot2': Lot2,
-        'Lot3': Lot3,
-        'Lot4': Lot4,
-        'Lot5': Lot5,
-        'Lot6': Lot6,
-        'Lot7': Lot7,
-        'LotWithouImage': LotWithouImage,
-        'LotWithoutAuctionDate': LotWithoutAuctionDate,
+        model.__name__: model
+        for model in [*await Lot.get_all_shards(), LotWithouImage, LotWithoutAuctionDate]
     }
 
     result = {}
@@ -2152,7 +2395,7 @@ async def get_lot_type_by_offset_and_limit(limit: int, offset: int, cached_resul
 
     # Определяем порядок обработки лотов
     lot_order = [
-        'Lot1', 'Lot2', 'Lot3', 'Lot4', 'Lot5', 'Lot6', 'Lot7',
+        *(shard.__name__ for shard in await Lot.get_all_shards()),
         'LotWithoutAuctionDate',
         'LotWithouImage'
     ]
@@ -2198,17 +2441,190 @@ async def get_lot_type_by_offset_and_limit(limit: int, offset: int, cached_resul
 
 
 VALIDATOR_MODEL = {
-    "Lot1": Lot1,
-    "Lot2": Lot2,
-    "Lot3": Lot3,
-    "Lot4": Lot4,
-    "Lot5": Lot5,
-    "Lot6": Lot6,
-    "Lot7": Lot7,
+    **LOT_SHARD_MODELS,
     "LotWithoutAuctionDate": LotWithoutAuctionDate,
     "LotWithouImage": LotWithouImage
 }
 
+# Справочники, которые /refine отдает списком со счетчиками
+REFINE_REFERENCE_FACETS = (
+    "color", "body_type", "fuel", "transmission", "seller_type", "document",
+    "status", "auction_status", "damage_pr", "damage_sec", "drive", "base_site",
+)
+
+# Фасет /refine -> колонка lot_search, по которой он группируется
+REFINE_FACET_COLUMNS = {
+    "make": "make_id",
+    "model": "model_id",
+    "series": "series_id",
+    "vehicle_type": "vehicle_type_id",
+    "year": "year",
+    "engine_size": "engine_size",
+    "cylinders": "cylinders",
+    **{facet: f"{facet}_id" for facet in REFINE_REFERENCE_FACETS},
+}
+
+# Фильтры, которые не применяются к "своему" фасету: выбранное значение не скрывает остальные варианты.
+# Фильтры вышестоящих уровней (марка для модели, модель для серии) остаются
+FACET_EXCLUDED_FILTERS = {
+    "make": ("make_slug__in",),
+    "model": ("model_slug__in",),
+    "series": ("series_slug__in",),
+    "year": ("year__gte", "year__lte"),
+    "cylinders": ("cylinders__in",),
+    "risk_index": ("risk_index__gte", "risk_index__lte"),
+    "engine_size": ("engine__in", "engine_size__in"),
+    "vehicle_type": ("vehicle_type_slug__in",),
+    **{facet: (f"{facet}_slug__in",) for facet in REFINE_REFERENCE_FACETS},
+}
+
+RISK_INDEX_BUCKETS = {
+    "low": ("risk_index", None, 50),
+    "medium": ("risk_index", 50, 75),
+    "high": ("risk_index", 75, None),
+}
+
+# Body types, которые показываются в фасете для типа ТС
+VEHICLE_TYPE_BODY_TYPES = {
+    "automobile": ["sedan", "coupe", "pickup", "suv", "cabrio", "hatchback", "limousine", "cabrio", "wagon", "van", "roadster", "liftback", "hearse"],
+    "motorcycle": ["bike", "sport_bike", "roadster_bike", "enduro_bike"],
+    "bus": ["bus"],
+    "atv": [],
+    "watercraft": [],
+    "jet_sky": [],
+    "boat": [],
+    "trailers": ["furgon"],
+    "mobile_home": [],
+    "emergency_equipment": ["fire_truck"],
+    "industrial_equipment": ["industrial"],
+    "truck": ["truck"],
+    "other": ["other"]
+}
+
+
+def lot_search_catalog(vehicle_type_slug: Optional[List[str]], is_historical: bool) -> str:
+    """Каталог lot_search (исходная таблица /refine) для типа ТС и состояния аукциона"""
+    if vehicle_type_slug and "automobile" in vehicle_type_slug:
+        return (HistoricalLot if is_historical else Lot).__name__
+    return (LotOtherVehicleHistorical if is_historical else LotOtherVehicle).__name__
+
+
+def facet_filters(filters: Dict[str, Any], facet: str) -> Dict[str, Any]:
+    excluded = FACET_EXCLUDED_FILTERS.get(facet, ())
+    return {key: value for key, value in filters.items() if key not in excluded}
+
+
+def facet_contexts(
+    catalog: str,
+    filters: Dict[str, Any],
+    facets: List[str],
+    vehicle_type_catalogs: List[str],
+) -> Dict[tuple, List[str]]:
+    """
+    Группирует фасеты по контексту (каталоги, исключенные фильтры).
+    Фасет без примененного "своего" фильтра попадает в общий контекст;
+    "totals" (count, одометр) и "risk_index" есть всегда.
+    """
+    contexts: Dict[tuple, List[str]] = {}
+    for facet in ["totals", "risk_index", *facets]:
+        scope = tuple(vehicle_type_catalogs) if facet == "vehicle_type" else (catalog,)
+        excluded = tuple(key for key in FACET_EXCLUDED_FILTERS.get(facet, ()) if key in filters)
+        contexts.setdefault((scope, excluded), []).append(facet)
+    return contexts
+
+
+async def search_lot_facets(
+    catalog: str,
+    filters: Dict[str, Any],
+    facets: List[str],
+    vehicle_type_catalogs: List[str],
+) -> Dict[str, Any]:
+    """
+    Статистика /refine по lot_search: один запрос GROUPING SETS на контекст facet_contexts.
+    Возвращает {фасет: {значение: count}, "totals": {count, odometer_min, odometer_max},
+    "risk_index": {low, medium, high}}.
+    """
+    async def run_context(scope: tuple, excluded: tuple, context_facets: List[str]) -> Dict[str, Any]:
+        columns = [REFINE_FACET_COLUMNS[facet] for facet in context_facets if facet in REFINE_FACET_COLUMNS]
+        query = LotSearch.filter(
+            catalog__in=list(scope), **{k: v for k, v in filters.items() if k not in excluded}
+        ).values(*columns, "odometer", "risk_index")
+        rows = await execute_facets(query, columns, ("odometer",), RISK_INDEX_BUCKETS)
+        reduced = reduce_facets(rows, columns, ("odometer",), RISK_INDEX_BUCKETS)
+
+        totals = reduced["totals"]
+        result = {}
+        for facet in context_facets:
+            if facet == "totals":
+                result[facet] = {key: totals[key] for key in ("count", "odometer_min", "odometer_max")}
+            elif facet == "risk_index":
+                result[facet] = {key: totals[key] for key in RISK_INDEX_BUCKETS}
+            else:
+                result[facet] = reduced[REFINE_FACET_COLUMNS[facet]]
+        return result
+
+    contexts = facet_contexts(catalog, filters, facets, vehicle_type_catalogs)
+    results = await asyncio.gather(*(
+        run_context(scope, excluded, context_facets) for (scope, excluded), context_facets in contexts.items()
+    ))
+    return {facet: counts for result in results for facet, counts in result.items()}
+
+
+async def search_lot_rows(
+    catalog: str,
+    filters: Dict[str, Any],
+    limit: int,
+    offset: int,
+    sort_by: str,
+    sort_order: str,
+    cursor: Optional[tuple] = None,
+) -> List[LotSearch]:
+    """Строки lot_search страницы (id, source, lot_pk и ключ сортировки) в порядке shard_ordering"""
+    descending = sort_order == "desc"
+    query = LotSearch.filter(catalog=catalog, **filters)
+    if cursor is not None:
+        query = query.filter(keyset_filter(sort_by, descending, cursor))
+        offset = 0
+    return await query.order_by(*shard_ordering(sort_by, descending)).offset(offset).limit(limit).only(
+        "id", "source", "lot_pk", sort_by
+    )
+
+
+async def search_lot_page(
+    catalog: str,
+    filters: Dict[str, Any],
+    limit: int,
+    offset: int,
+    sort_by: str,
+    sort_order: str,
+    cursor: Optional[tuple] = None,
+) -> tuple[List[LotBase], Optional[str]]:
+    """
+    Страница лотов по lot_search: сортировка и пагинация по одной таблице,
+    полные записи догружаются по первичному ключу. Возвращает (лоты, next_cursor).
+    """
+    rows = await search_lot_rows(catalog, filters, limit, offset, sort_by, sort_order, cursor)
+    next_cursor = encode_cursor(getattr(rows[-1], sort_by), rows[-1].id) if len(rows) == limit else None
+    return await LotSearch.hydrate(rows), next_cursor
+
+
+def reference_facet(entities, counts: Dict[int, int]) -> List[Dict[str, Any]]:
+    """Список справочника с количеством лотов, по убыванию количества"""
+    result = []
+    for entity in entities:
+        entity_data = {
+            "id": entity.id,
+            "name": entity.name,
+            "slug": entity.slug,
+            "counter": counts.get(entity.id, 0)
+        }
+        for field in ['hex', 'description', 'letter', 'popular_counter', 'icon_path']:
+            if hasattr(entity, field):
+                entity_data[field] = getattr(entity, field)
+        result.append(entity_data)
+    return sorted(result, key=lambda x: x['counter'], reverse=True)
+
+
 async def get_filtered_lots(
     cache = None,
     full_url: Optional[str] = None,
@@ -2249,399 +2665,137 @@ async def get_filtered_lots(
     limit: int = 100,
     offset: int = 0,
     sort_by: str = "auction_date",
-    sort_order: str = "desc"
+    sort_order: str = "desc",
+    cursor: Optional[str] = None
 ) -> Dict[str, Any]:
-    auction_count = 0
-    
+    """
+    Каталог /refine: лоты, count и статистика фильтров.
+    Все фильтры, сортировка и фасеты считаются по read model lot_search.
+    """
     limit = max(1, min(limit, 100))
     sort_by = sort_by if sort_by in {
         "auction_date", "price", "year", "odometer", "created_at", "bid", "current_bid", "reserve_price"
     } else "auction_date"
     sort_order = sort_order.lower() if sort_order.lower() in {"asc", "desc"} else "desc"
-    cached_result = None
-    async with in_transaction():
-        model_type = None
-        key = f"all_active_count"
-        logger.debug(f"KEY: {key} and Vehicle Type Slug: {vehicle_type_slug}")
-        if "automobile" in vehicle_type_slug:
-            if cache:
-                # тут ещё логическая ошибка, но это отдельно
-                if base_site and ("iaai" in base_site or "copart" in base_site) and "automobile" in vehicle_type_slug:
-                    key = f"all_auction_active_count"
-                cached_result = await cache.get(key)
-
-                logger.debug(f"RESULT CACHE COUNT IN REFINED FUNCTION: {cached_result}")
-                if cached_result:
-                    cached_result = json.loads(cached_result)
-                    model_type = await get_lot_type_by_offset_and_limit(
-                        limit=limit,
-                        offset=offset,
-                        cached_result=cached_result,
-                    )
-                    logger.debug(f"model_type from cache: {model_type}")
-
-            # безопасная проверка + дефолт
-            try:
-                if not model_type or model_type not in VALIDATOR_MODEL:
-                    model_type = "Lot1"
-                logger.debug(f"Using model_type={model_type}, cls={VALIDATOR_MODEL[model_type]}")
-            except Exception as e:
-                # ВАЖНО: здесь тоже возвращаем СТРОКУ, а не класс
-                logger.error(f"Error with model_type {model_type}: {e}")
-                model_type = "Lot1"
-
-            if sort_by == "bid" or sort_by == "current_bid":
-                model_type = "Lot6"
 
-            if is_historical:
-                query = HistoricalLot.all()
-            else:
-                query = VALIDATOR_MODEL[model_type].all().filter(
-                    auction_date__gte=date.today()
-                )
-        else:
-            query = LotOtherVehicleHistorical.all() if is_historical else LotOtherVehicle.all()
-
-        exists_task = query.exists()
-        # Start all filter queries concurrently
-        filter_tasks = [
-            apply_filters(
-                query=query,
-                is_historical=is_historical,
-                language=language,
-                base_site=base_site,
-                min_year=min_year,
-                max_year=max_year,
-                min_odometer=min_odometer,
-                max_odometer=max_odometer,
-                make_slug=make_slug,
-                model_slug=model_slug,
-                vehicle_type_slug=vehicle_type_slug,
-                damage_pr_slug=damage_pr_slug,
-                damage_sec_slug=damage_sec_slug,
-                fuel_slug=fuel_slug,
-                drive_slug=drive_slug,
-                transmission_slug=transmission_slug,
-                color_slug=color_slug,
-                status_slug=status_slug,
-                body_type_slug=body_type_slug,
-                series_slug=series_slug,
-                title_slug=title_slug,
-                seller_slug=seller_slug,
-                seller_type_slug=seller_type_slug,
-                document_slug=document_slug,
-                document_old_slug=document_old_slug,
-                engine=engine,
-                engine_size=engine_size,
-                state=state,
-                is_buynow=is_buynow,
-                min_risk_index=min_risk_index,
-                max_risk_index=max_risk_index,
-                auction_date_from=auction_date_from,
-                auction_date_to=auction_date_to
-            ),
-            apply_filters(
-                query=query,
-                is_historical=is_historical,
-                language=language,
-                base_site=base_site,
-                min_year=min_year,
-                max_year=max_year,
-                min_odometer=min_odometer,
-                max_odometer=max_odometer,
-                make_slug=make_slug,
-                model_slug=model_slug,
-                vehicle_type_slug=vehicle_type_slug,
-                damage_pr_slug=damage_pr_slug,
-                damage_sec_slug=damage_sec_slug,
-                fuel_slug=fuel_slug,
-                drive_slug=drive_slug,
-                transmission_slug=transmission_slug,
-                color_slug=color_slug,
-                status_slug=status_slug,
-                body_type_slug=body_type_slug,
-                series_slug=series_slug,
-                title_slug=title_slug,
-                seller_slug=seller_slug,
-                seller_type_slug=seller_type_slug,
-                document_slug=document_slug,
-                document_old_slug=document_old_slug,
-                cylinders=cylinders,
-                engine=engine,
-                engine_size=engine_size,
-                state=state,
-                is_buynow=is_buynow,
-                auction_date_from=auction_date_from,
-                auction_date_to=auction_date_to
-            ),
-            apply_filters(
-                query=query,
-                is_historical=is_historical,
-                language=language,
-                base_site=base_site,
-                min_year=min_year,
-                max_year=max_year,
-                min_odometer=min_odometer,
-                max_odometer=max_odometer,
-                make_slug=make_slug,
-                model_slug=model_slug,
-                vehicle_type_slug=vehicle_type_slug,
-                damage_pr_slug=damage_pr_slug,
-                damage_sec_slug=damage_sec_slug,
-                fuel_slug=fuel_slug,
-                drive_slug=drive_slug,
-                transmission_slug=transmission_slug,
-                color_slug=color_slug,
-                status_slug=status_slug,
-                body_type_slug=body_type_slug,
-                series_slug=series_slug,
-                title_slug=title_slug,
-                seller_slug=seller_slug,
-                seller_type_slug=seller_type_slug,
-                document_slug=document_slug,
-                document_old_slug=document_old_slug,
-                cylinders=cylinders,
-                state=state,
-                is_buynow=is_buynow,
-                min_risk_index=min_risk_index,
-                max_risk_index=max_risk_index,
-                auction_date_from=auction_date_from,
-                auction_date_to=auction_date_to
-            ),
-            apply_filters(
-                query=query,
-                is_historical=is_historical,
-                language=language,
-                base_site=base_site,
-                min_odometer=min_odometer,
-                max_odometer=max_odometer,
-                make_slug=make_slug,
-                model_slug=model_slug,
-                vehicle_type_slug=vehicle_type_slug,
-                damage_pr_slug=damage_pr_slug,
-                damage_sec_slug=damage_sec_slug,
-                fuel_slug=fuel_slug,
-                drive_slug=drive_slug,
-                transmission_slug=transmission_slug,
-                color_slug=color_slug,
-                status_slug=status_slug,
-                body_type_slug=body_type_slug,
-                series_slug=series_slug,
-                title_slug=title_slug,
-                seller_slug=seller_slug,
-                seller_type_slug=seller_type_slug,
-                document_slug=document_slug,
-                document_old_slug=document_old_slug,
-                cylinders=cylinders,
-                engine=engine,
-                engine_size=engine_size,
-                state=state,
-                is_buynow=is_buynow,
-                min_risk_index=min_risk_index,
-                max_risk_index=max_risk_index,
-                auction_date_from=auction_date_from,
-                auction_date_to=auction_date_to
-            )
-        ]
-        logger.debug('Filtered applies')
-        # Wait for all filter tasks and exists check
-        exists, *filtered_queries = await asyncio.gather(exists_task, *filter_tasks)
-        query_to_cylinders, query_to_risk_index, query_to_engine_size, query_to_year = filtered_queries
-
-        if not exists:
-            if "automobile" not in vehicle_type_slug:
-                query = LotOtherVehicleHistorical.all() if is_historical else LotOtherVehicle.all()
-        if is_historical:
-            auction_date_filter = None
-        else:
-            auction_date_filter = auction_date_from or date.today()
-        # Apply main filters
-        filters = {k: v for k, v in {
-            "year__gte": min_year,
-            "year__lte": max_year,
-            "odometer__gte": min_odometer,
-            "vehicle_type__slug__in": vehicle_type_slug,
-            "model__slug__in": model_slug,
-            "base_site__slug__in": base_site,
-            "fuel__slug__in": fuel_slug,
-            "damage_pr__slug__in": damage_pr_slug,
-            "damage_sec__slug__in": damage_sec_slug,
-            "seller__slug__in": seller_slug,
-            "drive__slug__in": drive_slug,
-            "status__slug__in": status_slug,
-            "auction_status__slug__in": auction_status_slug,
-            "seller_type__slug__in": seller_type_slug,
-            "body_type__slug__in": body_type_slug,
-            "document__slug__in": document_slug,
-            "document_old__slug__in": document_old_slug,
-            "transmission__slug__in": transmission_slug,
-            "color__slug__in": color_slug,
-            "make__slug__in": make_slug,
-            "series__slug__in": series_slug,
-            "odometer__lte": max_odometer,
-            "cylinders": cylinders,
-            "engine": engine,
-            "engine_size": engine_size,
-            "state": state,
-            "is_buynow": is_buynow,
-            "risk_index__gte": min_risk_index,
-            "risk_index__lte": max_risk_index,
-            # TODO: Uncomment after testing
-            # "auction_date__gte": auction_date_filter,
-            # "auction_date__lte": auction_date_to,
-            "is_historical": is_historical
-        }.items() if v is not None}
-        if "automobile" in vehicle_type_slug:
-            min_od, max_od = await Lot.get_min_max_odometer_across_shards(**filters) if not is_historical else await HistoricalLot.historical_get_min_max_odometer(**filters)
-            total_count = await HistoricalLot.historical_count(**filters) if is_historical else await Lot.count_across_shards(**filters)
-            results_lots = await Lot.query_across_shards_with_limit_offset(limit=limit, offset=offset, **filters) if not is_historical else await HistoricalLot.historical_query_with_limit_offset(limit=limit, offset=offset, **filters)
-            results_lots = [await lot_to_dict(language, lot) for lot in results_lots]
-        else:
-            min_od, max_od = await LotOtherVehicle.other_vehicle_get_min_max_odometer(**filters) if not is_historical else await LotOtherVehicleHistorical.historical_other_vehicle_get_min_max_odometer(**filters)
-            total_count = await LotOtherVehicleHistorical.historical_other_vehicle_count(**filters) if is_historical else await LotOtherVehicle.other_vehicle_count(**filters)
-            results_lots = await LotOtherVehicle.other_vehicle_query_with_limit_offset(limit=limit, offset=offset, **filters) if not is_historical else await LotOtherVehicleHistorical.historical_other_vehicle_query_with_limit_offset(limit=limit, offset=offset, **filters)
-            results_lots = [await lot_to_dict(language, lot) for lot in results_lots]
-
-        query = await apply_filters(
-            query=query,
-            is_historical=is_historical,
-            language=language,
-            base_site=base_site,
-            min_year=min_year,
-            max_year=max_year,
-            min_odometer=min_odometer,
-            max_odometer=max_odometer,
-            make_slug=make_slug,
-            model_slug=model_slug,
-            vehicle_type_slug=vehicle_type_slug,
-            damage_pr_slug=damage_pr_slug,
-            damage_sec_slug=damage_sec_slug,
-            fuel_slug=fuel_slug,
-            drive_slug=drive_slug,
-            transmission_slug=transmission_slug,
-            color_slug=color_slug,
-            status_slug=status_slug,
-            body_type_slug=body_type_slug,
-            series_slug=series_slug,
-            title_slug=title_slug,
-            seller_slug=seller_slug,
-            seller_type_slug=seller_type_slug,
-            document_slug=document_slug,
-            document_old_slug=document_old_slug,
-            cylinders=cylinders,
-            engine=engine,
-            engine_size=engine_size,
-            state=state,
-            is_buynow=is_buynow,
-            min_risk_index=min_risk_index,
-            max_risk_index=max_risk_index,
-            auction_date_from=auction_date_from,
-            auction_date_to=auction_date_to
-        )
+    def as_list(value):
+        return value if value is None or isinstance(value, list) else [value]
+
+    catalog = lot_search_catalog(vehicle_type_slug, is_historical)
+    filters = LotSearch.search_filters({k: v for k, v in {
+        "year__gte": min_year,
+        "year__lte": max_year,
+        "odometer__gte": min_odometer,
+        "vehicle_type__slug__in": vehicle_type_slug,
+        "model__slug__in": model_slug,
+        "base_site__slug__in": base_site,
+        "fuel__slug__in": fuel_slug,
+        "damage_pr__slug__in": damage_pr_slug,
+        "damage_sec__slug__in": damage_sec_slug,
+        "seller__slug__in": seller_slug,
+        "drive__slug__in": drive_slug,
+        "status__slug__in": status_slug,
+        "auction_status__slug__in": auction_status_slug,
+        "seller_type__slug__in": seller_type_slug,
+        "body_type__slug__in": body_type_slug,
+        "title__slug__in": title_slug,
+        "document__slug__in": document_slug,
+        "document_old__slug__in": document_old_slug,
+        "transmission__slug__in": transmission_slug,
+        "color__slug__in": color_slug,
+        "make__slug__in": make_slug,
+        "series__slug__in": series_slug,
+        "odometer__lte": max_odometer,
+        "cylinders__in": as_list(cylinders),
+        "engine__in": as_list(engine),
+        "engine_size__in": as_list(engine_size),
+        "state__in": as_list(state),
+        "is_buynow": is_buynow,
+        "risk_index__gte": min_risk_index,
+        "risk_index__lte": max_risk_index,
+        # TODO: Uncomment after testing
+        # "auction_date__gte": auction_date_filter,
+        # "auction_date__lte": auction_date_to,
+        "is_historical": is_historical
+    }.items() if v is not None})
+
+    # Каталоги того же состояния аукциона — для счетчиков по типам ТС
+    state_catalogs = [lot_search_catalog(["automobile"], is_historical), lot_search_catalog(None, is_historical)]
+
+    vehicle_types, makes = await asyncio.gather(
+        VehicleType.all(),
+        Make.filter(vehicle_type__slug__in=vehicle_type_slug) if vehicle_type_slug else asyncio.sleep(0, []),
+    )
+    facets = ["make", "vehicle_type", "year", "engine_size", "cylinders", *REFINE_REFERENCE_FACETS]
+    if make_slug:
+        facets += ["model", "series"]
+    (lots, next_cursor), facet_counts = await asyncio.gather(
+        search_lot_page(catalog, filters, limit, offset, sort_by, sort_order, decode_cursor(cursor)),
+        search_lot_facets(catalog, filters, facets, state_catalogs),
+    )
+    totals = facet_counts["totals"]
+    results_lots = [await lot_to_dict(language, lot) for lot in lots]
 
-        has_results = await query.exists()
-        if not has_results:
-            if cache:
-                cached_result = await cache.get(f"{settings.CACHE_KEY}{offset}{language}{'history' if is_historical else 'active'}")
-                if cached_result:
-                    try:
-                        result_dict = json.loads(cached_result)
-                        return result_dict
-                    except Exception as e:
-                        logger.error(f"Error decoding cached result: {e}")
+    stats: Dict[str, Any] = {"make": reference_facet(makes, facet_counts["make"])}
 
-        order_by = f"-{sort_by}" if sort_order == "desc" else sort_by
-        query = query.order_by(order_by)
+    if make_slug:
+        make_models = await Model.filter(make__slug__in=make_slug)
+        series = await Series.filter(model_id__in=[m.id for m in make_models])
+        stats["model"] = reference_facet(make_models, facet_counts["model"])
+        stats["series"] = reference_facet(series, facet_counts["series"])
 
-        # Prepare all async tasks
-        vehicle_type_ids_task = VehicleType.filter(slug__in=vehicle_type_slug).values_list("id", flat=True) if vehicle_type_slug else asyncio.sleep(0)
-        make_ids_task = Make.filter(slug__in=make_slug).values_list("id", flat=True) if make_slug else asyncio.sleep(0)
-        
-        # Gather core tasks
-        vehicle_type_ids, make_ids = await asyncio.gather(vehicle_type_ids_task, make_ids_task)
-        
-        stats_task = get_filter_stats(language, query, vehicle_type_ids)
-        series_model_stats_task = get_model_series_stats(query, make_ids) if make_slug else asyncio.sleep(0)
-        
-        stats, series_model_stats = await asyncio.gather(
-            stats_task,
-            series_model_stats_task
-        )
+    # Список всех моделей и их ключей
+    models = {
+        "color": Color,
+        "body_type": BodyType,
+        "fuel": Fuel,
+        "transmission": Transmission,
+        "seller_type": SellerType,
+        "document": Document,
+        "status": Status,
+        "auction_status": AuctionStatus,
+        "damage_pr": DamagePrimary,
+        "damage_sec": DamageSecondary,
+        "drive": Drive,
+        "base_site": BaseSite
+    }
 
-        # Process translations for vehicle types
-        auto_stat = await get_relation_stats(query if await check_filter_exists(query, "vehicle_type") else query.model.all(), "vehicle_type")
-        for vehicle_type in auto_stat:
-            translated_value = await get_translation(
-                field_name="vehicle_type", 
-                original_value=vehicle_type['slug'], 
-                language=language
-                )
-            if translated_value:
-                vehicle_type['name'] = translated_value
-
-        if series_model_stats:
-            stats.update(series_model_stats)
-
-        # Список всех моделей и их ключей
-        models = {
-            "color": Color,
-            "body_type": BodyType,
-            "fuel": Fuel,
-            "transmission": Transmission,
-            "seller_type": SellerType,
-            "document": Document,
-            "status": Status,
-            "auction_status": AuctionStatus,
-            "damage_pr": DamagePrimary,
-            "damage_sec": DamageSecondary,
-            "drive": Drive,
-            "base_site": BaseSite
-        }
+    # Параллельная выборка всех данных
+    fetched_data = await asyncio.gather(*(model.all() for model in models.values()))
+    add_stats = {
+        key: [dict(obj, counter=facet_counts[key].get(obj.id, 0)) for obj in data]
+        for key, data in zip(models.keys(), fetched_data)
+    }
 
-        # Параллельная выборка всех данных
-        fetched_data = await asyncio.gather(*(model.all() for model in models.values()))
-        add_stats = {
-            key: [dict(obj) for obj in data] for key, data in zip(models.keys(), fetched_data)
-        }
+    # Собираем все переводы в кучу
+    translation_tasks = []
+    slug_map = []
 
-        # Собираем все переводы в кучу
-        translation_tasks = []
-        slug_map = []
+    for rel, data in add_stats.items():
+        for item in data:
+            slug = item["slug"]
+            translation_tasks.append(get_translation(field_name=rel, original_value=slug, language=language))
+            slug_map.append((rel, item))
 
-        for rel, data in add_stats.items():
-            for item in data:
-                slug = item["slug"]
-                translation_tasks.append(get_translation(field_name=rel, original_value=slug, language=language))
-                slug_map.append((rel, item))
+    # Получаем переводы параллельно
+    translations = await asyncio.gather(*translation_tasks)
 
-        # Получаем переводы параллельно
-        translations = await asyncio.gather(*translation_tasks)
+    # Обновляем имена
+    for (rel, item), translated_value in zip(slug_map, translations):
+        if translated_value:
+            item["name"] = translated_value
 
-        # Обновляем имена
-        for (rel, item), translated_value in zip(slug_map, translations):
-            if translated_value:
-                item["name"] = translated_value
+    # Обновляем финальный словарь
+    stats.update(add_stats)
 
-        # Обновляем финальный словарь
-        stats.update(add_stats)
-        
-        # Run all basic stats in parallel
-        basic_stats = await asyncio.gather(
-            get_flat_stats(query_to_year, "year"),
-            get_range_stats(query_to_risk_index, "risk_index", 25),
-            get_flat_stats(query_to_engine_size, "engine_size"),
-            get_flat_stats(query_to_cylinders, "cylinders"),
-        )
-        stats.update({
-            "year": basic_stats[0],
-            "risk_index": basic_stats[1],
-            "engine_size": basic_stats[2],
-            "cylinders": basic_stats[3],
-        })
+    stats.update({
+        "year": {str(value): count for value, count in facet_counts["year"].items()},
+        "risk_index": facet_counts["risk_index"],
+        "engine_size": {str(value): count for value, count in facet_counts["engine_size"].items()},
+        "cylinders": {str(value): count for value, count in facet_counts["cylinders"].items()},
+    })
 
     # Final vehicle type stats
-    # query = HistoricalLot.all() if is_historical else VALIDATOR_MODEL[f'{model_type}'].all() if model_type else Lot1.all()
-    vehicle_types = await VehicleType.all()
     auto_stat = []
     for vt in vehicle_types:
         if vt.slug == "other":
@@ -2654,7 +2808,7 @@ async def get_filtered_lots(
             "icon_path": vt.icon_path,
             "icon_active": vt.icon_active,
             "icon_disable": vt.icon_disable,
-            "counter": total_count
+            "counter": facet_counts["vehicle_type"].get(vt.id, 0)
         }
 
         translated_value = await get_translation(
@@ -2680,31 +2834,17 @@ async def get_filtered_lots(
     stats["document"] = [drive for drive in stats["document"] if drive["slug"] != "unknown"]
     stats["vehicle_type"] = [drive for drive in stats["vehicle_type"] if drive["slug"] != "unknown"]
     stats['odometer'] = {
-            "min_val": min_od,
-            "max_val": max_od
+            "min_val": totals["odometer_min"],
+            "max_val": totals["odometer_max"]
         }
     # Filter body types based on vehicle type
-    vehicle_types = {
-        "automobile": ["sedan", "coupe", "pickup", "suv", "cabrio", "hatchback", "limousine", "cabrio", "wagon", "van", "roadster", "liftback", "hearse"],
-        "motorcycle": ["bike", "sport_bike", "roadster_bike", "enduro_bike"],
-        "bus": ["bus"],
-        "atv": [],
-        "watercraft": [],
-        "jet_sky": [],
-        "boat": [],
-        "trailers": ["furgon"],
-        "mobile_home": [],
-        "emergency_equipment": ["fire_truck"],
-        "industrial_equipment": ["industrial"],
-        "truck": ["truck"],
-        "other": ["other"]
-    }
-    if vehicle_type_slug and vehicle_type_slug[0] in vehicle_types:
-        vt_list = vehicle_types[vehicle_type_slug[0]]
+    if vehicle_type_slug and vehicle_type_slug[0] in VEHICLE_TYPE_BODY_TYPES:
+        vt_list = VEHICLE_TYPE_BODY_TYPES[vehicle_type_slug[0]]
         stats["body_type"] = [vt for vt in stats["body_type"] if vt["slug"] in vt_list]
     result = {
         "lots": results_lots,
-        "count": total_count,
+        "count": totals["count"],
+        "next_cursor": next_cursor,
         "stats": stats
     }
     key = f"{full_url}"
@@ -2939,8 +3079,18 @@ async def get_lots_with_pagination(language, query, offset: int, limit: int) ->
     return [await lot_to_dict(language, lot) for lot in lot_objects]
 
 
-async def lot_to_dict(language, lot) -> Dict:
-    """Преобразует объект Lot в словарь"""
+LOT_RELATED_FIELDS = [
+    "make", "model", "vehicle_type", "damage_pr", "damage_sec",
+    "fuel", "drive", "transmission", "color", "status", "body_type",
+    "series", "base_site", "seller", "seller_type", "document", "document_old", "title"
+]
+
+
+def lot_to_neutral_dict(lot) -> Dict:
+    """
+    Преобразует объект Lot в словарь без перевода: *_name — исходные имена справочников.
+    Такой словарь можно кэшировать один раз для всех языков и переводить через localize_lot.
+    """
     result = {
         "id": lot.id,
         "lot_id": lot.lot_id,
@@ -2970,25 +3120,10 @@ async def lot_to_dict(language, lot) -> Dict:
     }
     
     # Добавляем связанные поля
-    related_fields = [
-        "make", "model", "vehicle_type", "damage_pr", "damage_sec",
-        "fuel", "drive", "transmission", "color", "status", "body_type",
-        "series", "base_site", "seller", "seller_type", "document", "document_old", "title"
-    ]
-    
-    for field in related_fields:
+    for field in LOT_RELATED_FIELDS:
         related_obj = getattr(lot, field)
         if related_obj:
-            translated_value = await get_translation(
-                field_name=field, 
-                original_value=related_obj.slug, 
-                language=language
-            )
-            if translated_value:
-                result[f"{field}_name"] = translated_value
-            else:
-                result[f"{field}_name"] = related_obj.name
-
+            result[f"{field}_name"] = related_obj.name
             result[f"{field}_slug"] = related_obj.slug
 
             if field == "color" and hasattr(related_obj, "hex"):
@@ -3010,11 +3145,7 @@ async def lot_to_dict(language, lot) -> Dict:
     # COPART — фильтрация HD фоток
     # ============================
     try:
-        base_site_slug = result.get("base_site_slug")
-        if not base_site_slug and getattr(lot, "base_site", None) is not None:
-            base_site_slug = getattr(lot.base_site, "slug", None)
-
-        if base_site_slug == "copart":
+        if result.get("base_site_slug") == "copart":
             result["link_img_hd"] = filter_copart_hd_images(result.get("link_img_hd"))
     except Exception as e:
         print("ERROR processing copart HD images in lot_to_dict:", e)
@@ -3022,312 +3153,60 @@ async def lot_to_dict(language, lot) -> Dict:
     return result
 
 
-async def get_all_lot_ids(query) -> List[Dict[str, int]]:
-    """Получает только id лотов (без prefetch и to_dict)"""
-    return await query.only("id").values("id")
-
-
-async def get_additional_filter_stats(query, applied_filters=None):
-    """
-    Получает расширенную статистику по лотам, исключая фильтрацию по самим анализируемым полям,
-    но учитывая все остальные фильтры.
-    
-    Args:
-        query: Базовый QuerySet с примененными фильтрами
-        applied_filters: Словарь с примененными фильтрами
-        
-    Returns:
-        Словарь с статистикой по всем важным полям
-    """
-    if applied_filters is None:
-        applied_filters = {}
-
-    stats = {}
-    
-    # Поля, для которых нужно показать все варианты (исключая их собственную фильтрацию)
-    stat_fields = [
-        "body_type", "color", "fuel", "transmission",
-        "seller_type", "document", "status", "auction_status",
-        "damage_pr", "damage_sec", "drive", "base_site"
-    ]
-    
-    # 1. Создаем новый запрос, сохраняя все фильтры кроме относящихся к stat_fields
-    model = query.model
-    stats_query = model.all()
-    # Маппинг названий фильтров на поля запроса
-    FILTER_MAPPING = {
-        'make_slug': 'make__slug__in',
-        'model_slug': 'model__slug__in',
-        'vehicle_type_slug': 'vehicle_type__slug__in',
-        'damage_pr_slug': 'damage_pr__slug__in',
-        'damage_sec_slug': 'damage_sec__slug__in',
-        'fuel_slug': 'fuel__slug__in',
-        'drive_slug': 'drive__slug__in',
-        'transmission_slug': 'transmission__slug__in',
-        'color_slug': 'color__slug__in',
-        'status_slug': 'status__slug__in',
-        'body_type_slug': 'body_type__slug__in',
-        'series_slug': 'series__slug__in',
-        'title_slug': 'title__slug__in',
-        'seller_slug': 'seller__slug__in',
-        'seller_type_slug': 'seller_type__slug__in',
-        'document_slug': 'document__slug__in',
-        'document_old_slug': 'document_old__slug__in',
-        'base_site': 'base_site__in',
-        'state': 'state__in',
-        'cylinders': 'cylinders__in',
-        'engine': 'engine__in',
-        'engine_size': 'engine_size__in'
-    }
-    
-    # 2. Применяем фильтры из query._filter_kwargs
-    if hasattr(query, '_filter_kwargs'):
-        for key, value in query._filter_kwargs.items():
-            field = key.split('__')[0]  # Извлекаем базовое имя поля
-            if field not in stat_fields:
-                stats_query = stats_query.filter(**{key: value})
-    
-    # 3. Применяем фильтры из applied_filters
-    for filter_key, filter_value in applied_filters.items():
-        if filter_value is None:
+async def localize_lot(language, data: Dict) -> Dict:
+    """Переводит *_name нейтрального словаря лота на язык запроса (возвращает копию)"""
+    result = dict(data)
+    for field in LOT_RELATED_FIELDS:
+        slug = result.get(f"{field}_slug")
+        if not slug:
             continue
-            
-        # Пропускаем фильтры по stat_fields
-        field = filter_key.replace('_slug', '')
-        if field in stat_fields:
-            continue
-            
-        # Получаем правильное имя поля для фильтрации
-        filter_field = FILTER_MAPPING.get(filter_key, f"{filter_key}__in")
-        
-        # Применяем фильтр с учетом типа значения
-        if isinstance(filter_value, (list, tuple)):
-            stats_query = stats_query.filter(**{filter_field: filter_value})
-        else:
-            stats_query = stats_query.filter(**{filter_field: [filter_value]})
-    
-    # 4. Применяем числовые фильтры и фильтры по датам
-    numeric_filters = {
-        'year': ('year__gte', 'year__lte'),
-        'odometer': ('odometer__gte', 'odometer__lte'),
-        'risk_index': ('risk_index__gte', 'risk_index__lte')
-    }
-    
-    for field, (min_key, max_key) in numeric_filters.items():
-        if min_key in applied_filters:
-            stats_query = stats_query.filter(**{min_key: applied_filters[min_key]})
-        if max_key in applied_filters:
-            stats_query = stats_query.filter(**{max_key: applied_filters[max_key]})
-    
-    if 'auction_date_from' in applied_filters:
-        stats_query = stats_query.filter(auction_date__gte=applied_filters['auction_date_from'])
-    if 'auction_date_to' in applied_filters:
-        stats_query = stats_query.filter(auction_date__lte=applied_filters['auction_date_to'])
-    
-    if 'is_buynow' in applied_filters:
-        stats_query = stats_query.filter(is_buynow=applied_filters['is_buynow'])
-    # 5. Получаем статистику по всем stat_fields
-    try:
-        field_stats = await asyncio.gather(
-            *[get_relation_stats(stats_query, field) for field in stat_fields]
-        )
-    except Exception as e:
-        logger.error(f"Error gathering field stats: {str(e)}")
-        field_stats = [[] for _ in stat_fields]
-    
-    # 6. Базовые статистики считаем по исходному запросу
-    try:
-        basic_stats = await asyncio.gather(
-            get_flat_stats(query, "year"),
-            get_odometer_min_max(query),
-            get_range_stats(query, "risk_index", 25),
-            get_flat_stats(query, "engine_size"),
-            get_flat_stats(query, "cylinders"),
-        )
-    except Exception as e:
-        logger.error(f"Error gathering basic stats: {str(e)}")
-        basic_stats = [{}, {}, {}, {}, {}]
-    
-    # 7. Формируем итоговый результат
-    stats.update({
-        "year": basic_stats[0],
-        "odometer": basic_stats[1],
-        "risk_index": basic_stats[2],
-        "engine_size": basic_stats[3],
-        "cylinders": basic_stats[4],
-        **dict(zip(stat_fields, field_stats))
-    })
-    return stats
-
-
-async def get_model_series_stats(query, make_ids):
-    try:
-        stats = {}
-        lot_ids = await query.values_list("id", flat=True)
-        
-        # Получаем все модели для выбранных марок
-        models = await Model.filter(make_id__in=make_ids).all()
-        model_ids = [m.id for m in models]
-        
-        # Получаем все серии для выбранных моделей
-        series = await Series.filter(model_id__in=model_ids).all()
-        series_ids = [s.id for s in series]
-
-        model_stats, series_stats = await asyncio.gather(
-            get_relation_stats_for_entities("model", model_ids, models, lot_ids),
-            get_relation_stats_for_entities("series", series_ids, series, lot_ids),
+        translated_value = await get_translation(
+            field_name=field, 
+            original_value=slug, 
+            language=language
         )
-        
-        stats.update({
-            "model": model_stats,
-            "series": series_stats
-        })
-        return stats
-    except Exception as e:
-        logger.error(f'Error in getting stats to models and series {e}')
-
-
-async def get_make_stats(query, vehicle_type_ids):
-    try:
-        lot_ids = await query.values_list("id", flat=True)
-        
-        # Получаем все модели для выбранных марок
-        makes = await Make.filter(vehicle_type_id__in=vehicle_type_ids).all()
-        make_ids = [m.id for m in makes]
+        if translated_value:
+            result[f"{field}_name"] = translated_value
+    return result
 
-        make_stats = await get_relation_stats_for_entities("make", make_ids, makes, lot_ids)
-        
-        return make_stats
-    except Exception as e:
-        logger.error(f'Error in getting stats to models and series {e}')
 
+async def localize_stats(language, stats: Dict) -> Dict:
+    """Переводит имена в списках статистики фильтров ({slug, name}) на язык запроса"""
+    result = {}
+    for field, items in stats.items():
+        if isinstance(items, list) and items and isinstance(items[0], dict) and "slug" in items[0]:
+            localized = []
+            for item in items:
+                item = dict(item)
+                translated_value = await get_translation(
+                    field_name=field,
+                    original_value=item["slug"],
+                    language=language
+                ) if item.get("slug") else None
+                if translated_value:
+                    item["name"] = translated_value
+                localized.append(item)
+            result[field] = localized
+        else:
+            result[field] = items
+    return result
 
-async def get_relation_stats_for_entities(entity_type: str, entity_ids: List[int], entities: List[Any], lot_ids: List[int]) -> List[Dict[str, Any]]:
-    try:
-        if not entities:
-            return []
 
-        # Получаем статистику по лотам
-        stats = await get_entity_stats_from_lots(entity_type, entity_ids, lot_ids)
-        
-        # Собираем полную информацию
-        result = []
-        for entity in entities:
-            entity_data = {
-                "id": entity.id,
-                "name": entity.name,
-                "slug": entity.slug,
-                "counter": stats.get(entity.id, 0)
-            }
-            # Добавляем дополнительные поля, если они есть
-            for field in ['hex', 'description', 'letter', 'popular_counter', 'icon_path']:
-                if hasattr(entity, field):
-                    entity_data[field] = getattr(entity, field)
-            
-            result.append(entity_data)
-        
-        # Сортируем по количеству (по убыванию)
-        return sorted(result, key=lambda x: x['counter'], reverse=True)
+async def lot_to_dict(language, lot) -> Dict:
+    """Преобразует объект Lot в словарь"""
+    return await localize_lot(language, lot_to_neutral_dict(lot))
 
-    except Exception as e:
-        logger.error(f"Error processing {entity_type} stats: {str(e)}", exc_info=True)
-        return []
 
-async def get_entity_stats_from_lots(entity_type: str, entity_ids: List[int], lot_ids: List[int]) -> Dict[int, int]:
-    try:
-        if not entity_ids or not lot_ids:
-            return {}
-
-        table_name = "lot"  # предполагаем, что таблица называется lot
-        related_field = f"{entity_type}_id"
-
-        lot_ids_str = ", ".join(map(str, lot_ids))
-        entity_ids_str = ", ".join(map(str, entity_ids))
-
-        sql = f"""
-        SELECT 
-            {related_field} as entity_id, 
-            COUNT(id) as counter
-        FROM 
-            {table_name}
-        WHERE 
-            id IN ({lot_ids_str}) 
-            AND {related_field} IN ({entity_ids_str})
-            AND {related_field} IS NOT NULL
-        GROUP BY 
-            {related_field}
-        """
-
-        conn = Tortoise.get_connection("default")
-        results = await conn.execute_query_dict(sql)
-        
-        return {row['entity_id']: row['counter'] for row in results}
+async def get_all_lot_ids(query) -> List[Dict[str, int]]:
+    """Получает только id лотов (без prefetch и to_dict)"""
+    return await query.only("id").values("id")
 
-    except Exception as e:
-        logger.error(f"Error getting {entity_type} stats from lots: {str(e)}", exc_info=True)
-        return {}
 
-async def get_filter_stats(language, query, vehicle_type_ids) -> Dict[str, Any]:
-    """Optimized statistics with safe batch processing for large datasets"""
-    try:
-        stats = {}
-        try:
-            async with asyncio.timeout(180):
-                model = query.model
+async def get_vehicle_type_counters() -> Dict[int, int]:
+    """Количество лотов Lot1..Lot7 по vehicle_type_id одним UNION ALL запросом"""
+    buckets = await Lot.aggregate_across_shards(group_by="vehicle_type_id")
+    return {bucket["vehicle_type_id"]: bucket["count"] for bucket in buckets}
 
-                # 1. Получаем статистики vehicle_type и make
-                make_stats = await get_make_stats(query, vehicle_type_ids)
-                vehicle_types = await VehicleType.all()
-                result = []
-                
-                for vt in vehicle_types:
-                    if vt.slug == "other":
-                        continue  # исключаем 'other'
-                    
-                    count = (
-                        await Lot1.filter(vehicle_type=vt).count() +
-                        await Lot2.filter(vehicle_type=vt).count() +
-                        await Lot3.filter(vehicle_type=vt).count() +
-                        await Lot4.filter(vehicle_type=vt).count() +
-                        await Lot5.filter(vehicle_type=vt).count() +
-                        await Lot6.filter(vehicle_type=vt).count() +
-                        await Lot7.filter(vehicle_type=vt).count()
-                    )
-
-                    item = {
-                        "id": vt.id,
-                        "name": vt.name,
-                        "slug": vt.slug,
-                        "icon_path": vt.icon_path,
-                        "icon_active": vt.icon_active,
-                        "icon_disable": vt.icon_disable,
-                        "counter": count
-                    }
-
-                    translated_value = await get_translation(
-                        field_name="vehicle_type", 
-                        original_value=vt.slug, 
-                        language=language
-                    )
-                    if translated_value:
-                        item["name"] = translated_value
-
-                    result.append(item)
-                
-                # Сортируем по убыванию количества
-                result.sort(key=lambda x: x['counter'], reverse=True)
-                stats.update({
-                    "vehicle_type": result,
-                    "make": make_stats
-                })
-                
-        except asyncio.TimeoutError:
-            logger.warning("Timeout while getting stats, returning partial results")
-        return stats
-    except Exception as e:
-        logger.error(f"Error in get_filter_stats: {str(e)}", exc_info=True)
-        return {}
-    
 
 async def check_filter_exists(query, field: str, applied_filters: Dict = None) -> bool:
     """Точная проверка применённых фильтров через анализ параметров запроса"""
@@ -3359,187 +3238,6 @@ async def check_filter_exists(query, field: str, applied_filters: Dict = None) -
         return False
 
 
-async def get_flat_stats(query, field: str) -> Dict[str, int]:
-    """Статистика по плоским полям с пакетной обработкой"""
-    try:
-        batch_size = 10000
-        stats = {}
-        offset = 0
-        
-        while True:
-            batch = await query.offset(offset).limit(batch_size).values_list(field, flat=True)
-            if not batch:
-                break
-                
-            for value in batch:
-                if value is not None:
-                    stats[str(value)] = stats.get(str(value), 0) + 1
-            
-            offset += batch_size
-        
-        return stats
-    except Exception as e:
-        logger.error(f"Error in get_flat_stats for {field}: {str(e)}")
-        return {}
-
-
-async def get_relation_stats(query, relation: str) -> List[Dict[str, Any]]:
-    """Optimized relation stats with dynamic extra field support."""
-    try:
-        model = query.model
-        field = model._meta.fields_map.get(relation)
-        
-        if not field:
-            logger.warning(f"Relation {relation} not found in model {model.__name__}")
-            return []
-
-        related_model = getattr(field, 'related_model', getattr(field, 'model_class', None))
-        if not related_model:
-            logger.warning(f"No related model for {relation} in {model.__name__}")
-            return []
-
-        # Base fields that are always expected
-        base_fields = ['id', 'name', 'slug']
-        optional_fields = ['hex', 'description', 'letter', 'popular_counter', 'icon_path', 'icon_disable', 'icon_active']
-
-        # Determine which optional fields are present in the related model
-        all_fields = related_model._meta.fields
-        selected_fields = base_fields + [f for f in optional_fields if f in all_fields]
-
-        select_clause = ", ".join([f"r.{f}" for f in selected_fields] + ["COUNT(l.id) as counter"])
-        group_by_clause = ", ".join([f"r.{f}" for f in selected_fields])
-
-        # Table names and join field
-        table_name = model._meta.db_table
-        related_table = related_model._meta.db_table
-        related_field = f"{relation}_id"
-
-        sql = f"""
-        WITH filtered_lots AS (
-            SELECT id, {related_field}
-            FROM {table_name}
-            WHERE {related_field} IS NOT NULL
-        )
-        SELECT 
-            {select_clause}
-        FROM 
-            filtered_lots l
-        JOIN 
-            {related_table} r ON l.{related_field} = r.id
-        GROUP BY 
-            {group_by_clause}
-        ORDER BY 
-            counter DESC
-        """
-
-        conn = Tortoise.get_connection("default")
-        results = await conn.execute_query_dict(sql)
-
-        return [
-            {field: row[field] for field in selected_fields if field in row} | {"counter": row["counter"]}
-            for row in results
-        ]
-
-    except Exception as e:
-        logger.error(f"Error processing {relation} stats: {str(e)}", exc_info=True)
-        return []
-
-
-async def get_odometer_min_max(query) -> Dict[str, float]:
-    """Retrieve the min and max odometer values"""
-    try:
-        # First get the filtered IDs
-        ids = await query.values_list('id', flat=True)
-        if not ids:
-            return {}
-
-        # Use parameterized query to get min and max odometer values
-        sql = """
-        SELECT 
-            MIN(odometer) as min_val,
-            MAX(odometer) as max_val
-        FROM lot  -- Correctly reference the table name
-        WHERE id = ANY($1::bigint[])
-        """
-        
-        conn = Tortoise.get_connection("default")
-        result = await conn.execute_query(sql, [list(ids)])
-        
-        if not result or not result[1] or result[1][0]['min_val'] is None:
-            return {}
-
-        min_val = result[1][0]['min_val']
-        max_val = result[1][0]['max_val']
-        
-        return {
-            "min_val": min_val,
-            "max_val": max_val
-        }
-    except Exception as e:
-        logger.error(f"Error in get_odometer_min_max: {str(e)}")
-        return {}
-
-
-async def get_range_stats(query, field: str, step: Union[int, float] = None) -> Dict[str, int]:
-    """Статистика по risk_index с группировкой в 3 категории"""
-    
-    try:
-        # Если поле не risk_index, используем старую логику
-        if field != "risk_index":
-            return await get_default_range_stats(query, field, step or 25)
-            
-        # Получаем количество в каждой категории
-        low_count = await query.filter(risk_index__lt=50).count()
-        medium_count = await query.filter(risk_index__gte=50, risk_index__lt=75).count()
-        high_count = await query.filter(risk_index__gte=75).count()
-        
-        return {
-            "low": low_count,
-            "medium": medium_count,
-            "high": high_count
-        }
-        
-    except Exception as e:
-        logger.error(f"Error in get_range_stats for {field}: {str(e)}")
-        return {}
-
-async def get_default_range_stats(query, field: str, step: Union[int, float]) -> Dict[str, int]:
-    """Оригинальная логика для других полей"""
-    try:
-        # Получаем min и max значения
-        min_max = await query.annotate(
-            min_val=functions.Min(field),
-            max_val=functions.Max(field)
-        ).first()
-        
-        if not min_max or min_max.min_val is None:
-            return {}
-
-        min_val = min_max.min_val
-        max_val = min_max.max_val
-        
-        # Оптимизируем шаг если диапазон слишком большой
-        if (max_val - min_val) / step > 100:
-            step = (max_val - min_val) / 20
-            
-        counts = {}
-        current = min_val
-        
-        while current <= max_val:
-            next_val = current + step
-            count = await query.filter(
-                **{f"{field}__gte": current, f"{field}__lt": next_val}
-            ).count()
-            if count > 0:
-                counts[f"{current:.2f}-{next_val:.2f}"] = count
-            current = next_val
-
-        return counts
-    except Exception as e:
-        logger.error(f"Error in get_default_range_stats for {field}: {str(e)}")
-        return {}
-
-
 def empty_response() -> Dict:
     """Возвращает пустой ответ"""
     return {
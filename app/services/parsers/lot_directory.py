@@ -0,0 +1,17 @@
+from app.models import LotDirectory
+from loguru import logger
+from app.database import init_db, close_db
+import asyncio
+
+
+async def main():
+    logger.info('Starting lot_directory rebuild')
+    await init_db()
+    try:
+        await LotDirectory.rebuild()
+    finally:
+        await close_db()
+    logger.info('lot_directory rebuild completed')
+
+if __name__ == "__main__":
+    asyncio.run(main())
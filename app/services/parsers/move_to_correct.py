@@ -1,101 +1,130 @@
 from datetime import datetime
-from app.models import (Lot, Lot1, Lot2, Lot3, HistoricalLot, LotBase, LotHistoryAddons, LotOtherVehicle,
-                        LotWithouImage, LotWithoutAuctionDate, LotOtherVehicleHistorical,
-                        Lot4, Lot5, Lot6, Lot7)
+from app.models import (Lot, HistoricalLot, LotBase, LotOtherVehicle,
+                        LotWithouImage, LotWithoutAuctionDate, LotOtherVehicleHistorical, VehicleType)
+from tortoise.expressions import Case, Q, When
+from tortoise.functions import Length
 from tortoise.transactions import in_transaction
-from typing import List, Optional
+from typing import Dict, List, Optional
 from loguru import logger
 from app.database import init_db, close_db
-from app.services.lot_service import delete_lot
+from app.services.watchlist_service import HISTORY_MODELS, moved_to_history
+from app.services.kafka.watchlist import notify_lots_changes
 
 # Configuration for pagination
-BATCH_SIZE = 100
-
-async def fetch_lots_batch(offset: int, model: type[LotBase]) -> List[LotBase]:
-    """Fetch a batch of data with pagination from specified model."""
-    query = model.all().offset(offset).limit(BATCH_SIZE).prefetch_related(
-        "vehicle_type",
-        *model._meta.fk_fields,
-        *model._meta.m2m_fields
+BATCH_SIZE = 1000
+
+TARGET_MODELS = {
+    model.__name__: model
+    for model in (LotWithoutAuctionDate, HistoricalLot, LotOtherVehicle, LotWithouImage, LotOtherVehicleHistorical)
+}
+
+
+def target_model_case(automobile_id: Optional[int]) -> Case:
+    """
+    Правила get_target_model в SQL: имя целевой таблицы или NULL, если лот остается на месте.
+    Порядок веток тот же: нет даты -> прошедший аукцион -> прочая техника -> нет изображения
+    """
+    other_vehicle = ~Q(vehicle_type_id=automobile_id) if automobile_id is not None else Q(id__isnull=False)
+    passed = Q(auction_date__lt=datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+    return Case(
+        When(auction_date__isnull=True, then=LotWithoutAuctionDate.__name__),
+        When(passed & other_vehicle, then=LotOtherVehicleHistorical.__name__),
+        When(passed, then=HistoricalLot.__name__),
+        When(other_vehicle, then=LotOtherVehicle.__name__),
+        When(Q(image_thubnail__isnull=True) | Q(thumbnail_length__lt=5), then=LotWithouImage.__name__),
+        default=None,
     )
-    return await query
-
-async def should_move_to_historical(lot: LotBase) -> bool:
-    """Determine if a lot should be moved to historical based on auction date."""
-    if not lot.auction_date:
-        return False
-    return lot.auction_date < datetime.now().date()
-
-async def get_target_model(lot: LotBase) -> Optional[type[LotBase]]:
-    """Determine the target model for lot movement."""
-    if not lot.auction_date:
-        return LotWithoutAuctionDate
-    elif should_move_to_historical(lot):
-        if lot.vehicle_type.slug != 'automobile':
-            return LotOtherVehicleHistorical
-        else:
-            return HistoricalLot
-    elif lot.vehicle_type.slug != 'automobile':
-        return LotOtherVehicle
-    elif not lot.image_thubnail or len(lot.image_thubnail) < 5:
-        return LotWithouImage
-    return None
-
-async def process_lot(lot: LotBase) -> bool:
-    """Process a single lot: move to appropriate table and delete original."""
+
+
+async def fetch_moves_batch(model: type[LotBase], target_case: Case, last_id: int) -> List[tuple[int, str]]:
+    """Следующая пачка (id, целевая таблица) лотов, которые нужно перенести (keyset по id)"""
+    return await model.filter(id__gt=last_id).annotate(
+        thumbnail_length=Length("image_thubnail")
+    ).annotate(target=target_case).filter(target__isnull=False).order_by("id").limit(BATCH_SIZE).values_list(
+        "id", "target"
+    )
+
+
+async def move_batch(model: type[LotBase], batch: List[tuple[int, str]]) -> int:
+    """Переносит пачку одной транзакцией; при ошибке (например, конфликт lot_id) — по одному лоту"""
+    ids_by_target: Dict[str, List[int]] = {}
+    for lot_pk, target in batch:
+        ids_by_target.setdefault(target, []).append(lot_pk)
+
     try:
-        target_model = await get_target_model(lot)
-        if not target_model:
-            return False
-            
-        logger.debug(f"Moving lot {lot.id} from {lot.__class__.__name__} to {target_model.__name__}")
-        await lot.move_to(lot.id, target_model)
-        await delete_lot(lot_id=lot.lot_id)
-        return True
-        
+        async with in_transaction():
+            moved = 0
+            for target, ids in ids_by_target.items():
+                moved += await model.move_many(ids, TARGET_MODELS[target])
+        await notify_moved_to_history(ids_by_target)
+        return moved
     except Exception as e:
-        logger.error(f"Error processing lot {lot.id}: {str(e)}")
-        return False
+        logger.warning(f"Batch move from {model.__name__} failed, moving lots one by one: {str(e)}")
 
-async def process_shard(model: type[LotBase]) -> tuple[int, int]:
+    moved = 0
+    moved_by_target: Dict[str, List[int]] = {}
+    for target, ids in ids_by_target.items():
+        for lot_pk in ids:
+            try:
+                if await model.move_many([lot_pk], TARGET_MODELS[target]):
+                    moved += 1
+                    moved_by_target.setdefault(target, []).append(lot_pk)
+            except Exception as e:
+                logger.error(f"Error processing lot {lot_pk}: {str(e)}")
+    await notify_moved_to_history(moved_by_target)
+    return moved
+
+
+async def notify_moved_to_history(ids_by_target: Dict[str, List[int]]) -> None:
+    """Уведомляет наблюдателей лотов, перенесенных в таблицы завершенных аукционов"""
+    changes = {
+        lot_pk: moved_to_history()
+        for target, ids in ids_by_target.items() if TARGET_MODELS[target] in HISTORY_MODELS
+        for lot_pk in ids
+    }
+    try:
+        await notify_lots_changes(changes)
+    except Exception as e:
+        logger.error(f"Failed to notify watchers about {len(changes)} historical lots: {str(e)}")
+
+
+async def process_shard(model: type[LotBase], target_case: Case) -> tuple[int, int]:
     """Process all lots in a specific shard."""
     total_count = await model.all().count()
     processed_count = 0
     moved_count = 0
-    
-    for offset in range(0, total_count, BATCH_SIZE):
-        logger.info(f"Processing batch {offset}-{offset+BATCH_SIZE-1} from {model.__name__}")
-        lots = await fetch_lots_batch(offset, model)
-        
-        for lot in lots:
-            processed_count += 1
-            if await process_lot(lot):
-                moved_count += 1
-        
-        logger.info(f"Progress for {model.__name__}: {processed_count}/{total_count} processed, {moved_count} moved")
+    last_id = 0
+
+    while True:
+        batch = await fetch_moves_batch(model, target_case, last_id)
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        processed_count += len(batch)
+        moved_count += await move_batch(model, batch)
+        logger.info(
+            f"Progress for {model.__name__}: up to id {last_id}, "
+            f"{moved_count}/{processed_count} moved of {total_count} lots"
+        )
 
     logger.success(f"Completed for {model.__name__}: {moved_count} lots moved")
     return processed_count, moved_count
 
+
 async def mover():
-    """Main processing function with transaction handling."""
-    async with in_transaction():
-        total_processed = 0
-        total_moved = 0
-        
-        # Process main Lot table first
-        processed, moved = await process_shard(Lot)
+    """Main processing function: каждая пачка переносится своей транзакцией"""
+    automobile = await VehicleType.get_or_none(slug='automobile')
+    target_case = target_model_case(automobile.id if automobile else None)
+    total_processed = 0
+    total_moved = 0
+
+    # Process main Lot table first, then sharded tables
+    for model in [Lot, *await Lot.get_all_shards()]:
+        processed, moved = await process_shard(model, target_case)
         total_processed += processed
         total_moved += moved
-        
-        # Process sharded tables
-        shard_classes = [Lot1, Lot2, Lot3, Lot4, Lot5, Lot6, Lot7]
-        for shard_class in shard_classes:
-            processed, moved = await process_shard(shard_class)
-            total_processed += processed
-            total_moved += moved
 
-        logger.success(f"Total completed: {total_moved} lots moved from {total_processed} processed")
+    logger.success(f"Total completed: {total_moved} lots moved from {total_processed} to move")
 
 async def main():
     logger.info('Starting historical lots migration process')
@@ -111,4 +140,4 @@ async def main():
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Онлайн-ребалансировка шардов Lot после изменения LOT_SHARDS.
+
+1. Объявить новый класс шарда в app/models/lot.py (LOT_SHARD_MODELS) и создать таблицу.
+2. Перенести прежний список в LOT_SHARDS_PREVIOUS, новый — в LOT_SHARDS и перезапустить сервисы:
+   новые лоты пишутся по новому кольцу, чтение идет по новому и прежнему шарду (dual read).
+3. Запустить этот скрипт: он переносит только лоты, чей шард по новому кольцу изменился
+   (~1/N при добавлении шарда), пачками — копирование в новый шард и удаление из старого в одной транзакции.
+4. Очистить LOT_SHARDS_PREVIOUS и перезапустить сервисы.
+
+Лот переносится с прежним ID. Если в целевом шарде уже есть строка с таким ID или ID лежит
+в диапазоне префикса целевого шарда, который IDBlockAllocator еще не выдал (старые ID без префикса),
+лот не переносится: он остается в прежнем шарде (читается через lot_directory), а в итоге считается в collisions.
+
+Обязательно и при первом деплое размещения по хешу: лоты, созданные round-robin, лежат в основном
+не в своем шарде. До окончания переноса они читаются через lot_directory / перебор шардов
+(get_lot_by_lot_id_from_database) — медленнее, но без ошибок "не найден".
+"""
+from app.models import Lot, LotBase
+from app.models.lot import IDCounter, PREFIX_CAPACITY
+from loguru import logger
+from app.database import init_db, close_db
+import asyncio
+
+
+async def find_id_collisions(target: type[LotBase], ids: list[int]) -> set[int]:
+    """
+    ID, с которыми лот нельзя перенести в target: строка с таким ID в target уже есть
+    или ID выше счетчика target в диапазоне его префикса — IDBlockAllocator выдаст его новому лоту
+    """
+    collisions = set(await target.filter(id__in=ids).values_list('id', flat=True))
+    floor = target.PREFIX * PREFIX_CAPACITY
+    counter = await IDCounter.get_or_none(table_name=target.__name__)
+    last_id = counter.last_id if counter else floor
+    collisions.update(lot_pk for lot_pk in ids if max(floor, last_id) < lot_pk < floor + PREFIX_CAPACITY)
+    return collisions
+
+
+async def rebalance_batch(shard_class: type[LotBase], rows: list[tuple[int, int]], stats: dict) -> None:
+    """Переносит лоты пачки (id, lot_id), размещенные не в своем шарде; лоты с конфликтом ID пропускает"""
+    ids_by_shard: dict[type[LotBase], list[int]] = {}
+    for target, (lot_pk, _) in zip(await Lot.get_shards_for_new_records([lot_id for _, lot_id in rows]), rows):
+        if target is not shard_class:
+            ids_by_shard.setdefault(target, []).append(lot_pk)
+
+    for target, ids in ids_by_shard.items():
+        collisions = await find_id_collisions(target, ids)
+        if collisions:
+            logger.warning(
+                f"Skipping {len(collisions)} lots of {shard_class.__name__}: "
+                f"their ids collide with {target.__name__} ids: {sorted(collisions)}"
+            )
+            stats['collisions'] += len(collisions)
+            ids = [lot_pk for lot_pk in ids if lot_pk not in collisions]
+            if not ids:
+                continue
+        try:
+            stats['moved'] += await shard_class.move_many(ids, target)
+        except Exception as e:
+            logger.warning(f"Batch {shard_class.__name__} -> {target.__name__} failed, moving lots one by one: {str(e)}")
+            for lot_pk in ids:
+                try:
+                    stats['moved'] += await shard_class.move_many([lot_pk], target)
+                except Exception as e:
+                    logger.error(f"Error moving lot {lot_pk} to {target.__name__}: {str(e)}")
+                    stats['errors'] += 1
+
+
+async def rebalance_shards(batch_size: int = 1000) -> dict:
+    """
+    Проходит все шарды текущей и прежней карты (keyset по id) и переносит лоты в шард по текущему кольцу.
+    Возвращает статистику (collisions — лоты, оставленные на месте из-за конфликта ID)
+    """
+    stats = {'scanned': 0, 'moved': 0, 'collisions': 0, 'errors': 0}
+
+    for shard_class in await Lot.get_all_shards():
+        logger.info(f"Rebalancing {shard_class.__name__}...")
+        last_id = 0
+        while True:
+            rows = await shard_class.filter(id__gt=last_id).order_by('id').limit(batch_size).values_list('id', 'lot_id')
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            stats['scanned'] += len(rows)
+
+            await rebalance_batch(shard_class, rows, stats)
+            logger.info(
+                f"Rebalance progress: {stats['moved']}/{stats['scanned']} moved, "
+                f"{stats['collisions']} id collisions skipped, {stats['errors']} errors"
+            )
+
+    logger.success(f"Rebalance completed. Stats: {stats}")
+    return stats
+
+async def main():
+    logger.info('Starting lot shards rebalance')
+    await init_db()
+    try:
+        await rebalance_shards()
+    finally:
+        await close_db()
+    logger.info('Rebalance completed')
+
+if __name__ == "__main__":
+    asyncio.run(main())
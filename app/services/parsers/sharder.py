@@ -1,9 +1,42 @@
-from app.models import Lot, Lot1, Lot2, Lot3, Lot4, Lot5, Lot6, Lot7
+from app.models import Lot
 from loguru import logger
 from app.database import init_db, close_db
 from tortoise.transactions import in_transaction
 import asyncio
 
+
+async def migrate_batch(rows: list[tuple[int, int]], stats: dict, attempt: int = 1, max_attempts: int = 3) -> None:
+    """
+    Переносит пачку лотов (id, lot_id) в шарды одной транзакцией (по одному запросу на шард).
+    Шард — по консистентному хешу lot_id, как при создании лота
+    """
+    lot_pks = [lot_pk for lot_pk, _ in rows]
+    ids_by_shard: dict[type[Lot], list[int]] = {}
+    for shard_class, lot_pk in zip(await Lot.get_shards_for_new_records([lot_id for _, lot_id in rows]), lot_pks):
+        ids_by_shard.setdefault(shard_class, []).append(lot_pk)
+
+    try:
+        async with in_transaction():
+            moved = {shard_class: await Lot.move_many(ids, shard_class) for shard_class, ids in ids_by_shard.items()}
+    except Exception as e:
+        if "deadlock detected" in str(e).lower() and attempt < max_attempts:
+            logger.warning(f"Deadlock while migrating lots {lot_pks[0]}..{lot_pks[-1]}, retrying (attempt {attempt + 1})...")
+            await asyncio.sleep(0.5)
+            return await migrate_batch(rows, stats, attempt + 1)
+        if len(lot_pks) > 1:
+            # Например, id уже есть в шарде — переносим по одному, чтобы не терять всю пачку
+            logger.warning(f"Batch {lot_pks[0]}..{lot_pks[-1]} failed, migrating lots one by one: {str(e)}")
+            for row in rows:
+                await migrate_batch([row], stats)
+            return
+        logger.error(f"Error migrating lot {lot_pks[0]}: {str(e)}")
+        stats['errors'] += 1
+        return
+
+    for shard_class, count in moved.items():
+        stats['migrated'] += count
+        stats['shards'][shard_class.__name__] += count
+
 async def migrate_lots_to_shards(batch_size: int = 1000) -> dict:
     """
     Переносит данные из основной таблицы Lot в шарды (Lot1-Lot7)
@@ -13,7 +46,7 @@ async def migrate_lots_to_shards(batch_size: int = 1000) -> dict:
         'total_lots': 0,
         'migrated': 0,
         'errors': 0,
-        'shards': {f'Lot{i}': 0 for i in range(1, 8)}
+        'shards': {shard.__name__: 0 for shard in await Lot.get_all_shards()}
     }
 
     stats['total_lots'] = await Lot.all().count()
@@ -23,75 +56,18 @@ async def migrate_lots_to_shards(batch_size: int = 1000) -> dict:
     logger.info(f"Starting migration of {stats['total_lots']} lots to shards...")
 
     last_id = 0
-    has_more = True
-
-    while has_more:
-        lots = await Lot.filter(id__gt=last_id).order_by('id').limit(batch_size)
-        if not lots:
-            has_more = False
+    while True:
+        rows = await Lot.filter(id__gt=last_id).order_by('id').limit(batch_size).values_list('id', 'lot_id')
+        if not rows:
             break
+        last_id = rows[-1][0]
 
-        last_id = lots[-1].id
-
-        for lot in lots:
-            await handle_lot(lot, stats)
+        await migrate_batch(rows, stats)
+        logger.info(f"Migrated {stats['migrated']}/{stats['total_lots']} lots so far, {stats['errors']} errors")
 
     logger.success(f"Migration completed. Stats: {stats}")
     return stats
 
-async def handle_lot(lot, stats, attempt=1, max_attempts=3):
-    try:
-        shard_num = (lot.id % 10_000_000) % 7 + 1
-        shard_class = {
-            1: Lot1, 2: Lot2, 3: Lot3, 4: Lot4, 5: Lot5, 6: Lot6, 7: Lot7
-        }[shard_num]
-
-        if await shard_class.filter(id=lot.id).exists():
-            logger.warning(f"Lot {lot.id} already exists in {shard_class.__name__}")
-            stats['errors'] += 1
-            return
-
-        lot_data = {}
-        for field_name in lot._meta.fields_map.keys():
-            if field_name == 'id':
-                continue
-
-            if field_name in lot._meta.fk_fields:
-                related = getattr(lot, field_name)
-                if related:
-                    lot_data[field_name] = await related
-            elif field_name in lot._meta.m2m_fields:
-                continue
-            else:
-                lot_data[field_name] = getattr(lot, field_name)
-
-        async with in_transaction() as conn:
-            new_lot = shard_class(id=lot.id, **lot_data)
-            await new_lot.save(using_db=conn)
-
-            # M2M связи переносятся отдельно
-            for field_name in lot._meta.m2m_fields:
-                m2m_values = await getattr(lot, field_name).all()
-                if m2m_values:
-                    m2m_field = getattr(new_lot, field_name)
-                    await m2m_field.add(*m2m_values, using_db=conn)
-
-            await lot.delete(using_db=conn)
-
-        stats['migrated'] += 1
-        stats['shards'][shard_class.__name__] += 1
-
-        if stats['migrated'] % 100 == 0:
-            logger.info(f"Migrated {stats['migrated']} lots so far...")
-
-    except Exception as e:
-        if "deadlock detected" in str(e).lower() and attempt < max_attempts:
-            logger.warning(f"Deadlock while migrating lot {lot.id}, retrying (attempt {attempt + 1})...")
-            await asyncio.sleep(0.5)
-            return await handle_lot(lot, stats, attempt + 1)
-        logger.error(f"Error migrating lot {lot.id}: {str(e)}")
-        stats['errors'] += 1
-
 async def main():
     logger.info('Starting data migration process')
     await init_db()
@@ -102,4 +78,4 @@ async def main():
     logger.info('Migration completed')
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
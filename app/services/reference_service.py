@@ -0,0 +1,140 @@
+from loguru import logger
+from typing import Dict, Iterable, Optional, Type
+from app.models import (BaseReferenceModel, VehicleType, Make, Model, Series, Status, AuctionStatus,
+                        DamagePrimary, DamageSecondary, Keys, OdoBrand, Drive, Fuel, BodyType,
+                        Transmission, BaseSite, Title, SellerType, Seller, Document, DocumentOld,
+                        Color, slugify)
+from app.core.config import settings
+from app.core.cache import LocalCacheVersion
+from app.services.autocomplete_service import AUTOCOMPLETE_VERSION_KEY
+
+# Справочники, у которых slug уникален в пределах родителя
+PARENT_FIELDS: Dict[Type[BaseReferenceModel], str] = {
+    Make: "vehicle_type_id",
+    Model: "make_id",
+    Series: "model_id",
+}
+
+REFERENCE_MODELS: tuple[Type[BaseReferenceModel], ...] = (
+    VehicleType, Make, Model, Series, Status, AuctionStatus, DamagePrimary, DamageSecondary,
+    Keys, OdoBrand, Drive, Fuel, BodyType, Transmission, BaseSite, Title, SellerType, Seller,
+    Document, DocumentOld, Color,
+)
+
+RefKey = tuple[str, Optional[int]]
+
+NAME_MAX_LENGTH = 100
+
+
+class ReferenceResolver:
+    """
+    Process-wide identity map справочников: (slug, parent_id) -> экземпляр.
+
+    Справочник загружается целиком при первом обращении, дальше имена
+    разрешаются в памяти. Отсутствующие slug вставляются одним
+    INSERT ... ON CONFLICT DO NOTHING (bulk_create с ignore_conflicts) и
+    дочитываются одним SELECT. Изменения справочников из админки делают
+    invalidate(), остальные процессы сбрасывают карты по версии в Redis.
+    """
+
+    def __init__(self):
+        self._maps: Dict[Type[BaseReferenceModel], Dict[RefKey, BaseReferenceModel]] = {}
+        self.version = LocalCacheVersion(f"{settings.CACHE_KEY}_references_version")
+        self.autocomplete_version = LocalCacheVersion(AUTOCOMPLETE_VERSION_KEY)
+
+    @staticmethod
+    def _key(model: Type[BaseReferenceModel], instance: BaseReferenceModel) -> RefKey:
+        parent_field = PARENT_FIELDS.get(model)
+        return instance.slug, getattr(instance, parent_field) if parent_field else None
+
+    async def _index(self, model: Type[BaseReferenceModel]) -> Dict[RefKey, BaseReferenceModel]:
+        if await self.version.changed():
+            self._maps.clear()
+        index = self._maps.get(model)
+        if index is None:
+            if not self._maps:
+                await self.version.sync()
+            index = {self._key(model, instance): instance for instance in await model.all()}
+            self._maps[model] = index
+        return index
+
+    async def preload(self, models: Iterable[Type[BaseReferenceModel]] = REFERENCE_MODELS) -> None:
+        """Загружает справочники заранее (например, перед пакетным импортом)"""
+        for model in models:
+            await self._index(model)
+
+    async def invalidate(self) -> None:
+        """Сбрасывает локальные карты и поднимает версию для остальных процессов"""
+        self._maps.clear()
+        await self.version.bump()
+        await self.autocomplete_version.bump()
+
+    async def resolve_many(
+        self,
+        model: Type[BaseReferenceModel],
+        items: Iterable[tuple[Optional[str], Optional[int]]],
+    ) -> Dict[tuple[str, Optional[int]], BaseReferenceModel]:
+        """
+        Разрешает пачку (name, parent_id) в экземпляры справочника.
+        Пустые имена пропускаются; возвращает {(name, parent_id): instance}.
+        """
+        index = await self._index(model)
+        parent_field = PARENT_FIELDS.get(model)
+        requested: Dict[tuple[str, Optional[int]], RefKey] = {}
+        missing: Dict[RefKey, str] = {}
+        for name, parent_id in items:
+            if not name:
+                continue
+            key = (slugify(name), parent_id)
+            requested[(name, parent_id)] = key
+            # Невалидные строки не вставляем — иначе упадет вся пачка (и транзакция)
+            if key in index or len(name) > NAME_MAX_LENGTH or not key[0]:
+                continue
+            if parent_field and parent_id is None:
+                continue
+            missing.setdefault(key, name)
+
+        if missing:
+            await self._insert_missing(model, parent_field, missing, index)
+            # Новые марки/модели/серии должны появиться в автодополнении
+            if parent_field:
+                await self.autocomplete_version.bump()
+
+        return {item: index[key] for item, key in requested.items() if key in index}
+
+    async def resolve(
+        self,
+        model: Type[BaseReferenceModel],
+        name: Optional[str],
+        parent: Optional[BaseReferenceModel] = None,
+    ) -> Optional[BaseReferenceModel]:
+        """Аналог get_or_create_by_name, но без обращения к БД для известных slug"""
+        if not name:
+            return None
+        parent_id = parent.id if parent else None
+        resolved = await self.resolve_many(model, [(name, parent_id)])
+        return resolved.get((name, parent_id))
+
+    @staticmethod
+    async def _insert_missing(
+        model: Type[BaseReferenceModel],
+        parent_field: Optional[str],
+        missing: Dict[RefKey, str],
+        index: Dict[RefKey, BaseReferenceModel],
+    ) -> None:
+        objects = []
+        for (slug, parent_id), name in missing.items():
+            data = {"slug": slug, "name": name}
+            if parent_field:
+                data[parent_field] = parent_id
+            objects.append(model(**data))
+        try:
+            await model.bulk_create(objects, ignore_conflicts=True)
+        except Exception as e:
+            logger.error(f"Error inserting {model.__name__} references: {str(e)}")
+
+        for instance in await model.filter(slug__in=list({slug for slug, _ in missing})):
+            index[ReferenceResolver._key(model, instance)] = instance
+
+
+reference_resolver = ReferenceResolver()
@@ -0,0 +1,250 @@
+import asyncio
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from app.models import Lot, LotBase
+from app.core.cache import lots_changed_since, LOT_CHANGES_TTL
+
+# Масштабы признаков: разница на один масштаб стоит столько же, сколько смена модели
+YEAR_SCALE = 3
+ODOMETER_SCALE = 50_000
+PRICE_SCALE = 5_000
+ENGINE_SIZE_SCALE = 1.0
+# Максимальный вклад одного числового признака и вклад, если признак неизвестен
+MAX_GAP = 2.0
+MISSING_GAP = 1.0
+MODEL_PENALTY = 1.0
+DAMAGE_PENALTY = 0.5
+
+# Опрос журнала изменений и полная пересборка (секунды)
+REFRESH_INTERVAL = 5.0
+REFRESH_OVERLAP = 30.0
+REBUILD_INTERVAL = min(1800.0, LOT_CHANGES_TTL - REFRESH_OVERLAP)
+LOAD_RETRY_INTERVAL = 60.0
+LOAD_BATCH_SIZE = 50_000
+
+FEATURE_FIELDS = (
+    "id", "base_site_id", "make_id", "model_id", "year", "odometer", "price", "engine_size", "damage_pr_id",
+)
+
+
+class LotFeatures:
+    """Признаки лота для поиска похожих"""
+    __slots__ = ("pk", "shard", "site_id", "make_id", "model_id", "year", "odometer", "price", "engine_size",
+                 "damage_id")
+
+    def __init__(self, pk, shard, site_id, make_id, model_id, year, odometer, price, engine_size, damage_id):
+        self.pk = pk
+        self.shard = shard
+        self.site_id = site_id
+        self.make_id = make_id
+        self.model_id = model_id
+        self.year = year or 0
+        self.odometer = odometer
+        self.price = price
+        self.engine_size = engine_size
+        self.damage_id = damage_id
+
+    @classmethod
+    def from_row(cls, shard: Optional[type[LotBase]], row: tuple) -> 'LotFeatures':
+        """Из строки values_list(*FEATURE_FIELDS)"""
+        return cls(row[0], shard, *row[1:])
+
+    @classmethod
+    def from_lot(cls, lot: LotBase) -> 'LotFeatures':
+        return cls(lot.id, type(lot), *(getattr(lot, field, None) for field in FEATURE_FIELDS[1:]))
+
+    @property
+    def partition(self) -> tuple:
+        return self.site_id, self.make_id
+
+    @property
+    def bucket(self) -> tuple:
+        return self.model_id, self.year
+
+
+def _gap(a, b, scale: float) -> float:
+    if a is None or b is None:
+        return MISSING_GAP
+    return min(abs(b - a) / scale, MAX_GAP)
+
+
+def bucket_bound(source: LotFeatures, bucket: tuple) -> float:
+    """Нижняя граница расстояния до любого лота корзины (модель, год)"""
+    model_id, year = bucket
+    return abs(source.year - year) / YEAR_SCALE + (MODEL_PENALTY if model_id != source.model_id else 0.0)
+
+
+def distance(source: LotFeatures, other: LotFeatures) -> float:
+    """Взвешенное манхэттенское расстояние по нормированным признакам"""
+    value = bucket_bound(source, other.bucket) + (DAMAGE_PENALTY if other.damage_id != source.damage_id else 0.0)
+    value += _gap(source.odometer, other.odometer, ODOMETER_SCALE)
+    value += _gap(source.price, other.price, PRICE_SCALE)
+    value += _gap(source.engine_size, other.engine_size, ENGINE_SIZE_SCALE)
+    return value
+
+
+class SimilarLotsIndex:
+    """
+    In-memory индекс активных лотов (Lot1..Lot7) для /lot/similar_lots.
+
+    Лоты разложены по площадке и марке, внутри — по корзинам (модель, год).
+    Корзины обходятся по возрастанию нижней границы расстояния, обход останавливается,
+    как только граница хуже k-го найденного: соседние годы и модели той же марки
+    попадают в выдачу, а просматривается лишь малая часть каталога.
+    """
+
+    def __init__(self):
+        self._partitions: Dict[tuple, Dict[tuple, Dict[int, LotFeatures]]] = {}
+        self._entries: Dict[int, LotFeatures] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, features: LotFeatures) -> None:
+        self.discard(features.pk)
+        buckets = self._partitions.setdefault(features.partition, {})
+        buckets.setdefault(features.bucket, {})[features.pk] = features
+        self._entries[features.pk] = features
+
+    def discard(self, pk: int) -> None:
+        features = self._entries.pop(pk, None)
+        if features is None:
+            return
+        buckets = self._partitions[features.partition]
+        bucket = buckets[features.bucket]
+        del bucket[pk]
+        if not bucket:
+            del buckets[features.bucket]
+            if not buckets:
+                del self._partitions[features.partition]
+
+    def get(self, pk: int) -> Optional[LotFeatures]:
+        return self._entries.get(pk)
+
+    def nearest(self, source: LotFeatures, k: int) -> List[LotFeatures]:
+        """k ближайших лотов той же площадки и марки, кроме самого source"""
+        buckets = self._partitions.get(source.partition)
+        if not buckets or k <= 0:
+            return []
+        # Max-heap по расстоянию: (-расстояние, -pk, лот); worst — расстояние k-го найденного
+        heap: List[Tuple[float, int, LotFeatures]] = []
+        worst = float("inf")
+        # Горячий цикл: distance() развернута, лот отбрасывается, как только сумма превысила worst
+        odometer, price, engine_size = source.odometer, source.price, source.engine_size
+        for bound, key in sorted((bucket_bound(source, key), key) for key in buckets):
+            if bound > worst:
+                break
+            for features in buckets[key].values():
+                value = bound + (DAMAGE_PENALTY if features.damage_id != source.damage_id else 0.0)
+                value += (MISSING_GAP if odometer is None or features.odometer is None
+                          else min(abs(features.odometer - odometer) / ODOMETER_SCALE, MAX_GAP))
+                if value > worst:
+                    continue
+                value += (MISSING_GAP if price is None or features.price is None
+                          else min(abs(features.price - price) / PRICE_SCALE, MAX_GAP))
+                value += (MISSING_GAP if engine_size is None or features.engine_size is None
+                          else min(abs(features.engine_size - engine_size) / ENGINE_SIZE_SCALE, MAX_GAP))
+                if value > worst or features.pk == source.pk:
+                    continue
+                item = (-value, -features.pk, features)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, item)
+                if len(heap) >= k:
+                    worst = -heap[0][0]
+        return [features for _, _, features in sorted(heap, key=lambda item: item[:2], reverse=True)]
+
+
+class SimilarLots:
+    """
+    Индекс похожих лотов процесса: полная загрузка при старте и раз в REBUILD_INTERVAL,
+    между ними — дозагрузка лотов из журнала изменений (mark_lots_changed) раз в REFRESH_INTERVAL.
+    """
+
+    def __init__(self):
+        self.index: Optional[SimilarLotsIndex] = None
+        self._next_build_at = 0.0
+        self._refreshed_at = 0.0
+        self._watermark = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    async def load(self) -> None:
+        async with self._lock:
+            started = time.time()
+            index = SimilarLotsIndex()
+            for shard in await Lot.get_all_shards():
+                last_id = 0
+                while True:
+                    rows = await (
+                        shard.filter(id__gt=last_id).order_by("id").limit(LOAD_BATCH_SIZE)
+                        .values_list(*FEATURE_FIELDS)
+                    )
+                    if not rows:
+                        break
+                    last_id = rows[-1][0]
+                    for row in rows:
+                        index.add(LotFeatures.from_row(shard, row))
+            self.index = index
+            self._refreshed_at = self._watermark = started
+            logger.info(f"Similar lots index loaded: {len(index)} lots in {time.time() - started:.1f}s")
+
+    async def refresh(self) -> None:
+        """Перечитывает лоты, измененные с прошлого опроса (с запасом REFRESH_OVERLAP на незакоммиченные)"""
+        async with self._lock:
+            started = time.time()
+            changed = await lots_changed_since(self._watermark - REFRESH_OVERLAP)
+            if changed is None:
+                return
+            if changed:
+                shards = await Lot.get_all_shards()
+                try:
+                    found = await asyncio.gather(*(
+                        shard.filter(id__in=changed).values_list(*FEATURE_FIELDS) for shard in shards
+                    ))
+                except Exception as e:
+                    logger.warning(f"Similar lots index refresh failed: {e}")
+                    return
+                for pk in changed:
+                    self.index.discard(pk)
+                for shard, rows in zip(shards, found):
+                    for row in rows:
+                        self.index.add(LotFeatures.from_row(shard, row))
+            self._watermark = started
+
+    def ensure_fresh(self) -> None:
+        if self._lock.locked():
+            return
+        now = time.time()
+        if now >= self._next_build_at:
+            # Загрузка идет в фоне, пока запросы обслуживает текущий индекс (или запасной путь через БД)
+            self._next_build_at = now + REBUILD_INTERVAL
+            asyncio.create_task(self.warmup())
+        elif self.ready and now - self._refreshed_at > REFRESH_INTERVAL:
+            self._refreshed_at = now
+            asyncio.create_task(self.refresh())
+
+    async def warmup(self) -> None:
+        self._next_build_at = time.time() + REBUILD_INTERVAL
+        try:
+            await self.load()
+        except Exception as e:
+            self._next_build_at = time.time() + LOAD_RETRY_INTERVAL
+            logger.exception(f"Similar lots index load failed: {e}")
+
+    async def similar(self, lot: LotBase, limit: int) -> Optional[List[LotFeatures]]:
+        """Ближайшие лоты или None, если индекс еще не загружен"""
+        self.ensure_fresh()
+        if not self.ready:
+            return None
+        source = self.index.get(lot.id) or LotFeatures.from_lot(lot)
+        return self.index.nearest(source, limit)
+
+
+similar_lots = SimilarLots()
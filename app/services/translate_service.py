@@ -1,6 +1,84 @@
 from loguru import logger
 from app.models import BaseReferenceModel, LanguageEnum, Translation
-from typing import Type, Dict, Optional
+from app.core.config import settings
+from app.core.cache import LocalCacheVersion
+from typing import Type, Dict, Optional, Iterable
+
+_MISSING = object()
+
+
+def _lang(language) -> str:
+    return getattr(language, "value", language)
+
+
+class TranslationCache:
+    """
+    In-process словарь переводов {(field_name, slug, language): translated_value}.
+
+    Вся таблица translation грузится одним запросом, поиск — синхронный O(1).
+    Согласованность между процессами (API-воркеры, Celery) держится на версии
+    в Redis: изменения переводов делают INCR, остальные процессы сверяют версию
+    не чаще раза в 5 секунд и перечитывают таблицу.
+    """
+
+    def __init__(self):
+        self._values: Dict[tuple[str, str, str], Optional[str]] = {}
+        self._loaded = False
+        self.version = LocalCacheVersion(f"{settings.CACHE_KEY}_translations_version")
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    async def load(self) -> None:
+        """Перечитывает всю таблицу translation"""
+        await self.version.sync()
+        rows = await Translation.all().values_list(
+            "field_name", "original_value", "language", "translated_value"
+        )
+        self._values = {
+            (field_name, original_value, _lang(language)): translated_value
+            for field_name, original_value, language, translated_value in rows
+        }
+        self._loaded = True
+        logger.info(f"Translation cache loaded: {len(self._values)} rows, version={self.version.current}")
+
+    async def ensure_fresh(self) -> None:
+        """Грузит кэш при первом обращении и перечитывает его при смене версии в Redis"""
+        if not self._loaded or await self.version.changed():
+            await self.load()
+
+    async def invalidate(self) -> None:
+        """Поднимает версию в Redis и сразу перечитывает локальную копию"""
+        await self.version.bump()
+        await self.load()
+
+    async def publish(self) -> None:
+        """
+        Поднимает версию после вставки переводов: другие процессы перечитают таблицу
+        (и забудут запомненные отсутствия); локальная копия уже дополнена remember()
+        """
+        await self.version.bump()
+
+    def remember(self, field_name: str, original_value: str, language, translated_value: Optional[str]) -> None:
+        self._values[(field_name, original_value, _lang(language))] = translated_value
+
+    def lookup(self, field_name: str, original_value: str, language, default=None) -> Optional[str]:
+        """Синхронный поиск перевода без обращения к БД"""
+        return self._values.get((field_name, original_value, _lang(language)), default)
+
+    def lookup_many(self, field_name: str, original_values: Iterable[str], language) -> Dict[str, str]:
+        """Переводы для набора slug одного поля; отсутствующие пропускаются"""
+        language = _lang(language)
+        result = {}
+        for original_value in original_values:
+            value = self._values.get((field_name, original_value, language))
+            if value is not None:
+                result[original_value] = value
+        return result
+
+
+translation_cache = TranslationCache()
 
 async def create_model_translations(rel_name, model_instance: Type[BaseReferenceModel]) -> None:
     """
@@ -19,7 +97,10 @@ async def create_model_translations(rel_name, model_instance: Type[BaseReference
         model_name_value = model_instance.name  # Сохраняем название модели для перевода
         
         # Проходим по всем языкам из LanguageEnum и создаем переводы
+        created = False
         for language in LanguageEnum:
+            if translation_cache.lookup(rel_name, translation_key, language) is not None:
+                continue
             # Проверяем существование перевода для данного языка
             existing_translation = await Translation.filter(
                 field_name=rel_name,  # Здесь будет имя модели
@@ -38,10 +119,49 @@ async def create_model_translations(rel_name, model_instance: Type[BaseReference
                     translated_value=translated_value,  # Перевод
                     language=language  # Указываем язык
                 )
+                translation_cache.remember(rel_name, translation_key, language, translated_value)
+                created = True
+        if created:
+            await translation_cache.publish()
     except Exception as e:
         logger.error(f"Error creating translations for model '{model_instance.__class__.__name__}': {str(e)}")
 
 
+async def ensure_model_translations(relations: Iterable[tuple[str, Optional[BaseReferenceModel]]]) -> None:
+    """
+    Пакетный вариант create_model_translations: по кэшу переводов определяет,
+    каких (field_name, slug, language) нет, и вставляет их одним bulk_create.
+    Если все переводы уже есть — ни одного запроса к БД.
+
+    :param relations: пары (имя поля, экземпляр справочника)
+    """
+    await translation_cache.ensure_fresh()
+    missing: Dict[tuple[str, str, str], Translation] = {}
+    for rel_name, instance in relations:
+        if not instance or not instance.slug:
+            continue
+        for language in LanguageEnum:
+            key = (rel_name, instance.slug, language.value)
+            if key in missing or translation_cache.lookup(*key) is not None:
+                continue
+            missing[key] = Translation(
+                field_name=rel_name,
+                original_value=instance.slug,
+                translated_value=instance.name if language == LanguageEnum.EN else "",
+                language=language
+            )
+
+    if not missing:
+        return
+    try:
+        await Translation.bulk_create(list(missing.values()), ignore_conflicts=True)
+        for (rel_name, slug, language), translation in missing.items():
+            translation_cache.remember(rel_name, slug, language, translation.translated_value)
+        await translation_cache.publish()
+    except Exception as e:
+        logger.error(f"Error creating translations in bulk: {str(e)}")
+
+
 async def get_translations(
     field_name: str,
     original_values: list[str],
@@ -57,16 +177,9 @@ async def get_translations(
     """
     if not original_values:
         return {}
-    
-    # Получаем все переводы для указанных параметров одним запросом
-    translations = await Translation.filter(
-        field_name=field_name,
-        original_value__in=original_values,
-        language=language
-    )
-    
-    # Создаем словарь для быстрого поиска
-    return {t.original_value: t.translated_value for t in translations}
+
+    await translation_cache.ensure_fresh()
+    return translation_cache.lookup_many(field_name, original_values, language)
 
 
 async def get_translation(
@@ -82,10 +195,17 @@ async def get_translation(
     :param language: Язык перевода
     :return: Переведенное значение или None, если перевод не найден
     """
+    await translation_cache.ensure_fresh()
+    value = translation_cache.lookup(field_name, original_value, language, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    # Строка могла появиться после загрузки кэша — дочитываем и запоминаем (в т.ч. отсутствие)
     translation = await Translation.filter(
         field_name=field_name,
         original_value=original_value,
         language=language
     ).first()
-    
-    return translation.translated_value if translation else None
\ No newline at end of file
+    value = translation.translated_value if translation else None
+    translation_cache.remember(field_name, original_value, language, value)
+    return value
@@ -0,0 +1,79 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+from loguru import logger
+from app.models import LotBase, HistoricalLot, LotOtherVehicleHistorical, UserWatchlist
+from app.core.cache import watchers_key, WATCHERS_TTL, GUARDED_SET, generation_key
+from app.core.config.redis import get_redis_client
+
+# Таблицы завершенных аукционов: перенос туда — изменение "лот ушел в историю"
+HISTORY_MODELS = (HistoricalLot, LotOtherVehicleHistorical)
+
+
+def lot_state(lot: LotBase) -> Dict[str, Any]:
+    """Поля лота, изменения которых получают пользователи из watchlist"""
+    return {
+        "price": lot.price,
+        "current_bid": lot.current_bid,
+        "status_id": getattr(lot, "status_id", None),
+        "auction_status_id": getattr(lot, "auction_status_id", None),
+        "auction_date": lot.auction_date.isoformat() if lot.auction_date else None,
+        "historical": isinstance(lot, HISTORY_MODELS),
+    }
+
+
+def diff_lot_state(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """{поле: {"old": ..., "new": ...}} для изменившихся полей; для нового лота (old=None) — пусто"""
+    if old is None:
+        return {}
+    return {
+        field: {"old": old.get(field), "new": value}
+        for field, value in new.items() if old.get(field) != value
+    }
+
+
+def moved_to_history() -> Dict[str, Dict[str, Any]]:
+    return {"historical": {"old": False, "new": True}}
+
+
+async def watchers_for(lot_pks: Iterable[int]) -> Dict[int, List[str]]:
+    """
+    Инвертированный индекс lot_id -> id пользователей: списки в Redis,
+    недостающие — одним запросом к user_watchlist (и сразу кладутся в кэш,
+    если watchlist лота не менялся после чтения — invalidate_watchers)
+    """
+    lot_pks = list(dict.fromkeys(lot_pks))
+    if not lot_pks:
+        return {}
+    keys = [watchers_key(lot_pk) for lot_pk in lot_pks]
+    watchers: Dict[int, List[str]] = {}
+    generations: Dict[int, Optional[str]] = {}
+    try:
+        redis = await get_redis_client()
+        cached = await redis.mget(*keys, *(generation_key(key) for key in keys))
+        for lot_pk, users, generation in zip(lot_pks, cached, cached[len(keys):]):
+            generations[lot_pk] = generation
+            if users is not None:
+                watchers[lot_pk] = json.loads(users)
+    except Exception as e:
+        logger.warning(f"Failed to read watchers index: {e}")
+
+    missing = [lot_pk for lot_pk in lot_pks if lot_pk not in watchers]
+    if missing:
+        for lot_pk in missing:
+            watchers[lot_pk] = []
+        for lot_pk, user_id in await UserWatchlist.filter(lot_id__in=missing).values_list("lot_id", "user_id"):
+            watchers[lot_pk].append(str(user_id))
+        try:
+            redis = await get_redis_client()
+            async with redis.pipeline(transaction=False) as pipe:
+                for lot_pk in missing:
+                    key = watchers_key(lot_pk)
+                    pipe.eval(
+                        GUARDED_SET, 2, key, generation_key(key), generations.get(lot_pk) or "",
+                        json.dumps(watchers[lot_pk]), WATCHERS_TTL,
+                    )
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to store watchers index: {e}")
+
+    return {lot_pk: users for lot_pk, users in watchers.items() if users}
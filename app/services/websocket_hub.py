@@ -0,0 +1,377 @@
+from fastapi import WebSocket, status
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set
+from uuid import UUID
+import itertools
+import json
+import asyncio
+from loguru import logger
+
+from app.models.user import User
+from app.core.config import settings
+from app.core.config.redis import get_redis_client
+
+# Unsent messages kept per socket; beyond that the oldest one is dropped
+SEND_QUEUE_SIZE = 100
+# A socket that keeps dropping messages without ever catching up is closed
+MAX_DROPPED = 500
+SEND_TIMEOUT = 10.0
+# Live lot updates are collapsed into one frame per lot per tick (seconds)
+FRAME_INTERVAL = 0.05
+
+# Redis pub/sub channels shared by all uvicorn workers
+CHANNEL_PREFIX = f"{settings.CACHE_KEY}_ws"
+ALL_CHANNEL = f"{CHANNEL_PREFIX}:all"
+
+
+def lot_channel(lot_id: str) -> str:
+    return f"{CHANNEL_PREFIX}:lot:{lot_id}"
+
+
+def user_channel(user_id) -> str:
+    return f"{CHANNEL_PREFIX}:user:{user_id}"
+
+
+class ClientConnection:
+    """
+    A WebSocket with its own bounded send queue drained by a writer task,
+    so a slow client never blocks broadcasts to the others.
+
+    Messages with the same coalesce key replace each other while unsent
+    (a lagging client gets the latest bid, not every intermediate one).
+    """
+
+    def __init__(self, websocket: WebSocket, user: User, on_close: Callable[['ClientConnection'], Any]):
+        self.websocket = websocket
+        self.user = user
+        # Reverse index: channels this socket is subscribed to
+        self.channels: Set[str] = set()
+        self.dropped = 0
+        self.closed = False
+        self._pending: "OrderedDict[Any, str]" = OrderedDict()
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._on_close = on_close
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def send(self, payload: str, key: Optional[str] = None) -> None:
+        """Queue a serialized message without waiting for the client"""
+        if self.closed:
+            return
+        if key is not None and key in self._pending:
+            self._pending[key] = payload
+            return
+        if len(self._pending) >= SEND_QUEUE_SIZE:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+            if self.dropped >= MAX_DROPPED:
+                logger.warning(f"WebSocket too slow, closing: user={self.user.id}")
+                self.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+        self._pending[next(self._sequence) if key is None else key] = payload
+        self._wakeup.set()
+
+    def send_json(self, message: dict, key: Optional[str] = None) -> None:
+        self.send(json.dumps(message, default=str), key)
+
+    async def _write_loop(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                while self._pending:
+                    _, payload = self._pending.popitem(last=False)
+                    await asyncio.wait_for(self.websocket.send_text(payload), SEND_TIMEOUT)
+                self.dropped = 0
+                self._wakeup.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to websocket: {e}")
+            self.close()
+
+    def close(self, code: Optional[int] = None):
+        """Stop the writer and detach from the manager; code — also close the socket"""
+        if self.closed:
+            return
+        self.closed = True
+        self._pending.clear()
+        self._writer.cancel()
+        asyncio.ensure_future(self._on_close(self))
+        if code is not None:
+            asyncio.ensure_future(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+class RedisFanout:
+    """
+    Bridges uvicorn workers through Redis pub/sub: every message is published
+    to its channel, and each worker listens only to channels with local sockets.
+    """
+
+    def __init__(self, deliver: Callable[[str, str], None]):
+        self._deliver = deliver
+        self._channels: Set[str] = set()
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        # Concurrent first subscribers must not open two pubsub connections
+        self._start_lock = asyncio.Lock()
+
+    async def _start(self):
+        redis = await get_redis_client()
+        self._pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(ALL_CHANNEL, *self._channels)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    self._deliver(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket fan-out listener failed, resubscribing: {e}")
+            await asyncio.sleep(1)
+            try:
+                await self._pubsub.aclose()
+                redis = await get_redis_client()
+                self._pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                await self._pubsub.subscribe(ALL_CHANNEL, *self._channels)
+            except Exception as e:
+                logger.warning(f"WebSocket fan-out resubscribe failed: {e}")
+
+    async def subscribe(self, channel: str):
+        self._channels.add(channel)
+        try:
+            if self._listener is None:
+                async with self._start_lock:
+                    if self._listener is None:
+                        await self._start()
+                        return
+            await self._pubsub.subscribe(channel)
+        except Exception as e:
+            logger.warning(f"WebSocket fan-out subscribe to {channel} failed: {e}")
+
+    async def unsubscribe(self, channel: str):
+        self._channels.discard(channel)
+        try:
+            if self._pubsub is not None:
+                await self._pubsub.unsubscribe(channel)
+        except Exception as e:
+            logger.warning(f"WebSocket fan-out unsubscribe from {channel} failed: {e}")
+
+    async def publish(self, channel: str, data: str) -> bool:
+        """
+        False if this worker will not get the message back from Redis (Redis unavailable
+        or the listener never started) — the caller delivers to local sockets itself
+        """
+        try:
+            redis = await get_redis_client()
+            await redis.publish(channel, data)
+            return self._listener is not None
+        except Exception as e:
+            logger.warning(f"WebSocket fan-out publish to {channel} failed: {e}")
+            return False
+
+
+class LotFrames:
+    """
+    Collapses live lot updates into frames: within FRAME_INTERVAL the bids of each lot
+    are collected in order and its field changes are merged (latest value wins), then
+    every lot gets one frame of each kind serialized once for all its sockets.
+    bid_placed frames carry every bid of the tick ("bid" is the latest of them);
+    lot_update frames carry only the fields whose value differs from what this worker
+    already sent for the lot.
+    """
+
+    def __init__(self, send: Callable[[str, str, Optional[str]], None]):
+        self._send = send
+        # channel -> (lot_id, bids in arrival order) / (lot_id, merged changed fields)
+        self._bids: Dict[str, tuple] = {}
+        self._fields: Dict[str, tuple] = {}
+        # channel -> fields as last sent to local sockets
+        self._state: Dict[str, dict] = {}
+        self._tick: Optional[asyncio.TimerHandle] = None
+
+    def add_bid(self, channel: str, lot_id: str, bid: dict):
+        self._bids.setdefault(channel, (lot_id, []))[1].append(bid)
+        self._schedule()
+
+    def add_fields(self, channel: str, lot_id: str, fields: dict):
+        pending = self._fields.setdefault(channel, (lot_id, {}))[1]
+        pending.update(fields)
+        self._schedule()
+
+    def _schedule(self):
+        if self._tick is None:
+            self._tick = asyncio.get_running_loop().call_later(FRAME_INTERVAL, self.flush)
+
+    def flush(self):
+        self._tick = None
+        bids, self._bids = self._bids, {}
+        fields, self._fields = self._fields, {}
+        for channel, (lot_id, tick_bids) in bids.items():
+            # Not coalesced per socket: bid history and outbid events must reach every client
+            frame = {"type": "bid_placed", "lot_id": lot_id, "bid": tick_bids[-1], "bids": tick_bids}
+            self._send(channel, json.dumps(frame), None)
+        for channel, (lot_id, changes) in fields.items():
+            state = self._state.setdefault(channel, {})
+            delta = {name: value for name, value in changes.items() if name not in state or state[name] != value}
+            if delta:
+                state.update(delta)
+                self._send(channel, json.dumps({"type": "lot_update", "lot_id": lot_id, "data": delta}), None)
+
+    def snapshot(self, channel: str) -> Optional[dict]:
+        """All fields sent for the lot so far — for sockets that subscribe mid-auction"""
+        return self._state.get(channel)
+
+    def forget(self, channel: str):
+        self._state.pop(channel, None)
+
+
+class ConnectionManager:
+    """
+    Manages WebSocket connections for real-time bidding updates across all workers.
+
+    Messages are serialized once and published to Redis; each worker fans them out
+    to its local sockets by enqueueing (never awaiting a client). Live bids and lot
+    field updates go through LotFrames instead of being sent one by one.
+    """
+
+    def __init__(self):
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        # Map of channel (lot / user) to local connections subscribed to it
+        self.channel_members: Dict[str, Set[ClientConnection]] = {}
+        self.hub = RedisFanout(self.receive)
+        self.frames = LotFrames(self.deliver)
+
+    async def connect(self, websocket: WebSocket, user: User, lot_id: str = None) -> ClientConnection:
+        """Connect a new WebSocket"""
+        await websocket.accept()
+        connection = ClientConnection(websocket, user, self._detach)
+        self.connections[websocket] = connection
+
+        await self._join(connection, user_channel(user.id))
+        # If watching a specific lot, add to watchers
+        if lot_id:
+            await self._join(connection, lot_channel(lot_id))
+            self._send_snapshot(connection, lot_id)
+
+        logger.info(f"WebSocket connected: user={user.id}, lot={lot_id}")
+        return connection
+
+    async def disconnect(self, websocket: WebSocket):
+        """Disconnect a WebSocket"""
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            connection.close()
+            await self._detach(connection)
+
+    async def _detach(self, connection: ClientConnection):
+        if self.connections.get(connection.websocket) is not connection:
+            return
+        del self.connections[connection.websocket]
+        for channel in list(connection.channels):
+            await self._leave(connection, channel)
+        logger.info(f"WebSocket disconnected: user={connection.user.id}")
+
+    async def _join(self, connection: ClientConnection, channel: str):
+        members = self.channel_members.setdefault(channel, set())
+        members.add(connection)
+        connection.channels.add(channel)
+        if len(members) == 1:
+            await self.hub.subscribe(channel)
+
+    async def _leave(self, connection: ClientConnection, channel: str):
+        connection.channels.discard(channel)
+        members = self.channel_members.get(channel)
+        if members is None:
+            return
+        members.discard(connection)
+        if not members:
+            del self.channel_members[channel]
+            self.frames.forget(channel)
+            await self.hub.unsubscribe(channel)
+
+    def _send_snapshot(self, connection: ClientConnection, lot_id: str):
+        snapshot = self.frames.snapshot(lot_channel(lot_id))
+        if snapshot:
+            connection.send_json({"type": "lot_update", "lot_id": lot_id, "data": snapshot})
+
+    async def subscribe_to_lot(self, websocket: WebSocket, lot_id: str):
+        """Subscribe a WebSocket to a specific lot"""
+        connection = self.connections[websocket]
+        await self._join(connection, lot_channel(lot_id))
+
+        # Confirm subscription
+        connection.send_json({
+            "type": "subscribed",
+            "lot_id": lot_id,
+            "message": f"Subscribed to lot {lot_id}"
+        })
+        self._send_snapshot(connection, lot_id)
+
+    async def unsubscribe_from_lot(self, websocket: WebSocket, lot_id: str):
+        """Unsubscribe a WebSocket from a specific lot"""
+        connection = self.connections[websocket]
+        await self._leave(connection, lot_channel(lot_id))
+
+        # Confirm unsubscription
+        connection.send_json({
+            "type": "unsubscribed",
+            "lot_id": lot_id,
+            "message": f"Unsubscribed from lot {lot_id}"
+        })
+
+    def deliver(self, channel: str, payload: str, key: Optional[str] = None):
+        """Enqueue a serialized message to the local sockets of a channel"""
+        members = self.connections.values() if channel == ALL_CHANNEL else self.channel_members.get(channel, ())
+        for connection in list(members):
+            connection.send(payload, key)
+
+    def receive(self, channel: str, data: str):
+        """Message from Redis (or from this worker when Redis is unavailable)"""
+        if channel != ALL_CHANNEL and channel not in self.channel_members:
+            return
+        envelope = json.loads(data)
+        if "bid" in envelope:
+            self.frames.add_bid(channel, envelope["lot_id"], envelope["bid"])
+        elif "fields" in envelope:
+            self.frames.add_fields(channel, envelope["lot_id"], envelope["fields"])
+        else:
+            self.deliver(channel, envelope["payload"], envelope.get("key"))
+
+    async def _publish(self, channel: str, envelope: dict):
+        data = json.dumps(envelope, default=str)
+        if not await self.hub.publish(channel, data):
+            self.receive(channel, data)
+
+    async def publish(self, channel: str, message: dict, key: Optional[str] = None):
+        await self._publish(channel, {"key": key, "payload": json.dumps(message, default=str)})
+
+    async def broadcast_to_lot(self, lot_id: str, message: dict, key: Optional[str] = None):
+        """Broadcast a message to all watchers of a specific lot on every worker"""
+        await self.publish(lot_channel(lot_id), message, key)
+
+    async def stream_bid(self, lot_id: str, bid: dict):
+        """New bid on a lot: watchers get all bids of each FRAME_INTERVAL in one frame"""
+        await self._publish(lot_channel(lot_id), {"lot_id": lot_id, "bid": bid})
+
+    async def stream_lot_update(self, lot_id: str, fields: dict):
+        """Changed lot fields: merged per FRAME_INTERVAL, only values that differ are sent"""
+        await self._publish(lot_channel(lot_id), {"lot_id": lot_id, "fields": fields})
+
+    async def send_to_user(self, user_id: UUID, message: dict):
+        """Send a message to all connections of a specific user on every worker"""
+        await self.publish(user_channel(user_id), message)
+
+    async def broadcast_to_all(self, message: dict):
+        """Broadcast a message to all connected clients on every worker"""
+        await self.publish(ALL_CHANNEL, message)
@@ -1,12 +1,14 @@
 from celery import shared_task
 from celery.exceptions import MaxRetriesExceededError
-from app.services import get_filtered_lots, add_lot, get_special_filtered_lots, find_lots_by_price_range, count_all_active, count_all_auctions_active
-import asyncio
-from app.database import init_db, close_db
+from app.services import get_filtered_lots, add_lot, add_lots_bulk, get_special_filtered_lots, find_lots_by_price_range, count_all_active, count_all_auctions_active
+from app.tasks.runtime import run_async
 from loguru import logger
 from datetime import datetime
 from typing import Union, List, Optional
 
+# Сколько лотов process_batch_task пишет за один проход add_lots_bulk
+BATCH_CHUNK_SIZE = 500
+
 @shared_task(
     autoretry_for=(Exception,),
     retry_backoff=True,
@@ -67,7 +69,6 @@ def get_refine_task(
     """
     logger.debug('try start refine funct')
     async def run():
-        await init_db()
         try:
             # Преобразуем даты из строк
             auction_date_from_dt = datetime.fromisoformat(auction_date_from) if auction_date_from else None
@@ -134,10 +135,8 @@ def get_refine_task(
                 'result': None,
                 'error': str(e)
             }
-        finally:
-            await close_db()
 
-    return asyncio.run(run())
+    return run_async(run())
 
 
 @shared_task(
@@ -149,8 +148,6 @@ def get_refine_task(
 )
 def add_lot_task(vehicle_data):
     async def run():
-        await init_db()  # 🔹 Инициализируем БД
-
         try:
             lot = await add_lot(vehicle_data)
             return lot
@@ -158,10 +155,8 @@ def add_lot_task(vehicle_data):
             raise e
         except Exception as e:
             raise e
-        finally:
-            await close_db()  # 🔹 Закрываем соединение
 
-    return asyncio.run(run())
+    return run_async(run())
 
 @shared_task(
     bind=True,
@@ -173,61 +168,37 @@ def add_lot_task(vehicle_data):
 def process_batch_task(self, lots_data):
     """Основная задача для обработки пачки лотов"""
     results = []
+    # self.request привязан к потоку задачи, а корутина выполняется в потоке рантайма
+    task_id = self.request.id
     
     async def process():
-        await init_db()  # Инициализация подключения
-        
         total = len(lots_data)
         
-        for i, lot_data in enumerate(lots_data):
-            lot_result = None  # сюда положим результат add_lot
+        # Лоты пишутся частями: справочники, проверка дублей и вставка — пачкой
+        for start in range(0, total, BATCH_CHUNK_SIZE):
+            chunk = lots_data[start:start + BATCH_CHUNK_SIZE]
             try:
-                # Обновляем статус задачи
-                self.update_state(
-                    state='PROGRESS',
-                    meta={
-                        'processed': i + 1,
-                        'total': total,
-                        'current_vin': lot_data.get('vin')
-                    }
-                )
-                
-                # Обработка лота
-                lot_result = await add_lot(lot_data)
-
-                # add_lot мог вернуть None — считаем это ошибкой
-                if not lot_result:
-                    raise ValueError("add_lot returned None for VIN "
-                                     f"{lot_data.get('vin')}")
-
-                # lot_result — это dict {'id': ..., 'lot_id': ...}
-                results.append({
-                    'vin': lot_data.get('vin'),
-                    'status': 'success',
-                    'lot_id': lot_result.get('lot_id'),
-                    'id': lot_result.get('id'),
-                })
-                
+                results.extend(await add_lots_bulk(chunk))
             except Exception as e:
-                # Логируем с максимально аккуратным доступом к данным
-                logger.error(
-                    f"Ошибка обработки лота {lot_data.get('vin')}: {e}",
-                    exc_info=True,
-                )
-
-                lot_id = None
-                db_id = None
-                if isinstance(lot_result, dict):
-                    lot_id = lot_result.get('lot_id')
-                    db_id = lot_result.get('id')
-
-                results.append({
+                logger.error(f"Ошибка обработки пачки лотов {start}-{start + len(chunk)}: {e}", exc_info=True)
+                results.extend({
                     'vin': lot_data.get('vin'),
-                    'status': 'failed',          # ✅ тут точно failed
-                    'lot_id': lot_id,
-                    'id': db_id,
+                    'status': 'failed',
+                    'lot_id': None,
+                    'id': None,
                     'error': str(e),
-                })
+                } for lot_data in chunk)
+
+            # Обновляем статус задачи
+            self.update_state(
+                task_id=task_id,
+                state='PROGRESS',
+                meta={
+                    'processed': len(results),
+                    'total': total,
+                    'current_vin': chunk[-1].get('vin')
+                }
+            )
         
         return {
             'processed': total,
@@ -237,7 +208,7 @@ def process_batch_task(self, lots_data):
         }
     
     # Запускаем асинхронную обработку
-    task_result = asyncio.run(process())
+    task_result = run_async(process())
     
     # Финализируем статус
     self.update_state(
@@ -267,7 +238,6 @@ def get_special_filtered_lots_task(
     """
     try:
         async def run():
-            await init_db()
             try:
                 # Здесь должна быть основная логика обработки фильтров
                 # Например:
@@ -284,9 +254,7 @@ def get_special_filtered_lots_task(
                 }
             except Exception as e:
                 ...
-            finally:
-                await close_db()
-        return asyncio.run(run())
+        return run_async(run())
     except Exception as e:
         logger.error(f"Error in get_special_filtered_lots_task: {str(e)}")
         raise
@@ -312,7 +280,6 @@ def get_range_price_lots_task(
     """
     try:
         async def run():
-            await init_db()
             try:
                 # Здесь должна быть основная логика обработки фильтров
                 # Например:
@@ -330,9 +297,7 @@ def get_range_price_lots_task(
                 }
             except Exception as e:
                 ...
-            finally:
-                await close_db()
-        return asyncio.run(run())
+        return run_async(run())
     except Exception as e:
         logger.error(f"Error in get_special_filtered_lots_task: {str(e)}")
         raise
@@ -351,7 +316,6 @@ def count_lots_task() -> dict:
     """
     try:
         async def run():
-            await init_db()
             try:
                 # Здесь должна быть основная логика обработки фильтров
                 # Например:
@@ -361,9 +325,7 @@ def count_lots_task() -> dict:
                 }
             except Exception as e:
                 ...
-            finally:
-                await close_db()
-        return asyncio.run(run())
+        return run_async(run())
     except Exception as e:
         logger.error(f"Error in count_lots_task: {str(e)}")
         raise
@@ -383,7 +345,6 @@ def count_auctions_task() -> dict:
     """
     try:
         async def run():
-            await init_db()
             try:
                 # Здесь должна быть основная логика обработки фильтров
                 # Например:
@@ -393,9 +354,7 @@ def count_auctions_task() -> dict:
                 }
             except Exception as e:
                 ...
-            finally:
-                await close_db()
-        return asyncio.run(run())
+        return run_async(run())
     except Exception as e:
         logger.error(f"Error in count_lots_task: {str(e)}")
         raise
\ No newline at end of file
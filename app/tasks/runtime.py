@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+from celery.signals import worker_process_init, worker_process_shutdown
+from loguru import logger
+
+from app.database import init_db, close_db
+
+T = TypeVar("T")
+
+
+class WorkerRuntime:
+    """
+    Асинхронный рантайм процесса Celery-воркера.
+
+    Один event loop в фоновом потоке и один пул Tortoise на процесс:
+    задачи отправляют корутины в этот loop вместо asyncio.run() с
+    init_db()/close_db() на каждый вызов. Поднимается по worker_process_init,
+    а если сигнала не было (solo/threads пул, вызов вне воркера) — при первой задаче.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._db_lock: Optional[asyncio.Lock] = None
+        self._db_ready = False
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Запускает loop и инициализирует БД (идемпотентно)"""
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="celery-async-runtime", daemon=True)
+            thread.start()
+            self._loop, self._thread = loop, thread
+
+        try:
+            self.run(asyncio.sleep(0))
+            logger.info("Celery worker runtime started")
+        except Exception as e:
+            # Не роняем воркер: init_db повторится при первой задаче
+            logger.error(f"Celery worker runtime DB init failed: {str(e)}")
+
+    def stop(self) -> None:
+        """Закрывает соединения и останавливает loop"""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+
+        if self._db_ready:
+            try:
+                asyncio.run_coroutine_threadsafe(close_db(), loop).result(timeout=10)
+            except Exception as e:
+                logger.error(f"Error closing DB in worker runtime: {str(e)}")
+        self._db_ready = False
+        self._db_lock = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+        loop.close()
+
+    async def _ensure_db(self) -> None:
+        if self._db_ready:
+            return
+        if self._db_lock is None:
+            self._db_lock = asyncio.Lock()
+        async with self._db_lock:
+            if not self._db_ready:
+                await init_db()
+                self._db_ready = True
+
+    async def _with_db(self, coro: Coroutine[Any, Any, T]) -> T:
+        try:
+            await self._ensure_db()
+        except BaseException:
+            coro.close()
+            raise
+        return await coro
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Выполняет корутину в loop воркера и ждет результат"""
+        if self._loop is None:
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(self._with_db(coro), self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            # SoftTimeLimitExceeded и т.п. прилетают в поток задачи — отменяем корутину
+            future.cancel()
+            raise
+
+
+worker_runtime = WorkerRuntime()
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Синхронная обертка для тел Celery-задач"""
+    return worker_runtime.run(coro)
+
+
+@worker_process_init.connect
+def start_worker_runtime(**kwargs):
+    worker_runtime.start()
+
+
+@worker_process_shutdown.connect
+def stop_worker_runtime(**kwargs):
+    worker_runtime.stop()
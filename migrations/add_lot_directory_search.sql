@@ -0,0 +1,12 @@
+-- Migration: Text search for /lot/search_car over lot_directory
+-- Description: Adds denormalized search_text (make, model, series, VIN, lot_id) and auction_date
+-- to lot_directory and a pg_trgm GIN index for prefix/substring LIKE and similarity() ranking.
+-- After applying, fill the new columns with: python -m app.services.parsers.lot_directory
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE lot_directory ADD COLUMN IF NOT EXISTS auction_date TIMESTAMPTZ;
+ALTER TABLE lot_directory ADD COLUMN IF NOT EXISTS search_text VARCHAR(255) NOT NULL DEFAULT '';
+
+CREATE INDEX IF NOT EXISTS lot_directory_search_text_trgm_idx
+    ON lot_directory USING GIN (search_text gin_trgm_ops);
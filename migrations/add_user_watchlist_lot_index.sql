@@ -0,0 +1,5 @@
+-- Migration: Inverted lot -> watchers lookup for watchlist notifications
+-- Description: unique (user_id, lot_id) only serves per-user reads; change notifications
+-- look up watchers by lot_id for a whole batch of lots (lot_id = ANY(...)).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_watchlist_lot_id ON user_watchlist (lot_id);
@@ -0,0 +1,30 @@
+"""Модели в sqlite в памяти — для тестов SQL-построителей на настоящей БД"""
+from contextlib import asynccontextmanager
+
+from tortoise import Tortoise
+
+from app.core import cache as core_cache
+from app.models import lot as lot_module
+from tests.fakes import use_redis
+
+
+@asynccontextmanager
+async def sqlite_models(monkeypatch):
+    # Регистрация лотов и инвалидация кэшей при записи идут в поддельный Redis
+    use_redis(monkeypatch, core_cache, lot_module)
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["app.models"]})
+    await Tortoise.generate_schemas()
+    try:
+        yield
+    finally:
+        await Tortoise.close_connections()
+
+
+def lot_fields(lot_id: int, **fields) -> dict:
+    """Обязательные поля лота"""
+    return {
+        "lot_id": lot_id, "vin": f"VIN{lot_id:014d}", "bid": 0, "current_bid": 0, "year": 2020,
+        "state": "TX", "location": "Dallas", "country": "US", "is_buynow": False,
+        "link_img_hd": [], "link_img_small": [], "link": "https://example.com/lot", "is_historical": False,
+        **fields,
+    }
@@ -0,0 +1,170 @@
+"""Общие подделки для тестов без Redis"""
+import asyncio
+
+from app.core.cache import GUARDED_SET
+from app.services.cache.response import FENCED_WRITE, RELEASE_LOCK
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class FakeRedis:
+    """
+    Redis в памяти: строки, хэши, Lua-скрипты проекта (GUARDED_SET, FENCED_WRITE, RELEASE_LOCK),
+    pipeline и pubsub. decode_responses=False — как get_redis_bytes_client (значения в bytes).
+    calls — имена выполненных команд.
+    """
+
+    def __init__(self, decode_responses: bool = True):
+        self.decode_responses = decode_responses
+        self.data = {}
+        self.calls = []
+        self.pubsubs = []
+
+    def _value(self, value):
+        if isinstance(value, (bytes, dict, set)):
+            return value
+        return str(value) if self.decode_responses else str(value).encode()
+
+    async def get(self, key):
+        self.calls.append("get")
+        return self.data.get(key)
+
+    async def mget(self, *keys):
+        self.calls.append("mget")
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None, nx=False):
+        self.calls.append("set")
+        if nx and key in self.data:
+            return None
+        self.data[key] = self._value(value)
+        return True
+
+    async def delete(self, *keys):
+        self.calls.append("delete")
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def exists(self, key):
+        self.calls.append("exists")
+        return int(key in self.data)
+
+    async def incr(self, key):
+        self.calls.append("incr")
+        value = int(_text(self.data.get(key)) or 0) + 1
+        self.data[key] = self._value(value)
+        return value
+
+    async def expire(self, key, ttl):
+        self.calls.append("expire")
+
+    async def hget(self, key, field):
+        self.calls.append("hget")
+        return self.data.get(key, {}).get(field)
+
+    async def hset(self, key, field, value):
+        self.calls.append("hset")
+        self.data.setdefault(key, {})[field] = self._value(value)
+
+    async def sadd(self, key, *members):
+        self.calls.append("sadd")
+        self.data.setdefault(key, set()).update(members)
+
+    async def zadd(self, key, mapping):
+        self.calls.append("zadd")
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def zremrangebyscore(self, key, low, high):
+        self.calls.append("zremrangebyscore")
+
+    async def eval(self, script, numkeys, *args):
+        self.calls.append("eval")
+        keys, argv = args[:numkeys], args[numkeys:]
+        if script == GUARDED_SET:
+            key, generation = keys
+            if _text(self.data.get(generation)) != _text(argv[0]):
+                return 0
+            self.data[key] = self._value(argv[1])
+            return 1
+        if script in (FENCED_WRITE, RELEASE_LOCK):
+            # Действие только пока блокировка у владельца токена
+            if _text(self.data.get(keys[0])) != _text(argv[0]):
+                return 0
+            del self.data[keys[0]]
+            if script == RELEASE_LOCK:
+                return 1
+            key, generation = keys[1], keys[2]
+            entry, variant = argv[1], argv[3]
+            if _text(self.data.get(generation)) != _text(argv[4]):
+                return -1
+            if variant:
+                self.data.setdefault(key, {})[variant] = self._value(entry)
+            else:
+                self.data[key] = self._value(entry)
+            return 1
+        raise NotImplementedError("FakeRedis does not emulate this script")
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        self.pubsubs.append(FakePubSub())
+        return self.pubsubs[-1]
+
+
+class FakePipeline:
+    """Копит команды и выполняет их по порядку в execute()"""
+
+    def __init__(self, redis: FakeRedis):
+        self.redis, self.ops = redis, []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.ops.append((getattr(self.redis, name), args, kwargs))
+
+    async def execute(self):
+        ops, self.ops = self.ops, []
+        return [await method(*args, **kwargs) for method, args, kwargs in ops]
+
+
+class FakePubSub:
+    def __init__(self):
+        self.channels = []
+        self.closed = asyncio.Event()
+
+    async def subscribe(self, *channels):
+        # Уступает цикл, как сетевой вызов
+        await asyncio.sleep(0)
+        self.channels.extend(channels)
+
+    async def unsubscribe(self, *channels):
+        for channel in channels:
+            self.channels.remove(channel)
+
+    async def listen(self):
+        await self.closed.wait()
+        return
+        yield
+
+    async def aclose(self):
+        self.closed.set()
+
+
+def use_redis(monkeypatch, *modules, attribute: str = "get_redis_client", **options) -> FakeRedis:
+    """Подменяет фабрику клиента Redis (attribute) в модулях одним FakeRedis"""
+    redis = FakeRedis(**options)
+
+    async def get_client():
+        return redis
+
+    for module in modules:
+        monkeypatch.setattr(module, attribute, get_client)
+    return redis
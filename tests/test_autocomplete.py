@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+
+from app.services.autocomplete_service import build_trie
+
+
+def test_trie_completes_makes_models_and_series_by_prefix():
+    makes = [SimpleNamespace(id=1, name="BMW", slug="bmw", popular_counter=5),
+             SimpleNamespace(id=2, name="Bentley", slug="bentley", popular_counter=9)]
+    models = [SimpleNamespace(id=10, name="X5", slug="x5", make_id=1),
+              SimpleNamespace(id=11, name="Bentayga", slug="bentayga", make_id=2)]
+    series = [SimpleNamespace(id=100, name="xDrive40i", slug="xdrive40i", model_id=10)]
+    trie = build_trie(makes, models, series)
+
+    assert [item.label for item in trie.complete("b")] == ["Bentley", "BMW", "BMW X5", "Bentley Bentayga",
+                                                          "BMW X5 xDrive40i"]
+    assert [item.label for item in trie.complete("bmw  x")] == ["BMW X5", "BMW X5 xDrive40i"]
+    assert [(item.kind, item.slug) for item in trie.complete("XDR")] == [("series", "xdrive40i")]
+    assert trie.complete("b", limit=1)[0].slug == "bentley"
+    assert trie.complete("audi") == []
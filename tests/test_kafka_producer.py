@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from confluent_kafka import KafkaException
+
+from app.services.kafka.producer import KafkaProducer
+
+
+class InMemoryBroker:
+    """Stand-in for confluent_kafka.Producer: keeps messages in memory, acks them on poll()"""
+
+    def __init__(self, capacity: int = 100_000, fail_topics=()):
+        self.capacity = capacity
+        self.fail_topics = set(fail_topics)
+        self.pending = []
+        self.delivered = []
+        self.callback_threads = set()
+        self._lock = threading.Lock()
+
+    def produce(self, topic, key=None, value=None, callback=None):
+        with self._lock:
+            if len(self.pending) >= self.capacity:
+                raise BufferError("Local: Queue full")
+            self.pending.append((topic, key, value, callback))
+
+    def poll(self, timeout=0):
+        with self._lock:
+            batch, self.pending = self.pending, []
+        for topic, key, value, callback in batch:
+            message = Message(topic, key, value)
+            error = "broker unavailable" if topic in self.fail_topics else None
+            if error is None:
+                self.delivered.append(message)
+            self.callback_threads.add(threading.current_thread().name)
+            callback(error, message)
+        if not batch:
+            time.sleep(timeout)
+        return len(batch)
+
+    def flush(self, timeout=None):
+        while self.pending:
+            time.sleep(0.01)
+        return 0
+
+
+class Message:
+    def __init__(self, topic, key, value):
+        self._topic, self.key, self.value = topic, key, value
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return 0
+
+
+async def test_send_without_wait_only_enqueues_and_background_thread_delivers():
+    broker = InMemoryBroker(capacity=1_000)
+    producer = KafkaProducer(broker)
+
+    started = time.perf_counter()
+    for number in range(10_000):
+        await producer.send("watch", value=str(number), key="lot", wait=False)
+    assert time.perf_counter() - started < 2
+
+    producer.close()
+    assert [message.value for message in broker.delivered] == [str(number) for number in range(10_000)]
+    assert broker.callback_threads == {"kafka-producer-poll"}
+
+
+async def test_send_waits_for_delivery_and_raises_on_failure():
+    broker = InMemoryBroker(fail_topics={"broken"})
+    producer = KafkaProducer(broker)
+
+    message = await asyncio.wait_for(producer.send("watch", value="1", key="42"), 1)
+    assert (message.topic(), message.key, message.value) == ("watch", "42", "1")
+    with pytest.raises(KafkaException):
+        await asyncio.wait_for(producer.send("broken", value="2"), 1)
+    producer.close()
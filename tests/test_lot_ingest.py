@@ -0,0 +1,193 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.models import Lot, HistoricalLot, LotOtherVehicle, LotOtherVehicleHistorical, LotWithouImage, LotWithoutAuctionDate, Lot1, Lot2, Lot3
+from app.models.lot import IDBlockAllocator, IDCounter, PREFIX_CAPACITY
+from app.services.lot_service import (select_lot_model, lot_reference_names, parse_auction_date,
+                                      normalize_vehicle_type_name, lot_refine_changes)
+
+VIN = "1HGCM82633A004352"
+
+
+def test_select_lot_model_routes_like_single_insert():
+    auction_date = datetime(2099, 1, 1, tzinfo=timezone.utc)
+
+    assert select_lot_model("automobile", VIN, auction_date, False, "img") is Lot
+    assert select_lot_model("automobile", VIN, None, False, "img") is LotWithoutAuctionDate
+    assert select_lot_model("automobile", VIN, auction_date, False, None) is LotWithouImage
+    assert select_lot_model("automobile", "SHORT", auction_date, False, None) is LotOtherVehicle
+    assert select_lot_model("boats", VIN, auction_date, True, "img") is LotOtherVehicleHistorical
+
+
+def test_lot_reference_names_normalization():
+    names = lot_reference_names({
+        "color": "Magenta",
+        "status": "Engine Start Program",
+        "seller_type": "Dealer",
+        "base_site": "iaai",
+        "fuel": "",
+    })
+
+    assert names["color"] == "Two Colors"
+    assert names["status"] == "Starts"
+    assert names["seller_type"] == "Dealer"
+    assert names["base_site"] == "IAAI"
+    assert names["document"] == "Unknown"
+    assert names["auction_status"] == "Not sold"
+    assert names["fuel"] is None
+
+
+def test_parse_auction_date_and_vehicle_type():
+    assert parse_auction_date({"sale_date": "2025-01-02T10:00:00.000Z"}) == datetime(2025, 1, 2, 10, 0, tzinfo=timezone.utc)
+    assert parse_auction_date({"auction_date": "garbage"}) is None
+    assert normalize_vehicle_type_name("Snowmobiles") == "Snowmobile"
+    assert normalize_vehicle_type_name("Truck") == "Pickup Trucks"
+
+
+async def test_id_allocator_hands_out_disjoint_blocks_per_prefix(monkeypatch):
+    counters = {}
+
+    async def reserve_block(table_name, prefix, count):
+        first = max(counters.get(table_name, 0), prefix * PREFIX_CAPACITY) + 1
+        counters[table_name] = first + count - 1
+        return first, counters[table_name]
+
+    monkeypatch.setattr(IDCounter, "reserve_block", reserve_block)
+    worker_a, worker_b = IDBlockAllocator(block_size=3), IDBlockAllocator(block_size=3)
+
+    first = await worker_a.allocate(Lot1, 2)
+    second = await worker_b.allocate(Lot1, 1)
+    third = await worker_a.allocate(Lot1, 5)
+
+    assert first == [110_000_001, 110_000_002]
+    assert second == [110_000_004]
+    assert third == [110_000_003, *range(110_000_007, 110_000_011)]
+    assert await worker_a.allocate(Lot2) == [120_000_001]
+    assert len(counters) == 2
+
+
+async def test_lot_shards_are_picked_by_lot_id_hash():
+    lot_ids = list(range(1000, 1700))
+    shards = await Lot.get_shards_for_new_records(lot_ids)
+
+    assert shards == await Lot.get_shards_for_new_records(lot_ids)
+    assert {shard.__name__ for shard in shards} == {f"Lot{n}" for n in range(1, 8)}
+    assert Lot.get_read_shards(1234) == [await Lot.get_shard_for_new_record(1234)]
+    assert await LotOtherVehicle.get_shard_for_new_record() is LotOtherVehicle
+    with pytest.raises(ValueError):
+        await Lot.get_shard_for_new_record()
+
+
+async def test_lot_outside_hash_shard_is_still_found(monkeypatch):
+    from app.models import LotDirectory
+    from app.services import lot_service
+
+    class EmptyShard:
+        @staticmethod
+        def filter(**kwargs):
+            class Query:
+                async def first(self):
+                    return None
+            return Query()
+
+    placed_round_robin = object()
+    calls = []
+
+    async def fetch(key, value, models=None, prefetch=()):
+        calls.append((key, value, len(models)))
+        return [placed_round_robin]
+
+    monkeypatch.setattr(Lot, "get_read_shards", classmethod(lambda cls, lot_id: [EmptyShard]))
+    monkeypatch.setattr(LotDirectory, "fetch", fetch)
+
+    assert await lot_service.get_lot_by_lot_id_from_database(42) is placed_round_robin
+    assert calls == [("lot_id", 42, 7)]
+
+
+async def test_stored_lot_is_looked_up_in_lot_shards_first(monkeypatch):
+    from app.services import lot_service
+
+    active = Lot3(id=130_000_001, lot_id=42, vin=VIN)
+    checked = []
+
+    def table(name, rows):
+        class Table:
+            @staticmethod
+            def filter(**kwargs):
+                checked.append(name)
+
+                class Query:
+                    async def first(self):
+                        return rows[0] if rows else None
+                return Query()
+        return Table
+
+    async def fetch(key, value, models=None, prefetch=()):
+        return []
+
+    monkeypatch.setattr(Lot, "get_read_shards", classmethod(lambda cls, lot_id: [table("Lot3", [active])]))
+    monkeypatch.setattr(lot_service.LotDirectory, "fetch", fetch)
+    monkeypatch.setattr(lot_service, "LOT_TABLES", [table("HistoricalLot", [])])
+
+    # Активный лот находится в своем шарде, прежние таблицы не опрашиваются
+    assert await lot_service.find_stored_lot("42", VIN) is active
+    assert checked == ["Lot3"]
+
+    monkeypatch.setattr(Lot, "get_read_shards", classmethod(lambda cls, lot_id: [table("Lot3", [])]))
+    assert await lot_service.find_stored_lot(42, VIN) is None
+    assert checked == ["Lot3", "Lot3", "HistoricalLot"]
+
+
+def test_refine_changes_cover_only_tables_the_lot_moved_between():
+    from types import SimpleNamespace
+
+    copart = SimpleNamespace(slug="copart")
+    # Обновление на месте — одна группа
+    assert lot_refine_changes(Lot, copart, source=Lot) == [(False, "copart")]
+    assert lot_refine_changes(LotWithoutAuctionDate, copart, source=LotWithoutAuctionDate) == []
+    # Переезд между таблицами — группы обеих, без повторов
+    assert lot_refine_changes(HistoricalLot, copart, True, source=Lot) == [(False, "copart"), (True, "copart")]
+    assert lot_refine_changes(Lot, None, source=LotWithoutAuctionDate) == [(False, None)]
+
+
+async def test_bulk_ingest_updates_existing_history_addons(monkeypatch):
+    from app.services import lot_service
+
+    saved, inserted = [], []
+
+    class Addon:
+        def __init__(self, lot_id, vin):
+            self.lot_id, self.vin, self.price = lot_id, vin, 1
+
+        def update_from_dict(self, data):
+            self.price = data["price"]
+            return self
+
+        async def save(self):
+            saved.append((self.lot_id, self.price))
+
+    async def filter_addons(**kwargs):
+        return [Addon(42, VIN), Addon(7, VIN)]
+
+    async def bulk_insert(model, rows):
+        inserted.extend((model, row["lot_id"]) for row in rows)
+        return rows
+
+    monkeypatch.setattr(lot_service.LotHistoryAddons, "filter", filter_addons)
+    monkeypatch.setattr(lot_service, "_bulk_insert", bulk_insert)
+
+    await lot_service._upsert_history_addons({
+        (42, VIN): {"lot_id": 42, "price": 900},
+        (43, VIN): {"lot_id": 43, "price": 500},
+    })
+    # Существующая запись обновляется, чужой lot_id с тем же vin не трогается, новая вставляется
+    assert saved == [(42, 900)]
+    assert inserted == [(lot_service.LotHistoryAddons, 43)]
+
+
+def test_lifecycle_mover_targets():
+    from app.services.parsers.move_to_correct import TARGET_MODELS
+
+    assert TARGET_MODELS["LotWithoutAuctionDate"] is LotWithoutAuctionDate
+    assert TARGET_MODELS["LotOtherVehicleHistorical"] is LotOtherVehicleHistorical
@@ -0,0 +1,135 @@
+from app.models import (Lot, Lot3, HistoricalLot, LotOtherVehicle, LotWithouImage, LotHistoryAddons, LotSearch,
+                        LotDirectory, LOT_DIRECTORY_MODELS)
+from app.models.facet_query import grouping_mask, reduce_facets
+from app.core.cache import generation_key, lot_directory_key
+from app.services.lot_service import lot_search_catalog, facet_filters, facet_contexts
+from tests.fakes import use_redis
+
+
+def test_catalog_for_groups_shards_and_skips_side_tables():
+    assert LotSearch.catalog_for(Lot3) == "Lot"
+    assert LotSearch.catalog_for(HistoricalLot) == "HistoricalLot"
+    assert LotSearch.catalog_for(LotOtherVehicle) == "LotOtherVehicle"
+    assert LotSearch.catalog_for(Lot) is None
+    assert LotSearch.catalog_for(LotWithouImage) is None
+    assert LotSearch.catalog_for(LotHistoryAddons) is None
+
+
+def test_search_filters_map_relation_slugs_to_columns():
+    filters = LotSearch.search_filters({
+        "make__slug__in": ["bmw"],
+        "base_site__slug__in": ["copart"],
+        "year__gte": 2018,
+        "is_historical": False,
+    })
+
+    assert filters == {
+        "make_slug__in": ["bmw"],
+        "base_site_slug__in": ["copart"],
+        "year__gte": 2018,
+        "is_historical": False,
+    }
+
+
+def test_refine_catalog_and_facet_exclusions():
+    assert lot_search_catalog(["automobile"], False) == "Lot"
+    assert lot_search_catalog(["automobile"], True) == "HistoricalLot"
+    assert lot_search_catalog(["motorcycle"], True) == "LotOtherVehicleHistorical"
+
+    filters = {"year__gte": 2018, "year__lte": 2020, "make_slug__in": ["bmw"]}
+    assert facet_filters(filters, "year") == {"make_slug__in": ["bmw"]}
+    assert facet_filters(filters, "make") == {"year__gte": 2018, "year__lte": 2020}
+    assert facet_filters(filters, "model") == filters
+
+
+def test_facet_contexts_share_query_unless_own_filter_is_applied():
+    facets = ["make", "model", "series", "year", "cylinders", "color", "vehicle_type"]
+    filters = {"year__gte": 2018, "color_slug__in": ["red"], "make_slug__in": ["bmw"], "model_slug__in": ["x5"]}
+
+    contexts = facet_contexts("Lot", filters, facets, ["Lot", "LotOtherVehicle"])
+
+    # Марка и модель не фильтруют свои фасеты; серия без своего фильтра — в общем контексте
+    assert contexts == {
+        (("Lot",), ()): ["totals", "risk_index", "series", "cylinders"],
+        (("Lot",), ("make_slug__in",)): ["make"],
+        (("Lot",), ("model_slug__in",)): ["model"],
+        (("Lot",), ("year__gte",)): ["year"],
+        (("Lot",), ("color_slug__in",)): ["color"],
+        (("Lot", "LotOtherVehicle"), ()): ["vehicle_type"],
+    }
+
+
+def test_reduce_facets_splits_grouping_sets_rows():
+    columns = ["make_id", "year"]
+    ranges = {"low": ("risk_index", None, 50)}
+    assert grouping_mask(columns, "make_id") == 0b01
+    assert grouping_mask(columns, "year") == 0b10
+    assert grouping_mask(columns) == 0b11
+
+    rows = [
+        {"make_id": 1, "year": None, "grouping_id": 0b01, "count": 3, "odometer_min": 10, "odometer_max": 30, "low": 1},
+        {"make_id": None, "year": None, "grouping_id": 0b01, "count": 2, "odometer_min": 5, "odometer_max": 9, "low": 0},
+        {"make_id": None, "year": 2020, "grouping_id": 0b10, "count": 5, "odometer_min": 5, "odometer_max": 30, "low": 1},
+        {"make_id": None, "year": None, "grouping_id": 0b11, "count": 5, "odometer_min": 5, "odometer_max": 30, "low": 1},
+    ]
+
+    assert reduce_facets(rows, columns, ("odometer",), ranges) == {
+        "make_id": {1: 3},
+        "year": {2020: 5},
+        "totals": {"count": 5, "odometer_min": 5, "odometer_max": 30, "low": 1},
+    }
+
+
+def test_lot_directory_covers_all_lot_tables_and_normalizes_vin():
+    assert len(LOT_DIRECTORY_MODELS) == 14
+    assert LOT_DIRECTORY_MODELS["Lot3"] is Lot3
+
+    entry = LotDirectory.entry(Lot3(id=130_000_001, lot_id=42, vin="1hgcm82633a004352"))
+    assert (entry.source, entry.lot_pk, entry.lot_id, entry.vin) == ("Lot3", 130_000_001, 42, "1HGCM82633A004352")
+
+
+def test_lot_directory_search_text_is_lowercase_and_skips_missing_parts():
+    assert LotDirectory.search_text_for("BMW", "X5", None, "WBA123", 777) == "bmw x5 wba123 777"
+    assert {"make", "make_id", "auction_date", "vin"} <= LotDirectory.TRACKED_FIELDS
+
+
+async def test_lot_directory_probes_tables_on_miss_and_guards_mirror(monkeypatch):
+    from app.models import lot as lot_module
+
+    redis = use_redis(monkeypatch, lot_module)
+    registered = []
+
+    class EmptyDirectory:
+        def order_by(self, *fields):
+            return self
+
+        async def values_list(self, *fields):
+            return []
+
+    class Shard:
+        @staticmethod
+        async def filter(**kwargs):
+            return [Lot3(id=130_000_001, lot_id=42)] if kwargs == {"lot_id": 42} else []
+
+    class EmptyTable:
+        @staticmethod
+        async def filter(**kwargs):
+            return []
+
+    async def register(lots):
+        registered.extend(lot.id for lot in lots)
+        # Каталог по ключу изменился, пока шло чтение: поколение поднято, зеркало не пишется
+        redis.data[generation_key(lot_directory_key("lot_id", 42))] = "1"
+
+    monkeypatch.setattr(LotDirectory, "filter", classmethod(lambda cls, **kwargs: EmptyDirectory()))
+    monkeypatch.setattr(LotDirectory, "register", register)
+    monkeypatch.setattr(lot_module, "LOT_DIRECTORY_MODELS", {"Lot3": Shard, "HistoricalLot": EmptyTable})
+
+    assert await LotDirectory.locate("lot_id", 42) == [("Lot3", 130_000_001)]
+    assert registered == [130_000_001]
+    assert lot_directory_key("lot_id", 42) not in redis.data
+
+    # Без гонки результат попадает в зеркало, в том числе короткий "не найдено"
+    assert await LotDirectory.locate("lot_id", 7) == []
+    assert redis.data[lot_directory_key("lot_id", 7)] == "[]"
+    assert await LotDirectory.locate("lot_id", 7) == [] and registered == [130_000_001]
@@ -0,0 +1,75 @@
+import uuid
+
+from app.core import cache as core_cache
+from app.core.security import principal as principal_module
+from app.core.security.principal import Principal, PrincipalCache
+from tests.fakes import use_redis
+
+USER_ID = str(uuid.uuid4())
+
+
+def make_principal(roles=("basic_trader",), is_active=True):
+    return Principal(id=USER_ID, email="user@example.com", salt="ab" * 16, is_active=is_active, kyc_access=False,
+                     two_fa_enabled=False, roles=frozenset(roles), permissions=frozenset({"lots.read"}))
+
+
+def use_principal_redis(monkeypatch):
+    return use_redis(monkeypatch, principal_module, core_cache)
+
+
+async def test_principal_roundtrip_and_roles_without_db():
+    principal = make_principal(roles=("admin",))
+    assert Principal.from_json(principal.to_json()) == principal
+
+    user = principal.to_user()
+    assert await user.has_role("admin")
+    assert not await user.has_role("basic_trader")
+
+
+async def test_cache_loads_once_and_reloads_after_invalidation(monkeypatch):
+    use_principal_redis(monkeypatch)
+    stored = {"principal": make_principal()}
+    loads = []
+
+    async def load(user_id):
+        loads.append(user_id)
+        return stored["principal"]
+
+    monkeypatch.setattr(Principal, "load", staticmethod(load))
+
+    cache = PrincipalCache()
+    assert (await cache.get(USER_ID)).is_active
+    await cache.get(USER_ID)
+    # Другой процесс: пусто в памяти, но запись уже в Redis
+    await PrincipalCache().get(USER_ID)
+    assert loads == [USER_ID]
+
+    stored["principal"] = make_principal(is_active=False)
+    await cache.invalidate([USER_ID])
+    assert not (await cache.get(USER_ID)).is_active
+    assert len(loads) == 2
+
+    stored["principal"] = make_principal(roles=("admin",), is_active=False)
+    await cache.invalidate_all()
+    assert (await cache.get(USER_ID)).roles == {"admin"}
+    assert len(loads) == 3
+
+
+async def test_invalidation_during_load_is_not_cached(monkeypatch):
+    use_principal_redis(monkeypatch)
+    cache = PrincipalCache()
+    stored = {"principal": make_principal()}
+
+    async def load(user_id):
+        principal = stored["principal"]
+        if principal.is_active:
+            # Пользователя деактивируют между чтением из БД и записью в кэш
+            stored["principal"] = make_principal(is_active=False)
+            await cache.invalidate([user_id])
+        return principal
+
+    monkeypatch.setattr(Principal, "load", staticmethod(load))
+
+    assert not (await cache.get(USER_ID)).is_active
+    assert not (await PrincipalCache().get(USER_ID)).is_active
+    assert not (await cache.get(USER_ID)).is_active
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from app.services.cache.refine import refine_query_key
+
+
+def params(**overrides):
+    base = {
+        "is_historical": False, "language": "en", "base_site": None, "make_slug": None, "model_slug": None,
+        "vehicle_type_slug": ["automobile"], "auction_date_from": None, "limit": 18, "offset": 0,
+        "sort_by": "auction_date", "sort_order": "desc", "special_filter": None,
+    }
+    return {**base, **overrides}
+
+
+def test_equivalent_queries_share_key():
+    key = refine_query_key(params(make_slug=["bmw", "audi"], model_slug=["x5"]))
+    assert key.startswith("refine_v1_")
+    # Порядок параметров и значений, повторы значений
+    reordered = dict(reversed(list(params(make_slug=["audi", "bmw", "audi"], model_slug=["x5"]).items())))
+    assert refine_query_key(reordered) == key
+    # Не заданный фильтр (None) и отсутствующий параметр равнозначны
+    assert refine_query_key({k: v for k, v in params(make_slug=["bmw", "audi"], model_slug=["x5"]).items()
+                             if v is not None}) == key
+
+
+def test_result_affecting_params_change_key():
+    key = refine_query_key(params(base_site=["copart", "iaai"]))
+    assert refine_query_key(params(base_site=["iaai", "copart"])) != key
+    assert refine_query_key(params(base_site=["copart", "iaai"], offset=1)) != key
+    assert refine_query_key(params(base_site=["copart", "iaai"], language="ru")) != key
+    dated = params(auction_date_from=datetime(2026, 1, 1))
+    assert refine_query_key(dated) == refine_query_key(params(auction_date_from=datetime(2026, 1, 1)))
+    assert refine_query_key(dated) != refine_query_key(params(auction_date_from=datetime(2026, 1, 2)))
@@ -0,0 +1,151 @@
+import asyncio
+import gzip
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from starlette.requests import Request
+
+from app.services.cache import response as response_module
+from app.core.cache import generation_key
+from app.services.cache.response import ResponseCache, encode_json
+from tests.fakes import use_redis
+
+
+def make_request(accept_encoding="", if_none_match=""):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    if if_none_match:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+def test_encode_json_matches_api_encoding():
+    body = encode_json({"date": datetime(2026, 1, 2, 3, 4, 5), "price": Decimal("1.5"), 7: "ё"})
+    assert json.loads(body) == {"date": "2026-01-02T03:04:05", "price": 1.5, "7": "ё"}
+
+
+def use_bytes_redis(monkeypatch):
+    return use_redis(monkeypatch, response_module, attribute="get_redis_bytes_client", decode_responses=False)
+
+
+async def test_concurrent_misses_compute_once(monkeypatch):
+    redis = use_bytes_redis(monkeypatch)
+    cache = ResponseCache()
+    large = {"lots": [{"id": n, "vin": f"VIN{n:014d}"} for n in range(100)]}
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        await asyncio.sleep(0.01)
+        return large
+
+    responses = await asyncio.gather(*(
+        cache.fetch(make_request("gzip" if n % 2 else ""), "lot", compute, 60, 120, "en") for n in range(20)
+    ))
+    assert len(computed) == 1
+    # Крупное тело хранится сжатым: клиенту с gzip уходит как есть, остальным — распакованным
+    stored = response_module.CachedBody.unpack(redis.data["lot"]["en"]).body
+    assert responses[1].body == stored and responses[1].headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(stored)) == large
+    assert json.loads(responses[0].body) == large and "content-encoding" not in responses[0].headers
+
+    redis.calls.clear()
+    hit = await cache.fetch(make_request(), "lot", compute, 60, 120, "en")
+    assert json.loads(hit.body) == large and len(computed) == 1 and redis.calls == ["hget"]
+    assert "lot_lock_en" not in redis.data
+
+
+async def test_stale_entry_is_served_while_one_refresh_runs(monkeypatch):
+    redis = use_bytes_redis(monkeypatch)
+    monkeypatch.setattr(response_module, "POLL_INTERVAL", 0.001)
+    cache = ResponseCache()
+    versions = iter(range(1, 100))
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        return {"version": next(versions)}
+
+    first = await cache.fetch(make_request(), "refine", compute, 0, 60)
+    assert json.loads(first.body) == {"version": 1}
+    # Ответ уже устарел (soft_ttl=0): отдается старая версия, пересчет один на все запросы
+    stale = await asyncio.gather(*(cache.fetch(make_request(), "refine", compute, 60, 60) for _ in range(10)))
+    assert {json.loads(response.body)["version"] for response in stale} == {1}
+    await asyncio.sleep(0.05)
+    fresh = await cache.fetch(make_request(), "refine", compute, 60, 60)
+    assert json.loads(fresh.body) == {"version": 2}
+
+    # Пока блокировка у другого процесса, промах ждет его запись, а не считает сам
+    redis.data["other_lock_"] = "foreign"
+
+    async def publish():
+        await asyncio.sleep(0.02)
+        redis.data["other"] = response_module.CachedBody.build(b'{"version":0}', 60).pack()
+
+    waited, _ = await asyncio.gather(
+        ResponseCache().fetch(make_request(), "other", compute, 60, 60), publish()
+    )
+    assert json.loads(waited.body) == {"version": 0}
+    assert next(versions) == 3
+
+
+async def test_matching_etag_gets_not_modified(monkeypatch):
+    use_bytes_redis(monkeypatch)
+    monkeypatch.setattr(response_module, "brotli", None)
+    cache = ResponseCache()
+    large = {"lots": [{"id": n} for n in range(300)]}
+
+    async def compute():
+        return large
+
+    plain = await cache.fetch(make_request(), "refine", compute, 60, 60)
+    zipped = await cache.fetch(make_request("br;q=0, gzip"), "refine", compute, 60, 60)
+    # Свой ETag у каждой кодировки, а If-None-Match с любой из них означает то же тело
+    assert zipped.headers["content-encoding"] == "gzip" and zipped.headers["etag"] != plain.headers["etag"]
+    for etag in (plain.headers["etag"], f'W/{zipped.headers["etag"]}', '"other", ' + plain.headers["etag"]):
+        cached = await cache.fetch(make_request("gzip", etag), "refine", compute, 60, 60)
+        assert cached.status_code == 304 and cached.body == b"" and cached.headers["etag"] == zipped.headers["etag"]
+    changed = await cache.fetch(make_request(if_none_match='"0000000000000000"'), "refine", compute, 60, 60)
+    assert changed.status_code == 200 and json.loads(changed.body) == large
+
+
+async def test_waiters_take_over_when_holder_fails(monkeypatch):
+    redis = use_bytes_redis(monkeypatch)
+    monkeypatch.setattr(response_module, "POLL_INTERVAL", 0.001)
+    # Блокировку держит другой процесс, его compute падает: lock снят, записи нет
+    redis.data["lot_lock_en"] = "foreign"
+
+    async def holder_fails():
+        await asyncio.sleep(0.01)
+        del redis.data["lot_lock_en"]
+
+    async def compute():
+        return {"id": 1}
+
+    started = time.monotonic()
+    response, _ = await asyncio.gather(
+        ResponseCache().fetch(make_request(), "lot", compute, 60, 60, "en"), holder_fails()
+    )
+    assert json.loads(response.body) == {"id": 1}
+    assert time.monotonic() - started < response_module.LOCK_WAIT / 2
+    assert "lot_lock_en" not in redis.data and "en" in redis.data["lot"]
+
+
+async def test_invalidation_during_compute_drops_write(monkeypatch):
+    redis = use_bytes_redis(monkeypatch)
+    cache = ResponseCache()
+
+    async def compute():
+        # Лот изменился, пока считался ответ: invalidate_lot_cache поднимает поколение ключа
+        await redis.incr(generation_key("lot"))
+        return {"price": 100}
+
+    response = await cache.fetch(make_request(), "lot", compute, 60, 60, "en")
+    assert json.loads(response.body) == {"price": 100}
+    assert "lot" not in redis.data and "lot_lock_en" not in redis.data
+
+    async def fresh():
+        return {"price": 200}
+
+    await cache.fetch(make_request(), "lot", fresh, 60, 60, "en")
+    assert json.loads(response_module.CachedBody.unpack(redis.data["lot"]["en"]).body) == {"price": 200}
@@ -0,0 +1,36 @@
+from collections import Counter
+
+from app.models.shard_map import ShardMap, ShardRing
+
+SHARDS = [f"Lot{n}" for n in range(1, 8)]
+
+
+def test_shard_ring_is_deterministic_and_balanced():
+    """Every key lands on one shard, same in every process, spread roughly evenly"""
+    ring, same_ring = ShardRing(SHARDS), ShardRing(list(SHARDS))
+    placement = {lot_id: ring.shard_for(lot_id) for lot_id in range(70_000)}
+
+    assert placement == {lot_id: same_ring.shard_for(lot_id) for lot_id in range(70_000)}
+    counts = Counter(placement.values())
+    assert set(counts) == set(SHARDS)
+    assert max(counts.values()) < 1.5 * min(counts.values())
+
+
+def test_adding_shard_moves_only_keys_to_new_shard():
+    """Consistent hashing: after adding Lot8 keys only move onto Lot8, about 1/8 of them"""
+    before, after = ShardRing(SHARDS), ShardRing([*SHARDS, "Lot8"])
+    moved = [lot_id for lot_id in range(80_000) if before.shard_for(lot_id) != after.shard_for(lot_id)]
+
+    assert all(after.shard_for(lot_id) == "Lot8" for lot_id in moved)
+    assert 0.08 < len(moved) / 80_000 < 0.18
+
+
+def test_shard_map_dual_reads_while_migrating():
+    shard_map = ShardMap([*SHARDS, "Lot8"], previous=SHARDS)
+    moved = next(lot_id for lot_id in range(1000) if shard_map.shard_for(lot_id) == "Lot8")
+    stayed = next(lot_id for lot_id in range(1000) if shard_map.shard_for(lot_id) != "Lot8")
+
+    assert shard_map.migrating and shard_map.shards == [*SHARDS, "Lot8"]
+    assert shard_map.read_shards(moved) == ["Lot8", ShardRing(SHARDS).shard_for(moved)]
+    assert shard_map.read_shards(stayed) == [shard_map.shard_for(stayed)]
+    assert not ShardMap(SHARDS).migrating
@@ -0,0 +1,167 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from app.models import Lot, Lot1, Lot2, Lot3
+from app.models.facet_query import execute_facets, reduce_facets
+from app.models.lot import PREFIX_CAPACITY
+from app.services.parsers.rebalance_shards import find_id_collisions, rebalance_shards
+from app.models.shard_query import (
+    merge_shard_rows, shard_ordering, keyset_filter, encode_cursor, decode_cursor,
+    reduce_shard_aggregates
+)
+from tests.database import lot_fields, sqlite_models
+
+
+def test_merge_shard_rows_returns_global_page():
+    """K-way merge returns a globally sorted page across shards"""
+    shards = [
+        [(1, 100), (4, 400), (7, 700)],
+        [(2, 200), (5, 500)],
+        [(3, 300), (6, 600)],
+    ]
+
+    page = merge_shard_rows(shards, descending=False, offset=2, limit=3)
+
+    assert [(index, row_id) for index, row_id, _ in page] == [(2, 3), (0, 4), (1, 5)]
+
+
+def test_merge_shard_rows_descending_with_nulls_first():
+    """Descending merge matches Postgres order: NULL first, then id tie-breaker"""
+    shards = [
+        [(9, None), (3, 50), (1, 10)],
+        [(8, 50), (2, 20)],
+    ]
+
+    page = merge_shard_rows(shards, descending=True, offset=0, limit=10)
+
+    assert [row_id for _, row_id, _ in page] == [9, 8, 3, 2, 1]
+
+
+def test_shard_ordering_adds_id_tie_breaker():
+    assert shard_ordering("price", descending=True) == ("-price", "-id")
+    assert shard_ordering("price", descending=False) == ("price", "id")
+
+
+def test_keyset_filter_by_id():
+    """Keyset by id compiles to a single id comparison"""
+    condition = keyset_filter("id", descending=True, cursor=(10, 10))
+    assert condition.filters == {"id__lt": 10}
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(date(2025, 1, 2), 11000042)
+
+    assert decode_cursor(cursor) == (date(2025, 1, 2), 11000042)
+    # Значения сортировки возвращаются своего типа: их напрямую подставляет keyset_filter
+    auction_date = datetime(2025, 1, 2, 10, 30, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(auction_date, 7)) == (auction_date, 7)
+    assert decode_cursor(encode_cursor(Decimal("1.50"), 7)) == (Decimal("1.50"), 7)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+    assert decode_cursor(encode_cursor(15000, 7)) == (15000, 7)
+    assert decode_cursor("not-a-cursor") is None
+    assert decode_cursor(None) is None
+
+
+def test_reduce_shard_aggregates_totals():
+    """Partial shard aggregates are summed and min/max skip empty shards"""
+    rows = [
+        {"count": 3, "odometer_min": 10, "odometer_max": 90},
+        {"count": 0, "odometer_min": None, "odometer_max": None},
+        {"count": 2, "odometer_min": 5, "odometer_max": 40},
+    ]
+
+    totals = reduce_shard_aggregates(rows, min_max=("odometer",))
+
+    assert totals == {"count": 5, "odometer_min": 5, "odometer_max": 90}
+    assert reduce_shard_aggregates([], min_max=("odometer",))["count"] == 0
+
+
+def test_reduce_shard_aggregates_group_by():
+    rows = [
+        {"vehicle_type_id": 1, "count": 4},
+        {"vehicle_type_id": 2, "count": 1},
+        {"vehicle_type_id": 1, "count": 6},
+    ]
+
+    buckets = reduce_shard_aggregates(rows, group_by="vehicle_type_id")
+
+    assert {b["vehicle_type_id"]: b["count"] for b in buckets} == {1: 10, 2: 1}
+
+
+async def create_shard_lots():
+    for model, lot_id, year, odometer in (
+        (Lot1, 1, 2018, 500), (Lot2, 2, 2020, 100), (Lot3, 3, 2020, 300), (Lot1, 4, 2021, None),
+    ):
+        await model.create(**lot_fields(lot_id, year=year, odometer=odometer))
+
+
+async def test_shard_aggregate_and_page_on_database(monkeypatch):
+    async with sqlite_models(monkeypatch):
+        await create_shard_lots()
+
+        assert await Lot.aggregate_across_shards(min_max=("odometer",)) == {
+            "count": 4, "odometer_min": 100, "odometer_max": 500
+        }
+        buckets = await Lot.aggregate_across_shards(group_by="year", year__gte=2019)
+        assert {bucket["year"]: bucket["count"] for bucket in buckets} == {2020: 2, 2021: 1}
+
+        # Страница собирается из всех шардов в общем порядке; при равном году — по id (в id префикс шарда)
+        page = await Lot.query_across_shards_with_limit_offset(
+            limit=2, offset=1, sort_by="year", sort_order="desc", prefetch=()
+        )
+        assert [(type(lot), lot.lot_id) for lot in page] == [(Lot3, 3), (Lot2, 2)]
+        rest = await Lot.query_across_shards_with_limit_offset(
+            limit=5, sort_by="year", sort_order="desc", cursor=(page[-1].year, page[-1].id), prefetch=()
+        )
+        assert [lot.lot_id for lot in rest] == [1]
+
+
+async def test_execute_facets_on_database(monkeypatch):
+    async with sqlite_models(monkeypatch):
+        await create_shard_lots()
+        await Lot2.create(**lot_fields(5, year=2018, odometer=50, state="CA"))
+
+        columns = ["year", "state"]
+        ranges = {"short": ("odometer", None, 200)}
+        rows = await execute_facets(Lot1.filter().values(*columns, "odometer"), columns, ("odometer",), ranges)
+        assert reduce_facets(rows, columns, ("odometer",), ranges) == {
+            "year": {2018: 1, 2021: 1},
+            "state": {"TX": 2},
+            "totals": {"count": 2, "odometer_min": 500, "odometer_max": 500, "short": 0},
+        }
+        rows = await execute_facets(Lot2.filter(year=2018).values(*columns, "odometer"), columns, ("odometer",), ranges)
+        assert reduce_facets(rows, columns, ("odometer",), ranges) == {
+            "year": {2018: 1},
+            "state": {"CA": 1},
+            "totals": {"count": 1, "odometer_min": 50, "odometer_max": 50, "short": 1},
+        }
+
+
+async def test_move_many_on_database(monkeypatch):
+    async with sqlite_models(monkeypatch):
+        await create_shard_lots()
+        moved = await Lot1.get(lot_id=1)
+
+        assert await Lot1.move_many([moved.id, 999], Lot2) == 1
+        # Лот переехал с тем же id, второй лот первого шарда остался на месте
+        assert (await Lot2.get(lot_id=1)).id == moved.id
+        assert await Lot1.filter(lot_id=1).exists() is False
+        assert await Lot1.filter(lot_id=4).exists() is True
+        assert await Lot1.move_many([moved.id], Lot3) == 0
+
+
+async def test_rebalance_skips_lots_whose_id_collides_in_target(monkeypatch):
+    async with sqlite_models(monkeypatch):
+        # Два лота, которые по кольцу принадлежат Lot2, но лежат в Lot1
+        lot_ids = [lot_id for lot_id in range(1, 200) if await Lot.get_shard_for_new_record(lot_id) is Lot2][:3]
+        resident = await Lot2.create(**lot_fields(lot_ids[0]))
+        misplaced = await Lot1.create(**lot_fields(lot_ids[1]))
+        # Старый ID без префикса совпадает с ID лота, уже лежащего в Lot2
+        legacy = await Lot1.create(id=resident.id, **lot_fields(lot_ids[2]))
+
+        stats = await rebalance_shards()
+        assert (stats["moved"], stats["collisions"], stats["errors"]) == (1, 1, 0)
+        assert (await Lot2.get(lot_id=misplaced.lot_id)).id == misplaced.id
+        assert (await Lot1.get(lot_id=legacy.lot_id)).id == resident.id
+        # ID из еще не выданного блока Lot3 тоже конфликт: allocator отдаст его новому лоту
+        assert await find_id_collisions(Lot3, [Lot3.PREFIX * PREFIX_CAPACITY + 5]) == {Lot3.PREFIX * PREFIX_CAPACITY + 5}
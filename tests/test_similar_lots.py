@@ -0,0 +1,46 @@
+import random
+
+from app.services.similar_service import LotFeatures, SimilarLotsIndex, distance
+
+
+def features(pk, model_id=1, year=2018, odometer=60_000, price=10_000, make_id=1, site_id=1):
+    return LotFeatures(pk, None, site_id, make_id, model_id, year, odometer, price, 2.0, 3)
+
+
+def test_nearest_prefers_same_model_and_reaches_neighbouring_years():
+    index = SimilarLotsIndex()
+    source = features(1)
+    for lot in (
+        source,
+        features(2, year=2019),
+        features(3, model_id=2),
+        features(4, year=2012),
+        features(5, make_id=2),
+        features(6, site_id=2),
+        features(7, odometer=61_000, price=10_500),
+    ):
+        index.add(lot)
+
+    assert [lot.pk for lot in index.nearest(source, 3)] == [7, 2, 3]
+    # Другая марка и другая площадка в выдачу не попадают
+    assert [lot.pk for lot in index.nearest(source, 10)] == [7, 2, 3, 4]
+
+    index.discard(7)
+    index.add(features(2, year=2024))
+    assert [lot.pk for lot in index.nearest(source, 2)] == [3, 2]
+
+
+def test_nearest_matches_full_scan():
+    rng = random.Random(7)
+    index = SimilarLotsIndex()
+    lots = [
+        features(pk, model_id=rng.randint(1, 6), year=rng.randint(2005, 2024),
+                 odometer=rng.choice([None, rng.randint(0, 250_000)]), price=rng.randint(500, 40_000))
+        for pk in range(1, 2001)
+    ]
+    for lot in lots:
+        index.add(lot)
+
+    for source in lots[:20]:
+        expected = sorted((lot for lot in lots if lot.pk != source.pk), key=lambda lot: (distance(source, lot), lot.pk))
+        assert [lot.pk for lot in index.nearest(source, 5)] == [lot.pk for lot in expected[:5]]
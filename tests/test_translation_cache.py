@@ -0,0 +1,48 @@
+from app.models.translate import LanguageEnum, Translation
+from app.services import translate_service
+from app.services.translate_service import TranslationCache
+
+
+def test_lookup_accepts_enum_and_plain_language():
+    cache = TranslationCache()
+    cache.remember("color", "red", LanguageEnum.RU, "Красный")
+
+    assert cache.lookup("color", "red", "ru") == "Красный"
+    assert cache.lookup("color", "red", LanguageEnum.RU) == "Красный"
+    assert cache.lookup("color", "red", "en") is None
+
+
+def test_lookup_many_skips_missing_and_negative_entries():
+    cache = TranslationCache()
+    cache.remember("fuel", "gas", "ru", "Бензин")
+    cache.remember("fuel", "diesel", "ru", None)
+
+    assert cache.lookup_many("fuel", ["gas", "diesel", "electric"], "ru") == {"gas": "Бензин"}
+
+
+async def test_inserted_translations_bump_shared_version(monkeypatch):
+    cache = TranslationCache()
+    bumps = []
+
+    async def ensure_fresh():
+        pass
+
+    async def bump():
+        bumps.append(1)
+
+    async def bulk_create(rows, ignore_conflicts=False):
+        pass
+
+    class Make:
+        slug, name = "tesla", "Tesla"
+
+    monkeypatch.setattr(translate_service, "translation_cache", cache)
+    monkeypatch.setattr(cache, "ensure_fresh", ensure_fresh)
+    monkeypatch.setattr(cache.version, "bump", bump)
+    monkeypatch.setattr(Translation, "bulk_create", bulk_create)
+
+    await translate_service.ensure_model_translations([("make", Make())])
+    assert cache.lookup("make", "tesla", "en") == "Tesla" and bumps == [1]
+    # Все переводы уже есть — ни вставки, ни новой версии
+    await translate_service.ensure_model_translations([("make", Make())])
+    assert bumps == [1]
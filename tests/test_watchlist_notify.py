@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+
+from app.models import HistoricalLot, Lot
+from app.services.kafka import watchlist
+from app.services import watchlist_service
+from app.services.watchlist_service import diff_lot_state, lot_state
+from app.core.cache import generation_key, watchers_key
+from tests.fakes import use_redis
+
+
+def test_diff_reports_only_changed_fields():
+    lot = Lot(price=10_000, current_bid=500, auction_date=datetime(2026, 1, 10))
+    before = lot_state(lot)
+    lot.current_bid = 750
+    assert diff_lot_state(before, lot_state(lot)) == {"current_bid": {"old": 500, "new": 750}}
+
+    moved = HistoricalLot(price=10_000, current_bid=750, auction_date=datetime(2026, 1, 10))
+    assert diff_lot_state(lot_state(lot), lot_state(moved)) == {"historical": {"old": False, "new": True}}
+    # Новый лот — уведомлять некого и не о чем
+    assert diff_lot_state(None, lot_state(lot)) == {}
+
+
+class FakeProducer:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, topic, value, key=None, wait=True):
+        self.sent.append((topic, key, json.loads(value), wait))
+
+
+async def test_notify_sends_one_message_per_watched_lot(monkeypatch):
+    lookups = []
+
+    async def watchers_for(lot_pks):
+        lookups.append(sorted(lot_pks))
+        return {1: ["u1", "u2"], 3: ["u3"]}
+
+    producer = FakeProducer()
+    monkeypatch.setattr(watchlist, "watchers_for", watchers_for)
+    monkeypatch.setattr(watchlist, "kafka_producer", producer)
+
+    changes = {
+        1: {"current_bid": {"old": 500, "new": 750}},
+        2: {"price": {"old": 1, "new": 2}},
+        3: {"historical": {"old": False, "new": True}},
+        4: {},
+    }
+    assert await watchlist.notify_lots_changes(changes) == 2
+
+    # Наблюдатели всех лотов — одним запросом, лоты без изменений не запрашиваются
+    assert lookups == [[1, 2, 3]]
+    assert [(key, message["user_ids"], wait) for _, key, message, wait in producer.sent] == [
+        ("1", ["u1", "u2"], False),
+        ("3", ["u3"], False),
+    ]
+    assert producer.sent[0][2]["changes"] == changes[1]
+
+
+async def test_watchers_read_before_invalidation_are_not_cached(monkeypatch):
+    redis = use_redis(monkeypatch, watchlist_service)
+    redis.data[watchers_key(2)] = json.dumps(["u9"])
+
+    class Rows:
+        def __init__(self, lot_ids):
+            self.lot_ids = lot_ids
+
+        async def values_list(self, *fields):
+            # Пользователь меняет watchlist лота 1, пока идет чтение из БД
+            redis.data[generation_key(watchers_key(1))] = "1"
+            return [(lot_id, "u1") for lot_id in self.lot_ids]
+
+    monkeypatch.setattr(watchlist_service.UserWatchlist, "filter", classmethod(lambda cls, lot_id__in: Rows(lot_id__in)))
+
+    assert await watchlist_service.watchers_for([1, 2, 3]) == {1: ["u1"], 2: ["u9"], 3: ["u1"]}
+    assert watchers_key(1) not in redis.data
+    assert json.loads(redis.data[watchers_key(3)]) == ["u1"]
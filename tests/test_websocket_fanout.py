@@ -0,0 +1,160 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.services import websocket_hub as ws
+from tests.fakes import use_redis
+
+
+class FakeSocket:
+    def __init__(self, gate: asyncio.Event = None):
+        # gate — send_text blocks until it is set (a slow client)
+        self.gate = gate
+        self.sent = []
+        self.received = asyncio.Queue()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        if self.gate is not None:
+            await self.gate.wait()
+        message = json.loads(payload)
+        self.sent.append(message)
+        self.received.put_nowait(message)
+
+    async def next(self) -> dict:
+        return await asyncio.wait_for(self.received.get(), 1)
+
+    async def close(self, code=None):
+        pass
+
+
+class FakeBus:
+    """Redis pub/sub shared by several workers"""
+
+    def __init__(self):
+        self.subscribers = {}
+
+    def hub(self, deliver):
+        bus = self
+
+        class Hub:
+            async def subscribe(self, channel):
+                bus.subscribers.setdefault(channel, []).append(deliver)
+
+            async def unsubscribe(self, channel):
+                bus.subscribers[channel].remove(deliver)
+
+            async def publish(self, channel, data):
+                for subscriber in bus.subscribers.get(channel, []):
+                    subscriber(channel, data)
+                return True
+
+        return Hub()
+
+
+def worker(bus: FakeBus) -> ws.ConnectionManager:
+    manager = ws.ConnectionManager()
+    manager.hub = bus.hub(manager.receive)
+    return manager
+
+
+async def test_lot_updates_reach_watchers_on_every_worker_without_waiting_for_slow_ones():
+    bus = FakeBus()
+    first, second = worker(bus), worker(bus)
+    unblock = asyncio.Event()
+    fast, slow, other = FakeSocket(), FakeSocket(gate=unblock), FakeSocket()
+    await first.connect(fast, SimpleNamespace(id=1), "42")
+    await second.connect(slow, SimpleNamespace(id=2), "42")
+    await second.connect(other, SimpleNamespace(id=3), "7")
+
+    await first.broadcast_to_lot("42", {"type": "bid_placed", "amount": 100}, key="bid_placed:42")
+    assert await fast.next() == {"type": "bid_placed", "amount": 100}
+    assert slow.sent == [] and other.sent == []
+
+    # While the slow client is busy its unsent bids collapse into the latest one
+    await first.broadcast_to_lot("42", {"type": "bid_placed", "amount": 200}, key="bid_placed:42")
+    assert (await fast.next())["amount"] == 200
+    await first.broadcast_to_lot("42", {"type": "bid_placed", "amount": 300}, key="bid_placed:42")
+    assert (await fast.next())["amount"] == 300
+    unblock.set()
+    assert [(await slow.next())["amount"] for _ in range(2)] == [100, 300]
+    await asyncio.sleep(0)
+    assert slow.received.empty() and other.sent == []
+
+    await second.disconnect(slow)
+    assert ws.lot_channel("42") not in second.channel_members
+    assert ws.lot_channel("42") in first.channel_members
+    await first.disconnect(fast)
+    await second.disconnect(other)
+
+
+async def test_send_queue_is_bounded_and_drops_oldest(monkeypatch):
+    monkeypatch.setattr(ws, "SEND_QUEUE_SIZE", 3)
+    closed = asyncio.Event()
+
+    async def on_close(connection):
+        closed.set()
+
+    socket = FakeSocket()
+    connection = ws.ClientConnection(socket, SimpleNamespace(id=1), on_close)
+    for number in range(6):
+        connection.send(json.dumps({"n": number}))
+    assert connection.dropped == 3
+    assert [(await socket.next())["n"] for _ in range(3)] == [3, 4, 5]
+    await asyncio.sleep(0)
+    assert connection.dropped == 0 and not closed.is_set()
+    connection.close()
+    await asyncio.wait_for(closed.wait(), 1)
+
+
+async def test_live_lot_updates_are_sent_as_one_delta_frame_per_tick():
+    bus = FakeBus()
+    first, second = worker(bus), worker(bus)
+    early, late = FakeSocket(), FakeSocket()
+    await second.connect(early, SimpleNamespace(id=1), "42")
+
+    await first.stream_lot_update("42", {"current_bid": 100, "status": "live"})
+    await first.stream_bid("42", {"amount": 100})
+    await first.stream_bid("42", {"amount": 150})
+    await first.stream_lot_update("42", {"current_bid": 150})
+    assert [await early.next(), await early.next()] == [
+        {"type": "bid_placed", "lot_id": "42", "bid": {"amount": 150}, "bids": [{"amount": 100}, {"amount": 150}]},
+        {"type": "lot_update", "lot_id": "42", "data": {"current_bid": 150, "status": "live"}},
+    ]
+
+    # Unchanged fields are not resent; a socket joining later gets the full state first
+    await first.stream_lot_update("42", {"current_bid": 200, "status": "live"})
+    assert await early.next() == {"type": "lot_update", "lot_id": "42", "data": {"current_bid": 200}}
+    await second.connect(late, SimpleNamespace(id=2), "42")
+    assert await late.next() == {"type": "lot_update", "lot_id": "42", "data": {"current_bid": 200, "status": "live"}}
+    assert early.received.empty()
+
+
+    # Bid frames of later ticks are not coalesced away while a client lags
+    unblock = asyncio.Event()
+    slow = FakeSocket(gate=unblock)
+    await second.connect(slow, SimpleNamespace(id=3), "42")
+    await first.stream_bid("42", {"amount": 250})
+    assert (await early.next())["bids"] == [{"amount": 250}]
+    await first.stream_bid("42", {"amount": 300})
+    assert (await early.next())["bids"] == [{"amount": 300}]
+    unblock.set()
+    assert [message.get("bids") for message in [await slow.next() for _ in range(3)]] == [
+        None, [{"amount": 250}], [{"amount": 300}]
+    ]
+
+    await second.disconnect(early)
+    await second.disconnect(late)
+    await second.disconnect(slow)
+    assert second.frames.snapshot(ws.lot_channel("42")) is None
+
+
+async def test_concurrent_first_subscribers_open_one_listener(monkeypatch):
+    redis = use_redis(monkeypatch, ws)
+    fanout = ws.RedisFanout(lambda channel, data: None)
+    await asyncio.gather(fanout.subscribe("a"), fanout.subscribe("b"))
+    assert len(redis.pubsubs) == 1
+    assert {"a", "b"} <= set(redis.pubsubs[0].channels)
+    fanout._listener.cancel()